@@ -22,6 +22,7 @@ class _ApiKeyRedactor(logging.Filter):
                 key = m.group(1)
                 return f"{key}=***REDACTED***"
             record.msg = self._pattern.sub(_repl, msg)
+            record.args = None  # msg is already formatted
         except Exception:
             pass
         return True
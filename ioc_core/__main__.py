@@ -0,0 +1,5 @@
+"""``python -m ioc_core``: see ioc_core.cli."""
+
+from .cli import main
+
+raise SystemExit(main())
@@ -1,10 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
 import sqlite3
 import threading
 import time
-from typing import Any, Dict, Optional, cast
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from .codec import decode_payload, encode_payload
+
+if TYPE_CHECKING:
+    from .compiled_cache import CompiledCache
+
+# Keep row-value IN lists well under SQLite's bound-parameter limit
+_MANY_CHUNK = 400
+
+CacheKey = tuple[str, str]
+CacheRow = tuple[str, str, str, dict[str, Any]]
+# (provider, ioc, type, fetched_at, encoded payload) as stored in the table
+RawCacheRow = tuple[str, str, str, int, bytes]
+
+_T = TypeVar("_T")
 
 
 class Cache:
@@ -12,13 +31,27 @@ class Cache:
 
     Table: cache(provider TEXT, ioc TEXT, type TEXT, fetched_at INTEGER, payload TEXT,
     PRIMARY KEY(provider,ioc))
+
+    Table: hash_alias(alias TEXT PRIMARY KEY, sha256 TEXT) maps MD5/SHA-1 digests of
+    a sample to its SHA-256 so hash results are cached once under the SHA-256.
+
+    Payloads are written in the compact binary format from ``ioc_core.codec`` unless
+    ``compact=False``; legacy JSON text rows are read transparently either way.
+
+    An optional read-only CompiledCache can sit beneath the table
+    (``attach_compiled``); it answers keys that are missing or stale locally.
     """
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, compact: bool = True):
+        self.compact = compact
+        self.compiled: CompiledCache | None = None
         self.conn = sqlite3.connect(path, check_same_thread=False)
         self.conn.execute(
             "CREATE TABLE IF NOT EXISTS cache (provider TEXT, ioc TEXT, type TEXT, fetched_at INTEGER, payload TEXT, PRIMARY KEY(provider,ioc))"
         )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hash_alias (alias TEXT PRIMARY KEY, sha256 TEXT NOT NULL)"
+        )
         self._migrate_schema_if_needed()
         self.conn.commit()
         self.lock = threading.Lock()
@@ -34,21 +67,52 @@ class Cache:
         except Exception:
             pass
 
-    def get(self, provider: str, ioc: str, max_age: int) -> Optional[Dict[str, Any]]:
+    def attach_compiled(self, compiled: CompiledCache | None) -> None:
+        """Use a compiled lookup file as a read tier beneath SQLite (None detaches)."""
+        self.compiled = compiled
+
+    def get(self, provider: str, ioc: str, max_age: int) -> dict[str, Any] | None:
         with self.lock:
             cur = self.conn.execute("SELECT fetched_at, payload FROM cache WHERE provider=? AND ioc= ?", (provider, ioc))
             row = cur.fetchone()
-        if not row:
-            return None
-        fetched_at, payload = row
-        if int(time.time()) - int(fetched_at) > max_age:
-            return None
+        if not row or int(time.time()) - int(row[0]) > max_age:
+            return self.compiled.get(provider, ioc, max_age) if self.compiled is not None else None
         try:
-            return cast(Dict[str, Any], json.loads(payload))
+            return decode_payload(row[1])
         except Exception:
             return None
 
-    def get_age(self, provider: str, ioc: str) -> Optional[int]:
+    def get_many(self, keys: Iterable[CacheKey], max_age: int) -> dict[CacheKey, dict[str, Any]]:
+        """Bulk variant of get(): returns {(provider, ioc): payload} for fresh hits only."""
+        uniq = list(dict.fromkeys(keys))
+        out: dict[CacheKey, dict[str, Any]] = {}
+        now = int(time.time())
+        for i in range(0, len(uniq), _MANY_CHUNK):
+            chunk = uniq[i:i + _MANY_CHUNK]
+            marks = ",".join("(?,?)" for _ in chunk)
+            params = [v for k in chunk for v in k]
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT provider, ioc, fetched_at, payload FROM cache"  # noqa: S608
+                    f" WHERE (provider, ioc) IN (VALUES {marks})",
+                    params,
+                ).fetchall()
+            for provider, ioc, fetched_at, payload in rows:
+                if now - int(fetched_at) > max_age:
+                    continue
+                try:
+                    out[(provider, ioc)] = decode_payload(payload)
+                except Exception:
+                    continue
+        if self.compiled is not None:
+            for provider, ioc in uniq:
+                if (provider, ioc) not in out:
+                    hit = self.compiled.get(provider, ioc, max_age)
+                    if hit is not None:
+                        out[(provider, ioc)] = hit
+        return out
+
+    def get_age(self, provider: str, ioc: str) -> int | None:
         """Return age in seconds for (provider,ioc) if present; otherwise None."""
         with self.lock:
             cur = self.conn.execute(
@@ -57,21 +121,232 @@ class Cache:
             )
             row = cur.fetchone()
         if not row:
-            return None
+            return self.compiled.get_age(provider, ioc) if self.compiled is not None else None
         fetched_at = int(row[0])
         age = int(time.time()) - fetched_at
         if age < 0:
             return 0
         return age
 
-    def set(self, provider: str, ioc: str, ioc_type: str, payload: Dict[str, Any]) -> None:
+    def get_ages_many(self, keys: Iterable[CacheKey]) -> dict[CacheKey, int]:
+        """Bulk get_age(): {(provider, ioc): age in seconds} for the keys that are present."""
+        uniq = list(dict.fromkeys(keys))
+        out: dict[CacheKey, int] = {}
+        now = int(time.time())
+        for i in range(0, len(uniq), _MANY_CHUNK):
+            chunk = uniq[i:i + _MANY_CHUNK]
+            marks = ",".join("(?,?)" for _ in chunk)
+            params = [v for k in chunk for v in k]
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT provider, ioc, fetched_at FROM cache"  # noqa: S608
+                    f" WHERE (provider, ioc) IN (VALUES {marks})",
+                    params,
+                ).fetchall()
+            for provider, ioc, fetched_at in rows:
+                out[(provider, ioc)] = max(0, now - int(fetched_at))
+        if self.compiled is not None:
+            for provider, ioc in uniq:
+                if (provider, ioc) not in out:
+                    age = self.compiled.get_age(provider, ioc)
+                    if age is not None:
+                        out[(provider, ioc)] = age
+        return out
+
+    def resolve_hash(self, digest: str) -> str:
+        """Return the known SHA-256 for an MD5/SHA-1/SHA-256 digest, else the digest itself."""
+        d = digest.lower()
+        if len(d) == 64:
+            return d
+        with self.lock:
+            row = self.conn.execute("SELECT sha256 FROM hash_alias WHERE alias=?", (d,)).fetchone()
+        return str(row[0]) if row else d
+
+    def add_hash_aliases(self, sha256: str, aliases: Iterable[str]) -> None:
+        """Record that each alias digest (MD5/SHA-1) names the sample ``sha256``."""
+        canon = sha256.lower()
+        rows = [(a.lower(), canon) for a in aliases if a and a.lower() != canon]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("REPLACE INTO hash_alias (alias, sha256) VALUES (?, ?)", rows)
+            self.conn.commit()
+
+    def _encode(self, payload: dict[str, Any]) -> Any:
+        if self.compact:
+            return sqlite3.Binary(encode_payload(payload))
+        return json.dumps(payload)
+
+    def set(self, provider: str, ioc: str, ioc_type: str, payload: dict[str, Any]) -> None:
         with self.lock:
             self.conn.execute(
                 "REPLACE INTO cache (provider, ioc, type, fetched_at, payload) VALUES (?,?,?,?,?)",
-                (provider, ioc, ioc_type, int(time.time()), json.dumps(payload)),
+                (provider, ioc, ioc_type, int(time.time()), self._encode(payload)),
+            )
+            self.conn.commit()
+
+    def set_many(self, rows: Iterable[CacheRow]) -> None:
+        """Write several entries in one transaction (one commit instead of one per row)."""
+        now = int(time.time())
+        params = [(p, ioc, t, now, self._encode(payload)) for p, ioc, t, payload in rows]
+        if not params:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "REPLACE INTO cache (provider, ioc, type, fetched_at, payload) VALUES (?,?,?,?,?)",
+                params,
             )
             self.conn.commit()
 
+    def iter_rows(self, since: int = 0, batch_size: int = 5000) -> Iterator[RawCacheRow]:
+        """Yield stored rows with fetched_at >= since, in rowid batches.
+
+        Payloads come back in the compact encoding (legacy JSON rows are re-encoded).
+        The lock is only held while fetching a batch, never across a yield.
+        """
+        last_rowid = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, provider, ioc, type, fetched_at, payload FROM cache "
+                    "WHERE rowid > ? AND fetched_at >= ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, int(since), max(1, batch_size)),
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, provider, ioc, ioc_type, fetched_at, payload in rows:
+                last_rowid = rowid
+                if isinstance(payload, str):
+                    try:
+                        payload = encode_payload(decode_payload(payload))
+                    except Exception:
+                        continue
+                yield provider, ioc, ioc_type or "", int(fetched_at), bytes(payload)
+
+    def iter_hash_aliases(
+        self, since: int = 0, batch_size: int = 5000
+    ) -> Iterator[tuple[str, str]]:
+        """Yield (alias, sha256) pairs whose SHA-256 has a row fetched at or after ``since``."""
+        last_rowid = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, alias, sha256 FROM hash_alias WHERE rowid > ? "
+                    "AND (? <= 0 OR sha256 IN (SELECT ioc FROM cache WHERE fetched_at >= ?)) "
+                    "ORDER BY rowid LIMIT ?",
+                    (last_rowid, int(since), int(since), max(1, batch_size)),
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            for _, alias, sha256 in rows:
+                yield str(alias), str(sha256)
+
+    def merge_rows(
+        self,
+        rows: Iterable[RawCacheRow],
+        batch_size: int = 5000,
+        aliases: Iterable[tuple[str, str]] = (),
+    ) -> int:
+        """Upsert raw rows; an incoming row only wins if its fetched_at is newer.
+
+        ``aliases`` are (alias, sha256) pairs recorded as by ``add_hash_aliases``.
+        Both are staged in temp tables and applied in one transaction once they
+        are exhausted, so an error while producing them (e.g. a truncated
+        snapshot) leaves the cache untouched. Returns the number of rows
+        inserted or replaced.
+        """
+        with self.lock:
+            self.conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS merge_stage "
+                "(provider TEXT, ioc TEXT, type TEXT, fetched_at INTEGER, payload BLOB)"
+            )
+            self.conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS merge_alias_stage (alias TEXT, sha256 TEXT)"
+            )
+            self.conn.commit()
+
+        def stage(sql: str, items: Iterable[tuple[Any, ...]]) -> None:
+            batch: list[tuple[Any, ...]] = []
+            for item in items:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    with self.lock:
+                        self.conn.executemany(sql, batch)
+                        self.conn.commit()
+                    batch.clear()
+            if batch:
+                with self.lock:
+                    self.conn.executemany(sql, batch)
+                    self.conn.commit()
+
+        try:
+            stage(
+                "INSERT INTO temp.merge_stage VALUES (?,?,?,?,?)",
+                ((p, i, t, f, sqlite3.Binary(pay)) for p, i, t, f, pay in rows),
+            )
+            stage(
+                "INSERT INTO temp.merge_alias_stage VALUES (?,?)",
+                ((a.lower(), h.lower()) for a, h in aliases if a and a.lower() != h.lower()),
+            )
+            with self.lock:
+                try:
+                    before = self.conn.total_changes
+                    # WHERE true: an upsert after INSERT ... SELECT needs it to parse
+                    self.conn.execute(
+                        "INSERT INTO cache (provider, ioc, type, fetched_at, payload) "
+                        "SELECT provider, ioc, type, fetched_at, payload FROM temp.merge_stage "
+                        "WHERE true ORDER BY rowid "
+                        "ON CONFLICT(provider, ioc) DO UPDATE SET type=excluded.type, "
+                        "fetched_at=excluded.fetched_at, payload=excluded.payload "
+                        "WHERE excluded.fetched_at > cache.fetched_at"
+                    )
+                    applied = self.conn.total_changes - before
+                    self.conn.execute(
+                        "REPLACE INTO hash_alias (alias, sha256) "
+                        "SELECT alias, sha256 FROM temp.merge_alias_stage"
+                    )
+                    self.conn.commit()
+                except BaseException:
+                    self.conn.rollback()
+                    raise
+        finally:
+            with self.lock:
+                self.conn.execute("DELETE FROM temp.merge_stage")
+                self.conn.execute("DELETE FROM temp.merge_alias_stage")
+                self.conn.commit()
+        return applied
+
+    def migrate_payloads(self, batch_size: int = 5000) -> int:
+        """Re-encode legacy JSON text rows into the compact format.
+
+        Works in rowid-ordered batches so memory stays flat on large caches.
+        Rows that fail to decode are left untouched. Returns the number of rows converted.
+        """
+        converted = 0
+        last_rowid = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, payload FROM cache WHERE rowid > ? AND typeof(payload) = 'text' "
+                    "ORDER BY rowid LIMIT ?",
+                    (last_rowid, max(1, batch_size)),
+                ).fetchall()
+                if not rows:
+                    return converted
+                updates = []
+                for rowid, payload in rows:
+                    last_rowid = rowid
+                    try:
+                        updates.append(
+                            (sqlite3.Binary(encode_payload(decode_payload(payload))), rowid)
+                        )
+                    except Exception:
+                        continue
+                self.conn.executemany("UPDATE cache SET payload=? WHERE rowid=?", updates)
+                self.conn.commit()
+            converted += len(updates)
+
     def clear(self) -> None:
         with self.lock:
             try:
@@ -81,7 +356,121 @@ class Cache:
                 pass
 
 
-def age_bucket(age_seconds: Optional[int]) -> str:
+class AsyncCache:
+    """Awaitable facade over :class:`Cache` that keeps SQLite I/O off the event loop.
+
+    All work runs on one dedicated I/O thread. Calls issued during the same loop
+    iteration are coalesced: reads become one get_many() per TTL and writes one
+    set_many() transaction. The wrapped Cache (and its lock) stays usable from
+    other threads, e.g. the Qt UI reading ages during export.
+    """
+
+    def __init__(self, cache: Cache):
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ioc-cache")
+        self._reads: list[tuple[CacheKey, int, asyncio.Future[dict[str, Any] | None]]] = []
+        self._writes: list[tuple[CacheRow, asyncio.Future[None]]] = []
+        self._flush_scheduled = False
+        self._inflight: set[asyncio.Future[Any]] = set()
+
+    async def get(self, provider: str, ioc: str, max_age: int) -> dict[str, Any] | None:
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future[dict[str, Any] | None] = loop.create_future()
+        self._reads.append(((provider, ioc), max_age, fut))
+        self._schedule_flush(loop)
+        return await fut
+
+    async def get_many(
+        self, keys: Iterable[CacheKey], max_age: int
+    ) -> dict[CacheKey, dict[str, Any]]:
+        return await self._submit(self.cache.get_many, list(keys), max_age)
+
+    async def set(self, provider: str, ioc: str, ioc_type: str, payload: dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future[None] = loop.create_future()
+        self._writes.append(((provider, ioc, ioc_type, payload), fut))
+        self._schedule_flush(loop)
+        await fut
+
+    async def set_many(self, rows: Iterable[CacheRow]) -> None:
+        await self._submit(self.cache.set_many, list(rows))
+
+    async def get_age(self, provider: str, ioc: str) -> int | None:
+        return await self._submit(self.cache.get_age, provider, ioc)
+
+    async def get_ages_many(self, keys: Iterable[CacheKey]) -> dict[CacheKey, int]:
+        return await self._submit(self.cache.get_ages_many, list(keys))
+
+    async def resolve_hash(self, digest: str) -> str:
+        return await self._submit(self.cache.resolve_hash, digest)
+
+    async def add_hash_aliases(self, sha256: str, aliases: Iterable[str]) -> None:
+        await self._submit(self.cache.add_hash_aliases, sha256, list(aliases))
+
+    async def aclose(self) -> None:
+        """Wait for queued work, then release the I/O thread. The wrapped Cache stays open."""
+        if self._reads or self._writes:
+            self._flush()
+        while self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    def _submit(self, fn: Callable[..., _T], *args: Any) -> asyncio.Future[_T]:
+        fut = asyncio.wrap_future(self._executor.submit(fn, *args))
+        self._inflight.add(fut)
+        fut.add_done_callback(self._inflight.discard)
+        return fut
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        reads, self._reads = self._reads, []
+        writes, self._writes = self._writes, []
+        if writes:
+            wf = self._submit(self.cache.set_many, [row for row, _ in writes])
+            wf.add_done_callback(functools.partial(_deliver_writes, [w for _, w in writes]))
+        by_ttl: dict[int, list[tuple[CacheKey, asyncio.Future[dict[str, Any] | None]]]] = {}
+        for key, ttl, fut in reads:
+            by_ttl.setdefault(ttl, []).append((key, fut))
+        for ttl, items in by_ttl.items():
+            rf = self._submit(self.cache.get_many, [k for k, _ in items], ttl)
+            rf.add_done_callback(functools.partial(_deliver_reads, items))
+
+
+def _done_exception(done: asyncio.Future[Any]) -> BaseException | None:
+    return asyncio.CancelledError() if done.cancelled() else done.exception()
+
+
+def _deliver_reads(
+    items: list[tuple[CacheKey, asyncio.Future[dict[str, Any] | None]]], done: asyncio.Future[Any]
+) -> None:
+    exc = _done_exception(done)
+    hits: dict[CacheKey, dict[str, Any]] = done.result() if exc is None else {}
+    for key, fut in items:
+        if fut.done():
+            continue
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(hits.get(key))
+
+
+def _deliver_writes(waiters: list[asyncio.Future[None]], done: asyncio.Future[Any]) -> None:
+    exc = _done_exception(done)
+    for fut in waiters:
+        if fut.done():
+            continue
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(None)
+
+
+def age_bucket(age_seconds: int | None) -> str:
     """Map age in seconds to bucket label.
 
     <1h, 1–24h, >24h; 'unknown' if None.
@@ -92,4 +481,4 @@ def age_bucket(age_seconds: Optional[int]) -> str:
         return "<1h"
     if age_seconds < 86400:
         return "1–24h"
-    return ">24h" 
\ No newline at end of file
+    return ">24h"
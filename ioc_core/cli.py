@@ -0,0 +1,365 @@
+"""Headless command line for pipelines: ``python -m ioc_core <command> ...``.
+
+``check`` enriches IOCs of every type with any provider and streams results to
+stdout as they complete::
+
+    zcat iocs.txt.gz | python -m ioc_core check --format csv > results.csv
+    python -m ioc_core check --extract proxy.log.gz --fail-on MALICIOUS --deadline 600
+
+Input (files or ``-`` for stdin, plain or compressed) is read lazily, one IOC
+per line, or scanned for IOCs in free text with ``--extract``. Dedup is bounded
+(``--dedup``) and at most a few x ``--concurrency`` lookups are read ahead, so
+memory stays constant for inputs of any length. Output is NDJSON (default), CSV
+or one JSON array, written row by row.
+
+``extract``, ``follow``, ``mirror``, ``watch`` and ``snapshot`` run the module
+CLIs of the same name.
+
+Exit codes: 0 done, 1 a result matched ``--fail-on``, 2 usage or configuration
+error, 3 ``--deadline`` reached before the input was exhausted, 4 unreadable
+input, 130 interrupted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import IO, TextIO
+
+from . import config, extract, follow, mirror, snapshot, watch
+from .cache import Cache
+from .compiled_cache import CompiledCache
+from .export import CsvSink, JsonArraySink, JsonLinesSink, ResultSink
+from .extract import DEFAULT_DEDUP, BoundedSeen, ExtractError, extract_iocs, iter_lines
+from .ipasn import IpAsnDb
+from .models import normalize_ioc
+from .negatives import NegativeFilter
+from .offload import Offloader
+from .prefilter import Prefilter, build_prefilter
+from .services import BaseProvider, RateLimiter, build_providers, enrich_stream
+
+EXIT_OK = 0
+EXIT_FLAGGED = 1
+EXIT_USAGE = 2
+EXIT_DEADLINE = 3
+EXIT_INPUT = 4
+EXIT_INTERRUPTED = 130
+
+FORMATS = ("ndjson", "csv", "json")
+FAIL_ON = {"MALICIOUS": {"MALICIOUS"}, "SUSPICIOUS": {"MALICIOUS", "SUSPICIOUS"}}
+# Buffered output is flushed this long after the first unflushed row, so a
+# downstream reader sees results promptly without a syscall per row.
+FLUSH_DELAY = 0.1
+
+_SUBCOMMANDS: dict[str, Callable[[list[str] | None], int]] = {
+    "extract": extract.main,
+    "follow": follow.main,
+    "mirror": mirror.main,
+    "watch": watch.main,
+    "snapshot": snapshot.main,
+}
+
+
+def iter_input(
+    paths: Sequence[str],
+    scan: bool = False,
+    dedup: int = DEFAULT_DEDUP,
+    offload: Offloader | None = None,
+) -> Iterator[str]:
+    """IOCs from ``paths`` ('-' is stdin): one per line, or with ``scan`` every IOC in the text.
+
+    Repeats (after normalization) are dropped while they are among the last
+    ``dedup`` distinct values; 0 disables dedup. ``offload`` scans text on a
+    process pool.
+    """
+    seen = BoundedSeen(dedup) if dedup > 0 else None
+    for path in paths:
+        source: str | IO[bytes] = sys.stdin.buffer if path == "-" else path
+        items: Iterator[str]
+        if scan:
+            items = (ioc for ioc, _ in extract_iocs(source, dedup=dedup, offload=offload))
+        else:
+            items = iter_lines(source)
+        for item in items:
+            if seen is None or seen.add(normalize_ioc(item)):
+                yield item
+
+
+def open_sink(out: TextIO, fmt: str, provider_names: Sequence[str]) -> ResultSink:
+    """Streaming sink for ``--format``: NDJSON, CSV (status and score columns) or a JSON array."""
+    if fmt == "ndjson":
+        return JsonLinesSink(out, flush_interval=FLUSH_DELAY)
+    if fmt == "csv":
+        return CsvSink(
+            out, provider_names, include_status=True, include_age=False, flush_interval=FLUSH_DELAY
+        )
+    if fmt == "json":
+        return JsonArraySink(out, indent=None, flush_interval=FLUSH_DELAY)
+    raise ValueError(f"unsupported output format: {fmt}")
+
+
+@dataclass
+class CheckStats:
+    results: int = 0
+    invalid: int = 0
+    flagged: int = 0
+    timed_out: bool = False
+
+
+async def check(
+    iocs: Iterable[str],
+    providers: list[BaseProvider],
+    cache: Cache,
+    ttls: dict[str, int],
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    concurrency: int,
+    writer: ResultSink,
+    deadline: float | None = None,
+    fail_on: str | None = None,
+    negatives: NegativeFilter | None = None,
+    prefilter: Prefilter | None = None,
+    ipasn: IpAsnDb | None = None,
+) -> CheckStats:
+    """Enrich ``iocs`` and hand each result to ``writer`` as it completes.
+
+    After ``deadline`` seconds no more input is read, in-flight lookups are
+    cancelled and ``timed_out`` is set; results written so far stand.
+    """
+    stats = CheckStats()
+    flag = FAIL_ON.get(fail_on or "", set())
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline if deadline else None
+    agen = enrich_stream(
+        iocs,
+        providers,
+        cache,
+        ttls,
+        use_cache,
+        refresh,
+        timeout,
+        concurrency,
+        negatives=negatives,
+        prefilter=prefilter,
+        ipasn=ipasn,
+    )
+    try:
+        while True:
+            try:
+                if stop_at is None:
+                    ar = await agen.__anext__()
+                else:
+                    ar = await asyncio.wait_for(agen.__anext__(), max(0.0, stop_at - loop.time()))
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                stats.timed_out = True
+                break
+            writer.write(ar)
+            stats.results += 1
+            if ar.ioc_type == "invalid":
+                stats.invalid += 1
+            elif ar.status in flag:
+                stats.flagged += 1
+    finally:
+        await agen.aclose()
+    return stats
+
+
+def _positive(value: str) -> float:
+    v = float(value)
+    if v < 0:
+        raise argparse.ArgumentTypeError("must be >= 0")
+    return v
+
+
+def _check_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core check",
+        description="Enrich IOCs from files or stdin and stream the results to stdout.",
+    )
+    ap.add_argument(
+        "inputs",
+        nargs="*",
+        default=["-"],
+        help="files to read ('-' for stdin, the default); gz/bz2/xz/zst are detected",
+    )
+    ap.add_argument(
+        "--extract",
+        action="store_true",
+        help="scan free text (logs, mail) for IOCs instead of reading one per line",
+    )
+    ap.add_argument("--format", choices=FORMATS, default="ndjson")
+    ap.add_argument(
+        "--providers",
+        default=",".join(config.DEFAULT_PROVIDERS),
+        help="comma-separated provider names",
+    )
+    ap.add_argument("--mode", choices=sorted(config.DEFAULT_TIMEOUTS), default="normal")
+    ap.add_argument(
+        "--timeout",
+        type=_positive,
+        default=0,
+        help="per-request timeout in seconds (default: from --mode)",
+    )
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=config.DEFAULT_CONCURRENCY,
+        help="IOCs looked up at the same time",
+    )
+    ap.add_argument(
+        "--rate",
+        type=_positive,
+        default=0,
+        help="max network queries per second for each provider (0: unlimited)",
+    )
+    ap.add_argument(
+        "--deadline", type=_positive, default=0, help="stop after this many seconds (exit code 3)"
+    )
+    ap.add_argument("--cache", default=config.CACHE_PATH, help="local SQLite cache path")
+    ap.add_argument("--no-cache", action="store_true", help="do not read cached results")
+    ap.add_argument(
+        "--refresh", action="store_true", help="query providers even when a cached result is fresh"
+    )
+    ap.add_argument(
+        "--dedup",
+        type=int,
+        default=DEFAULT_DEDUP,
+        help="distinct IOCs remembered for dedup (0: off)",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=config.offload_workers(dict(os.environ)),
+        help="processes scanning --extract input in parallel "
+        "(default: IOC_OFFLOAD_WORKERS, else 0)",
+    )
+    ap.add_argument(
+        "--fail-on",
+        choices=sorted(FAIL_ON),
+        help="exit with code 1 if any result has this status or worse",
+    )
+    return ap
+
+
+def _usage() -> str:
+    return (
+        "usage: python -m ioc_core {check,extract,follow,mirror,watch,snapshot} ...\n\n"
+        "  check     enrich IOCs from files or stdin, stream results to stdout\n"
+        "  extract   print the unique IOCs found in logs and archives\n"
+        "  follow    follow growing log files and stream results as NDJSON\n"
+        "  mirror    enrich the IOC column of a CSV, keeping every row and column\n"
+        "  watch     enrich files dropped into a directory\n"
+        "  snapshot  export or import cache snapshots\n\n"
+        "Run 'python -m ioc_core <command> -h' for command options.\n"
+    )
+
+
+def run_check(argv: list[str] | None = None, out: TextIO | None = None) -> int:
+    args = _check_parser().parse_args(argv)
+    out = out or sys.stdout
+    env = dict(os.environ)
+    try:
+        providers = build_providers(
+            [n.strip() for n in args.providers.split(",") if n.strip()], env
+        )
+        prefilter = build_prefilter(
+            config.allowlist_file(env), config.prefilter_cidrs(env), config.public_suffix_file(env)
+        )
+        ipasn_path = config.ipasn_db_path(env)
+        ipasn = IpAsnDb(ipasn_path) if ipasn_path else None
+        compiled_path = config.compiled_cache_path(env)
+        compiled = CompiledCache(compiled_path) if compiled_path else None
+    except (OSError, ValueError) as e:  # IpAsnError and CompiledCacheError are ValueErrors
+        print(str(e), file=sys.stderr)
+        return EXIT_USAGE
+    if args.rate:
+        for p in providers:
+            p.limiter = RateLimiter(args.rate)
+    trust_hours = config.negative_trust_hours(env)
+    negatives = NegativeFilter(config.NEGATIVE_FILTER_DIR, trust_hours) if trust_hours > 0 else None
+    use_cache, refresh, timeout = config.resolve_mode(args.mode)
+    use_cache = use_cache and not args.no_cache
+    refresh = refresh or args.refresh
+    timeout = args.timeout or timeout
+    cache = Cache(args.cache)
+    cache.attach_compiled(compiled)
+    writer = open_sink(out, args.format, [p.name for p in providers])
+    offload = Offloader(max(0, args.workers))
+    source = iter_input(args.inputs, scan=args.extract, dedup=args.dedup, offload=offload)
+    started = time.monotonic()
+
+    async def run() -> CheckStats:
+        stats = await check(
+            source,
+            providers,
+            cache,
+            dict(config.DEFAULT_TTLS),
+            use_cache,
+            refresh,
+            timeout,
+            max(1, args.concurrency),
+            writer,
+            deadline=args.deadline or None,
+            fail_on=args.fail_on,
+            negatives=negatives,
+            prefilter=prefilter,
+            ipasn=ipasn,
+        )
+        writer.close()
+        return stats
+
+    try:
+        stats = asyncio.run(run())
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except (ExtractError, OSError) as e:
+        if isinstance(e, BrokenPipeError):
+            # Downstream closed early (e.g. `| head`); silence the flush at interpreter exit
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            return EXIT_OK
+        print(str(e), file=sys.stderr)
+        return EXIT_INPUT
+    finally:
+        offload.close()
+        if ipasn is not None:
+            ipasn.close()
+        if compiled is not None:
+            compiled.close()
+        cache.conn.close()
+    print(
+        f"checked {stats.results} IOC(s) in {time.monotonic() - started:.1f}s: "
+        f"{stats.flagged} flagged, {stats.invalid} invalid",
+        file=sys.stderr,
+    )
+    if stats.timed_out:
+        print(f"deadline of {args.deadline:g}s reached; remaining input skipped", file=sys.stderr)
+        return EXIT_DEADLINE
+    return EXIT_FLAGGED if stats.flagged else EXIT_OK
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(_usage(), end="", file=sys.stdout if argv else sys.stderr)
+        return EXIT_OK if argv else EXIT_USAGE
+    cmd, rest = argv[0], argv[1:]
+    if cmd == "check":
+        return run_check(rest)
+    sub = _SUBCOMMANDS.get(cmd)
+    if sub is None:
+        print(f"unknown command: {cmd}\n\n{_usage()}", end="", file=sys.stderr)
+        return EXIT_USAGE
+    return sub(rest)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
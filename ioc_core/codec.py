@@ -0,0 +1,301 @@
+"""Compact binary encoding for cache payloads.
+
+Legacy rows hold ``json.dumps(ProviderResult.to_dict())`` text; :func:`decode_payload`
+reads both forms so old caches keep working without a migration.
+
+Binary layout (little-endian)::
+
+    MAGIC(2) VERSION(1) FLAGS(1) BODY
+
+BODY is zlib-compressed when FLAG_ZLIB is set. Payloads shaped like a ProviderResult
+dict use a struct-packed body with interned provider/status/evidence-key codes
+followed by a 0x1F-separated text section; anything else (including strings that
+contain 0x1F) is stored as JSON inside the envelope (FLAG_JSON).
+
+Version 2 adds FLAG_FIELDS: the result's structured ``fields`` follow the
+latency as one length-prefixed compact JSON string, and the evidence keys from
+``sha256`` on. Each payload is written with the lowest version that can read it,
+so payloads without fields or the newer keys stay version 1 and older readers
+keep working on them.
+
+The intern tables below are part of the on-disk format: only append to them.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from typing import Any, cast
+
+MAGIC = b"\x00I"  # JSON text never starts with NUL, so legacy rows are unambiguous
+VERSION = 2
+_VERSIONS = (1, 2)
+
+FLAG_JSON = 0x01
+FLAG_ZLIB = 0x02
+FLAG_CACHED = 0x04
+FLAG_LATENCY = 0x08
+FLAG_RAW_REF = 0x10
+FLAG_FIELDS = 0x20  # version 2
+
+# Bodies smaller than this are never worth compressing
+COMPRESS_MIN_BYTES = 256
+
+_LITERAL = 0xFF
+
+_STATUSES: tuple[str, ...] = ("MALICIOUS", "SUSPICIOUS", "CLEAN", "INCONCLUSIVE")
+_PROVIDERS: tuple[str, ...] = ("virustotal", "abuseipdb", "otx", "threatfox")
+# Index 0 means "evidence string has no interned key"
+_EVIDENCE_KEYS: tuple[str, ...] = (
+    "",
+    "malicious",
+    "suspicious",
+    "harmless",
+    "undetected",
+    "reputation",
+    "categories",
+    "last_analysis",
+    "votes",
+    "confidence",
+    "total_reports",
+    "is_public",
+    "country_code",
+    "usage_type",
+    "isp",
+    "domain",
+    "last_reported_at",
+    "pulses",
+    "pulse",
+    "country",
+    "asn",
+    "family",
+    "tags",
+    "first_seen",
+    "last_seen",
+    "type",
+    # version 2
+    "sha256",
+    "md5",
+    "sha1",
+)
+# Key codes a version-1 reader knows
+_V1_EVIDENCE_KEYS = _EVIDENCE_KEYS.index("sha256")
+
+_STATUS_CODES = {s: i for i, s in enumerate(_STATUSES)}
+_PROVIDER_CODES = {p: i for i, p in enumerate(_PROVIDERS)}
+_EVIDENCE_KEY_CODES = {k: i for i, k in enumerate(_EVIDENCE_KEYS) if k}
+_KEY_PREFIXES = {i: (k + "=" if k else "") for i, k in enumerate(_EVIDENCE_KEYS)}
+
+# Separates items in the text section; key codes must stay below it
+_SEP = "\x1f"
+if len(_EVIDENCE_KEYS) >= ord(_SEP):
+    raise RuntimeError(f"{len(_EVIDENCE_KEYS)} evidence keys do not fit below the item separator")
+
+_RESULT_KEYS = frozenset(
+    {"provider", "status", "score", "evidence", "raw_ref", "latency_ms", "cached"}
+)
+
+_HEADER = struct.Struct("<2sBB")
+_SCORE = struct.Struct("<d")
+_LATENCY = struct.Struct("<i")
+
+
+class PayloadDecodeError(ValueError):
+    """Raised when a binary payload is truncated or has an unknown version."""
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf: bytes, pos: int) -> tuple[int, int]:
+    shift = 0
+    n = 0
+    while True:
+        if pos >= len(buf):
+            raise PayloadDecodeError("truncated varint")
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _put_str(out: bytearray, s: str) -> None:
+    raw = s.encode("utf-8")
+    _put_varint(out, len(raw))
+    out += raw
+
+
+def _get_str(buf: bytes, pos: int) -> tuple[str, int]:
+    n, pos = _get_varint(buf, pos)
+    end = pos + n
+    if end > len(buf):
+        raise PayloadDecodeError("truncated string")
+    return buf[pos:end].decode("utf-8"), end
+
+
+def _put_interned(out: bytearray, s: str, codes: dict[str, int]) -> None:
+    code = codes.get(s)
+    if code is None:
+        out.append(_LITERAL)
+        _put_str(out, s)
+    else:
+        out.append(code)
+
+
+def _get_interned(buf: bytes, pos: int, table: tuple[str, ...]) -> tuple[str, int]:
+    if pos >= len(buf):
+        raise PayloadDecodeError("truncated code")
+    code = buf[pos]
+    pos += 1
+    if code == _LITERAL:
+        return _get_str(buf, pos)
+    if code >= len(table):
+        raise PayloadDecodeError(f"unknown intern code {code}")
+    return table[code], pos
+
+
+def _is_result_shaped(p: dict[str, Any]) -> bool:
+    keys = set(p)
+    if keys != _RESULT_KEYS and not (
+        keys == _RESULT_KEYS | {"fields"} and isinstance(p["fields"], dict)
+    ):
+        return False
+    lat = p["latency_ms"]
+    ev = p["evidence"]
+    ref = p["raw_ref"]
+    return (
+        isinstance(p["provider"], str)
+        and isinstance(p["status"], str)
+        and type(p["score"]) is float
+        and isinstance(ev, list)
+        and all(isinstance(e, str) and _SEP not in e for e in ev)
+        and (ref is None or (isinstance(ref, str) and _SEP not in ref))
+        and (lat is None or (type(lat) is int and -(2**31) <= lat < 2**31))
+        and isinstance(p["cached"], bool)
+    )
+
+
+def _encode_result_body(p: dict[str, Any]) -> tuple[int, int, bytearray]:
+    """(lowest version that reads it, flags, body) for a result-shaped payload."""
+    version = 1
+    flags = 0
+    body = bytearray()
+    _put_interned(body, p["status"], _STATUS_CODES)
+    _put_interned(body, p["provider"], _PROVIDER_CODES)
+    body += _SCORE.pack(p["score"])
+    if p["cached"]:
+        flags |= FLAG_CACHED
+    if p["latency_ms"] is not None:
+        flags |= FLAG_LATENCY
+        body += _LATENCY.pack(p["latency_ms"])
+    if p.get("fields"):
+        flags |= FLAG_FIELDS
+        version = 2
+        _put_str(body, json.dumps(p["fields"], separators=(",", ":"), ensure_ascii=False))
+    if p["raw_ref"] is not None:
+        flags |= FLAG_RAW_REF
+    # Trailing text section: raw_ref, then one item per evidence string whose first
+    # char is the interned key code; a single split() decodes it all.
+    parts: list[str] = [p["raw_ref"] or ""]
+    for ev in p["evidence"]:
+        key, sep, val = ev.partition("=")
+        code = _EVIDENCE_KEY_CODES.get(key) if sep else None
+        if code is not None and code >= _V1_EVIDENCE_KEYS:
+            version = 2
+        parts.append("\x00" + ev if code is None else chr(code) + val)
+    body += _SEP.join(parts).encode("utf-8")
+    return version, flags, body
+
+
+def _decode_result_body(flags: int, body: bytes) -> dict[str, Any]:
+    status, pos = _get_interned(body, 0, _STATUSES)
+    provider, pos = _get_interned(body, pos, _PROVIDERS)
+    if pos + _SCORE.size > len(body):
+        raise PayloadDecodeError("truncated score")
+    (score,) = _SCORE.unpack_from(body, pos)
+    pos += _SCORE.size
+    latency: int | None = None
+    if flags & FLAG_LATENCY:
+        if pos + _LATENCY.size > len(body):
+            raise PayloadDecodeError("truncated latency")
+        (latency,) = _LATENCY.unpack_from(body, pos)
+        pos += _LATENCY.size
+    fields: dict[str, Any] | None = None
+    if flags & FLAG_FIELDS:
+        text, pos = _get_str(body, pos)
+        fields = json.loads(text)
+        if not isinstance(fields, dict):
+            raise PayloadDecodeError("bad fields")
+    parts = body[pos:].decode("utf-8").split(_SEP)
+    try:
+        evidence = [_KEY_PREFIXES[ord(x[0])] + x[1:] for x in parts[1:]]
+    except (IndexError, KeyError) as e:
+        raise PayloadDecodeError("bad evidence item") from e
+    out = {
+        "provider": provider,
+        "status": status,
+        "score": score,
+        "evidence": evidence,
+        "raw_ref": parts[0] if flags & FLAG_RAW_REF else None,
+        "latency_ms": latency,
+        "cached": bool(flags & FLAG_CACHED),
+    }
+    if fields is not None:
+        out["fields"] = fields
+    return out
+
+
+def encode_payload(payload: dict[str, Any]) -> bytes:
+    """Encode a cache payload dict into the versioned binary format."""
+    if _is_result_shaped(payload):
+        version, flags, body = _encode_result_body(payload)
+    else:
+        version, flags, body = (
+            1,
+            FLAG_JSON,
+            bytearray(json.dumps(payload, separators=(",", ":")).encode("utf-8")),
+        )
+    out: bytes = bytes(body)
+    if len(body) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(out, 6)
+        if len(packed) < len(out):
+            flags |= FLAG_ZLIB
+            out = packed
+    return _HEADER.pack(MAGIC, version, flags) + out
+
+
+def is_binary_payload(data: bytes | bytearray | memoryview | str) -> bool:
+    return not isinstance(data, str) and bytes(data[:2]) == MAGIC
+
+
+def decode_payload(data: bytes | bytearray | memoryview | str) -> dict[str, Any]:
+    """Decode a payload written by :func:`encode_payload` or a legacy JSON row.
+
+    Raises ValueError (PayloadDecodeError or JSONDecodeError) on corrupt input.
+    """
+    if isinstance(data, str):
+        return cast(dict[str, Any], json.loads(data))
+    buf = bytes(data)
+    if buf[:2] != MAGIC:
+        return cast(dict[str, Any], json.loads(buf.decode("utf-8")))
+    if len(buf) < _HEADER.size:
+        raise PayloadDecodeError("truncated header")
+    _, version, flags = _HEADER.unpack_from(buf, 0)
+    if version not in _VERSIONS or (version == 1 and flags & FLAG_FIELDS):
+        raise PayloadDecodeError(f"unsupported payload version {version}")
+    body = buf[_HEADER.size :]
+    if flags & FLAG_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as e:
+            raise PayloadDecodeError(str(e)) from e
+    if flags & FLAG_JSON:
+        return cast(dict[str, Any], json.loads(body.decode("utf-8")))
+    return _decode_result_body(flags, body)
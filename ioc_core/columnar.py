@@ -0,0 +1,260 @@
+"""Columnar (Parquet) export and import of enrichment results.
+
+One row per IOC with typed columns instead of ``STATUS [score]`` strings::
+
+    ioc, type, status, score, info
+    <provider>_status, _score, _cached, _latency_ms, _age_s, _evidence, _raw_ref, _fields
+
+``_fields`` holds ProviderResult.fields as compact JSON.
+
+Status and type columns are dictionary-encoded. ``ParquetSink`` accepts results
+one at a time and writes a row group every ``row_group_size`` rows, so memory
+stays bounded while results stream in; ``read_table`` / ``iter_results`` load
+a previous run back (as an Arrow table for dataframes, or as AggregatedResult
+objects).
+
+Needs the optional ``pyarrow`` package; without it the functions here raise
+ColumnarError and the rest of ioc_core is unaffected.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import json
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+from .cache import AsyncCache, Cache
+from .export import ResultSink
+from .models import AggregatedResult, ProviderResult
+
+DEFAULT_ROW_GROUP_SIZE = 65_536
+_META_PROVIDERS = b"ioc_core.providers"
+_PROVIDER_FIELDS = (
+    "status",
+    "score",
+    "cached",
+    "latency_ms",
+    "age_s",
+    "evidence",
+    "raw_ref",
+    "fields",
+)
+
+
+class ColumnarError(RuntimeError):
+    """Parquet support is unavailable or a file is not an ioc_core results file."""
+
+
+def pyarrow_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _pyarrow() -> tuple[Any, Any]:
+    try:
+        pa = importlib.import_module("pyarrow")
+        pq = importlib.import_module("pyarrow.parquet")
+    except ImportError as e:
+        raise ColumnarError(
+            "Parquet export needs the optional 'pyarrow' package (pip install pyarrow)"
+        ) from e
+    return pa, pq
+
+
+def _schema(pa: Any, provider_names: Sequence[str]) -> Any:
+    label = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        pa.field("ioc", pa.string(), nullable=False),
+        pa.field("type", label),
+        pa.field("status", label),
+        pa.field("score", pa.float64()),
+        pa.field("info", pa.string()),
+    ]
+    for p in provider_names:
+        fields += [
+            pa.field(f"{p}_status", label),
+            pa.field(f"{p}_score", pa.float64()),
+            pa.field(f"{p}_cached", pa.bool_()),
+            pa.field(f"{p}_latency_ms", pa.int32()),
+            pa.field(f"{p}_age_s", pa.int64()),
+            pa.field(f"{p}_evidence", pa.list_(pa.string())),
+            pa.field(f"{p}_raw_ref", pa.string()),
+            pa.field(f"{p}_fields", pa.string()),
+        ]
+    return pa.schema(fields, metadata={_META_PROVIDERS: json.dumps(list(provider_names)).encode()})
+
+
+class ParquetSink(ResultSink):
+    """Writes results to a Parquet file in row groups as they arrive; ``close()`` writes the footer.
+
+    An export.ResultSink, except that nothing is flushed between row groups: a
+    Parquet file is only readable once closed. With ``cache`` (a Cache, or an
+    AsyncCache for ``awrite``), per-provider ages are resolved with one bulk
+    query per row group.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        provider_names: Iterable[str],
+        *,
+        cache: Cache | AsyncCache | None = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        compression: str = "zstd",
+    ):
+        self._pa, pq = _pyarrow()
+        super().__init__(path, binary=True)
+        self.provider_names = list(provider_names)
+        self.acache = cache if isinstance(cache, AsyncCache) else None
+        self.cache = cache.cache if isinstance(cache, AsyncCache) else cache
+        self.row_group_size = max(1, row_group_size)
+        self._schema = _schema(self._pa, self.provider_names)
+        self._pending: list[AggregatedResult] = []
+        try:
+            self._writer = pq.ParquetWriter(self.out, self._schema, compression=compression)
+        except BaseException:
+            self.out.close()
+            raise
+
+    def flush(self) -> None:
+        """No-op between row groups: a Parquet file is only readable once closed."""
+
+    async def aflush(self) -> None:
+        """No-op, as ``flush``."""
+
+    def _write(self, ar: AggregatedResult) -> None:
+        self._pending.append(ar)
+
+    def _should_drain(self) -> bool:
+        return len(self._pending) >= self.row_group_size
+
+    def _drain(self) -> None:
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        ages: dict[tuple[str, str], int] = {}
+        if self.cache is not None:
+            ages = self.cache.get_ages_many(
+                (pr.provider, ar.ioc) for ar in rows for pr in ar.providers
+            )
+        self._write_group(rows, ages)
+
+    async def _adrain(self) -> None:
+        if self.acache is None:
+            self._drain()
+            return
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        keys = [(pr.provider, ar.ioc) for ar in rows for pr in ar.providers]
+        ages = await self.acache.get_ages_many(keys)
+        self._write_group(rows, ages)
+
+    def _finish(self) -> None:
+        self._writer.close()
+
+    def _write_group(self, rows: list[AggregatedResult], ages: dict[tuple[str, str], int]) -> None:
+        cols: dict[str, list[Any]] = {f.name: [] for f in self._schema}
+        ioc_c, type_c, status_c, score_c, info_c = (
+            cols[k] for k in ("ioc", "type", "status", "score", "info")
+        )
+        per_provider = [
+            (p, [cols[f"{p}_{field}"] for field in _PROVIDER_FIELDS]) for p in self.provider_names
+        ]
+        for ar in rows:
+            ioc_c.append(ar.ioc)
+            type_c.append(ar.ioc_type)
+            status_c.append(ar.status)
+            score_c.append(float(ar.score))
+            info_c.append(json.dumps(ar.info, ensure_ascii=False) if ar.info else None)
+            per = {pr.provider: pr for pr in ar.providers}
+            for p, (st, sc, cached, lat, age, ev, ref, fields) in per_provider:
+                pr = per.get(p)
+                if pr is None:
+                    for c in (st, sc, cached, lat, age, ev, ref, fields):
+                        c.append(None)
+                    continue
+                st.append(pr.status)
+                sc.append(float(pr.score))
+                cached.append(bool(pr.cached))
+                lat.append(pr.latency_ms)
+                age.append(ages.get((p, ar.ioc)))
+                ev.append(pr.evidence)
+                ref.append(pr.raw_ref)
+                fields.append(
+                    json.dumps(pr.fields, separators=(",", ":"), ensure_ascii=False)
+                    if pr.fields
+                    else None
+                )
+        pa = self._pa
+        table = pa.Table.from_arrays(
+            [pa.array(cols[f.name], type=f.type) for f in self._schema], schema=self._schema
+        )
+        self._writer.write_table(table)
+
+
+def write_parquet(
+    path: str,
+    results: Iterable[AggregatedResult],
+    provider_names: Iterable[str],
+    *,
+    cache: Cache | None = None,
+) -> int:
+    """Write ``results`` to ``path``; returns the row count."""
+    with ParquetSink(path, provider_names, cache=cache) as sink:
+        sink.write_many(results)
+    return sink.count
+
+
+def read_table(path: str, columns: Sequence[str] | None = None) -> Any:
+    """Load a results file as a ``pyarrow.Table`` (``.to_pandas()`` for a dataframe)."""
+    _, pq = _pyarrow()
+    return pq.read_table(path, columns=list(columns) if columns is not None else None)
+
+
+def provider_names(path: str) -> list[str]:
+    """Providers recorded in a results file, in column order."""
+    _, pq = _pyarrow()
+    meta = pq.read_schema(path).metadata or {}
+    if _META_PROVIDERS not in meta:
+        raise ColumnarError(f"{path}: not an ioc_core results file")
+    names: list[str] = json.loads(meta[_META_PROVIDERS])
+    return names
+
+
+def iter_results(path: str, batch_size: int = DEFAULT_ROW_GROUP_SIZE) -> Iterator[AggregatedResult]:
+    """Rebuild AggregatedResult objects from a results file, one record batch at a time."""
+    _, pq = _pyarrow()
+    names = provider_names(path)
+    pf = pq.ParquetFile(path)
+    for batch in pf.iter_batches(batch_size=batch_size):
+        cols = batch.to_pydict()
+        for i in range(batch.num_rows):
+            prs: list[ProviderResult] = []
+            for p in names:
+                status = cols[f"{p}_status"][i]
+                if status is None:
+                    continue
+                fields = cols[f"{p}_fields"][i] if f"{p}_fields" in cols else None
+                prs.append(
+                    ProviderResult(
+                        p,
+                        status,
+                        cols[f"{p}_score"][i] or 0.0,
+                        list(cols[f"{p}_evidence"][i] or []),
+                        cols[f"{p}_raw_ref"][i],
+                        cols[f"{p}_latency_ms"][i],
+                        bool(cols[f"{p}_cached"][i]),
+                        json.loads(fields) if fields else {},
+                    )
+                )
+            info = cols["info"][i]
+            yield AggregatedResult(
+                cols["ioc"][i],
+                cols["type"][i],
+                cols["status"][i],
+                cols["score"][i] or 0.0,
+                prs,
+                json.loads(info) if info else {},
+            )
@@ -0,0 +1,227 @@
+"""Read-only, memory-mapped lookup file compiled from the SQLite cache.
+
+Layout (little-endian)::
+
+    HEADER  MAGIC(8) VERSION(u32) RESERVED(u32) ENTRIES(u64) SLOTS(u64) CREATED_AT(i64)
+    TABLE   SLOTS x (HASH(u64) RECORD_OFFSET(u64))   -- open addressing, linear probing
+    RECORDS { FETCHED_AT(i64) LEN_PROVIDER(u16) LEN_IOC(u16) LEN_TYPE(u16) LEN_PAYLOAD(u32)
+              bytes... }*
+
+SLOTS is a power of two sized for a load factor <= 0.5; an empty slot has offset 0.
+Readers only mmap the file, so opening is instant, lookups are O(1) and any number
+of processes can share the pages without locking. Attach one beneath a Cache with
+``Cache.attach_compiled()``; the CLIs and the GUI do so when IOC_COMPILED_CACHE
+names a file. Build (or rebuild) it from the SQLite cache with::
+
+    python -m ioc_core.compiled_cache build --cache .ioc_enricher_cache.sqlite compiled.idx
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from typing import Any
+
+from . import config
+from .cache import Cache
+from .codec import decode_payload
+
+MAGIC = b"IOCIDX\x00\x00"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQq")
+_SLOT = struct.Struct("<QQ")
+_RECORD = struct.Struct("<qHHHI")
+
+
+class CompiledCacheError(ValueError):
+    """Raised when a compiled cache file is missing, foreign or damaged."""
+
+
+def _key_hash(provider: str, ioc: str) -> int:
+    h = hashlib.blake2b((provider + "\x00" + ioc).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(h, "little")
+
+
+def _slot_count(entries: int) -> int:
+    n = 8
+    while n < entries * 2:
+        n <<= 1
+    return n
+
+
+def compile_cache(cache: Cache, path: str, since: int = 0) -> int:
+    """Compile cache rows into an immutable lookup file at ``path``; returns the entry count.
+
+    Two passes keep memory flat: rows are streamed to a temp file first, then the
+    slot table is filled in place through an mmap of the output. The output is
+    written to a sibling temp name and renamed, so readers never see a partial file.
+    """
+    out_dir = os.path.dirname(os.path.abspath(path))
+    entries = 0
+    with tempfile.TemporaryFile(dir=out_dir) as tmp:
+        for provider, ioc, ioc_type, fetched_at, payload in cache.iter_rows(since=since):
+            p, i, t = provider.encode("utf-8"), ioc.encode("utf-8"), ioc_type.encode("utf-8")
+            if max(len(p), len(i), len(t)) > 0xFFFF:
+                continue
+            tmp.write(_RECORD.pack(fetched_at, len(p), len(i), len(t), len(payload)))
+            tmp.write(p + i + t + payload)
+            entries += 1
+        records_size = tmp.tell()
+        slots = _slot_count(entries)
+        table_off = _HEADER.size
+        records_off = table_off + slots * _SLOT.size
+        fd, part = tempfile.mkstemp(dir=out_dir, prefix=".compiled-", suffix=".part")
+        try:
+            with os.fdopen(fd, "w+b") as out:
+                out.write(_HEADER.pack(MAGIC, VERSION, 0, entries, slots, int(time.time())))
+                out.truncate(records_off + records_size)
+                out.seek(records_off)
+                tmp.seek(0)
+                mask = slots - 1
+                with mmap.mmap(out.fileno(), records_off, access=mmap.ACCESS_WRITE) as table:
+                    pos = records_off
+                    while True:
+                        head = tmp.read(_RECORD.size)
+                        if not head:
+                            break
+                        _, lp, li, lt, lpay = _RECORD.unpack(head)
+                        body = tmp.read(lp + li + lt + lpay)
+                        out.write(head)
+                        out.write(body)
+                        h = _key_hash(body[:lp].decode("utf-8"), body[lp:lp + li].decode("utf-8"))
+                        slot = h & mask
+                        while _SLOT.unpack_from(table, table_off + slot * _SLOT.size)[1]:
+                            slot = (slot + 1) & mask
+                        _SLOT.pack_into(table, table_off + slot * _SLOT.size, h, pos)
+                        pos += _RECORD.size + len(body)
+                    table.flush()
+            os.replace(part, path)
+        except BaseException:
+            try:
+                os.unlink(part)
+            except OSError:
+                pass
+            raise
+    return entries
+
+
+class CompiledCache:
+    """Zero-copy reader over a file produced by :func:`compile_cache`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise CompiledCacheError(f"cannot map {path}: {e}") from e
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise CompiledCacheError("truncated compiled cache")
+        magic, version, _, entries, slots, created_at = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise CompiledCacheError("not a compiled IOC cache (or unsupported version)")
+        if slots & (slots - 1) or _HEADER.size + slots * _SLOT.size > len(self._mm):
+            self._mm.close()
+            raise CompiledCacheError("corrupt slot table")
+        self.entries: int = entries
+        self.created_at: int = created_at
+        self._mask = slots - 1
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def lookup(self, provider: str, ioc: str) -> tuple[str, int, bytes] | None:
+        """Return (type, fetched_at, encoded payload) for the key, or None."""
+        h = _key_hash(provider, ioc)
+        mm = self._mm
+        slot = h & self._mask
+        want_p = provider.encode("utf-8")
+        want_i = ioc.encode("utf-8")
+        while True:
+            hh, off = _SLOT.unpack_from(mm, _HEADER.size + slot * _SLOT.size)
+            if not off:
+                return None
+            if hh == h:
+                fetched_at, lp, li, lt, lpay = _RECORD.unpack_from(mm, off)
+                start = off + _RECORD.size
+                if mm[start:start + lp] == want_p and mm[start + lp:start + lp + li] == want_i:
+                    tstart = start + lp + li
+                    ioc_type = mm[tstart:tstart + lt].decode("utf-8")
+                    return ioc_type, fetched_at, mm[tstart + lt:tstart + lt + lpay]
+            slot = (slot + 1) & self._mask
+
+    def get(self, provider: str, ioc: str, max_age: int) -> dict[str, Any] | None:
+        hit = self.lookup(provider, ioc)
+        if hit is None or int(time.time()) - hit[1] > max_age:
+            return None
+        try:
+            return decode_payload(hit[2])
+        except Exception:
+            return None
+
+    def get_age(self, provider: str, ioc: str) -> int | None:
+        hit = self.lookup(provider, ioc)
+        if hit is None:
+            return None
+        return max(0, int(time.time()) - hit[1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.compiled_cache",
+        description="Build or inspect a compiled cache lookup file.",
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="compile the SQLite cache into a lookup file")
+    b.add_argument("out")
+    b.add_argument("--cache", default=config.CACHE_PATH, help="local SQLite cache path")
+    b.add_argument(
+        "--max-age",
+        type=int,
+        default=0,
+        help="only rows fetched within this many seconds (default: all)",
+    )
+    q = sub.add_parser("lookup", help="show the stored entry for a provider and IOCs")
+    q.add_argument("path")
+    q.add_argument("provider")
+    q.add_argument("iocs", nargs="+")
+    args = ap.parse_args(argv)
+    try:
+        if args.cmd == "build":
+            since = int(time.time()) - args.max_age if args.max_age > 0 else 0
+            cache = Cache(args.cache)
+            try:
+                n = compile_cache(cache, args.out, since=since)
+            finally:
+                cache.conn.close()
+            print(f"Wrote {n} entries to {args.out}")
+            return 0
+        compiled = CompiledCache(args.path)
+        try:
+            for ioc in args.iocs:
+                hit = compiled.lookup(args.provider, ioc)
+                age = compiled.get_age(args.provider, ioc)
+                print(ioc, "-" if hit is None else f"type={hit[0]} age={age}s bytes={len(hit[2])}")
+        finally:
+            compiled.close()
+        return 0
+    except (OSError, sqlite3.Error, CompiledCacheError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,8 @@
 import os
-from typing import Tuple, Dict, List
 
 # Provider registry (single source of truth)
 # types: set of supported IOC kinds; needs_key: whether an API key is required
-PROVIDERS: Dict[str, Dict[str, object]] = {
+PROVIDERS: dict[str, dict[str, object]] = {
     "virustotal":  {"types": {"ip", "domain", "url", "hash"}, "needs_key": True,  "rate": "≈4/min"},
     "abuseipdb":   {"types": {"ip"},                         "needs_key": True,  "rate": "1000/day"},
     "otx":         {"types": {"ip", "domain", "url", "hash"}, "needs_key": True,  "rate": "~60/min"},
@@ -17,21 +16,27 @@ PROVIDERS: Dict[str, Dict[str, object]] = {
 
 # Defaults
 # Order also used for CSV export sorting
-DEFAULT_PROVIDERS: List[str] = [
+DEFAULT_PROVIDERS: list[str] = [
     "virustotal",
     "abuseipdb",
     "otx",
     "threatfox",
 ]
-DEFAULT_TTLS: Dict[str, int] = {
+DEFAULT_TTLS: dict[str, int] = {
     "virustotal": 86400,     # 24h
     "abuseipdb": 43200,      # 12h
     "otx": 43200,            # 12h
     "threatfox": 28800,      # 8h (6–12h window)
 }
-DEFAULT_TIMEOUTS: Dict[str, float] = {"normal": 15.0, "fast": 8.0, "deep": 25.0}
+# Shared on-disk lookup cache (GUI, CLI and tools)
+CACHE_PATH = ".ioc_enricher_cache.sqlite"
+DEFAULT_TIMEOUTS: dict[str, float] = {"normal": 15.0, "fast": 8.0, "deep": 25.0}
 DEFAULT_CONCURRENCY = 6
 
+# AbuseIPDB: pending IPs from one /24 needed before a single check-block call
+# replaces their /check calls
+DEFAULT_ABUSEIPDB_BLOCK_MIN_GROUP = 4
+
 # Conservative per-provider concurrency minima
 PROVIDER_MIN_CAPS = {
     "virustotal": 2,
@@ -47,10 +52,103 @@ def _env_flag(name: str, default: bool = False) -> bool:
         return default
     return v in ("1", "true", "yes", "on")
 
+
 # Centralized feature flags (urlscan removed)
 
+# Trust recent "not found" answers for this many hours (0 disables the negative filter)
+DEFAULT_NEGATIVE_TRUST_HOURS = 0.0
+NEGATIVE_FILTER_DIR = ".ioc_negatives"
+
+
+def negative_trust_hours(env: dict[str, str]) -> float:
+    """Hours to trust cached negatives, from IOC_TRUST_NEGATIVES_HOURS (invalid -> default)."""
+    raw = str(env.get("IOC_TRUST_NEGATIVES_HOURS", "") or "").strip()
+    if not raw:
+        return DEFAULT_NEGATIVE_TRUST_HOURS
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        return DEFAULT_NEGATIVE_TRUST_HOURS
+
+
+# Local ThreatFox export mirror (see ioc_core.threatfox_mirror); used only when enabled
+THREATFOX_MIRROR_PATH = ".ioc_threatfox.sqlite"
+# The "recent" export covers 48h, so a daily sync keeps the mirror complete
+DEFAULT_THREATFOX_MIRROR_MAX_AGE = 86400
+
+
+def threatfox_mirror_path(env: dict[str, str]) -> str | None:
+    """Mirror path from IOC_THREATFOX_MIRROR, or None when the mirror is not enabled."""
+    raw = str(env.get("IOC_THREATFOX_MIRROR", "") or "").strip()
+    return raw or None
+
+
+# Local index of subscribed OTX pulses (see ioc_core.otx_index)
+OTX_INDEX_PATH = ".ioc_otx_index.sqlite"
+DEFAULT_OTX_INDEX_MAX_AGE = 86400
+
+
+def otx_index_path(env: dict[str, str]) -> str | None:
+    """Index path from IOC_OTX_INDEX, or None when the index is not enabled."""
+    raw = str(env.get("IOC_OTX_INDEX", "") or "").strip()
+    return raw or None
+
+
+def allowlist_file(env: dict[str, str]) -> str | None:
+    """Top-sites allowlist for the prefilter, from IOC_ALLOWLIST_FILE (None when unset)."""
+    raw = str(env.get("IOC_ALLOWLIST_FILE", "") or "").strip()
+    return raw or None
+
+
+def prefilter_cidrs(env: dict[str, str]) -> list[str]:
+    """Extra CIDRs never sent to providers, from comma-separated IOC_PREFILTER_CIDRS."""
+    raw = str(env.get("IOC_PREFILTER_CIDRS", "") or "")
+    return [c.strip() for c in raw.split(",") if c.strip()]
+
+
+def ipasn_db_path(env: dict[str, str]) -> str | None:
+    """Compiled IP-ASN table (see ioc_core.ipasn) from IOC_IPASN_DB, or None when unset."""
+    raw = str(env.get("IOC_IPASN_DB", "") or "").strip()
+    return raw or None
+
+
+def compiled_cache_path(env: dict[str, str]) -> str | None:
+    """Compiled lookup file (ioc_core.compiled_cache) from IOC_COMPILED_CACHE, or None."""
+    raw = str(env.get("IOC_COMPILED_CACHE", "") or "").strip()
+    return raw or None
+
+
+def group_registrable(env: dict[str, str]) -> bool:
+    """Look up subdomains once per registrable domain when IOC_GROUP_REGISTRABLE is truthy."""
+    return str(env.get("IOC_GROUP_REGISTRABLE", "") or "").strip().lower() in (
+        "1",
+        "true",
+        "yes",
+        "on",
+    )
+
+
+def public_suffix_file(env: dict[str, str]) -> str | None:
+    """Full Public Suffix List file from IOC_PUBLIC_SUFFIX_FILE (None -> built-in subset)."""
+    raw = str(env.get("IOC_PUBLIC_SUFFIX_FILE", "") or "").strip()
+    return raw or None
+
+
+def offload_workers(env: dict[str, str]) -> int:
+    """Worker processes for CPU-bound batch stages (see ioc_core.offload), from IOC_OFFLOAD_WORKERS.
+
+    ``auto`` uses all cores but one; unset, invalid or 0 keeps everything in-process.
+    """
+    raw = str(env.get("IOC_OFFLOAD_WORKERS", "") or "").strip().lower()
+    if raw == "auto":
+        return max(0, (os.cpu_count() or 1) - 1)
+    try:
+        return max(0, int(raw or 0))
+    except ValueError:
+        return 0
+
 
-def resolve_mode(mode: str) -> Tuple[bool, bool, float]:
+def resolve_mode(mode: str) -> tuple[bool, bool, float]:
     """Return (use_cache, refresh, timeout_seconds).
 
     Centralized shim: regardless of requested mode, enforce Normal semantics.
@@ -59,14 +157,14 @@ def resolve_mode(mode: str) -> Tuple[bool, bool, float]:
     return True, False, timeout
 
 
-def enabled_providers(env: Dict[str, str]) -> List[str]:
+def enabled_providers(env: dict[str, str]) -> list[str]:
     """Return the list of providers enabled given env vars.
 
     Includes providers with needs_key=False always, and those with needs_key=True only if a non-empty key exists in env.
     Keys expected:
       - VIRUSTOTAL_API_KEY, ABUSEIPDB_API_KEY, OTX_API_KEY
     """
-    names: List[str] = []
+    names: list[str] = []
     key_map = {
         "virustotal": "VIRUSTOTAL_API_KEY",
         "abuseipdb": "ABUSEIPDB_API_KEY",
@@ -81,4 +179,4 @@ def enabled_providers(env: Dict[str, str]) -> List[str]:
         env_key = key_map.get(name)
         if env_key and (env.get(env_key) or ""):
             names.append(name)
-    return names 
\ No newline at end of file
+    return names
@@ -1,77 +1,364 @@
 from __future__ import annotations
 
+import asyncio
 import csv
 import json
-from typing import Any, Dict, List, Optional
+import textwrap
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from typing import IO, Any, TextIO, TypeVar
 
+from .cache import AsyncCache, Cache, age_bucket
 from .config import DEFAULT_PROVIDERS
 from .models import AggregatedResult, ProviderResult
-from .cache import Cache, age_bucket
+from .spill import SpillStore
 
+# Sinks flush buffered output this long after the first unflushed result
+DEFAULT_FLUSH_INTERVAL = 0.5
 
-def _ordered_provider_keys(results: List[AggregatedResult]) -> List[str]:
-    present = {pr.provider for r in results for pr in r.providers}
-    ordered = [p for p in DEFAULT_PROVIDERS if p in present]
-    # append any others deterministically
-    extras = sorted(present - set(ordered))
-    return ordered + extras
+_S = TypeVar("_S", bound="ResultSink")
 
 
-def export_results_csv(path: str, results: List[AggregatedResult], *, include_age: bool = True, excel_bom: bool = False, cache: Optional[Cache] = None) -> None:
-    provider_keys = _ordered_provider_keys(results)
-    columns = ["type", "ioc"]
-    if include_age:
-        columns.append("age_bucket")
-    columns += provider_keys
-    open_kwargs: Dict[str, Any] = {"mode": "w", "newline": "", "encoding": "utf-8"}
-    with open(path, **open_kwargs) as f:
-        if excel_bom:
-            f.write("\ufeff")
-        w = csv.writer(f)
-        w.writerow(columns)
+def _ordered_provider_keys(results: Iterable[AggregatedResult]) -> list[str]:
+    return ordered_provider_names(pr.provider for r in results for pr in r.providers)
+
+
+def provider_cell(pr: ProviderResult | None) -> str:
+    """``STATUS [score]`` for one provider column; empty when the provider did not answer."""
+    if pr is None:
+        return ""
+    try:
+        sc = int(pr.score)
+    except Exception:
+        sc = int(float(pr.score) if pr.score else 0)
+    return f"{pr.status} [{sc}]"
+
+
+def mirrored_cell(pr: ProviderResult | None) -> str:
+    """Provider column of a mirrored CSV: the status, plus ``(score)`` when flagged."""
+    if pr is None:
+        return ""
+    txt = pr.status
+    if pr.status in ("MALICIOUS", "SUSPICIOUS") and pr.score:
+        try:
+            txt += f" ({int(pr.score)})"
+        except Exception:
+            txt += f" ({int(float(pr.score) if pr.score else 0)})"
+    return txt
+
+
+def mirrored_cells(ar: AggregatedResult, provider_names: list[str]) -> list[str]:
+    """One ``mirrored_cell`` per enabled provider, in ``provider_names`` order."""
+    per = {pr.provider: pr for pr in ar.providers}
+    return [mirrored_cell(per.get(pname)) for pname in provider_names]
+
+
+def ordered_provider_names(names: Iterable[str]) -> list[str]:
+    """``names`` in DEFAULT_PROVIDERS order, then the others sorted (the CSV column order)."""
+    present = set(names)
+    return [p for p in DEFAULT_PROVIDERS if p in present] + sorted(present - set(DEFAULT_PROVIDERS))
+
+
+class ResultSink(ABC):
+    """Writes results incrementally: ``write()`` each one as it arrives, then ``close()``.
+
+    ``dest`` is a path (opened and closed by the sink) or an open stream, text
+    unless the subclass passes ``binary=True``. Buffered output is flushed
+    ``flush_interval`` seconds after the first unflushed result: by a timer when
+    an event loop is running, otherwise on the next write. ``close()``
+    finalizes a valid file with whatever was written, so a cancelled run still
+    leaves a readable export; the sink is also a context manager that closes on
+    exit.
+
+    Coroutines on an event loop use ``awrite()``/``aclose()`` instead: held-back
+    rows are then drained with ``_adrain()``, which never blocks the loop, and
+    output is flushed on the first write after ``flush_interval`` (no timer).
+    Subclasses implement ``_write``; those that hold rows back also implement
+    ``_should_drain``/``_drain`` (and ``_adrain`` when draining does I/O).
+    """
+
+    def __init__(
+        self,
+        dest: str | IO[Any],
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        *,
+        binary: bool = False,
+    ):
+        self._owns = isinstance(dest, str)
+        self.out: IO[Any]
+        if not isinstance(dest, str):
+            self.out = dest
+        elif binary:
+            self.out = open(dest, "wb")
+        else:
+            self.out = open(dest, "w", encoding="utf-8", newline="")
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.closed = False
+        self._timer: asyncio.TimerHandle | None = None
+        self._last_flush = time.monotonic()
+
+    def __enter__(self: _S) -> _S:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def write(self, ar: AggregatedResult) -> None:
+        self._write(ar)
+        self.count += 1
+        if self._should_drain():
+            self._drain()
+        if self._timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+            return
+        self._timer = loop.call_later(self.flush_interval, self._timed_flush)
+
+    def write_many(self, results: Iterable[AggregatedResult]) -> None:
         for ar in results:
-            base = [ar.ioc_type, ar.ioc]
-            if include_age:
-                # compute worst/youngest? Use min age among providers present for this IOC
-                ages: List[int] = []
-                if cache is not None:
-                    for pr in ar.providers:
-                        a = cache.get_age(pr.provider, ar.ioc)
-                        if isinstance(a, int):
-                            ages.append(a)
-                age_col = age_bucket(min(ages) if ages else None)
-                base.append(age_col)
-            per = {pr.provider: pr for pr in ar.providers}
-            vals: List[str] = []
-            for pname in provider_keys:
-                pr = per.get(pname)
-                if pr is None:
-                    vals.append("")
-                else:
-                    try:
-                        sc = int(pr.score)
-                    except Exception:
-                        sc = int(float(pr.score) if pr.score else 0)
-                    vals.append(f"{pr.status} [{sc}]")
-            w.writerow(base + vals)
-
-
-def export_results_json(path: str, results: List[AggregatedResult]) -> None:
-    data = [r.to_dict() for r in results]
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-
-
-def write_mirrored_csv(out_path: str, ctx: Dict[str, Any], results: List[AggregatedResult], canceled: bool) -> str:
-    idx_to_result: Dict[int, AggregatedResult] = {}
-    rows_selected: List[int] = ctx.get("rows_selected", [])
+            self.write(ar)
+
+    def flush(self) -> None:
+        self._cancel_timer()
+        self._drain()
+        self.out.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._cancel_timer()
+            self._drain()
+            self._finish()
+            self.out.flush()
+        finally:
+            if self._owns:
+                self.out.close()
+
+    async def awrite(self, ar: AggregatedResult) -> None:
+        self._write(ar)
+        self.count += 1
+        if self._should_drain():
+            await self._adrain()
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.aflush()
+
+    async def aflush(self) -> None:
+        self._cancel_timer()
+        await self._adrain()
+        self.out.flush()
+        self._last_flush = time.monotonic()
+
+    async def aclose(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._cancel_timer()
+            await self._adrain()
+            self._finish()
+            self.out.flush()
+        finally:
+            if self._owns:
+                self.out.close()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _timed_flush(self) -> None:
+        self._timer = None
+        try:
+            self.flush()
+        except (OSError, ValueError):
+            pass  # reader gone or stream closed; close() reports it
+
+    @abstractmethod
+    def _write(self, ar: AggregatedResult) -> None:
+        """Write (or hold back) one result."""
+
+    def _should_drain(self) -> bool:
+        """True when enough rows are held back to drain them now."""
+        return False
+
+    def _drain(self) -> None:  # noqa: B027 - optional hook
+        """Write anything held back (e.g. rows waiting for a bulk age lookup)."""
+
+    async def _adrain(self) -> None:
+        """``_drain`` for ``aflush``; override when draining does blocking I/O."""
+        self._drain()
+
+    def _finish(self) -> None:  # noqa: B027 - optional hook
+        """Write the trailer of the format, if any."""
+
+
+class CsvSink(ResultSink):
+    """CSV with one ``STATUS [score]`` column per provider in ``provider_names``.
+
+    Columns: type, ioc, [status, score], [age_bucket], providers. Ages come from
+    ``cache`` with one bulk query per ``batch_size`` rows (or per flush); pass an
+    AsyncCache to run those queries on its I/O thread under ``awrite``.
+    """
+
+    def __init__(
+        self,
+        dest: str | TextIO,
+        provider_names: Iterable[str],
+        *,
+        include_status: bool = False,
+        include_age: bool = True,
+        excel_bom: bool = False,
+        cache: Cache | AsyncCache | None = None,
+        batch_size: int = 500,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        super().__init__(dest, flush_interval)
+        self.provider_names = list(provider_names)
+        self.include_status = include_status
+        self.include_age = include_age
+        self.acache = cache if isinstance(cache, AsyncCache) else None
+        self.cache = cache.cache if isinstance(cache, AsyncCache) else cache
+        self.batch_size = max(1, batch_size)
+        self._pending: list[AggregatedResult] = []
+        self._csv = csv.writer(self.out)
+        if excel_bom:
+            self.out.write("\ufeff")
+        columns = ["type", "ioc"]
+        if include_status:
+            columns += ["status", "score"]
+        if include_age:
+            columns.append("age_bucket")
+        self._csv.writerow(columns + self.provider_names)
+
+    def _write(self, ar: AggregatedResult) -> None:
+        if not self.include_age:
+            self._row(ar, None)
+            return
+        self._pending.append(ar)
+
+    def _should_drain(self) -> bool:
+        return len(self._pending) >= self.batch_size
+
+    def _drain(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        ages: dict[tuple[str, str], int] = {}
+        if self.cache is not None:
+            ages = self.cache.get_ages_many(
+                (pr.provider, ar.ioc) for ar in pending for pr in ar.providers
+            )
+        self._emit(pending, ages)
+
+    async def _adrain(self) -> None:
+        if self.acache is None:
+            self._drain()
+            return
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        keys = [(pr.provider, ar.ioc) for ar in pending for pr in ar.providers]
+        ages = await self.acache.get_ages_many(keys)
+        self._emit(pending, ages)
+
+    def _emit(self, pending: list[AggregatedResult], ages: dict[tuple[str, str], int]) -> None:
+        for ar in pending:
+            # youngest entry among the providers present for this IOC
+            found = [
+                ages[(pr.provider, ar.ioc)] for pr in ar.providers if (pr.provider, ar.ioc) in ages
+            ]
+            self._row(ar, age_bucket(min(found) if found else None))
+
+    def _row(self, ar: AggregatedResult, age_col: str | None) -> None:
+        base: list[Any] = [ar.ioc_type, ar.ioc]
+        if self.include_status:
+            base += [ar.status, round(ar.score, 2)]
+        if age_col is not None:
+            base.append(age_col)
+        per = {pr.provider: pr for pr in ar.providers}
+        self._csv.writerow(base + [provider_cell(per.get(pname)) for pname in self.provider_names])
+
+
+class JsonLinesSink(ResultSink):
+    """One compact JSON object per line (NDJSON)."""
+
+    def _write(self, ar: AggregatedResult) -> None:
+        self.out.write(json.dumps(ar.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+class JsonArraySink(ResultSink):
+    """A single JSON array, written element by element.
+
+    With the default ``indent=2`` the file is identical to ``json.dump(results, f, indent=2)``;
+    ``indent=None`` writes one compact element per line.
+    """
+
+    def __init__(
+        self,
+        dest: str | TextIO,
+        indent: int | None = 2,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        super().__init__(dest, flush_interval)
+        self.indent = indent
+        self.out.write("[")
+
+    def _write(self, ar: AggregatedResult) -> None:
+        if self.indent is None:
+            item = json.dumps(ar.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        else:
+            item = textwrap.indent(json.dumps(ar.to_dict(), indent=self.indent), " " * self.indent)
+        self.out.write(("\n" if self.count == 0 else ",\n") + item)
+
+    def _finish(self) -> None:
+        self.out.write("\n]" if self.count else "]")
+        if self.indent is None:
+            self.out.write("\n")
+
+
+def export_results_csv(
+    path: str,
+    results: Sequence[AggregatedResult],
+    *,
+    include_age: bool = True,
+    excel_bom: bool = False,
+    cache: Cache | None = None,
+) -> None:
+    # A SpillStore knows its providers; walking it for them would read the whole run twice
+    if isinstance(results, SpillStore):
+        names = ordered_provider_names(results.provider_names())
+    else:
+        names = _ordered_provider_keys(results)
+    with CsvSink(path, names, include_age=include_age, excel_bom=excel_bom, cache=cache) as sink:
+        sink.write_many(results)
+
+
+def export_results_json(path: str, results: Iterable[AggregatedResult]) -> None:
+    with JsonArraySink(path) as sink:
+        sink.write_many(results)
+
+
+def write_mirrored_csv(
+    out_path: str, ctx: dict[str, Any], results: list[AggregatedResult], canceled: bool
+) -> str:
+    idx_to_result: dict[int, AggregatedResult] = {}
+    rows_selected: list[int] = ctx.get("rows_selected", [])
     for j, ridx in enumerate(rows_selected):
         if j < len(results):
             idx_to_result[ridx] = results[j]
-    enabled_names: List[str] = ctx.get("enabled_provider_names", [])
-    header: Optional[List[str]] = ctx.get("header")
-    data_rows: List[List[str]] = ctx.get("data_rows", [])
-    row_override: Dict[int, str] = ctx.get("row_override", {})
+    enabled_names: list[str] = ctx.get("enabled_provider_names", [])
+    header: list[str] | None = ctx.get("header")
+    data_rows: list[list[str]] = ctx.get("data_rows", [])
+    row_override: dict[int, str] = ctx.get("row_override", {})
     blank_rows: set[int] = ctx.get("blank_rows", set())
 
     with open(out_path, "w", encoding="utf-8", newline="") as f:
@@ -84,7 +371,7 @@ def write_mirrored_csv(out_path: str, ctx: Dict[str, Any], results: List[Aggrega
                 orig_col_count = max((len(r) for r in data_rows), default=0)
             except Exception:
                 orig_col_count = 0
-            placeholder_cols = [f"Column {i+1}" for i in range(orig_col_count)]
+            placeholder_cols = [f"Column {i + 1}" for i in range(orig_col_count)]
             header_row = placeholder_cols + enabled_names
         writer.writerow(header_row)
         if canceled:
@@ -99,7 +386,7 @@ def write_mirrored_csv(out_path: str, ctx: Dict[str, Any], results: List[Aggrega
             to_write_idxs = list(range(len(data_rows)))
         for i in to_write_idxs:
             base_row = data_rows[i] if i < len(data_rows) else []
-            app_vals: List[str] = []
+            app_vals: list[str] = []
             if i in blank_rows:
                 app_vals = [""] * len(enabled_names)
             elif i in row_override:
@@ -107,21 +394,6 @@ def write_mirrored_csv(out_path: str, ctx: Dict[str, Any], results: List[Aggrega
                 app_vals = [v] * len(enabled_names)
             else:
                 ar = idx_to_result.get(i)
-                if not ar:
-                    app_vals = [""] * len(enabled_names)
-                else:
-                    per = {pr.provider: pr for pr in ar.providers}
-                    for pname in enabled_names:
-                        pr = per.get(pname)
-                        if not pr:
-                            app_vals.append("")
-                        else:
-                            txt = pr.status
-                            if pr.status in ("MALICIOUS", "SUSPICIOUS") and pr.score:
-                                try:
-                                    txt += f" ({int(pr.score)})"
-                                except Exception:
-                                    txt += f" ({int(float(pr.score) if pr.score else 0)})"
-                            app_vals.append(txt)
+                app_vals = mirrored_cells(ar, enabled_names) if ar else [""] * len(enabled_names)
             writer.writerow(list(base_row) + app_vals)
-    return out_path 
\ No newline at end of file
+    return out_path
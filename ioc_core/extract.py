@@ -0,0 +1,329 @@
+"""Streaming IOC extraction from logs, mail dumps and compressed archives.
+
+Input is read in fixed-size chunks: plain files through ``mmap``, ``.gz``/``.bz2``/
+``.xz`` through the stdlib decompressors and ``.zst`` through the optional
+``zstandard`` package (detected by magic bytes, not the file name). Each chunk
+is cut at its last newline and scanned as bytes by one compiled alternation that
+finds URLs, IPv4 addresses, hashes and domains, including defanged forms such as
+``hxxp://evil[.]com``. Matches go through ``normalize_ioc``/``classify_many``, so
+what comes out is exactly what the engine would have queried.
+
+Dedup keeps the last ``dedup`` distinct values in two rotating generations, so
+memory stays bounded on inputs with tens of millions of distinct tokens (an IOC
+may repeat once it has aged out of both generations)::
+
+    for ioc, ioc_type in extract_iocs("proxy.log.gz"):
+        ...
+
+    python -m ioc_core.extract proxy.log.gz > iocs.txt
+
+Scanning is CPU-bound; with an ``offload.Offloader`` (``--workers N`` or
+IOC_OFFLOAD_WORKERS) blocks are scanned on a process pool, a few at a time,
+while dedup stays in this process.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import os
+import re
+import sys
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import IO, TYPE_CHECKING
+
+from . import config
+from .models import IOC_INVALID, IOC_TYPE_NAMES, classify_many, normalize_ioc
+
+if TYPE_CHECKING:
+    from .offload import Offloader
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_DEDUP = 1_000_000
+# A "line" longer than this is scanned in pieces instead of being carried forward
+_MAX_CARRY = 1 << 20
+
+_DOT = rb"(?:\.|\[\.\]|\(\.\)|\{\.\}|\[(?:dot|DOT)\]|\((?:dot|DOT)\))"
+# Branches start at a word boundary and their repeats are atomic: Python's re
+# tries every position, so cheap failure matters more than exactness here.
+# ``(?=(?P<x>...))(?P=x)`` is an atomic group, as fast as a possessive ``++``
+# (which needs Python 3.11; 3.10 is supported). Domains are any dotted label
+# run; the alphabetic-TLD check happens in scan_block.
+_SCANNER = re.compile(
+    rb"\b(?:(?P<url>[hH](?:tt|TT|xx|XX|\*\*)[pP][sS]?(?::|\[:\])"
+    rb"(?=(?P<url_rest>(?:\[\.\]|\(\.\)|\[dot\]|\[/\]|[^\s\"'<>\[\](){}|\\^`])+))(?P=url_rest))"
+    rb"|(?P<ip>\d{1,3}" + _DOT + rb"\d{1,3}" + _DOT + rb"\d{1,3}" + _DOT + rb"\d{1,3}\b(?!\.\d))"
+    rb"|(?P<hash>[0-9A-Fa-f]{32}(?:[0-9A-Fa-f]{8}(?:[0-9A-Fa-f]{24})?)?\b)"
+    rb"|(?P<domain>(?=(?P<label>[A-Za-z0-9-]+))(?P=label)"
+    rb"(?:" + _DOT + rb"(?=(?P<next>[A-Za-z0-9-]+))(?P=next))+))"
+)
+# Dotted tokens that look like domains in logs but are file names, not TLDs
+_NOT_TLDS = frozenset(
+    (
+        b"exe",
+        b"dll",
+        b"sys",
+        b"txt",
+        b"log",
+        b"tmp",
+        b"dat",
+        b"bin",
+        b"ini",
+        b"cfg",
+        b"conf",
+        b"json",
+        b"xml",
+        b"yml",
+        b"yaml",
+        b"html",
+        b"htm",
+        b"php",
+        b"asp",
+        b"aspx",
+        b"jsp",
+        b"js",
+        b"css",
+        b"png",
+        b"jpg",
+        b"jpeg",
+        b"gif",
+        b"bmp",
+        b"svg",
+        b"ico",
+        b"pdf",
+        b"doc",
+        b"docx",
+        b"xls",
+        b"xlsx",
+        b"ppt",
+        b"pptx",
+        b"csv",
+        b"tsv",
+        b"gz",
+        b"bz2",
+        b"xz",
+        b"zst",
+        b"tar",
+        b"rar",
+        b"bat",
+        b"ps1",
+        b"vbs",
+        b"lnk",
+        b"msi",
+        b"iso",
+        b"img",
+        b"jar",
+        b"class",
+        b"sql",
+    )
+)
+_URL_TRAILING = ".,;:!?'\")]}>"
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class ExtractError(ValueError):
+    """Raised for inputs that cannot be opened or decompressed."""
+
+
+class BoundedSeen:
+    """Set-like dedup over the most recent ``capacity`` values (two rotating generations)."""
+
+    def __init__(self, capacity: int = DEFAULT_DEDUP):
+        self.half = max(1, capacity // 2)
+        self._cur: set[str] = set()
+        self._old: set[str] = set()
+
+    def add(self, value: str) -> bool:
+        """Record ``value``; False when it was already seen recently."""
+        if value in self._cur:
+            return False
+        if value in self._old:
+            self._cur.add(value)
+            return False
+        if len(self._cur) >= self.half:
+            self._old, self._cur = self._cur, set()
+        self._cur.add(value)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._cur) + len(self._old)
+
+
+def _open_decompressed(path: str, head: bytes) -> io.BufferedIOBase | None:
+    if head.startswith(b"\x1f\x8b"):
+        return gzip.open(path, "rb")
+    if head.startswith(b"BZh"):
+        return bz2.open(path, "rb")
+    if head.startswith(b"\xfd7zXZ\x00"):
+        return lzma.open(path, "rb")
+    if head.startswith(_ZSTD_MAGIC):
+        try:
+            import zstandard  # type: ignore[import-not-found]
+        except ImportError as e:
+            raise ExtractError(f"{path}: zstd input needs the optional 'zstandard' package") from e
+        raw = open(path, "rb")
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)  # type: ignore[no-any-return]
+    return None
+
+
+def _read_chunks(f: IO[bytes] | io.BufferedIOBase, chunk_size: int) -> Iterator[bytes]:
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            return
+        yield data
+
+
+def iter_chunks(source: str | IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield raw byte chunks of a path (plain or compressed) or an open binary stream."""
+    if not isinstance(source, str):
+        yield from _read_chunks(source, chunk_size)
+        return
+    try:
+        with open(source, "rb") as f:
+            head = f.read(6)
+            stream = _open_decompressed(source, head)
+            if stream is None:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for off in range(0, size, chunk_size):
+                        yield mm[off:off + chunk_size]
+                return
+    except OSError as e:
+        raise ExtractError(f"cannot read {source}: {e}") from e
+    try:
+        with stream:
+            yield from _read_chunks(stream, chunk_size)
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        raise ExtractError(f"{source}: corrupt compressed input: {e}") from e
+
+
+def iter_blocks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Re-cut chunks at newlines so no token straddles two blocks."""
+    carry = b""
+    for chunk in chunks:
+        buf = carry + chunk if carry else chunk
+        cut = buf.rfind(b"\n") + 1
+        if cut == 0 and len(buf) > _MAX_CARRY:
+            cut = max(buf.rfind(b" "), buf.rfind(b"\t")) + 1 or len(buf)
+        if cut:
+            yield buf[:cut]
+        carry = buf[cut:]
+    if carry:
+        yield carry
+
+
+def iter_lines(source: str | IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Lazily yield the stripped, non-empty lines of ``source``, skipping ``#`` comments."""
+    for block in iter_blocks(iter_chunks(source, chunk_size)):
+        for raw in block.splitlines():
+            line = raw.strip()
+            if line and not line.startswith(b"#"):
+                yield line.decode("utf-8", "replace")
+
+
+def scan_block(block: bytes) -> Iterator[tuple[str, str]]:
+    """Raw (kind, text) candidates in one block; not yet normalized or validated."""
+    for url, _, ip, digest, domain, _, _ in _SCANNER.findall(block):
+        if url:
+            yield "url", url.decode("ascii", "replace").rstrip(_URL_TRAILING)
+        elif ip:
+            yield "ip", ip.decode("ascii")
+        elif digest:
+            yield "hash", digest.decode("ascii")
+        else:
+            tld = domain[domain.rfind(b".") + 1 :].rpartition(b"]")[2].rpartition(b")")[2]
+            if 2 <= len(tld) <= 63 and tld.isalpha() and tld.lower() not in _NOT_TLDS:
+                yield "domain", domain.decode("ascii")
+
+
+def iocs_in_block(block: bytes, raw_seen: BoundedSeen | None = None) -> Iterator[tuple[str, str]]:
+    """Validated (normalized ioc, type) pairs in one block, in order of appearance.
+
+    ``raw_seen`` remembers raw spellings so a repeated token skips normalization.
+    """
+    fresh = [text for _, text in scan_block(block) if raw_seen is None or raw_seen.add(text)]
+    codes, values = classify_many([normalize_ioc(text) for text in fresh])
+    for code, norm in zip(codes, values, strict=True):
+        if code != IOC_INVALID:
+            yield norm, IOC_TYPE_NAMES[code]
+
+
+def extract_iocs(
+    source: str | IO[bytes],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dedup: int = DEFAULT_DEDUP,
+    offload: Offloader | None = None,
+) -> Iterator[tuple[str, str]]:
+    """Lazily yield unique (normalized ioc, type) pairs found in ``source``.
+
+    ``dedup`` bounds the dedup memory (0 disables dedup). With ``offload``,
+    blocks are scanned on its process pool, two per worker at a time.
+    """
+    seen = BoundedSeen(dedup) if dedup > 0 else None
+    blocks = iter_blocks(iter_chunks(source, chunk_size))
+    if offload is not None and offload.workers > 0:
+        from .offload import scan_blocks  # offload imports this module
+
+        while True:
+            batch = list(islice(blocks, 2 * max(1, offload.workers)))
+            if not batch:
+                return
+            for found in offload.map(scan_blocks, batch, chunk_size=1, min_batch=2):
+                for norm, t in found:
+                    if seen is None or seen.add(norm):
+                        yield norm, t
+    raw_seen = BoundedSeen(dedup) if dedup > 0 else None
+    for block in blocks:
+        for norm, t in iocs_in_block(block, raw_seen):
+            if seen is None or seen.add(norm):
+                yield norm, t
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.extract", description="Print the unique IOCs found in files."
+    )
+    ap.add_argument(
+        "paths", nargs="+", help="files to scan ('-' for stdin); gz/bz2/xz/zst are detected"
+    )
+    ap.add_argument("--types", default="", help="comma-separated subset of ip,domain,url,hash")
+    ap.add_argument("--with-type", action="store_true", help="print 'type<TAB>ioc'")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=config.offload_workers(dict(os.environ)),
+        help="processes scanning blocks in parallel "
+        "(default: IOC_OFFLOAD_WORKERS, else 0: in-process)",
+    )
+    args = ap.parse_args(argv)
+    keep = {t.strip() for t in args.types.split(",") if t.strip()}
+    out = sys.stdout
+    from .offload import Offloader
+
+    try:
+        with Offloader(max(0, args.workers)) as offload:
+            for path in args.paths:
+                source: str | IO[bytes] = sys.stdin.buffer if path == "-" else path
+                for ioc, t in extract_iocs(source, offload=offload):
+                    if keep and t not in keep:
+                        continue
+                    out.write(f"{t}\t{ioc}\n" if args.with_type else ioc + "\n")
+    except ExtractError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        return 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,324 @@
+"""Follow growing log files and enrich new IOCs continuously (``tail -F`` style).
+
+Each path is polled for appended bytes; only complete lines are scanned, with the
+same scanner as ``ioc_core.extract``. A path that is renamed away and recreated
+(logrotate ``create``) or truncated in place (``copytruncate``) is reopened from
+the start, and a path that does not exist yet is picked up when it appears.
+An IOC is enriched at most once per ``window`` seconds; the window set is capped
+so memory stays bounded on busy logs. Results stream out as NDJSON, one object
+per line, as soon as each lookup completes::
+
+    python -m ioc_core.follow /var/log/squid/access.log /var/log/dns/query.log
+
+Backpressure: when lookups fall behind, the engine stops pulling IOCs and the
+unread lines simply wait in the files.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import IO, TextIO
+
+from . import config
+from .cache import Cache
+from .compiled_cache import CompiledCache
+from .extract import _MAX_CARRY, iocs_in_block
+from .ipasn import IpAsnDb
+from .negatives import NegativeFilter
+from .prefilter import Prefilter, build_prefilter
+from .services import BaseProvider, build_providers, enrich_stream
+
+DEFAULT_POLL_INTERVAL = 0.5
+DEFAULT_WINDOW = 3600.0
+DEFAULT_MAX_SEEN = 500_000
+_READ_SIZE = 1 << 20
+
+
+class TailFile:
+    """Incremental reader for one path that survives rotation and truncation."""
+
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = path
+        self._f: IO[bytes] | None = None
+        self._ident: tuple[int, int] | None = None
+        self._partial = b""
+        # A file present at startup is read from its end unless from_start;
+        # anything opened later (rotation, late creation) is read from byte 0.
+        self._open(at_start=from_start)
+
+    def _open(self, at_start: bool) -> bool:
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return False
+        st = os.fstat(f.fileno())
+        if not at_start:
+            f.seek(0, os.SEEK_END)
+        self._f, self._ident, self._partial = f, (st.st_dev, st.st_ino), b""
+        return True
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _reopen_if_replaced(self) -> bool:
+        """Switch to a new file at ``path`` (rotation) or rewind after truncation."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False  # rotated away and not recreated yet: keep the old handle
+        if self._f is None or (st.st_dev, st.st_ino) != self._ident:
+            self.close()
+            return self._open(at_start=True)
+        if st.st_size < self._f.tell():
+            self._f.seek(0)
+            self._partial = b""
+            return True
+        return False
+
+    def read(self, max_bytes: int = _READ_SIZE) -> bytes:
+        """Complete lines appended since the last call (b"" when there is nothing new)."""
+        data = self._f.read(max_bytes) if self._f is not None else b""
+        if not data and self._reopen_if_replaced() and self._f is not None:
+            data = self._f.read(max_bytes)
+        if not data:
+            return b""
+        buf = self._partial + data
+        cut = buf.rfind(b"\n") + 1
+        if cut == 0 and len(buf) > _MAX_CARRY:
+            cut = len(buf)  # a runaway line without newline: scan it rather than grow forever
+        self._partial = buf[cut:]
+        return buf[:cut]
+
+
+class SeenWindow:
+    """Remember IOCs for ``seconds``; at most ``max_items`` entries (oldest evicted first)."""
+
+    def __init__(
+        self,
+        seconds: float = DEFAULT_WINDOW,
+        max_items: int = DEFAULT_MAX_SEEN,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.seconds = seconds
+        self.max_items = max(1, max_items)
+        self._clock = clock
+        self._last: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def fresh(self, key: str) -> bool:
+        """True (and record it) unless ``key`` was let through within the window."""
+        now = self._clock()
+        last = self._last
+        horizon = now - self.seconds
+        while last:
+            oldest_key, oldest_ts = next(iter(last.items()))
+            if oldest_ts > horizon and len(last) < self.max_items:
+                break
+            del last[oldest_key]
+        if key in last:
+            return False  # anything still present is inside the window
+        last[key] = now
+        return True
+
+
+def _read_iocs(tail: TailFile) -> list[tuple[str, str]] | None:
+    """Read and scan the lines appended to ``tail``; None when nothing new arrived."""
+    block = tail.read()
+    return list(iocs_in_block(block)) if block else None
+
+
+async def follow_iocs(
+    paths: Sequence[str],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    from_start: bool = False,
+    window: float = DEFAULT_WINDOW,
+    max_seen: int = DEFAULT_MAX_SEEN,
+    stop: asyncio.Event | None = None,
+) -> AsyncIterator[str]:
+    """Yield normalized IOCs appended to ``paths`` until ``stop`` is set.
+
+    Files are read and scanned in a worker thread, so a large burst of appended
+    lines never stalls the event loop; when no file grew, the loop sleeps for
+    ``poll_interval`` (which bounds the detection latency).
+    """
+    tails = [TailFile(p, from_start) for p in paths]
+    seen = SeenWindow(window, max_seen)
+    try:
+        while stop is None or not stop.is_set():
+            grew = False
+            for tail in tails:
+                found = await asyncio.to_thread(_read_iocs, tail)
+                if found is None:
+                    continue
+                grew = True
+                for ioc, _ in found:
+                    if seen.fresh(ioc):
+                        yield ioc
+            if grew:
+                continue
+            if stop is None:
+                await asyncio.sleep(poll_interval)
+            else:
+                try:
+                    await asyncio.wait_for(stop.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        for tail in tails:
+            tail.close()
+
+
+async def follow(
+    paths: Sequence[str],
+    providers: list[BaseProvider],
+    cache: Cache,
+    ttls: dict[str, int],
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    concurrency: int,
+    out: TextIO,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    from_start: bool = False,
+    window: float = DEFAULT_WINDOW,
+    negatives: NegativeFilter | None = None,
+    prefilter: Prefilter | None = None,
+    ipasn: IpAsnDb | None = None,
+    stop: asyncio.Event | None = None,
+) -> int:
+    """Enrich IOCs from followed files, writing one NDJSON line per result; returns the count."""
+    n = 0
+    source = follow_iocs(paths, poll_interval, from_start, window, stop=stop)
+    async for ar in enrich_stream(
+        source,
+        providers,
+        cache,
+        ttls,
+        use_cache,
+        refresh,
+        timeout,
+        concurrency,
+        negatives=negatives,
+        prefilter=prefilter,
+        ipasn=ipasn,
+    ):
+        out.write(json.dumps(ar.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n")
+        out.flush()
+        n += 1
+    return n
+
+
+def install_stop_signals(stop: asyncio.Event) -> None:
+    """Set ``stop`` on SIGINT/SIGTERM so long-running modes can drain and exit cleanly."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # Windows / non-main thread: Ctrl+C falls back to KeyboardInterrupt
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.follow",
+        description="Follow log files and stream enrichment results as NDJSON.",
+    )
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument(
+        "--providers",
+        default=",".join(config.DEFAULT_PROVIDERS),
+        help="comma-separated provider names",
+    )
+    ap.add_argument("--mode", choices=sorted(config.DEFAULT_TIMEOUTS), default="normal")
+    ap.add_argument("--concurrency", type=int, default=config.DEFAULT_CONCURRENCY)
+    ap.add_argument("--cache", default=config.CACHE_PATH, help="local SQLite cache path")
+    ap.add_argument(
+        "--poll",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="seconds between polls of idle files",
+    )
+    ap.add_argument(
+        "--window",
+        type=float,
+        default=DEFAULT_WINDOW,
+        help="seconds before the same IOC is enriched again",
+    )
+    ap.add_argument(
+        "--from-start", action="store_true", help="read existing content too, not only new lines"
+    )
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ)
+    try:
+        providers = build_providers(
+            [n.strip() for n in args.providers.split(",") if n.strip()], env
+        )
+        prefilter = build_prefilter(
+            config.allowlist_file(env), config.prefilter_cidrs(env), config.public_suffix_file(env)
+        )
+        ipasn_path = config.ipasn_db_path(env)
+        ipasn = IpAsnDb(ipasn_path) if ipasn_path else None
+        compiled_path = config.compiled_cache_path(env)
+        compiled = CompiledCache(compiled_path) if compiled_path else None
+    except (OSError, ValueError) as e:  # IpAsnError and CompiledCacheError are ValueErrors
+        print(str(e), file=sys.stderr)
+        return 2
+    trust_hours = config.negative_trust_hours(env)
+    negatives = NegativeFilter(config.NEGATIVE_FILTER_DIR, trust_hours) if trust_hours > 0 else None
+    use_cache, refresh, timeout = config.resolve_mode(args.mode)
+    cache = Cache(args.cache)
+    cache.attach_compiled(compiled)
+
+    async def run() -> int:
+        stop = asyncio.Event()
+        install_stop_signals(stop)
+        return await follow(
+            args.paths,
+            providers,
+            cache,
+            dict(config.DEFAULT_TTLS),
+            use_cache,
+            refresh,
+            timeout,
+            max(1, args.concurrency),
+            sys.stdout,
+            args.poll,
+            args.from_start,
+            args.window,
+            negatives=negatives,
+            prefilter=prefilter,
+            ipasn=ipasn,
+            stop=stop,
+        )
+
+    try:
+        n = asyncio.run(run())
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        return 0
+    finally:
+        if ipasn is not None:
+            ipasn.close()
+        if compiled is not None:
+            compiled.close()
+        cache.conn.close()
+    print(f"followed {len(args.paths)} file(s), {n} result(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
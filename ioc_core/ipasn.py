@@ -0,0 +1,304 @@
+"""Offline IPv4 -> ASN/country lookups from a compiled, memory-mapped range table.
+
+Build the table from a CSV/TSV of ranges we supply (``start,end,asn,country[,as_name]``
+with dotted or integer addresses, or ``cidr,asn,country[,as_name]``; iptoasn.com's
+TSV dump has this shape)::
+
+    python -m ioc_core.ipasn build ip2asn.tsv ipasn.db
+
+Layout (little-endian, every section 4-byte aligned)::
+
+    HEADER   MAGIC(8) VERSION(u32) RESERVED(u32) COUNT(u64) NAMES(u64) CREATED_AT(i64)
+    STARTS   u32[COUNT]     range start, sorted
+    ENDS     u32[COUNT]     range end (inclusive)
+    ASNS     u32[COUNT]
+    NAME_IDX u32[COUNT]     index into the AS-name table
+    COUNTRY  2s[COUNT]      ISO-3166 alpha-2, padded to 4 bytes
+    NAME_OFF u32[NAMES+1]   offsets into the UTF-8 name blob
+    DIR      u32[65537]     DIR[k] = first range whose start >= k << 16
+    NAME_BLOB
+
+Readers mmap the file and bisect a ``memoryview.cast('I')`` of STARTS, so opening
+is instant and lookups never copy the table. DIR narrows each bisect to the few
+ranges around the address's /16.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import ipaddress
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterator
+from typing import NamedTuple
+
+from .models import ipv4_to_int
+
+MAGIC = b"IOCASN\x00\x00"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQq")
+# One directory slot per /16 plus a sentinel
+_DIR_SLOTS = (1 << 16) + 1
+
+# (start, end, asn, country, as_name)
+IpRange = tuple[int, int, int, str, str]
+
+
+class IpAsnError(ValueError):
+    """Raised for unreadable range CSVs or missing/foreign compiled tables."""
+
+
+class IpAsnInfo(NamedTuple):
+    asn: int
+    country: str
+    as_name: str
+
+    def to_info(self) -> dict[str, str]:
+        """Fields for ``AggregatedResult.info``."""
+        out = {"asn": f"AS{self.asn}"}
+        if self.country:
+            out["country"] = self.country
+        if self.as_name:
+            out["as_name"] = self.as_name
+        return out
+
+
+def _addr(value: str) -> int:
+    v = value.strip()
+    if v.isdigit():
+        return int(v)
+    return int(ipaddress.IPv4Address(v))
+
+
+def iter_ranges_csv(path: str) -> Iterator[IpRange]:
+    """Parse a range CSV/TSV; rows with ASN 0 ("not routed") and IPv6 rows are skipped."""
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        first = f.readline()
+        delim = "\t" if first.count("\t") > first.count(",") else ","
+        f.seek(0)
+        for lineno, row in enumerate(csv.reader(f, delimiter=delim), 1):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            try:
+                if "/" in row[0]:
+                    net = ipaddress.ip_network(row[0].strip(), strict=False)
+                    if net.version != 4:
+                        continue
+                    start, end = int(net.network_address), int(net.broadcast_address)
+                    rest = row[1:]
+                else:
+                    if ":" in row[0]:
+                        continue
+                    start, end = _addr(row[0]), _addr(row[1])
+                    rest = row[2:]
+                asn = int(rest[0].strip().upper().removeprefix("AS") or 0)
+            except (ValueError, IndexError) as e:
+                if lineno == 1:
+                    continue  # header row
+                raise IpAsnError(f"{path}:{lineno}: cannot parse range row") from e
+            if asn == 0:
+                continue
+            country = rest[1].strip().upper() if len(rest) > 1 else ""
+            # Placeholders for "unknown"; compared whole, since "NO" is Norway
+            country = "" if country in ("NONE", "--", "ZZ", "") else country[:2]
+            name = rest[2].strip() if len(rest) > 2 else ""
+            yield start, end, asn, country, name
+
+
+def build_table(ranges: list[IpRange], path: str) -> int:
+    """Compile ranges into a lookup file at ``path``; returns the number of stored ranges.
+
+    Ranges are sorted; ones overlapping an earlier range are dropped and adjacent
+    ranges with identical ASN/country/name are merged.
+    """
+    ranges.sort(key=lambda r: (r[0], -r[1]))
+    starts, ends, asns, name_idx = array("I"), array("I"), array("I"), array("I")
+    countries = bytearray()
+    names: dict[str, int] = {"": 0}
+    for start, end, asn, country, name in ranges:
+        if ends and start <= ends[-1]:
+            continue
+        ni = names.setdefault(name, len(names))
+        cc = country.encode("ascii", "replace")[:2].ljust(2, b"\x00")
+        adjacent = bool(ends) and start == ends[-1] + 1
+        if adjacent and asns[-1] == asn and name_idx[-1] == ni and countries[-2:] == cc:
+            ends[-1] = end
+            continue
+        starts.append(start)
+        ends.append(end)
+        asns.append(asn)
+        name_idx.append(ni)
+        countries += cc
+    count = len(starts)
+    countries += b"\x00" * (-len(countries) % 4)
+    blob = bytearray()
+    offsets = array("I", [0])
+    for name in names:  # dict order == index order
+        blob += name.encode("utf-8")
+        offsets.append(len(blob))
+    directory = array("I")
+    i = 0
+    for k in range(_DIR_SLOTS):
+        while i < count and starts[i] < (k << 16):
+            i += 1
+        directory.append(i)
+    for arr in (starts, ends, asns, name_idx, offsets, directory):
+        if sys.byteorder != "little":
+            arr.byteswap()
+    out_dir = os.path.dirname(os.path.abspath(path))
+    fd, part = tempfile.mkstemp(dir=out_dir, prefix=".ipasn-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(_HEADER.pack(MAGIC, VERSION, 0, count, len(names), int(time.time())))
+            for arr in (starts, ends, asns, name_idx):
+                out.write(arr.tobytes())
+            out.write(countries)
+            out.write(offsets.tobytes())
+            out.write(directory.tobytes())
+            out.write(blob)
+        os.replace(part, path)
+    except BaseException:
+        try:
+            os.unlink(part)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def build_from_csv(csv_path: str, out_path: str) -> int:
+    return build_table(list(iter_ranges_csv(csv_path)), out_path)
+
+
+class IpAsnDb:
+    """Memory-mapped reader over a file produced by :func:`build_table`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise IpAsnError(f"cannot map {path}: {e}") from e
+        try:
+            self._open()
+        except IpAsnError:
+            self._mm.close()
+            raise
+
+    def _open(self) -> None:
+        mm = self._mm
+        if len(mm) < _HEADER.size:
+            raise IpAsnError("truncated IP-ASN table")
+        magic, version, _, count, nnames, created_at = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise IpAsnError("not an IP-ASN table (or unsupported version)")
+        if sys.byteorder != "little":
+            raise IpAsnError("IP-ASN tables are little-endian; big-endian hosts are not supported")
+        cc_size = 2 * count + (-2 * count % 4)
+        names_off = _HEADER.size + 16 * count + cc_size
+        dir_off = names_off + 4 * (nnames + 1)
+        if dir_off + 4 * _DIR_SLOTS > len(mm):
+            raise IpAsnError("corrupt IP-ASN table")
+        view = memoryview(mm)
+        ints = view[_HEADER.size:_HEADER.size + 16 * count].cast("I")
+        self._starts = ints[0:count]
+        self._ends = ints[count:2 * count]
+        self._asns = ints[2 * count:3 * count]
+        self._name_idx = ints[3 * count:4 * count]
+        self._cc_off = _HEADER.size + 16 * count
+        self._name_offs = view[names_off:dir_off].cast("I")
+        self._dir = view[dir_off:dir_off + 4 * _DIR_SLOTS].cast("I")
+        # Every view must be released before the mmap can close
+        self._views = [
+            self._starts,
+            self._ends,
+            self._asns,
+            self._name_idx,
+            self._name_offs,
+            self._dir,
+            ints,
+            view,
+        ]
+        self._blob_off = dir_off + 4 * _DIR_SLOTS
+        self._names: dict[int, str] = {}
+        self.count: int = count
+        self.created_at: int = created_at
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        for mv in self._views:
+            mv.release()
+        self._mm.close()
+
+    def _name(self, ni: int) -> str:
+        name = self._names.get(ni)
+        if name is None:
+            a, b = self._name_offs[ni], self._name_offs[ni + 1]
+            name = self._mm[self._blob_off + a:self._blob_off + b].decode("utf-8", "replace")
+            self._names[ni] = name
+        return name
+
+    def lookup_int(self, n: int) -> IpAsnInfo | None:
+        k = n >> 16
+        d = self._dir
+        i = bisect_right(self._starts, n, max(0, d[k] - 1), d[k + 1]) - 1
+        if i < 0 or n > self._ends[i]:
+            return None
+        off = self._cc_off + 2 * i
+        cc = self._mm[off:off + 2].rstrip(b"\x00").decode("ascii", "replace")
+        return IpAsnInfo(self._asns[i], cc, self._name(self._name_idx[i]))
+
+    def lookup(self, ip: str) -> IpAsnInfo | None:
+        """Return ASN/country/name for a dotted-quad IPv4 address, or None."""
+        n = ipv4_to_int(ip)
+        return None if n is None else self.lookup_int(n)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.ipasn", description="Build or query the offline IP-ASN table."
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="compile a range CSV/TSV into a lookup file")
+    b.add_argument("csv")
+    b.add_argument("out")
+    q = sub.add_parser("lookup", help="look up IPv4 addresses")
+    q.add_argument("db")
+    q.add_argument("ips", nargs="+")
+    args = ap.parse_args(argv)
+    try:
+        if args.cmd == "build":
+            n = build_from_csv(args.csv, args.out)
+            print(f"Wrote {n} ranges to {args.out}")
+            return 0
+        db = IpAsnDb(args.db)
+        try:
+            for ip in args.ips:
+                info = db.lookup(ip)
+                print(
+                    ip,
+                    "-"
+                    if info is None
+                    else " ".join(f"{k}={v}" for k, v in info.to_info().items()),
+                )
+        finally:
+            db.close()
+        return 0
+    except (OSError, IpAsnError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
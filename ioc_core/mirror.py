@@ -0,0 +1,433 @@
+"""Streaming CSV-in/CSV-out enrichment for spreadsheets of any size.
+
+The input CSV is read row by row and copied to the output with one column per
+provider appended (the ``write_mirrored_csv`` layout). The IOC column is given
+(``--column`` name or 1-based index) or detected from the first rows. Each
+distinct IOC is enriched once: rows repeating an IOC that is still in flight
+wait for that lookup, and recent results are kept in a bounded LRU so later
+repeats are answered without a lookup.
+
+Rows are written in input order as soon as they and every row before them are
+done. Up to ``max_buffer`` rows wait in a reorder buffer behind a slow lookup;
+when it is full, reading pauses. Memory is therefore bounded by the buffer and
+the LRU, not by the file size::
+
+    python -m ioc_core.mirror alerts.csv -o alerts.enriched.csv --column src_ip
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from dataclasses import dataclass
+from itertools import chain, islice
+from typing import TextIO
+
+from . import config
+from .cache import Cache
+from .compiled_cache import CompiledCache
+from .export import mirrored_cells
+from .ipasn import IpAsnDb
+from .models import classify_ioc, normalize_ioc
+from .negatives import NegativeFilter
+from .prefilter import Prefilter, build_prefilter
+from .services import BaseProvider, build_providers, enrich_stream
+
+DEFAULT_MAX_BUFFER = 10_000
+DEFAULT_RESULT_LRU = 100_000
+SNIFF_ROWS = 200
+INVALID_CELL = "INVALID"
+_READ_BATCH = 512
+_IOC_HEADER_HINTS = (
+    "ioc",
+    "indicator",
+    "observable",
+    "ip",
+    "domain",
+    "url",
+    "hash",
+    "sha256",
+    "md5",
+    "sha1",
+)
+
+
+class MirrorError(ValueError):
+    """The input cannot be mirrored (empty file, unknown column)."""
+
+
+@dataclass
+class MirrorStats:
+    rows: int = 0
+    lookups: int = 0
+    invalid: int = 0
+    column: int = -1
+
+
+def ioc_key(cell: str) -> str | None:
+    """The normalized IOC in ``cell`` (what the engine queries), or None if it holds none."""
+    valid, _, norm, _ = classify_ioc(normalize_ioc(cell))
+    return norm if valid else None
+
+
+def detect_ioc_column(header: Sequence[str] | None, rows: Sequence[Sequence[str]]) -> int:
+    """Index of the column holding the most valid IOCs; header names break ties."""
+    width = max((len(r) for r in rows), default=len(header or ()))
+    if width == 0:
+        raise MirrorError("no columns to choose an IOC column from")
+    best, best_score = 0, -1.0
+    for col in range(width):
+        hits = sum(
+            1 for r in rows if col < len(r) and r[col].strip() and ioc_key(r[col]) is not None
+        )
+        name = (header[col] if header is not None and col < len(header) else "").strip().lower()
+        score = hits + (0.5 if name in _IOC_HEADER_HINTS else 0.0)
+        if score > best_score:
+            best, best_score = col, score
+    return best
+
+
+def _resolve_column(column: str | int, header: Sequence[str] | None) -> int:
+    if isinstance(column, int) or column.isdigit():
+        idx = int(column) - 1
+        if idx < 0:
+            raise MirrorError("column numbers start at 1")
+        return idx
+    names = [h.strip().lower() for h in header or ()]
+    try:
+        return names.index(column.strip().lower())
+    except ValueError:
+        raise MirrorError(f"no column named {column!r} in the header") from None
+
+
+def _read_sample(f: TextIO, limit: int = 64 * 1024) -> list[str]:
+    """Whole lines from the start of ``f`` (about ``limit`` characters) for sniffing."""
+    lines: list[str] = []
+    size = 0
+    for line in f:
+        lines.append(line)
+        size += len(line)
+        if size >= limit:
+            break
+    return lines
+
+
+class _Reorder:
+    """Rows waiting to be written in input order, keyed by row number."""
+
+    def __init__(self, write_row: Callable[[list[str]], object]):
+        self.write_row = write_row
+        self.rows: dict[int, tuple[list[str], list[str] | None]] = {}
+        self.waiting: dict[str, list[int]] = {}
+        self.next_row = 0
+
+    def add(self, idx: int, row: list[str], cells: list[str] | None) -> None:
+        self.rows[idx] = (row, cells)
+
+    def resolve(self, key: str, cells: list[str]) -> None:
+        for idx in self.waiting.pop(key, ()):
+            self.rows[idx] = (self.rows[idx][0], cells)
+
+    def flush(self) -> int:
+        """Write every finished row at the head of the buffer; returns how many."""
+        n = 0
+        while True:
+            entry = self.rows.get(self.next_row)
+            if entry is None or entry[1] is None:
+                return n
+            del self.rows[self.next_row]
+            self.write_row(entry[0] + entry[1])
+            self.next_row += 1
+            n += 1
+
+
+async def mirror_csv(
+    src: str | TextIO,
+    dst: TextIO,
+    providers: list[BaseProvider],
+    cache: Cache,
+    ttls: dict[str, int],
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    concurrency: int,
+    column: str | int | None = None,
+    has_header: bool | None = None,
+    max_buffer: int = DEFAULT_MAX_BUFFER,
+    result_lru: int = DEFAULT_RESULT_LRU,
+    negatives: NegativeFilter | None = None,
+    prefilter: Prefilter | None = None,
+    ipasn: IpAsnDb | None = None,
+) -> MirrorStats:
+    """Copy the CSV ``src`` to ``dst`` with one enrichment column per provider appended.
+
+    ``column`` is a header name or 1-based index (detected when None);
+    ``has_header`` is sniffed when None. Empty IOC cells get blank provider
+    columns and invalid ones ``INVALID``.
+    """
+    f = open(src, encoding="utf-8-sig", newline="") if isinstance(src, str) else src
+    try:
+        return await _mirror(
+            f,
+            dst,
+            providers,
+            cache,
+            ttls,
+            use_cache,
+            refresh,
+            timeout,
+            concurrency,
+            column,
+            has_header,
+            max(1, max_buffer),
+            max(1, result_lru),
+            negatives,
+            prefilter,
+            ipasn,
+        )
+    finally:
+        if isinstance(src, str):
+            f.close()
+
+
+async def _mirror(
+    f: TextIO,
+    dst: TextIO,
+    providers: list[BaseProvider],
+    cache: Cache,
+    ttls: dict[str, int],
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    concurrency: int,
+    column: str | int | None,
+    has_header: bool | None,
+    max_buffer: int,
+    result_lru: int,
+    negatives: NegativeFilter | None,
+    prefilter: Prefilter | None,
+    ipasn: IpAsnDb | None,
+) -> MirrorStats:
+    sample_lines = await asyncio.to_thread(_read_sample, f)
+    sample = "".join(sample_lines)
+    if not sample.strip():
+        raise MirrorError("input CSV is empty")
+    try:
+        dialect: type[csv.Dialect] | csv.Dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    reader: Iterator[list[str]] = csv.reader(chain(sample_lines, f), dialect)
+    head = await asyncio.to_thread(lambda: list(islice(reader, SNIFF_ROWS + 1)))
+    named = column is not None and not isinstance(column, int) and not column.isdigit()
+    if has_header is None:
+        try:
+            has_header = named or csv.Sniffer().has_header(sample)
+        except csv.Error:
+            has_header = False
+        if not has_header and len(head) > 1:
+            # Sniffer misses all-text headers: call row 0 a header when its IOC cell
+            # is not an IOC but the cells below it are
+            guess = (
+                _resolve_column(column, head[0])
+                if column is not None
+                else detect_ioc_column(head[0], head[1:])
+            )
+            first = head[0][guess] if guess < len(head[0]) else ""
+            has_header = ioc_key(first) is None and any(
+                guess < len(r) and ioc_key(r[guess]) for r in head[1:]
+            )
+    header = head.pop(0) if has_header and head else None
+    col = _resolve_column(column, header) if column is not None else detect_ioc_column(header, head)
+    rows = chain(head, reader)
+
+    names = [p.name for p in providers]
+    width = len(names)
+    writer = csv.writer(dst, dialect)
+    if header is not None:
+        writer.writerow(list(header) + names)
+    else:
+        cols = max((len(r) for r in head), default=0)
+        writer.writerow([f"Column {i + 1}" for i in range(cols)] + names)
+
+    stats = MirrorStats(column=col)
+    buf = _Reorder(writer.writerow)
+    done: OrderedDict[str, list[str]] = OrderedDict()
+    room = asyncio.Event()
+    room.set()
+
+    async def keys() -> AsyncIterator[str]:
+        """Register rows in the reorder buffer; yield each IOC that needs a lookup."""
+        idx = 0
+        while True:
+            batch = await asyncio.to_thread(lambda: list(islice(rows, _READ_BATCH)))
+            if not batch:
+                return
+            for row in batch:
+                while len(buf.rows) >= max_buffer and not buf.flush():
+                    room.clear()
+                    await room.wait()  # the head row waits on a lookup; the loop below sets room
+                cell = row[col] if col < len(row) else ""
+                key = ioc_key(cell) if cell.strip() else None
+                if not cell.strip():
+                    buf.add(idx, row, [""] * width)
+                elif key is None:
+                    stats.invalid += 1
+                    buf.add(idx, row, [INVALID_CELL] * width)
+                elif key in done:
+                    done.move_to_end(key)
+                    buf.add(idx, row, done[key])
+                elif key in buf.waiting:
+                    buf.add(idx, row, None)
+                    buf.waiting[key].append(idx)
+                else:
+                    buf.add(idx, row, None)
+                    buf.waiting[key] = [idx]
+                    stats.lookups += 1
+                    yield key
+                idx += 1
+            stats.rows = idx
+            buf.flush()
+
+    async for ar in enrich_stream(
+        keys(),
+        providers,
+        cache,
+        ttls,
+        use_cache,
+        refresh,
+        timeout,
+        concurrency,
+        negatives=negatives,
+        prefilter=prefilter,
+        ipasn=ipasn,
+    ):
+        cells = mirrored_cells(ar, names)
+        done[ar.ioc] = cells
+        if len(done) > result_lru:
+            done.popitem(last=False)
+        buf.resolve(ar.ioc, cells)
+        buf.flush()
+        if len(buf.rows) < max_buffer:
+            room.set()
+    buf.flush()
+    if buf.rows:
+        raise MirrorError(f"{len(buf.rows)} row(s) never received a result")  # engine/key mismatch
+    return stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.mirror",
+        description="Enrich the IOC column of a CSV, streaming rows to a mirrored CSV.",
+    )
+    ap.add_argument("input", help="CSV file to read ('-' for stdin)")
+    ap.add_argument(
+        "-o", "--output", default="-", help="CSV file to write ('-' for stdout, the default)"
+    )
+    ap.add_argument(
+        "--column", help="IOC column: header name or 1-based number (default: detected)"
+    )
+    header = ap.add_mutually_exclusive_group()
+    header.add_argument(
+        "--header",
+        dest="has_header",
+        action="store_const",
+        const=True,
+        help="first row is a header",
+    )
+    header.add_argument(
+        "--no-header",
+        dest="has_header",
+        action="store_const",
+        const=False,
+        help="first row is data",
+    )
+    ap.add_argument(
+        "--providers",
+        default=",".join(config.DEFAULT_PROVIDERS),
+        help="comma-separated provider names",
+    )
+    ap.add_argument("--mode", choices=sorted(config.DEFAULT_TIMEOUTS), default="normal")
+    ap.add_argument("--concurrency", type=int, default=config.DEFAULT_CONCURRENCY)
+    ap.add_argument("--cache", default=config.CACHE_PATH, help="local SQLite cache path")
+    ap.add_argument(
+        "--max-buffer", type=int, default=DEFAULT_MAX_BUFFER, help="rows held to keep input order"
+    )
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ)
+    try:
+        providers = build_providers(
+            [n.strip() for n in args.providers.split(",") if n.strip()], env
+        )
+        prefilter = build_prefilter(
+            config.allowlist_file(env), config.prefilter_cidrs(env), config.public_suffix_file(env)
+        )
+        ipasn_path = config.ipasn_db_path(env)
+        ipasn = IpAsnDb(ipasn_path) if ipasn_path else None
+        compiled_path = config.compiled_cache_path(env)
+        compiled = CompiledCache(compiled_path) if compiled_path else None
+    except (OSError, ValueError) as e:  # IpAsnError and CompiledCacheError are ValueErrors
+        print(str(e), file=sys.stderr)
+        return 2
+    trust_hours = config.negative_trust_hours(env)
+    negatives = NegativeFilter(config.NEGATIVE_FILTER_DIR, trust_hours) if trust_hours > 0 else None
+    use_cache, refresh, timeout = config.resolve_mode(args.mode)
+    cache = Cache(args.cache)
+    cache.attach_compiled(compiled)
+    src: str | TextIO = sys.stdin if args.input == "-" else args.input
+    try:
+        out = (
+            sys.stdout
+            if args.output == "-"
+            else open(args.output, "w", encoding="utf-8", newline="")
+        )
+        try:
+            stats = asyncio.run(
+                mirror_csv(
+                    src,
+                    out,
+                    providers,
+                    cache,
+                    dict(config.DEFAULT_TTLS),
+                    use_cache,
+                    refresh,
+                    timeout,
+                    max(1, args.concurrency),
+                    column=args.column,
+                    has_header=args.has_header,
+                    max_buffer=args.max_buffer,
+                    negatives=negatives,
+                    prefilter=prefilter,
+                    ipasn=ipasn,
+                )
+            )
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    except KeyboardInterrupt:
+        return 130
+    except (MirrorError, OSError, UnicodeDecodeError, csv.Error) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        if ipasn is not None:
+            ipasn.close()
+        if compiled is not None:
+            compiled.close()
+        cache.conn.close()
+    print(
+        f"mirrored {stats.rows} row(s) using column {stats.column + 1}: {stats.lookups} lookup(s), "
+        f"{stats.invalid} invalid",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,22 +3,115 @@ from __future__ import annotations
 import base64
 import datetime as dt
 import re
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import string
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from typing import Any, overload
+from urllib.parse import urlsplit, urlunsplit
 
+# Structured evidence each provider reports in ProviderResult.fields (every field
+# is optional). ``evidence`` keeps the legacy "key=value" strings for display.
+FIELD_SCHEMAS: dict[str, dict[str, type]] = {
+    "virustotal": {
+        "malicious": int,
+        "suspicious": int,
+        "harmless": int,
+        "undetected": int,
+        "reputation": int,
+        "categories": list,
+        "last_analysis": str,
+        "votes_malicious": int,
+        "votes_harmless": int,
+        "sha256": str,
+        "md5": str,
+        "sha1": str,
+    },
+    "abuseipdb": {
+        "confidence": int,
+        "total_reports": int,
+        "is_public": bool,
+        "country": str,
+        "usage_type": str,
+        "isp": str,
+        "domain": str,
+        "last_seen": str,
+        "network": str,
+    },
+    "otx": {"pulses": int, "pulse_names": list, "reputation": int, "country": str, "asn": str},
+    "threatfox": {
+        "family": str,
+        "tags": list,
+        "first_seen": str,
+        "last_seen": str,
+        "threat_type": str,
+        "sha256": str,
+        "md5": str,
+    },
+}
+# Legacy evidence keys whose field has a different name
+_LEGACY_FIELD_NAMES = {
+    "country_code": "country",
+    "last_reported_at": "last_seen",
+    "type": "threat_type",
+    "pulse": "pulse_names",
+}
 
-@dataclass
+
+def fields_from_evidence(provider: str, evidence: Iterable[str]) -> dict[str, Any]:
+    """Recover ProviderResult.fields from legacy "key=value" evidence (e.g. old cache rows).
+
+    Keys outside the provider's schema are dropped; providers without a schema
+    keep every key as a string.
+    """
+    schema = FIELD_SCHEMAS.get(provider)
+    out: dict[str, Any] = {}
+    for item in evidence:
+        key, sep, value = item.partition("=")
+        if not sep:
+            continue
+        if key == "votes" and schema is not None:
+            # "mal:3/har:5"
+            for part in value.split("/"):
+                name, _, n = part.partition(":")
+                if name in ("mal", "har") and n.isdigit():
+                    out["votes_malicious" if name == "mal" else "votes_harmless"] = int(n)
+            continue
+        name = _LEGACY_FIELD_NAMES.get(key, key)
+        kind = str if schema is None else schema.get(name)
+        if kind is None:
+            continue
+        if kind is int:
+            try:
+                out[name] = int(value)
+            except ValueError:
+                continue
+        elif kind is bool:
+            out[name] = value == "True"
+        elif kind is list:
+            if name == "pulse_names":
+                out.setdefault(name, []).append(value)
+            else:
+                out[name] = [v for v in value.split(",") if v]
+        else:
+            out[name] = value
+    return out
+
+
+@dataclass(slots=True)
 class ProviderResult:
     provider: str
     status: str  # MALICIOUS | SUSPICIOUS | CLEAN | INCONCLUSIVE
     score: float
-    evidence: List[str]
-    raw_ref: Optional[str]
-    latency_ms: Optional[int]
+    evidence: list[str]
+    raw_ref: str | None
+    latency_ms: int | None
     cached: bool
+    # Typed evidence per FIELD_SCHEMAS, filled when the response is parsed
+    fields: dict[str, Any] = field(default_factory=dict)
 
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    def to_dict(self) -> dict[str, Any]:
+        d = {
             "provider": self.provider,
             "status": self.status,
             "score": self.score,
@@ -27,35 +120,251 @@ class ProviderResult:
             "latency_ms": self.latency_ms,
             "cached": self.cached,
         }
+        if self.fields:
+            d["fields"] = self.fields
+        return d
 
 
-@dataclass
+@dataclass(slots=True)
 class AggregatedResult:
     ioc: str
     ioc_type: str
     status: str
     score: float
-    providers: List[ProviderResult]
+    providers: list[ProviderResult]
+    # Local context (e.g. asn/country/as_name from the offline IP-ASN table)
+    info: dict[str, str] = field(default_factory=dict)
 
-    def to_row(self) -> Dict[str, Any]:
-        d = {"ioc": self.ioc, "type": self.ioc_type, "status": self.status, "score": round(self.score, 2)}
+    def to_row(self) -> dict[str, Any]:
+        d = {
+            "ioc": self.ioc,
+            "type": self.ioc_type,
+            "status": self.status,
+            "score": round(self.score, 2),
+        }
         for pr in self.providers:
             d[f"{pr.provider}_status"] = pr.status
             d[f"{pr.provider}_score"] = pr.score
             d[f"{pr.provider}_cached"] = pr.cached
         return d
 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self) -> dict[str, Any]:
         return {
             "ioc": self.ioc,
             "type": self.ioc_type,
             "status": self.status,
             "score": round(self.score, 2),
             "providers": [p.to_dict() for p in self.providers],
+            **({"info": dict(self.info)} if self.info else {}),
         }
 
 
-def classify_ioc(raw: str) -> tuple[bool, str, str, Optional[str]]:
+class ResultStore(Sequence[AggregatedResult]):
+    """Append-only, column-oriented storage for a run's results.
+
+    A list of AggregatedResult holds several objects per IOC and repeats the same
+    provider names, statuses and evidence strings millions of times. Here each
+    field is an ``array`` column (one entry per result, or per provider result),
+    and types, statuses, provider names, evidence and info values are interned
+    once and stored as integer codes. Structured ``fields`` share the same
+    interned strings.
+
+    Indexing and iteration build AggregatedResult views on demand, so existing
+    callers work unchanged; the views are copies, and changing one does not
+    change the store. ``ioc_at``, ``status_at``, ``count_status`` and ``by_ioc``
+    answer common questions without building views for every row.
+    """
+
+    __slots__ = (
+        "_strings",
+        "_codes",
+        "_ioc",
+        "_type",
+        "_status",
+        "_score",
+        "_prov_end",
+        "_info",
+        "_p_name",
+        "_p_status",
+        "_p_score",
+        "_p_latency",
+        "_p_cached",
+        "_p_raw_ref",
+        "_p_ev_end",
+        "_evidence",
+        "_p_fields",
+    )
+
+    def __init__(self, results: Iterable[AggregatedResult] = ()):
+        self._strings: list[str] = []
+        self._codes: dict[str, int] = {}
+        # One entry per result
+        self._ioc: list[str] = []
+        self._type = array("I")
+        self._status = array("I")
+        self._score = array("d")
+        self._prov_end = array("I")  # end offset into the provider columns
+        self._info: dict[int, tuple[int, ...]] = {}  # sparse: flattened (key, value) codes
+        # One entry per provider result
+        self._p_name = array("I")
+        self._p_status = array("I")
+        self._p_score = array("d")
+        self._p_latency = array("i")  # -1 for None
+        self._p_cached = bytearray()
+        self._p_raw_ref: list[str | None] = []
+        self._p_ev_end = array("I")  # end offset into _evidence
+        self._evidence = array("I")
+        self._p_fields: dict[int, tuple[Any, ...]] = {}  # sparse: flattened (key code, value)
+        self.extend(results)
+
+    def _intern(self, s: str) -> int:
+        code = self._codes.get(s)
+        if code is None:
+            code = self._codes[s] = len(self._strings)
+            self._strings.append(s)
+        return code
+
+    def _shared(self, value: Any) -> Any:
+        """``value`` with its strings replaced by the interned copies; lists become tuples."""
+        if isinstance(value, str):
+            return self._strings[self._intern(value)]
+        if isinstance(value, list):
+            return tuple(self._shared(v) for v in value)
+        return value
+
+    def append(self, ar: AggregatedResult) -> None:
+        intern = self._intern
+        i = len(self._ioc)
+        self._ioc.append(ar.ioc)
+        self._type.append(intern(ar.ioc_type))
+        self._status.append(intern(ar.status))
+        self._score.append(ar.score)
+        if ar.info:
+            self._info[i] = tuple(intern(x) for kv in ar.info.items() for x in kv)
+        for pr in ar.providers:
+            self._p_name.append(intern(pr.provider))
+            self._p_status.append(intern(pr.status))
+            self._p_score.append(pr.score)
+            self._p_latency.append(-1 if pr.latency_ms is None else pr.latency_ms)
+            self._p_cached.append(1 if pr.cached else 0)
+            self._p_raw_ref.append(pr.raw_ref)
+            self._evidence.extend(intern(e) for e in pr.evidence)
+            if pr.fields:
+                self._p_fields[len(self._p_raw_ref) - 1] = tuple(
+                    x for k, v in pr.fields.items() for x in (intern(k), self._shared(v))
+                )
+            self._p_ev_end.append(len(self._evidence))
+        self._prov_end.append(len(self._p_name))
+
+    def extend(self, results: Iterable[AggregatedResult]) -> None:
+        for ar in results:
+            self.append(ar)
+
+    def __len__(self) -> int:
+        return len(self._ioc)
+
+    def __bool__(self) -> bool:
+        return bool(self._ioc)
+
+    @overload
+    def __getitem__(self, index: int) -> AggregatedResult: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[AggregatedResult]: ...
+
+    def __getitem__(self, index: int | slice) -> AggregatedResult | list[AggregatedResult]:
+        if isinstance(index, slice):
+            return [self._view(i) for i in range(*index.indices(len(self._ioc)))]
+        n = len(self._ioc)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("ResultStore index out of range")
+        return self._view(index)
+
+    def __iter__(self) -> Iterator[AggregatedResult]:
+        for i in range(len(self._ioc)):
+            yield self._view(i)
+
+    def _view(self, i: int) -> AggregatedResult:
+        strings = self._strings
+        start = self._prov_end[i - 1] if i else 0
+        providers: list[ProviderResult] = []
+        for j in range(start, self._prov_end[i]):
+            ev_start = self._p_ev_end[j - 1] if j else 0
+            latency = self._p_latency[j]
+            providers.append(
+                ProviderResult(
+                    strings[self._p_name[j]],
+                    strings[self._p_status[j]],
+                    self._p_score[j],
+                    [strings[c] for c in self._evidence[ev_start:self._p_ev_end[j]]],
+                    self._p_raw_ref[j],
+                    None if latency < 0 else latency,
+                    bool(self._p_cached[j]),
+                    self._fields(j),
+                )
+            )
+        codes = self._info.get(i, ())
+        info = {strings[codes[k]]: strings[codes[k + 1]] for k in range(0, len(codes), 2)}
+        return AggregatedResult(
+            self._ioc[i],
+            strings[self._type[i]],
+            strings[self._status[i]],
+            self._score[i],
+            providers,
+            info,
+        )
+
+    def _fields(self, j: int) -> dict[str, Any]:
+        flat = self._p_fields.get(j, ())
+        return {
+            self._strings[flat[k]]: list(flat[k + 1])
+            if isinstance(flat[k + 1], tuple)
+            else flat[k + 1]
+            for k in range(0, len(flat), 2)
+        }
+
+    def ioc_at(self, index: int) -> str:
+        return self._ioc[index]
+
+    def status_at(self, index: int) -> str:
+        return self._strings[self._status[index]]
+
+    def count_status(self, *statuses: str) -> int:
+        """Number of results whose aggregate status is one of ``statuses``."""
+        wanted = {self._codes[s] for s in statuses if s in self._codes}
+        return sum(1 for c in self._status if c in wanted)
+
+    def by_ioc(self, ioc: str) -> list[AggregatedResult]:
+        """Views of the results for ``ioc``, in insertion order."""
+        return [self._view(i) for i, v in enumerate(self._ioc) if v == ioc]
+
+
+def ipv4_to_int(ip: str) -> int | None:
+    """Integer value of a strict dotted-quad IPv4 address, or None.
+
+    Each octet is 1-3 decimal digits without a leading zero, so ``012.0.0.1``
+    is rejected rather than read as octal (as ``inet_aton`` would) and shorthand
+    like ``10.1`` is not an address.
+    """
+    parts = ip.split(".")
+    if len(parts) != 4:
+        return None
+    n = 0
+    for part in parts:
+        if not (part.isascii() and part.isdigit()) or len(part) > 3:
+            return None
+        if len(part) > 1 and part[0] == "0":
+            return None
+        octet = int(part)
+        if octet > 255:
+            return None
+        n = n << 8 | octet
+    return n
+
+
+def classify_ioc(raw: str) -> tuple[bool, str, str, str | None]:
     s = (raw or "").strip()
     if not s:
         return False, "invalid", s, "Empty line"
@@ -66,13 +375,161 @@ def classify_ioc(raw: str) -> tuple[bool, str, str, Optional[str]]:
         if all(0 <= o <= 255 for o in octs):
             return True, "ip", s, None
         return False, "invalid", s, "Invalid IPv4 octet range"
-    if re.fullmatch(r"[A-Fa-f0-9]{32}", s) or re.fullmatch(r"[A-Fa-f0-9]{40}", s) or re.fullmatch(r"[A-Fa-f0-9]{64}", s):
+    if (
+        re.fullmatch(r"[A-Fa-f0-9]{32}", s)
+        or re.fullmatch(r"[A-Fa-f0-9]{40}", s)
+        or re.fullmatch(r"[A-Fa-f0-9]{64}", s)
+    ):
         return True, "hash", s.lower(), None
     if re.fullmatch(r"(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,63}", s):
         return True, "domain", s.lower(), None
     return False, "invalid", s, "Unrecognized IOC format"
 
 
+# Compact type codes returned by classify_many; IOC_TYPE_NAMES[code] is the classify_ioc type
+IOC_INVALID, IOC_IP, IOC_DOMAIN, IOC_HASH, IOC_URL = range(5)
+IOC_TYPE_NAMES = ("invalid", "ip", "domain", "hash", "url")
+
+_DOMAIN_RE = r"(?P<domain>(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,63})"
+_HASH_RE = r"(?P<hash>[A-Fa-f0-9]{32}|[A-Fa-f0-9]{40}|[A-Fa-f0-9]{64})"
+# One alternation per possible first character, tried in classify_ioc's order
+_DIGIT_FIRST = re.compile(
+    r"(?P<ip>(?:\d{1,3}\.){3}\d{1,3})|" + _HASH_RE + "|" + _DOMAIN_RE, re.ASCII
+)
+_HEX_FIRST = re.compile(_HASH_RE + "|" + _DOMAIN_RE, re.ASCII)
+_LABEL_FIRST = re.compile(_DOMAIN_RE, re.ASCII)
+_DISPATCH: dict[str, re.Pattern[str]] = {
+    **dict.fromkeys("0123456789", _DIGIT_FIRST),
+    **dict.fromkeys("abcdefABCDEF", _HEX_FIRST),
+    **dict.fromkeys("ghijklmnopqrstuvwxyzGHIJKLMNOPQRSTUVWXYZ-", _LABEL_FIRST),
+}
+
+
+def classify_many(lines: Iterable[str]) -> tuple[bytearray, list[str]]:
+    """Classify a batch in one pass: (type codes, normalized values), same verdicts as classify_ioc.
+
+    The first character picks the only patterns that can match, so most lines
+    cost one compiled ``fullmatch``. Non-ASCII lines go through classify_ioc.
+    Invalid lines keep their stripped text; classify_ioc gives the reason.
+    """
+    codes = bytearray()
+    values: list[str] = []
+    add_code = codes.append
+    add_value = values.append
+    dispatch = _DISPATCH.get
+    for raw in lines:
+        s = (raw or "").strip()
+        if not s:
+            add_code(IOC_INVALID)
+            add_value(s)
+            continue
+        if not s.isascii():
+            _, t, norm, _ = classify_ioc(s)
+            add_code(IOC_TYPE_NAMES.index(t))
+            add_value(norm)
+            continue
+        c = s[0]
+        if (c == "h" or c == "H") and s[:8].lower().startswith(("http://", "https://")):
+            add_code(IOC_URL)
+            add_value(s)
+            continue
+        pat = dispatch(c)
+        m = pat.fullmatch(s) if pat is not None else None
+        if m is None:
+            add_code(IOC_INVALID)
+            add_value(s)
+            continue
+        kind = m.lastgroup
+        if kind == "ip":
+            a, b, c2, d = s.split(".")
+            ok = int(a) <= 255 and int(b) <= 255 and int(c2) <= 255 and int(d) <= 255
+            add_code(IOC_IP if ok else IOC_INVALID)
+            add_value(s)
+        elif kind == "hash":
+            add_code(IOC_HASH)
+            add_value(s.lower())
+        else:
+            add_code(IOC_DOMAIN)
+            add_value(s.lower())
+    return codes, values
+
+
+# Defang tokens seen in reports and feeds; matched case-insensitively
+_DEFANG_TOKENS = {
+    "[.]": ".",
+    "(.)": ".",
+    "{.}": ".",
+    "[dot]": ".",
+    "(dot)": ".",
+    "{dot}": ".",
+    "[:]": ":",
+    "[://]": "://",
+    "[/]": "/",
+}
+_DEFANG_RE = re.compile("|".join(re.escape(k) for k in _DEFANG_TOKENS), re.IGNORECASE)
+_FANGED_SCHEME_RE = re.compile(r"h(?:xx|\*\*)p(s?):", re.IGNORECASE)
+_PCT_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+_UNRESERVED = frozenset(string.ascii_letters + string.digits + "-._~")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# Already canonical: lower-case host without port/userinfo/trailing dot, no escapes or fragment
+_CANONICAL_URL_RE = re.compile(r"https?://[a-z0-9-]+(?:\.[a-z0-9-]+)*(?:[/?][^#%]*)?")
+
+
+def _pct_normalize(m: re.Match[str]) -> str:
+    ch = chr(int(m.group(1), 16))
+    return ch if ch in _UNRESERVED else "%" + m.group(1).upper()
+
+
+def canonical_url(url: str) -> str:
+    """RFC 3986 normalization: lower-case scheme/host; drop default port, host dot and fragment.
+
+    Percent-escapes of unreserved characters are decoded and the rest upper-cased.
+    Unparseable URLs are returned unchanged.
+    """
+    if _CANONICAL_URL_RE.fullmatch(url):
+        return url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    host = (parts.hostname or "").rstrip(".")
+    if not host:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = f"[{host}]" if ":" in host else host
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if "@" in parts.netloc:
+        netloc = parts.netloc.rpartition("@")[0] + "@" + netloc
+    path = _PCT_RE.sub(_pct_normalize, parts.path)
+    query = _PCT_RE.sub(_pct_normalize, parts.query)
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def normalize_ioc(raw: str) -> str:
+    """Refang and canonicalize one IOC string before classification, dedup and cache keys.
+
+    ``hxxp://Evil[.]com/a``, ``HTTP://EVIL.COM:80/a#x`` -> ``http://evil.com/a``;
+    ``Evil.com.`` -> ``evil.com``. Anything that is not a URL is lower-cased, which
+    classify_ioc already does for domains and hashes.
+    """
+    s = (raw or "").strip()
+    if not s:
+        return s
+    if "[" in s or "(" in s or "{" in s:
+        s = _DEFANG_RE.sub(lambda m: _DEFANG_TOKENS[m.group().lower()], s)
+    if s[0] in "hH":
+        m = _FANGED_SCHEME_RE.match(s)
+        if m is not None:
+            s = f"http{m.group(1)}:" + s[m.end() :]
+        if s[:8].lower().startswith(("http://", "https://")):
+            return canonical_url(s)
+    if s.endswith(".") and "/" not in s:
+        s = s.rstrip(".")
+    return s.lower()
+
+
 def vt_url_id(u: str) -> str:
     b = base64.urlsafe_b64encode(u.encode("utf-8")).decode("ascii")
     return b.strip("=")
@@ -82,7 +539,7 @@ def now_utc() -> int:
     return int(dt.datetime.utcnow().timestamp())
 
 
-def aggregate(ioc: str, ioc_type: str, provider_results: List[ProviderResult]) -> AggregatedResult:
+def aggregate(ioc: str, ioc_type: str, provider_results: list[ProviderResult]) -> AggregatedResult:
     statuses = [pr.status for pr in provider_results]
     total = sum(pr.score for pr in provider_results) if provider_results else 0.0
     if any(s == "MALICIOUS" for s in statuses):
@@ -93,4 +550,109 @@ def aggregate(ioc: str, ioc_type: str, provider_results: List[ProviderResult]) -
         status = "CLEAN"
     else:
         status = "INCONCLUSIVE"
-    return AggregatedResult(ioc, ioc_type, status, float(total), provider_results) 
\ No newline at end of file
+    return AggregatedResult(ioc, ioc_type, status, float(total), provider_results)
+
+
+# Built-in public-suffix rules: the common multi-label ICANN suffixes plus popular
+# shared-hosting (PSL "private" section) suffixes. Load the full list from
+# https://publicsuffix.org/list/public_suffix_list.dat with PublicSuffixTrie.from_file().
+_DEFAULT_SUFFIX_RULES = """
+ac.uk co.uk gov.uk ltd.uk me.uk net.uk nhs.uk org.uk plc.uk police.uk sch.uk
+com.au net.au org.au edu.au gov.au asn.au id.au
+co.nz net.nz org.nz govt.nz ac.nz
+co.jp ne.jp or.jp ac.jp go.jp gr.jp
+com.br net.br org.br gov.br
+com.cn net.cn org.cn gov.cn edu.cn
+com.mx org.mx gob.mx com.ar com.co com.pe com.ve com.tr com.tw com.hk com.sg com.my
+co.in net.in org.in gov.in ac.in firm.in gen.in ind.in
+co.za org.za gov.za ac.za co.kr or.kr ne.kr go.kr co.il org.il ac.il co.id or.id
+com.ua kiev.ua com.pl net.pl org.pl com.ru msk.ru spb.ru com.es nom.es org.es
+com.vn com.ph com.pk com.ng com.eg com.sa com.bd
+*.ck !www.ck *.bd *.np
+blogspot.com github.io gitlab.io herokuapp.com appspot.com azurewebsites.net
+cloudfront.net netlify.app pages.dev workers.dev web.app firebaseapp.com
+vercel.app onrender.com fly.dev glitch.me repl.co ngrok.io ngrok-free.app
+s3.amazonaws.com elasticbeanstalk.com azureedge.net trafficmanager.net
+duckdns.org no-ip.org ddns.net dyndns.org hopto.org zapto.org
+000webhostapp.com weebly.com wixsite.com blogspot.co.uk myshopify.com
+"""
+
+
+class PublicSuffixTrie:
+    """Public Suffix List rules in a label trie, walked right to left.
+
+    Supports normal, wildcard (``*.ck``) and exception (``!www.ck``) rules; an
+    unlisted TLD is its own public suffix (the PSL ``*`` default rule).
+    """
+
+    _END = ""  # child key marking "a rule ends here"; labels are never empty
+
+    def __init__(self, rules: Iterable[str] = ()):
+        self.root: dict[str, Any] = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: str) -> None:
+        r = rule.strip().lower()
+        if not r or r.startswith("//"):
+            return
+        r = r.split()[0]
+        exception = r.startswith("!")
+        node = self.root
+        for label in reversed(r.lstrip("!").split(".")):
+            node = node.setdefault(label, {})
+        node[self._END] = "!" if exception else "+"
+
+    @classmethod
+    def from_text(cls, text: str) -> PublicSuffixTrie:
+        return cls(text.split())
+
+    @classmethod
+    def from_file(cls, path: str) -> PublicSuffixTrie:
+        """Load a public_suffix_list.dat (comments and blank lines are ignored)."""
+        with open(path, encoding="utf-8") as f:
+            return cls(line for line in f if line.strip() and not line.startswith("//"))
+
+    def public_suffix_len(self, labels: list[str]) -> int:
+        """Number of trailing labels forming the public suffix of ``labels``."""
+        node = self.root
+        best = 1
+        n = len(labels)
+        for depth in range(1, n + 1):
+            label = labels[n - depth]
+            wild = node.get("*")
+            if wild is not None and wild.get(self._END) == "+":
+                best = max(best, depth)
+            child = node.get(label)
+            if child is None:
+                break
+            node = child
+            mark = node.get(self._END)
+            if mark == "!":
+                return depth - 1
+            if mark == "+":
+                best = depth
+        return best
+
+    def registrable_domain(self, domain: str) -> str | None:
+        """eTLD+1 of ``domain`` (``a.b.example.co.uk`` -> ``example.co.uk``); None for a suffix."""
+        labels = domain.strip(".").lower().split(".")
+        k = self.public_suffix_len(labels)
+        if len(labels) <= k:
+            return None
+        return ".".join(labels[-(k + 1) :])
+
+
+_default_suffixes: PublicSuffixTrie | None = None
+
+
+def default_public_suffixes() -> PublicSuffixTrie:
+    """Trie of the built-in rules (built once)."""
+    global _default_suffixes
+    if _default_suffixes is None:
+        _default_suffixes = PublicSuffixTrie.from_text(_DEFAULT_SUFFIX_RULES)
+    return _default_suffixes
+
+
+def registrable_domain(domain: str, suffixes: PublicSuffixTrie | None = None) -> str | None:
+    return (suffixes or default_public_suffixes()).registrable_domain(domain)
@@ -0,0 +1,182 @@
+"""Persisted Bloom filters of recent "not found" answers, per provider.
+
+Feeds repeat the same unknown hashes/domains; when a provider already said
+"not found" within the trust window we can skip the network call. Each provider
+gets a ring of time windows (``trust_hours / windows`` long); answers go into the
+current window and whole windows are dropped once they fall out of the trust
+period, so old negatives age out without per-entry bookkeeping.
+
+A full window grows another Bloom slice instead of overfilling, so the false
+positive rate stays near ``fp_rate`` per slice. A false positive means one IOC is
+reported "not found" without asking the provider; keep ``fp_rate`` small.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import struct
+import time
+
+from .models import ProviderResult
+
+_MAGIC = b"IOCBLM01"
+_HEADER = struct.Struct("<8sQIIQ")  # magic, bits, hashes, capacity, count
+
+TRUSTED_NEGATIVE_EVIDENCE = "not found (trusted negative)"
+
+
+def is_negative(pr: ProviderResult) -> bool:
+    """True for the providers' explicit "not found" answers (404 / empty ThreatFox data)."""
+    return pr.status == "CLEAN" and pr.evidence == ["not found"]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a blake2b digest."""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, int(capacity))
+        fp_rate = min(0.5, max(1e-9, float(fp_rate)))
+        self.capacity = capacity
+        self.nbits = max(64, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.nhashes = max(1, int(round(self.nbits / capacity * math.log(2))))
+        self.count = 0
+        self.bits = bytearray((self.nbits + 7) // 8)
+
+    def _positions(self, key: str) -> list[int]:
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        m = self.nbits
+        return [(h1 + i * h2) % m for i in range(self.nhashes)]
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_MAGIC, self.nbits, self.nhashes, self.capacity, self.count) + bytes(
+            self.bits
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> BloomFilter:
+        if len(data) < _HEADER.size:
+            raise ValueError("truncated bloom filter")
+        magic, nbits, nhashes, capacity, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or len(data) - _HEADER.size != (nbits + 7) // 8:
+            raise ValueError("not a bloom filter file")
+        bf = cls.__new__(cls)
+        bf.capacity, bf.nbits, bf.nhashes, bf.count = capacity, nbits, nhashes, count
+        bf.bits = bytearray(data[_HEADER.size :])
+        return bf
+
+
+class NegativeFilter:
+    """Per-provider, time-partitioned negative-answer filters persisted in ``directory``.
+
+    Files are named ``<provider>.<window>.<slice>.bloom``. Call :meth:`save` to
+    persist (check_iocs does this at the end of a run).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        trust_hours: float,
+        windows: int = 4,
+        capacity: int = 200_000,
+        fp_rate: float = 0.001,
+    ):
+        self.directory = directory
+        self.trust_seconds = max(1, int(trust_hours * 3600))
+        self.windows = max(1, int(windows))
+        self.window_seconds = max(1, self.trust_seconds // self.windows)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        # provider -> window id -> slices
+        self._filters: dict[str, dict[int, list[BloomFilter]]] = {}
+        self._dirty: set[tuple[str, int]] = set()
+        self._load()
+
+    def _window(self, now: float | None = None) -> int:
+        return int((time.time() if now is None else now) // self.window_seconds)
+
+    def _live_windows(self, now: float | None = None) -> range:
+        cur = self._window(now)
+        return range(cur - self.windows + 1, cur + 1)
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        live = self._live_windows()
+        for fn in sorted(os.listdir(self.directory)):
+            parts = fn.split(".")
+            if len(parts) != 4 or parts[-1] != "bloom":
+                continue
+            provider, window_s, _slice = parts[0], parts[1], parts[2]
+            path = os.path.join(self.directory, fn)
+            try:
+                window = int(window_s)
+                if window not in live:
+                    os.remove(path)
+                    continue
+                with open(path, "rb") as f:
+                    bf = BloomFilter.from_bytes(f.read())
+            except (OSError, ValueError):
+                continue
+            self._filters.setdefault(provider, {}).setdefault(window, []).append(bf)
+
+    def _rotate(self, provider: str) -> dict[int, list[BloomFilter]]:
+        wins = self._filters.setdefault(provider, {})
+        live = self._live_windows()
+        for w in [w for w in wins if w not in live]:
+            del wins[w]
+        return wins
+
+    def contains(self, provider: str, ioc: str) -> bool:
+        wins = self._rotate(provider)
+        return any(ioc in bf for slices in wins.values() for bf in slices)
+
+    def add(self, provider: str, ioc: str) -> None:
+        wins = self._rotate(provider)
+        cur = self._window()
+        slices = wins.setdefault(cur, [])
+        if not slices or slices[-1].full:
+            slices.append(BloomFilter(self.capacity, self.fp_rate))
+        slices[-1].add(ioc)
+        self._dirty.add((provider, cur))
+
+    def save(self) -> None:
+        """Write changed windows and delete files for windows that aged out."""
+        os.makedirs(self.directory, exist_ok=True)
+        for provider, window in sorted(self._dirty):
+            for i, bf in enumerate(self._filters.get(provider, {}).get(window, [])):
+                path = os.path.join(self.directory, f"{provider}.{window}.{i}.bloom")
+                tmp = path + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(bf.to_bytes())
+                os.replace(tmp, path)
+        self._dirty.clear()
+        live = self._live_windows()
+        for fn in os.listdir(self.directory):
+            parts = fn.split(".")
+            if (
+                len(parts) == 4
+                and parts[-1] == "bloom"
+                and parts[1].lstrip("-").isdigit()
+                and int(parts[1]) not in live
+            ):
+                try:
+                    os.remove(os.path.join(self.directory, fn))
+                except OSError:
+                    pass
@@ -0,0 +1,195 @@
+"""Process-pool offload for CPU-bound batch stages.
+
+Networking stays on the event loop; pure, batchable work can run in worker
+processes. The stages here take raw bytes and short strings, which are cheap to
+send to a worker compared with the work done on them:
+
+- ``scan_blocks``: find and classify the IOCs in blocks of log text. Used by
+  ``extract_iocs(..., offload=)``, i.e. ``extract``/``check --extract``
+  ``--workers N`` and ``@file`` input in the GUI.
+- ``classify_lines``: normalize and classify input lines; the pre-pass of
+  ``check_iocs(..., offload=)`` (prefetch planning and registrable grouping).
+- ``parse_responses``: decode and parse recorded provider responses
+  (``(provider, ioc, ioc_type, url, latency_ms, body)`` tuples).
+
+``Offloader`` splits a batch into chunks and maps a stage over them on a
+``spawn`` process pool. It is off unless asked for (``IOC_OFFLOAD_WORKERS`` or
+``--workers``). Batches smaller than ``min_batch`` (and every batch with
+``workers=0``, or once the pool has failed to start) run inline, since a pool
+round trip costs more than it saves there::
+
+    with Offloader(workers=4) as off:
+        for ioc, ioc_type in extract_iocs("proxy.log.gz", offload=off):
+            ...
+
+Live provider responses arrive one at a time and are parsed inline. Finished
+AggregatedResult objects are not sent to workers for export serialization:
+pickling one costs about twice as much as ``json.dumps`` of it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, TypeVar
+
+from .extract import iocs_in_block
+from .logger import get_logger
+from .models import IOC_TYPE_NAMES, ProviderResult, classify_many, normalize_ioc
+
+DEFAULT_MIN_BATCH = 256
+DEFAULT_CHUNK_SIZE = 512
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# provider, ioc, ioc_type, url, latency_ms, raw body
+ResponseItem = tuple[str, str, str, str, int | None, bytes]
+ResponseParser = Callable[[str, str, Any, str, int | None], ProviderResult]
+
+_parsers: dict[str, ResponseParser] = {}
+
+
+def _response_parsers() -> dict[str, ResponseParser]:
+    if not _parsers:
+        # services imports this module for the check_iocs pre-pass
+        from .services import AbuseIPDBProvider, OTXProvider, ThreatFoxProvider, VirusTotalProvider
+
+        for prov in (VirusTotalProvider, AbuseIPDBProvider, OTXProvider, ThreatFoxProvider):
+            _parsers[prov.name] = prov.parse
+    return _parsers
+
+
+def parse_responses(items: Sequence[ResponseItem]) -> list[ProviderResult]:
+    """Parse successful (HTTP 200) response bodies, as the providers do after a live query."""
+    parsers = _response_parsers()
+    out: list[ProviderResult] = []
+    for provider, ioc, ioc_type, url, latency, body in items:
+        parse = parsers.get(provider)
+        try:
+            if parse is None:
+                raise ValueError(f"no response parser for provider: {provider}")
+            out.append(parse(ioc, ioc_type, json.loads(body), url, latency))
+        except Exception as e:
+            out.append(ProviderResult(provider, "INCONCLUSIVE", 0.0, [str(e)], url, latency, False))
+    return out
+
+
+def classify_lines(lines: Sequence[str]) -> list[tuple[str, str]]:
+    """``(type, value)`` per line, the type and value of ``classify_ioc(normalize_ioc(line))``."""
+    codes, values = classify_many([normalize_ioc(line) for line in lines])
+    return [(IOC_TYPE_NAMES[c], v) for c, v in zip(codes, values, strict=True)]
+
+
+def scan_blocks(blocks: Sequence[bytes]) -> list[list[tuple[str, str]]]:
+    """Validated (normalized ioc, type) pairs per block, as ``extract.iocs_in_block`` finds them."""
+    return [list(iocs_in_block(block)) for block in blocks]
+
+
+class Offloader:
+    """Runs batch stages on a process pool, or inline for small batches.
+
+    ``workers`` is the pool size (0: always inline). The pool is started on
+    first use with the ``spawn`` method, so workers never inherit the event
+    loop's threads or open SQLite handles. Stage functions must be module-level
+    and take and return lists. One Offloader may be shared by several threads.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        *,
+        min_batch: int = DEFAULT_MIN_BATCH,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        if workers < 0:
+            raise ValueError("workers must be >= 0")
+        self.workers = workers
+        self.min_batch = max(1, min_batch)
+        self.chunk_size = max(1, chunk_size)
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> Offloader:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def inline(self, n: int, min_batch: int | None = None) -> bool:
+        """True when a batch of ``n`` items would run in this process."""
+        return self.workers == 0 or n < (min_batch or self.min_batch)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _chunks(self, items: Sequence[T], chunk_size: int | None) -> list[Sequence[T]]:
+        # At least one chunk per worker, so a batch just over min_batch still spreads out
+        size = min(chunk_size or self.chunk_size, -(-len(items) // max(1, self.workers)))
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def _disable(self, e: BaseException) -> None:
+        get_logger().warning("offload pool unavailable, running inline: %s", e)
+        self.close()
+        self.workers = 0
+
+    def map(
+        self,
+        fn: Callable[[Sequence[T]], list[R]],
+        items: Sequence[T],
+        *,
+        chunk_size: int | None = None,
+        min_batch: int | None = None,
+    ) -> list[R]:
+        """``fn(items)``, computed chunk by chunk on the pool; order is preserved.
+
+        ``chunk_size`` and ``min_batch`` override the instance defaults for
+        stages whose items are large (e.g. one block of log text each).
+        """
+        if self.inline(len(items), min_batch):
+            return fn(items)
+        try:
+            parts = list(self._executor().map(fn, self._chunks(items, chunk_size)))
+        except (OSError, BrokenProcessPool) as e:
+            self._disable(e)
+            return fn(items)
+        return [r for part in parts for r in part]
+
+    async def amap(
+        self,
+        fn: Callable[[Sequence[T]], list[R]],
+        items: Sequence[T],
+        *,
+        chunk_size: int | None = None,
+        min_batch: int | None = None,
+    ) -> list[R]:
+        """Like ``map`` without blocking the event loop while the pool works."""
+        if self.inline(len(items), min_batch):
+            return fn(items)
+        loop = asyncio.get_running_loop()
+        try:
+            pool = self._executor()
+            chunks = self._chunks(items, chunk_size)
+            parts = await asyncio.gather(
+                *(loop.run_in_executor(pool, fn, chunk) for chunk in chunks)
+            )
+        except (OSError, BrokenProcessPool) as e:
+            self._disable(e)
+            return fn(items)
+        return [r for part in parts for r in part]
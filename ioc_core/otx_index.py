@@ -0,0 +1,312 @@
+"""Local inverted index of indicators from subscribed OTX pulses.
+
+``sync_subscribed`` pages through ``/api/v1/pulses/subscribed`` with
+``modified_since`` set to the newest pulse seen by the previous run, so after the
+first pull only changed pulses are transferred. Each pulse's indicators are stored
+as (ioc, type) -> pulse rows; a modified pulse replaces its old indicator set.
+Values are stored as ``normalize_ioc`` spells them, so they match the keys the
+engine looks up; an index written before that is rewritten once when opened.
+
+``OTXProvider`` answers pulse counts and names from the index and only calls the
+``/indicators/.../general`` endpoint for IOCs the index does not know. Counts
+cover subscribed pulses only, which is what the analyst follows anyway.
+
+Usage::
+
+    python -m ioc_core.otx_index sync            # needs OTX_API_KEY
+    python -m ioc_core.otx_index ingest dump.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+import httpx
+
+from .models import normalize_ioc
+
+SUBSCRIBED_URL = "https://otx.alienvault.com/api/v1/pulses/subscribed"
+
+_TYPE_MAP = {
+    "ipv4": "ip",
+    "domain": "domain",
+    "hostname": "domain",
+    "url": "url",
+    "filehash-md5": "hash",
+    "filehash-sha1": "hash",
+    "filehash-sha256": "hash",
+}
+# meta "schema": 2 once stored values are normalize_ioc spellings
+SCHEMA_VERSION = 2
+
+
+class OTXIndexError(RuntimeError):
+    """Raised when a sync request fails or a pulse dump cannot be read."""
+
+
+def normalize_indicator(ind: dict[str, Any]) -> tuple[str, str] | None:
+    """Map an OTX indicator object to our (ioc, type), or None for unsupported kinds."""
+    t = _TYPE_MAP.get(str(ind.get("type") or "").strip().lower())
+    value = normalize_ioc(str(ind.get("indicator") or ""))
+    if t is None or not value:
+        return None
+    return value, t
+
+
+class OTXIndex:
+    """SQLite inverted index: indicators(ioc, type, pulse_id) -> pulses(id, name, modified).
+
+    meta holds ``modified_since`` (cursor for the next sync) and ``synced_at``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pulses (id TEXT PRIMARY KEY, name TEXT, modified TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS indicators ("
+            "ioc TEXT NOT NULL, type TEXT NOT NULL, pulse_id TEXT NOT NULL, "
+            "PRIMARY KEY(ioc, type, pulse_id)) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_indicators_pulse ON indicators(pulse_id)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        if self._meta("schema") != str(SCHEMA_VERSION):
+            self._normalize_stored()
+
+    def _normalize_stored(self) -> None:
+        """Rewrite indicators stored before values were normalized (schema 1)."""
+        with self.lock:
+            try:
+                rows = self.conn.execute("SELECT ioc, type, pulse_id FROM indicators").fetchall()
+                stale = [
+                    (ioc, t, pid, norm)
+                    for ioc, t, pid in rows
+                    if (norm := normalize_ioc(ioc)) != ioc
+                ]
+                self.conn.executemany(
+                    "DELETE FROM indicators WHERE ioc=? AND type=? AND pulse_id=?",
+                    ((ioc, t, pid) for ioc, t, pid, _ in stale),
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO indicators (ioc, type, pulse_id) VALUES (?, ?, ?)",
+                    ((norm, t, pid) for _, t, pid, norm in stale if norm),
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)",
+                    (str(SCHEMA_VERSION),),
+                )
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return int(self.conn.execute("SELECT COUNT(*) FROM indicators").fetchone()[0])
+
+    def _meta(self, key: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return None if row is None else str(row[0])
+
+    def modified_since(self) -> str | None:
+        return self._meta("modified_since")
+
+    def synced_at(self) -> int | None:
+        v = self._meta("synced_at")
+        return None if v is None else int(v)
+
+    def is_fresh(self, max_age: int) -> bool:
+        ts = self.synced_at()
+        return ts is not None and int(time.time()) - ts <= max_age
+
+    def ingest_pulses(self, pulses: Iterable[dict[str, Any]]) -> int:
+        """Insert or replace pulses and their indicators in one transaction; returns the count."""
+        count = 0
+        with self.lock:
+            try:
+                for p in pulses:
+                    pid = str(p.get("id") or "")
+                    if not pid:
+                        continue
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO pulses (id, name, modified) VALUES (?, ?, ?)",
+                        (pid, str(p.get("name") or ""), str(p.get("modified") or "")),
+                    )
+                    self.conn.execute("DELETE FROM indicators WHERE pulse_id=?", (pid,))
+                    rows = {
+                        (key[0], key[1], pid)
+                        for key in (
+                            normalize_indicator(i)
+                            for i in (p.get("indicators") or [])
+                            if isinstance(i, dict)
+                        )
+                        if key is not None
+                    }
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO indicators (ioc, type, pulse_id) VALUES (?, ?, ?)",
+                        rows,
+                    )
+                    count += 1
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return count
+
+    def mark_synced(self, modified_since: str | None) -> None:
+        """Record a completed sync; ``modified_since`` becomes the next run's cursor."""
+        with self.lock:
+            if modified_since:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('modified_since', ?)",
+                    (modified_since,),
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_at', ?)",
+                (str(int(time.time())),),
+            )
+            self.conn.commit()
+
+    def ingest_dump(self, path: str) -> int:
+        """Load a recorded pulse dump (a JSON list of pulses, or a subscribed-API page)."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise OTXIndexError(f"{path}: {e}") from e
+        pulses = data.get("results") if isinstance(data, dict) else data
+        if not isinstance(pulses, list):
+            raise OTXIndexError(f"{path}: expected a list of pulses")
+        n = self.ingest_pulses(p for p in pulses if isinstance(p, dict))
+        self.mark_synced(
+            max((str(p.get("modified") or "") for p in pulses if isinstance(p, dict)), default="")
+            or None
+        )
+        return n
+
+    def lookup(self, ioc: str, ioc_type: str, limit: int = 5) -> tuple[int, list[str]]:
+        """Return (pulse count, up to ``limit`` most recently modified pulse names)."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT p.name FROM indicators i JOIN pulses p ON p.id = i.pulse_id "
+                "WHERE i.ioc=? AND i.type=? ORDER BY p.modified DESC",
+                (ioc, ioc_type),
+            ).fetchall()
+        return len(rows), [str(r[0]) for r in rows[:limit] if r[0]]
+
+
+async def sync_subscribed(
+    index: OTXIndex,
+    client: httpx.AsyncClient,
+    api_key: str,
+    timeout: float = 30.0,
+    limit: int = 50,
+    max_pages: int | None = None,
+) -> int:
+    """Pull pulses modified since the last completed sync; returns the pulse count.
+
+    The cursor only advances when every page was read, so an interrupted or
+    page-limited run is simply repeated from the same point next time.
+    """
+    since = index.modified_since()
+    first: dict[str, str] = {"limit": str(limit)}
+    if since:
+        first["modified_since"] = since
+    params: dict[str, str] | None = first
+    url: str | None = SUBSCRIBED_URL
+    newest = since or ""
+    total = 0
+    pages = 0
+    while url:
+        r = await client.get(
+            url, headers={"X-OTX-API-KEY": api_key}, params=params, timeout=timeout
+        )
+        if r.status_code != 200:
+            raise OTXIndexError(f"http {r.status_code} from {url}")
+        js = r.json() or {}
+        results = [p for p in (js.get("results") or []) if isinstance(p, dict)]
+        total += index.ingest_pulses(results)
+        newest = max([newest] + [str(p.get("modified") or "") for p in results])
+        url = js.get("next") or None
+        params = None  # "next" already carries the query string
+        pages += 1
+        if max_pages is not None and pages >= max_pages and url:
+            return total
+    index.mark_synced(newest or None)
+    return total
+
+
+def main(argv: list[str] | None = None) -> int:
+    from . import config
+
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.otx_index", description="Maintain the local OTX pulse index."
+    )
+    ap.add_argument(
+        "--db",
+        default=config.otx_index_path(dict(os.environ)) or config.OTX_INDEX_PATH,
+        help="index SQLite path",
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser(
+        "sync", help="pull subscribed pulses modified since the last sync (needs OTX_API_KEY)"
+    )
+    ing = sub.add_parser("ingest", help="load recorded pulse dumps (JSON)")
+    ing.add_argument("files", nargs="+")
+    sub.add_parser("info", help="show indicator count and last sync time")
+    args = ap.parse_args(argv)
+
+    index = OTXIndex(args.db)
+    try:
+        if args.cmd == "sync":
+            key = os.getenv("OTX_API_KEY") or os.getenv("ALIENVAULT_OTX_API_KEY")
+            if not key:
+                print("OTX_API_KEY is not set", file=sys.stderr)
+                return 2
+            import asyncio
+
+            async def _run() -> int:
+                async with httpx.AsyncClient(follow_redirects=True) as client:
+                    return await sync_subscribed(index, client, key)
+
+            try:
+                n = asyncio.run(_run())
+            except (httpx.HTTPError, OTXIndexError) as e:
+                print(f"sync failed: {e}", file=sys.stderr)
+                return 1
+            print(f"synced {n} pulses")
+            return 0
+        if args.cmd == "ingest":
+            for path in args.files:
+                try:
+                    n = index.ingest_dump(path)
+                except OTXIndexError as e:
+                    print(str(e), file=sys.stderr)
+                    return 1
+                print(f"{path}: ingested {n} pulses")
+            return 0
+        ts = index.synced_at()
+        print(f"{len(index)} indicators; last sync: {ts if ts is not None else 'never'}")
+        return 0
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
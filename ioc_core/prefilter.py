@@ -0,0 +1,147 @@
+"""Pre-enrichment filter: answer bogon/private IPs and allowlisted domains locally.
+
+IPv4 ranges (the special-purpose registry plus user CIDRs) are compiled into two
+sorted ``array('I')`` columns of disjoint [start, end] ranges, so a lookup is one
+``bisect`` over native integers. Domains are matched against an allowlist set by
+walking their label suffixes up to the registrable domain (``cdn.example.com``
+-> ``example.com``), so a subdomain of an allowlisted site matches too. The walk
+never goes past a public or shared-hosting suffix: ``evil.github.io`` is not
+covered by an allowlisted ``github.io``. URLs and hashes are never filtered: a
+benign host can still serve a malicious URL.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Sequence
+
+from .models import (
+    AggregatedResult,
+    ProviderResult,
+    PublicSuffixTrie,
+    default_public_suffixes,
+    ipv4_to_int,
+)
+
+# IPv4 special-purpose ranges (RFC 6890 and friends)
+BOGON_RANGES: tuple[tuple[str, str], ...] = (
+    ("0.0.0.0/8", "this-network"),
+    ("10.0.0.0/8", "private"),
+    ("100.64.0.0/10", "shared-cgnat"),
+    ("127.0.0.0/8", "loopback"),
+    ("169.254.0.0/16", "link-local"),
+    ("172.16.0.0/12", "private"),
+    ("192.0.0.0/24", "ietf-reserved"),
+    ("192.0.2.0/24", "documentation"),
+    ("192.168.0.0/16", "private"),
+    ("198.18.0.0/15", "benchmarking"),
+    ("198.51.100.0/24", "documentation"),
+    ("203.0.113.0/24", "documentation"),
+    ("224.0.0.0/4", "multicast"),
+    ("240.0.0.0/4", "reserved"),
+)
+
+
+class RangeTable:
+    """Disjoint IPv4 ranges with labels; nested CIDRs collapse into the outer one."""
+
+    def __init__(self, ranges: Iterable[tuple[str, str]]):
+        spans: list[tuple[int, int, str]] = []
+        for cidr, label in ranges:
+            net = ipaddress.IPv4Network(cidr.strip(), strict=False)
+            spans.append((int(net.network_address), int(net.broadcast_address), f"{label} ({net})"))
+        spans.sort(key=lambda s: (s[0], -s[1]))
+        self.starts = array("I")
+        self.ends = array("I")
+        self.labels: list[str] = []
+        for start, end, label in spans:
+            if self.ends and start <= self.ends[-1]:
+                continue  # CIDRs never partially overlap: this one sits inside the previous range
+            self.starts.append(start)
+            self.ends.append(end)
+            self.labels.append(label)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def lookup(self, ip: str) -> str | None:
+        n = ipv4_to_int(ip)
+        if n is None:
+            return None
+        i = bisect_right(self.starts, n) - 1
+        if i >= 0 and n <= self.ends[i]:
+            return self.labels[i]
+        return None
+
+
+def load_allowlist(path: str) -> list[str]:
+    """Read a top-sites file: one domain per line or ``rank,domain`` CSV (Tranco/Umbrella style)."""
+    out: list[str] = []
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            s = line.strip()
+            if not s or s.startswith("#"):
+                continue
+            dom = s.rsplit(",", 1)[-1].strip().strip(".").lower()
+            if dom:
+                out.append(dom)
+    return out
+
+
+class Prefilter:
+    """Label IOCs that should not be sent to providers.
+
+    ``cidrs`` are extra (cidr, label) ranges; ``allowlist`` is an iterable of domains.
+    ``suffixes`` bounds allowlist matching (default: the built-in suffix rules).
+    """
+
+    def __init__(
+        self,
+        cidrs: Sequence[tuple[str, str]] = (),
+        allowlist: Iterable[str] = (),
+        bogons: bool = True,
+        suffixes: PublicSuffixTrie | None = None,
+    ):
+        self.ranges = RangeTable((BOGON_RANGES if bogons else ()) + tuple(cidrs))
+        self.allowlist = frozenset(
+            d.strip().strip(".").lower() for d in allowlist if d and d.strip()
+        )
+        self.suffixes = suffixes or default_public_suffixes()
+
+    def match(self, ioc: str, ioc_type: str) -> str | None:
+        """Return a label such as ``private (10.0.0.0/8)`` for filtered IOCs, else None."""
+        if ioc_type == "ip":
+            return self.ranges.lookup(ioc)
+        if ioc_type == "domain" and self.allowlist:
+            allow = self.allowlist
+            if ioc in allow:
+                return f"allowlisted ({ioc})"
+            # Parents up to the registrable domain; a public suffix itself only matches exactly
+            reg = self.suffixes.registrable_domain(ioc)
+            d = ioc
+            while reg is not None and d != reg:
+                d = d[d.find(".") + 1 :]
+                if d in allow:
+                    return f"allowlisted ({d})"
+        return None
+
+    def result(self, ioc: str, ioc_type: str, label: str) -> AggregatedResult:
+        """Immediate result for a filtered IOC: CLEAN if allowlisted, INCONCLUSIVE otherwise."""
+        status = "CLEAN" if label.startswith("allowlisted") else "INCONCLUSIVE"
+        pr = ProviderResult("prefilter", status, 0.0, [f"prefilter={label}"], None, None, False)
+        return AggregatedResult(ioc, ioc_type, status, 0.0, [pr])
+
+
+def build_prefilter(
+    allowlist_path: str | None = None, cidrs: Iterable[str] = (), suffix_path: str | None = None
+) -> Prefilter:
+    """Prefilter with bogon ranges, optional user CIDRs and an optional top-sites allowlist file.
+
+    ``suffix_path`` is a full public_suffix_list.dat (default: the built-in rules).
+    """
+    user = [(c, "user-range") for c in cidrs if c.strip()]
+    allow = load_allowlist(allowlist_path) if allowlist_path else []
+    suffixes = PublicSuffixTrie.from_file(suffix_path) if suffix_path and allow else None
+    return Prefilter(user, allow, suffixes=suffixes)
@@ -1,23 +1,76 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List, Optional, Tuple, Callable, cast
+import contextlib
+import os
 import random
+import sqlite3
 import time
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from itertools import islice
+from typing import Any, TypeVar, cast
 
 import httpx
 
 from . import config
-from .cache import Cache
-from .models import AggregatedResult, ProviderResult, aggregate, vt_url_id, now_utc, classify_ioc
+from .cache import AsyncCache, Cache
+from .ipasn import IpAsnDb
 from .logger import get_logger
+from .models import (
+    AggregatedResult,
+    ProviderResult,
+    PublicSuffixTrie,
+    aggregate,
+    classify_ioc,
+    fields_from_evidence,
+    normalize_ioc,
+    now_utc,
+    vt_url_id,
+)
+from .negatives import TRUSTED_NEGATIVE_EVIDENCE, NegativeFilter, is_negative
+from .offload import Offloader, classify_lines
+from .otx_index import OTXIndex
+from .prefilter import Prefilter
+from .spill import SpillStore
+from .threatfox_mirror import ThreatFoxMirror
+
+T = TypeVar("T")
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart (``rate`` per second)."""
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = 1.0 / rate
+        self._clock = clock
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        now = self._clock()
+        slot = max(now, self._next)
+        self._next = slot + self.interval  # reserve before sleeping so waiters queue up
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 class BaseProvider:
     name = ""
     supported: set[str] = set()  # {"ip","domain","hash","url"}
+    # Optional pacing of network queries (cache hits and prefetched answers are not paced)
+    limiter: RateLimiter | None = None
 
-    def __init__(self, api_key: Optional[str]):
+    def __init__(self, api_key: str | None):
         self.api_key = api_key
 
     def available(self) -> bool:
@@ -29,6 +82,20 @@ class BaseProvider:
     async def query(self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float) -> ProviderResult:
         return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [], None, None, False)
 
+    async def prefetch(
+        self,
+        client: httpx.AsyncClient,
+        iocs: list[tuple[str, str]],
+        timeout: float,
+        sem: asyncio.Semaphore | None = None,
+    ) -> dict[str, ProviderResult]:
+        """Answer several pending (ioc, type) lookups at once where the API allows it.
+
+        Returns {ioc: result} for the IOCs it could answer; the rest go through query().
+        The default answers nothing.
+        """
+        return {}
+
 
 class VirusTotalProvider(BaseProvider):
     name = "virustotal"
@@ -45,14 +112,101 @@ class VirusTotalProvider(BaseProvider):
             return f"https://www.virustotal.com/api/v3/urls/{vt_url_id(ioc)}"
         return ""
 
-    async def query(self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float) -> ProviderResult:
+    @classmethod
+    def parse(
+        cls, ioc: str, ioc_type: str, data: Any, url: str, latency: int | None
+    ) -> ProviderResult:
+        """Result for a decoded 200 response; pure, so offload can parse batches in workers."""
+        attributes = ((data or {}).get("data") or {}).get("attributes") or {}
+        stats = attributes.get("last_analysis_stats") or {}
+        mal = int(stats.get("malicious", 0))
+        susp = int(stats.get("suspicious", 0))
+        harmless = int(stats.get("harmless", 0))
+        undetected = int(stats.get("undetected", 0))
+        score = mal * 2 + susp * 1.0
+        if mal >= 1:
+            status = "MALICIOUS"
+        elif susp >= 1:
+            status = "SUSPICIOUS"
+        elif harmless > 5 or undetected > 10:
+            status = "CLEAN"
+        else:
+            status = "INCONCLUSIVE"
+        ev: list[str] = [
+            f"malicious={mal}",
+            f"suspicious={susp}",
+            f"harmless={harmless}",
+            f"undetected={undetected}",
+        ]
+        fields: dict[str, Any] = {
+            "malicious": mal,
+            "suspicious": susp,
+            "harmless": harmless,
+            "undetected": undetected,
+        }
+        rep = attributes.get("reputation")
+        if isinstance(rep, (int, float)):
+            ev.append(f"reputation={rep}")
+            fields["reputation"] = int(rep)
+        cats = attributes.get("categories")
+        if isinstance(cats, dict) and cats:
+            unique_categories = list(dict.fromkeys(str(v) for v in cats.values()))
+            ev.append("categories=" + ",".join(unique_categories[:5]))
+            fields["categories"] = unique_categories[:5]
+        last_analysis = attributes.get("last_analysis_date")
+        if isinstance(last_analysis, (int, float)) and last_analysis:
+            try:
+                from datetime import datetime
+
+                fields["last_analysis"] = (
+                    datetime.utcfromtimestamp(int(last_analysis)).isoformat() + "Z"
+                )
+                ev.append("last_analysis=" + fields["last_analysis"])
+            except Exception:
+                pass
+        total_votes = attributes.get("total_votes")
+        if isinstance(total_votes, dict) and total_votes:
+            harmless_votes = int(total_votes.get("harmless", 0))
+            malicious_votes = int(total_votes.get("malicious", 0))
+            ev.append(f"votes=mal:{malicious_votes}/har:{harmless_votes}")
+            fields["votes_malicious"] = malicious_votes
+            fields["votes_harmless"] = harmless_votes
+        if ioc_type == "hash":
+            # All three digests, so the engine can alias MD5/SHA-1 queries to the SHA-256
+            for algo in ("sha256", "md5", "sha1"):
+                digest = attributes.get(algo)
+                if isinstance(digest, str) and digest:
+                    ev.append(f"{algo}={digest.lower()}")
+                    fields[algo] = digest.lower()
+        if ioc_type == "ip":
+            ref = f"https://www.virustotal.com/gui/ip-address/{ioc}"
+        elif ioc_type == "domain":
+            ref = f"https://www.virustotal.com/gui/domain/{ioc}"
+        elif ioc_type == "hash":
+            ref = f"https://www.virustotal.com/gui/file/{ioc}"
+        elif ioc_type == "url":
+            ref = f"https://www.virustotal.com/gui/url/{vt_url_id(ioc)}"
+        else:
+            ref = url
+        return ProviderResult(cls.name, status, float(score), ev, ref, latency, False, fields)
+
+    async def query(
+        self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float
+    ) -> ProviderResult:
         if not self.available() or not self.supports(ioc_type):
             return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [], None, None, False)
         url = self._endpoint(ioc, ioc_type)
         headers = {"x-apikey": self.api_key or ""}
         endpoint_kind = "reputation"
-        t_resp = await _http_get_with_retries(client, url, headers=headers, params=None, timeout=timeout)
-        r, latency, status_code, err = t_resp.response, t_resp.latency_ms, t_resp.status_code, t_resp.error
+        t_resp = await _http_get_with_retries(
+            client, url, headers=headers, params=None, timeout=timeout
+        )
+        r, latency, status_code, err = (
+            t_resp.response,
+            t_resp.latency_ms,
+            t_resp.status_code,
+            t_resp.error,
+        )
         try:
             log = get_logger()
             log.info(
@@ -67,85 +221,225 @@ class VirusTotalProvider(BaseProvider):
             pass
         try:
             if r.status_code in (429,) or r.status_code >= 500:
-                return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [f"http {r.status_code}"], url, latency, False)
+                return ProviderResult(
+                    self.name, "INCONCLUSIVE", 0.0, [f"http {r.status_code}"], url, latency, False
+                )
             if r.status_code == 404:
                 return ProviderResult(self.name, "CLEAN", 0.0, ["not found"], url, latency, False)
             if r.status_code in (401, 403):
-                return ProviderResult(self.name, "INCONCLUSIVE", 0.0, ["unauthorized/forbidden (check API key)"], url, latency, False)
-            data = r.json()
-            attributes = (((data or {}).get("data") or {}).get("attributes") or {})
-            stats = attributes.get("last_analysis_stats") or {}
-            mal = int(stats.get("malicious", 0))
-            susp = int(stats.get("suspicious", 0))
-            harmless = int(stats.get("harmless", 0))
-            undetected = int(stats.get("undetected", 0))
-            score = mal * 2 + susp * 1.0
-            if mal >= 1:
-                status = "MALICIOUS"
-            elif susp >= 1:
-                status = "SUSPICIOUS"
-            elif harmless > 5 or undetected > 10:
-                status = "CLEAN"
-            else:
-                status = "INCONCLUSIVE"
-            ev: List[str] = [
-                f"malicious={mal}",
-                f"suspicious={susp}",
-                f"harmless={harmless}",
-                f"undetected={undetected}",
-            ]
-            rep = attributes.get("reputation")
-            if isinstance(rep, (int, float)):
-                ev.append(f"reputation={rep}")
-            cats = attributes.get("categories")
-            if isinstance(cats, dict) and cats:
-                unique_categories = list({str(v) for v in cats.values()})
-                ev.append("categories=" + ",".join(unique_categories[:5]))
-            last_analysis = attributes.get("last_analysis_date")
-            if isinstance(last_analysis, (int, float)) and last_analysis:
-                try:
-                    from datetime import datetime
-
-                    ev.append(
-                        "last_analysis="
-                        + datetime.utcfromtimestamp(int(last_analysis)).isoformat()
-                        + "Z"
-                    )
-                except Exception:
-                    pass
-            total_votes = attributes.get("total_votes")
-            if isinstance(total_votes, dict) and total_votes:
-                harmless_votes = int(total_votes.get("harmless", 0))
-                malicious_votes = int(total_votes.get("malicious", 0))
-                ev.append(f"votes=mal:{malicious_votes}/har:{harmless_votes}")
-            if ioc_type == "ip":
-                ref = f"https://www.virustotal.com/gui/ip-address/{ioc}"
-            elif ioc_type == "domain":
-                ref = f"https://www.virustotal.com/gui/domain/{ioc}"
-            elif ioc_type == "hash":
-                ref = f"https://www.virustotal.com/gui/file/{ioc}"
-            elif ioc_type == "url":
-                ref = f"https://www.virustotal.com/gui/url/{vt_url_id(ioc)}"
-            else:
-                ref = url
-            return ProviderResult(self.name, status, float(score), ev, ref, latency, False)
+                return ProviderResult(
+                    self.name,
+                    "INCONCLUSIVE",
+                    0.0,
+                    ["unauthorized/forbidden (check API key)"],
+                    url,
+                    latency,
+                    False,
+                )
+            return self.parse(ioc, ioc_type, r.json(), url, latency)
         except Exception as e:
-            return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [str(e)], url, latency if isinstance(latency, int) else None, False)
+            return ProviderResult(
+                self.name,
+                "INCONCLUSIVE",
+                0.0,
+                [str(e)],
+                url,
+                latency if isinstance(latency, int) else None,
+                False,
+            )
+
+
+# Report window for /check and /check-block alike, so a verdict does not depend on batching
+_ABUSEIPDB_MAX_AGE_DAYS = "90"
+
+
+def _abuseipdb_status(conf: float, total: int, is_public: bool) -> str:
+    if conf >= 75:
+        return "MALICIOUS"
+    if conf >= 25 or total >= 3:
+        return "SUSPICIOUS"
+    if total == 0 and is_public:
+        return "CLEAN"
+    return "INCONCLUSIVE"
 
 
 class AbuseIPDBProvider(BaseProvider):
     name = "abuseipdb"
     supported = {"ip"}
 
-    async def query(self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float) -> ProviderResult:
+    def __init__(
+        self, api_key: str | None, block_min_group: int = config.DEFAULT_ABUSEIPDB_BLOCK_MIN_GROUP
+    ):
+        """block_min_group: pending IPs sharing a /24 needed before one check-block call
+        replaces their checks (0 disables)."""
+        super().__init__(api_key)
+        self.block_min_group = block_min_group
+
+    async def prefetch(
+        self,
+        client: httpx.AsyncClient,
+        iocs: list[tuple[str, str]],
+        timeout: float,
+        sem: asyncio.Semaphore | None = None,
+    ) -> dict[str, ProviderResult]:
+        """Group pending IPs by /24 and spend one check-block call per large enough group."""
+        if not self.available() or self.block_min_group <= 0:
+            return {}
+        groups: dict[str, list[str]] = {}
+        for ioc, t in dict.fromkeys(iocs):
+            if t == "ip":
+                groups.setdefault(ioc.rsplit(".", 1)[0], []).append(ioc)
+        big = [
+            (prefix, ips)
+            for prefix, ips in groups.items()
+            if len(ips) >= max(2, self.block_min_group)
+        ]
+        if not big:
+            return {}
+
+        async def _one(prefix: str, ips: list[str]) -> dict[str, ProviderResult]:
+            if sem is None:
+                return await self._check_block(client, prefix + ".0/24", ips, timeout)
+            async with sem:
+                return await self._check_block(client, prefix + ".0/24", ips, timeout)
+
+        out: dict[str, ProviderResult] = {}
+        for part in await asyncio.gather(*(_one(p, ips) for p, ips in big)):
+            out.update(part)
+        return out
+
+    async def _check_block(
+        self, client: httpx.AsyncClient, network: str, ips: list[str], timeout: float
+    ) -> dict[str, ProviderResult]:
+        url = "https://api.abuseipdb.com/api/v2/check-block"
+        headers = {"Key": self.api_key or "", "Accept": "application/json"}
+        params = {"network": network, "maxAgeInDays": _ABUSEIPDB_MAX_AGE_DAYS}
+        t_resp = await _http_get_with_retries(
+            client, url, headers=headers, params=params, timeout=timeout
+        )
+        r, latency, status_code, err = (
+            t_resp.response,
+            t_resp.latency_ms,
+            t_resp.status_code,
+            t_resp.error,
+        )
+        get_logger().info(
+            "provider=%s endpoint_kind=%s status_code=%s latency_ms=%s cache_hit=%s",
+            self.name,
+            "check-block",
+            (status_code if status_code is not None else ("timeout" if err else "unknown")),
+            latency,
+            False,
+        )
+        if r.status_code != 200:
+            # Leave the whole group to per-IP /check calls
+            return {}
+        try:
+            d = (r.json() or {}).get("data") or {}
+            reported = {
+                str(rec.get("ipAddress")): rec
+                for rec in (d.get("reportedAddress") or [])
+                if isinstance(rec, dict) and rec.get("ipAddress")
+            }
+        except Exception:
+            return {}
+        out: dict[str, ProviderResult] = {}
+        for ip in ips:
+            rec = reported.get(ip) or {}
+            conf = float(rec.get("abuseConfidenceScore", 0) or 0)
+            total = int(rec.get("numReports", 0) or 0)
+            # check-block does not say whether an address is public, so is_public is not reported
+            ev: list[str] = [f"confidence={int(conf)}", f"total_reports={total}"]
+            fields: dict[str, Any] = {"confidence": int(conf), "total_reports": total}
+            if rec.get("countryCode"):
+                ev.append(f"country_code={rec['countryCode']}")
+                fields["country"] = str(rec["countryCode"])
+            if rec.get("mostRecentReport"):
+                ev.append(f"last_reported_at={rec['mostRecentReport']}")
+                fields["last_seen"] = str(rec["mostRecentReport"])
+            ev.append(f"network={network}")
+            fields["network"] = network
+            out[ip] = ProviderResult(
+                self.name,
+                _abuseipdb_status(conf, total, True),
+                conf,
+                ev,
+                f"https://www.abuseipdb.com/check/{ip}",
+                latency,
+                False,
+                fields,
+            )
+        return out
+
+    @classmethod
+    def parse(
+        cls, ioc: str, ioc_type: str, data: Any, url: str, latency: int | None
+    ) -> ProviderResult:
+        """Result for a decoded 200 /check response."""
+        d = (data or {}).get("data") or {}
+        conf = float(d.get("abuseConfidenceScore", 0))
+        total = int(d.get("totalReports", 0))
+        is_public = bool(d.get("isPublic", True))
+        score = conf
+        status = _abuseipdb_status(conf, total, is_public)
+        ev: list[str] = [
+            f"confidence={int(conf)}",
+            f"total_reports={total}",
+            f"is_public={is_public}",
+        ]
+        fields: dict[str, Any] = {
+            "confidence": int(conf),
+            "total_reports": total,
+            "is_public": is_public,
+        }
+        for k, name in (
+            ("countryCode", "country"),
+            ("usageType", "usage_type"),
+            ("isp", "isp"),
+            ("domain", "domain"),
+            ("lastReportedAt", "last_seen"),
+        ):
+            val = d.get(k)
+            if val:
+                fields[name] = str(val)
+                # Normalize to snake_case where applicable
+                if k == "countryCode":
+                    ev.append(f"country_code={val}")
+                elif k == "usageType":
+                    ev.append(f"usage_type={val}")
+                elif k == "lastReportedAt":
+                    ev.append(f"last_reported_at={val}")
+                else:
+                    ev.append(f"{k.lower()}={val}")
+        return ProviderResult(
+            cls.name,
+            status,
+            float(score),
+            ev,
+            f"https://www.abuseipdb.com/check/{ioc}",
+            latency,
+            False,
+            fields,
+        )
+
+    async def query(
+        self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float
+    ) -> ProviderResult:
         if not self.available() or not self.supports(ioc_type):
             return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [], None, None, False)
         url = "https://api.abuseipdb.com/api/v2/check"
         headers = {"Key": self.api_key or "", "Accept": "application/json"}
-        params = {"ipAddress": ioc, "maxAgeInDays": "90"}
+        params = {"ipAddress": ioc, "maxAgeInDays": _ABUSEIPDB_MAX_AGE_DAYS}
         endpoint_kind = "check"
-        t_resp = await _http_get_with_retries(client, url, headers=headers, params=params, timeout=timeout)
-        r, latency, status_code, err = t_resp.response, t_resp.latency_ms, t_resp.status_code, t_resp.error
+        t_resp = await _http_get_with_retries(
+            client, url, headers=headers, params=params, timeout=timeout
+        )
+        r, latency, status_code, err = (
+            t_resp.response,
+            t_resp.latency_ms,
+            t_resp.status_code,
+            t_resp.error,
+        )
         try:
             log = get_logger()
             log.info(
@@ -160,51 +454,77 @@ class AbuseIPDBProvider(BaseProvider):
             pass
         try:
             if r.status_code in (429,) or r.status_code >= 500:
-                return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [f"http {r.status_code}"], url, latency, False)
+                return ProviderResult(
+                    self.name, "INCONCLUSIVE", 0.0, [f"http {r.status_code}"], url, latency, False
+                )
             if r.status_code == 404:
                 return ProviderResult(self.name, "CLEAN", 0.0, ["not found"], url, latency, False)
             if r.status_code in (401, 403):
-                return ProviderResult(self.name, "INCONCLUSIVE", 0.0, ["unauthorized/forbidden (check API key)"], url, latency, False)
-            data = r.json()
-            d = (data or {}).get("data") or {}
-            conf = float(d.get("abuseConfidenceScore", 0))
-            total = int(d.get("totalReports", 0))
-            is_public = bool(d.get("isPublic", True))
-            score = conf
-            if conf >= 75:
-                status = "MALICIOUS"
-            elif conf >= 25 or total >= 3:
-                status = "SUSPICIOUS"
-            elif total == 0 and is_public:
-                status = "CLEAN"
-            else:
-                status = "INCONCLUSIVE"
-            ev: List[str] = [
-                f"confidence={int(conf)}",
-                f"total_reports={total}",
-                f"is_public={is_public}",
-            ]
-            for k in ("countryCode", "usageType", "isp", "domain", "lastReportedAt"):
-                val = d.get(k)
-                if val:
-                    # Normalize to snake_case where applicable
-                    if k == "countryCode":
-                        ev.append(f"country_code={val}")
-                    elif k == "usageType":
-                        ev.append(f"usage_type={val}")
-                    elif k == "lastReportedAt":
-                        ev.append(f"last_reported_at={val}")
-                    else:
-                        ev.append(f"{k.lower()}={val}")
-            return ProviderResult(self.name, status, float(score), ev, f"https://www.abuseipdb.com/check/{ioc}", latency, False)
+                return ProviderResult(
+                    self.name,
+                    "INCONCLUSIVE",
+                    0.0,
+                    ["unauthorized/forbidden (check API key)"],
+                    url,
+                    latency,
+                    False,
+                )
+            return self.parse(ioc, ioc_type, r.json(), url, latency)
         except Exception as e:
-            return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [str(e)], "https://www.abuseipdb.com", latency if isinstance(latency, int) else None, False)
+            return ProviderResult(
+                self.name,
+                "INCONCLUSIVE",
+                0.0,
+                [str(e)],
+                "https://www.abuseipdb.com",
+                latency if isinstance(latency, int) else None,
+                False,
+            )
 
 
 class OTXProvider(BaseProvider):
     name = "otx"
     supported = {"ip", "domain", "hash", "url"}
 
+    def __init__(
+        self,
+        api_key: str | None,
+        index: OTXIndex | None = None,
+        index_max_age: int = config.DEFAULT_OTX_INDEX_MAX_AGE,
+    ):
+        """index: optional subscribed-pulse index, used while fresher than index_max_age seconds."""
+        super().__init__(api_key)
+        self.index = index
+        self.index_max_age = index_max_age
+
+    def _query_index(self, ioc: str, ioc_type: str) -> ProviderResult | None:
+        """Answer from the pulse index; None when it is missing, stale or does not know the IOC."""
+        index = self.index
+        if index is None:
+            return None
+        t0 = time.perf_counter()
+        try:
+            if not index.is_fresh(self.index_max_age):
+                return None
+            pulses, names = index.lookup(ioc, ioc_type)
+        except sqlite3.Error:
+            return None
+        if not pulses:
+            return None
+        latency = int((time.perf_counter() - t0) * 1000)
+        ev: list[str] = [f"pulses={pulses}"] + [f"pulse={n}" for n in names]
+        fields: dict[str, Any] = {"pulses": pulses, "pulse_names": list(names)}
+        return ProviderResult(
+            self.name,
+            "SUSPICIOUS",
+            float(pulses),
+            ev,
+            self._endpoint(ioc, ioc_type),
+            latency,
+            False,
+            fields,
+        )
+
     def _endpoint(self, ioc: str, t: str) -> str:
         if t == "ip":
             return f"https://otx.alienvault.com/api/v1/indicators/IPv4/{ioc}/general"
@@ -218,14 +538,55 @@ class OTXProvider(BaseProvider):
             return f"https://otx.alienvault.com/api/v1/indicators/url/{quote(ioc, safe='')}/general"
         return ""
 
-    async def query(self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float) -> ProviderResult:
+    @classmethod
+    def parse(
+        cls, ioc: str, ioc_type: str, data: Any, url: str, latency: int | None
+    ) -> ProviderResult:
+        """Result for a decoded 200 indicator response."""
+        pulses = (((data or {}).get("pulse_info") or {}).get("count")) or 0
+        refs = (((data or {}).get("pulse_info") or {}).get("pulses")) or []
+        names = [p.get("name") for p in refs if isinstance(p, dict) and p.get("name")]
+        score = float(pulses)
+        status = "SUSPICIOUS" if pulses >= 1 else "INCONCLUSIVE"
+        ev: list[str] = [f"pulses={pulses}"] + [f"pulse={n}" for n in names[:5]]
+        fields: dict[str, Any] = {"pulses": int(pulses), "pulse_names": [str(n) for n in names[:5]]}
+        general = data or {}
+        rep = general.get("reputation")
+        if isinstance(rep, (int, float)):
+            ev.append(f"reputation={int(rep)}")
+            fields["reputation"] = int(rep)
+        country = general.get("country_name") or general.get("country_code")
+        if country:
+            ev.append(f"country={country}")
+            fields["country"] = str(country)
+        asn = general.get("asn") or (
+            general.get("as") if isinstance(general.get("as"), str) else None
+        )
+        if asn:
+            ev.append(f"asn={asn}")
+            fields["asn"] = str(asn)
+        return ProviderResult(cls.name, status, score, ev, url, latency, False, fields)
+
+    async def query(
+        self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float
+    ) -> ProviderResult:
         if not self.available() or not self.supports(ioc_type):
             return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [], None, None, False)
+        local = self._query_index(ioc, ioc_type)
+        if local is not None:
+            return local
         url = self._endpoint(ioc, ioc_type)
         headers = {"X-OTX-API-KEY": self.api_key or ""}
         endpoint_kind = "reputation"
-        t_resp = await _http_get_with_retries(client, url, headers=headers, params=None, timeout=timeout)
-        r, latency, status_code, err = t_resp.response, t_resp.latency_ms, t_resp.status_code, t_resp.error
+        t_resp = await _http_get_with_retries(
+            client, url, headers=headers, params=None, timeout=timeout
+        )
+        r, latency, status_code, err = (
+            t_resp.response,
+            t_resp.latency_ms,
+            t_resp.status_code,
+            t_resp.error,
+        )
         try:
             log = get_logger()
             log.info(
@@ -240,49 +601,135 @@ class OTXProvider(BaseProvider):
             pass
         try:
             if r.status_code in (429,) or r.status_code >= 500:
-                return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [f"http {r.status_code}"], url, latency, False)
+                return ProviderResult(
+                    self.name, "INCONCLUSIVE", 0.0, [f"http {r.status_code}"], url, latency, False
+                )
             if r.status_code == 404:
                 return ProviderResult(self.name, "CLEAN", 0.0, ["not found"], url, latency, False)
             if r.status_code in (401, 403):
-                return ProviderResult(self.name, "INCONCLUSIVE", 0.0, ["unauthorized/forbidden (check API key)"], url, latency, False)
-            data = r.json()
-            pulses = (((data or {}).get("pulse_info") or {}).get("count")) or 0
-            refs = (((data or {}).get("pulse_info") or {}).get("pulses")) or []
-            names = [p.get("name") for p in refs if isinstance(p, dict) and p.get("name")]
-            score = float(pulses)
-            status = "SUSPICIOUS" if pulses >= 1 else "INCONCLUSIVE"
-            ev: List[str] = [f"pulses={pulses}"] + [f"pulse={n}" for n in names[:5]]
-            general = (data or {})
-            rep = general.get("reputation")
-            if isinstance(rep, (int, float)):
-                ev.append(f"reputation={int(rep)}")
-            country = general.get("country_name") or general.get("country_code")
-            if country:
-                ev.append(f"country={country}")
-            asn = general.get("asn") or (general.get("as") if isinstance(general.get("as"), str) else None)
-            if asn:
-                ev.append(f"asn={asn}")
-            return ProviderResult(self.name, status, score, ev, url, latency, False)
+                return ProviderResult(
+                    self.name,
+                    "INCONCLUSIVE",
+                    0.0,
+                    ["unauthorized/forbidden (check API key)"],
+                    url,
+                    latency,
+                    False,
+                )
+            return self.parse(ioc, ioc_type, r.json(), url, latency)
         except Exception as e:
-            return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [str(e)], url, latency if isinstance(latency, int) else None, False)
-
-
+            return ProviderResult(
+                self.name,
+                "INCONCLUSIVE",
+                0.0,
+                [str(e)],
+                url,
+                latency if isinstance(latency, int) else None,
+                False,
+            )
 
 
 class ThreatFoxProvider(BaseProvider):
     name = "threatfox"
     supported = {"ip", "domain", "hash", "url"}
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        mirror: ThreatFoxMirror | None = None,
+        mirror_max_age: int = config.DEFAULT_THREATFOX_MIRROR_MAX_AGE,
+    ) -> None:
+        """mirror: optional local export mirror, used while fresher than mirror_max_age seconds."""
         super().__init__(api_key=None)
+        self.mirror = mirror
+        self.mirror_max_age = mirror_max_age
 
     def available(self) -> bool:
         # public, keyless
         return True
 
-    async def query(self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float) -> ProviderResult:
+    @classmethod
+    def _result_from_record(cls, rec: dict[str, Any], latency: int | None) -> ProviderResult:
+        tags = rec.get("tags") or []
+        family = rec.get("malware") or rec.get("malware_printable")
+        conf = int(rec.get("confidence_level") or 0)
+        threat_type = (rec.get("threat_type") or rec.get("ioc_type") or "").lower()
+        status = "MALICIOUS" if conf >= 80 else ("SUSPICIOUS" if conf >= 20 else "INCONCLUSIVE")
+        ev: list[str] = []
+        fields: dict[str, Any] = {}
+        if family:
+            ev.append(f"family={family}")
+            fields["family"] = str(family)
+        if tags:
+            try:
+                ev.append("tags=" + ",".join([str(t) for t in tags][:6]))
+                fields["tags"] = [str(t) for t in tags][:6]
+            except Exception:
+                pass
+        fs = rec.get("first_seen") or rec.get("first_seen_utc")
+        ls = rec.get("last_seen") or rec.get("last_seen_utc")
+        if fs:
+            ev.append(f"first_seen={fs}")
+            fields["first_seen"] = str(fs)
+        if ls:
+            ev.append(f"last_seen={ls}")
+            fields["last_seen"] = str(ls)
+        if threat_type:
+            ev.append(f"type={threat_type}")
+            fields["threat_type"] = threat_type
+        for algo in ("sha256", "md5"):
+            digest = rec.get(f"{algo}_hash")
+            if isinstance(digest, str) and digest:
+                ev.append(f"{algo}={digest.lower()}")
+                fields[algo] = digest.lower()
+        ref = rec.get("reference") or "https://threatfox.abuse.ch/"
+        return ProviderResult(cls.name, status, float(conf), ev, ref, latency, False, fields)
+
+    @classmethod
+    def parse(
+        cls, ioc: str, ioc_type: str, data: Any, url: str, latency: int | None
+    ) -> ProviderResult:
+        """Result for a decoded search_ioc response."""
+        records = (data or {}).get("data") or []
+        if not records:
+            return ProviderResult(cls.name, "CLEAN", 0.0, ["not found"], url, latency, False)
+        # Use the first matching record
+        return cls._result_from_record(
+            records[0] if isinstance(records, list) else records, latency
+        )
+
+    def _query_mirror(self, ioc: str, ioc_type: str) -> ProviderResult | None:
+        """Answer from the local mirror, or None when it is missing, stale or unreadable."""
+        mirror = self.mirror
+        if mirror is None:
+            return None
+        t0 = time.perf_counter()
+        try:
+            if not mirror.is_fresh(self.mirror_max_age):
+                return None
+            rec = mirror.lookup(ioc, ioc_type)
+        except sqlite3.Error:
+            return None
+        latency = int((time.perf_counter() - t0) * 1000)
+        if rec is None:
+            return ProviderResult(
+                self.name,
+                "CLEAN",
+                0.0,
+                ["not found"],
+                "https://threatfox.abuse.ch/",
+                latency,
+                False,
+            )
+        return self._result_from_record(rec, latency)
+
+    async def query(
+        self, client: httpx.AsyncClient, ioc: str, ioc_type: str, timeout: float
+    ) -> ProviderResult:
         if not self.supports(ioc_type):
             return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [], None, None, False)
+        local = self._query_mirror(ioc, ioc_type)
+        if local is not None:
+            return local
         url = "https://threatfox-api.abuse.ch/api/v1/"
         payload = {"query": "search_ioc", "search_term": ioc}
         # Minimal backoff on 429 (0.8s -> 1.6s), respect Retry-After up to 5s
@@ -295,7 +742,9 @@ class ThreatFoxProvider(BaseProvider):
                 latency = int((now_utc() - t0) * 1000)
                 if r.status_code == 429:
                     if attempt >= 2:
-                        return ProviderResult(self.name, "INCONCLUSIVE", 0.0, ["http 429"], url, latency, False)
+                        return ProviderResult(
+                            self.name, "INCONCLUSIVE", 0.0, ["http 429"], url, latency, False
+                        )
                     ra = r.headers.get("retry-after")
                     try:
                         ra_s = min(5.0, float(ra)) if ra else delay
@@ -306,44 +755,92 @@ class ThreatFoxProvider(BaseProvider):
                     delay *= 2
                     continue
                 if r.status_code >= 500:
-                    return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [f"http {r.status_code}"], url, latency, False)
-                js = r.json()
-                data = (js or {}).get("data") or []
-                if not data:
-                    return ProviderResult(self.name, "CLEAN", 0.0, ["not found"], url, latency, False)
-                # Use the first matching record
-                rec = data[0] if isinstance(data, list) else data
-                tags = rec.get("tags") or []
-                family = rec.get("malware") or rec.get("malware_printable")
-                conf = int(rec.get("confidence_level") or 0)
-                threat_type = (rec.get("threat_type") or rec.get("ioc_type") or "").lower()
-                status = "MALICIOUS" if conf >= 80 else ("SUSPICIOUS" if conf >= 20 else "INCONCLUSIVE")
-                ev: List[str] = []
-                if family:
-                    ev.append(f"family={family}")
-                if tags:
-                    try:
-                        ev.append("tags=" + ",".join([str(t) for t in tags][:6]))
-                    except Exception:
-                        pass
-                fs = rec.get("first_seen") or rec.get("first_seen_utc")
-                ls = rec.get("last_seen") or rec.get("last_seen_utc")
-                if fs:
-                    ev.append(f"first_seen={fs}")
-                if ls:
-                    ev.append(f"last_seen={ls}")
-                if threat_type:
-                    ev.append(f"type={threat_type}")
-                ref = rec.get("reference") or "https://threatfox.abuse.ch/"
-                return ProviderResult(self.name, status, float(conf), ev, ref, latency, False)
+                    return ProviderResult(
+                        self.name,
+                        "INCONCLUSIVE",
+                        0.0,
+                        [f"http {r.status_code}"],
+                        url,
+                        latency,
+                        False,
+                    )
+                return self.parse(ioc, ioc_type, r.json(), url, latency)
             except Exception as e:
                 return ProviderResult(self.name, "INCONCLUSIVE", 0.0, [str(e)], url, None, False)
 
 
-async def fetch_with_cache(provider: BaseProvider, cache: Cache, client: httpx.AsyncClient, ioc: str, ioc_type: str, ttl: int, use_cache: bool, refresh: bool, timeout: float) -> ProviderResult:
+def build_providers(names: Iterable[str], env: dict[str, str]) -> list[BaseProvider]:
+    """Construct providers by registry name (config.PROVIDERS), taking API keys from ``env``.
+
+    The local ThreatFox mirror and OTX index are attached when their paths are
+    configured and exist. Unknown names raise ValueError.
+    """
+    provs: list[BaseProvider] = []
+    for name in names:
+        if name == "virustotal":
+            provs.append(VirusTotalProvider(env.get("VIRUSTOTAL_API_KEY")))
+        elif name == "abuseipdb":
+            provs.append(AbuseIPDBProvider(env.get("ABUSEIPDB_API_KEY")))
+        elif name == "otx":
+            index_path = config.otx_index_path(env)
+            index = OTXIndex(index_path) if index_path and os.path.exists(index_path) else None
+            provs.append(
+                OTXProvider(
+                    env.get("OTX_API_KEY") or env.get("ALIENVAULT_OTX_API_KEY"), index=index
+                )
+            )
+        elif name == "threatfox":
+            mirror_path = config.threatfox_mirror_path(env)
+            mirror = (
+                ThreatFoxMirror(mirror_path)
+                if mirror_path and os.path.exists(mirror_path)
+                else None
+            )
+            provs.append(ThreatFoxProvider(mirror=mirror))
+        else:
+            raise ValueError(f"unknown provider: {name}")
+    return provs
+
+
+async def fetch_with_cache(
+    provider: BaseProvider,
+    cache: Cache | AsyncCache,
+    client: httpx.AsyncClient,
+    ioc: str,
+    ioc_type: str,
+    ttl: int,
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    negatives: NegativeFilter | None = None,
+    prefetched: dict[tuple[str, str], ProviderResult] | None = None,
+) -> ProviderResult:
+    """Return a cached result if fresh, else query the provider and store the answer.
+
+    Accepts a plain Cache (blocking calls, kept for legacy callers) or an AsyncCache,
+    whose reads/writes run on its I/O thread so the event loop never waits on SQLite.
+    With a NegativeFilter, IOCs the provider recently reported "not found" are
+    answered locally, and new "not found" answers are recorded.
+    ``prefetched`` holds {(provider, ioc): result} from a batched prefetch; such
+    results are used (and cached) instead of a per-IOC query.
+    Hash results are cached under the sample's SHA-256 once any provider has
+    reported it, so the MD5, SHA-1 and SHA-256 forms share one entry.
+    """
+    key = ioc
+    if ioc_type == "hash" and len(ioc) != 64:
+        key = (
+            await cache.resolve_hash(ioc)
+            if isinstance(cache, AsyncCache)
+            else cache.resolve_hash(ioc)
+        )
     if use_cache and not refresh:
-        cached = cache.get(provider.name, ioc, ttl)
+        if isinstance(cache, AsyncCache):
+            cached = await cache.get(provider.name, key, ttl)
+        else:
+            cached = cache.get(provider.name, key, ttl)
         if cached is not None:
+            evidence = list(cached.get("evidence", []))
+            fields = cached.get("fields")
             try:
                 get_logger().info(
                     "provider=%s endpoint_kind=%s status_code=%s latency_ms=%s cache_hit=%s",
@@ -359,13 +856,39 @@ async def fetch_with_cache(provider: BaseProvider, cache: Cache, client: httpx.A
                 provider.name,
                 cached.get("status", "INCONCLUSIVE"),
                 float(cached.get("score", 0.0)),
-                list(cached.get("evidence", [])),
+                evidence,
                 cached.get("raw_ref"),
                 cached.get("latency_ms"),
                 True,
+                # Rows cached before fields existed: recover them once here, not on every render
+                dict(fields)
+                if isinstance(fields, dict)
+                else fields_from_evidence(provider.name, evidence),
             )
-    res = await provider.query(client, ioc, ioc_type, timeout)
-    cache.set(provider.name, ioc, ioc_type, res.to_dict())
+    if negatives is not None and not refresh and negatives.contains(provider.name, ioc):
+        return ProviderResult(
+            provider.name, "CLEAN", 0.0, [TRUSTED_NEGATIVE_EVIDENCE], None, None, True
+        )
+    pre = prefetched.pop((provider.name, ioc), None) if prefetched is not None else None
+    if pre is None and provider.limiter is not None:
+        await provider.limiter.acquire()
+    res = pre if pre is not None else await provider.query(client, ioc, ioc_type, timeout)
+    if negatives is not None and is_negative(res):
+        negatives.add(provider.name, ioc)
+    if ioc_type == "hash":
+        digests = _reported_digests(res)
+        sha256 = digests.pop("sha256", None)
+        if sha256:
+            aliases = [ioc] + list(digests.values())
+            if isinstance(cache, AsyncCache):
+                await cache.add_hash_aliases(sha256, aliases)
+            else:
+                cache.add_hash_aliases(sha256, aliases)
+            key = sha256
+    if isinstance(cache, AsyncCache):
+        await cache.set(provider.name, key, ioc_type, res.to_dict())
+    else:
+        cache.set(provider.name, key, ioc_type, res.to_dict())
     try:
         get_logger().info(
             "provider=%s endpoint_kind=%s status_code=%s latency_ms=%s cache_hit=%s",
@@ -380,9 +903,21 @@ async def fetch_with_cache(provider: BaseProvider, cache: Cache, client: httpx.A
     return res
 
 
+def _reported_digests(res: ProviderResult) -> dict[str, str]:
+    """The sha256/md5/sha1 digests a provider reported, from its parsed fields: {algo: digest}."""
+    out: dict[str, str] = {}
+    for algo in ("sha256", "md5", "sha1"):
+        digest = res.fields.get(algo)
+        if isinstance(digest, str) and digest:
+            out[algo] = digest
+    return out
+
+
 # Internal: HTTP GET with bounded retries/backoff and total budget cap
 class _HttpAttemptResult:
-    def __init__(self, response: httpx.Response, latency_ms: int, status_code: Optional[int], error: Optional[str]):
+    def __init__(
+        self, response: httpx.Response, latency_ms: int, status_code: int | None, error: str | None
+    ):
         self.response = response
         self.latency_ms = latency_ms
         self.status_code = status_code
@@ -392,8 +927,8 @@ class _HttpAttemptResult:
 async def _http_get_with_retries(
     client: httpx.AsyncClient,
     url: str,
-    headers: Optional[Dict[str, str]],
-    params: Optional[Dict[str, Any]],
+    headers: dict[str, str] | None,
+    params: dict[str, Any] | None,
     timeout: float,
     max_extra_retries: int = 2,
 ) -> _HttpAttemptResult:
@@ -401,9 +936,9 @@ async def _http_get_with_retries(
     budget = max(timeout * 1.5, timeout + 0.5)
     attempt = 0
     backoff = 0.5
-    last_exc: Optional[BaseException] = None
-    last_resp: Optional[httpx.Response] = None
-    status_code: Optional[int] = None
+    last_exc: BaseException | None = None
+    last_resp: httpx.Response | None = None
+    status_code: int | None = None
     latency_ms: int = 0
     while True:
         t0 = time.monotonic()
@@ -451,72 +986,452 @@ async def _http_get_with_retries(
         # fabricate minimal response object for downstream code paths
         req = httpx.Request("GET", url)
         resp = httpx.Response(status_code=599, request=req)
-        return _HttpAttemptResult(resp, latency_ms, status_code, "timeout" if isinstance(last_exc, httpx.TimeoutException) else "error")
+        return _HttpAttemptResult(
+            resp,
+            latency_ms,
+            status_code,
+            "timeout" if isinstance(last_exc, httpx.TimeoutException) else "error",
+        )
     return _HttpAttemptResult(last_resp, latency_ms, status_code, None)
 
 
-async def enrich_one(ioc: str, providers: List[BaseProvider], cache: Cache, ttls: Dict[str, int], use_cache: bool, refresh: bool, timeout: float, concurrency: int, client: Optional[httpx.AsyncClient] = None, sem: Optional[asyncio.Semaphore] = None) -> AggregatedResult:
-    valid, t, norm, err = classify_ioc(ioc)
+async def enrich_one(
+    ioc: str,
+    providers: list[BaseProvider],
+    cache: Cache | AsyncCache,
+    ttls: dict[str, int],
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    concurrency: int,
+    client: httpx.AsyncClient | None = None,
+    sem: asyncio.Semaphore | None = None,
+    negatives: NegativeFilter | None = None,
+    prefetched: dict[tuple[str, str], ProviderResult] | None = None,
+    prefilter: Prefilter | None = None,
+    ipasn: IpAsnDb | None = None,
+) -> AggregatedResult:
+    canon = normalize_ioc(ioc)
+    valid, t, norm, err = classify_ioc(canon)
     if not valid:
-        return AggregatedResult(ioc, "invalid", "INCONCLUSIVE", 0.0, [ProviderResult("validation", "INCONCLUSIVE", 0.0, [err or "invalid"], None, None, False)])
+        return AggregatedResult(
+            ioc,
+            "invalid",
+            "INCONCLUSIVE",
+            0.0,
+            [
+                ProviderResult(
+                    "validation", "INCONCLUSIVE", 0.0, [err or "invalid"], None, None, False
+                )
+            ],
+        )
+    if prefilter is not None:
+        label = prefilter.match(norm, t)
+        if label is not None:
+            return prefilter.result(norm, t, label)
+    info: dict[str, str] = {}
+    if ipasn is not None and t == "ip":
+        hit = ipasn.lookup(norm)
+        if hit is not None:
+            info = hit.to_info()
+    original = ioc.strip()
+    if norm != original and norm != original.lower():
+        info["input"] = original  # refanged or canonicalized: keep what the user pasted
     _sem = sem or asyncio.Semaphore(max(1, concurrency))
     async with _sem:
         if client is None:
             async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as c:
                 tasks = [
-                    fetch_with_cache(p, cache, c, norm, t, ttls.get(p.name, 3600), use_cache, refresh, timeout)
+                    fetch_with_cache(
+                        p,
+                        cache,
+                        c,
+                        norm,
+                        t,
+                        ttls.get(p.name, 3600),
+                        use_cache,
+                        refresh,
+                        timeout,
+                        negatives,
+                        prefetched,
+                    )
                     for p in providers
                     if p.available() and p.supports(t)
                 ]
                 if not tasks:
-                    return AggregatedResult(norm, t, "INCONCLUSIVE", 0.0, [])
+                    return AggregatedResult(norm, t, "INCONCLUSIVE", 0.0, [], info)
                 results = await asyncio.gather(*tasks, return_exceptions=True)
         else:
             tasks = [
-                fetch_with_cache(p, cache, client, norm, t, ttls.get(p.name, 3600), use_cache, refresh, timeout)
+                fetch_with_cache(
+                    p,
+                    cache,
+                    client,
+                    norm,
+                    t,
+                    ttls.get(p.name, 3600),
+                    use_cache,
+                    refresh,
+                    timeout,
+                    negatives,
+                    prefetched,
+                )
                 for p in providers
                 if p.available() and p.supports(t)
             ]
             if not tasks:
-                return AggregatedResult(norm, t, "INCONCLUSIVE", 0.0, [])
+                return AggregatedResult(norm, t, "INCONCLUSIVE", 0.0, [], info)
             results = await asyncio.gather(*tasks, return_exceptions=True)
-    prs: List[ProviderResult] = []
+    prs: list[ProviderResult] = []
     for r in results:
         if isinstance(r, Exception):
             prs.append(ProviderResult("unknown", "INCONCLUSIVE", 0.0, [str(r)], None, None, False))
         else:
             # mypy: ensure r is ProviderResult
             prs.append(cast(ProviderResult, r))
-    return aggregate(norm, t, prs)
+    ar = aggregate(norm, t, prs)
+    ar.info.update(info)
+    return ar
+
+
+async def _prefetch_pending(
+    iocs: list[str],
+    providers: list[BaseProvider],
+    cache: AsyncCache,
+    ttls: dict[str, int],
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    prefilter: Prefilter | None = None,
+    classified: Sequence[tuple[str, str]] | None = None,
+) -> dict[tuple[str, str], ProviderResult]:
+    """Run each provider's bulk prefetch over the valid IOCs it would otherwise query one by one.
+
+    ``classified`` is the (type, value) of each IOC when the caller has it already.
+    """
+    pending: list[tuple[str, str]] = []
+    for t, norm in classified if classified is not None else classify_lines(iocs):
+        if t == "invalid":
+            continue
+        if prefilter is None or prefilter.match(norm, t) is None:
+            pending.append((norm, t))
+    out: dict[tuple[str, str], ProviderResult] = {}
+    for p in providers:
+        if type(p).prefetch is BaseProvider.prefetch or not p.available():
+            continue
+        mine = list(dict.fromkeys((ioc, t) for ioc, t in pending if p.supports(t)))
+        if use_cache and not refresh and mine:
+            hits = await cache.get_many([(p.name, ioc) for ioc, _ in mine], ttls.get(p.name, 3600))
+            mine = [(ioc, t) for ioc, t in mine if (p.name, ioc) not in hits]
+        if not mine:
+            continue
+        try:
+            got = await p.prefetch(client, mine, timeout, sem)
+        except Exception:
+            continue
+        for ioc, res in got.items():
+            out[(p.name, ioc)] = res
+    return out
+
+
+async def _unless_cancelled(
+    coro: Coroutine[Any, Any, T], cancel_cb: Callable[[], bool], interval: float = 0.1
+) -> T | None:
+    """Await ``coro`` while polling ``cancel_cb``; on cancellation cancel it and return None."""
+    if cancel_cb():
+        coro.close()
+        return None
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=interval)
+        if done:
+            return task.result()
+        if cancel_cb():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+            return None
+
+
+def _group_registrable(
+    iocs: list[str], suffixes: PublicSuffixTrie, classified: Sequence[tuple[str, str]] | None = None
+) -> tuple[list[str], list[tuple[int, str | None]], list[tuple[str, str]]]:
+    """Collapse domains sharing a registrable domain into one query.
+
+    Returns the unique queries (first-seen order), per input the index of its
+    query plus the registrable domain when the input was folded into one, and
+    the (type, value) of each query. Domains alone in their group (repeats of
+    one host count once) are queried as given; inputs with the same normalized
+    form share a query. ``classified`` is the (type, value) of each input when
+    the caller has it already.
+    """
+    if classified is None:
+        classified = classify_lines(iocs)
+    regs: list[str | None] = []
+    members: dict[str, set[str]] = {}
+    for t, norm in classified:
+        reg = suffixes.registrable_domain(norm) if t == "domain" else None
+        regs.append(reg)
+        if reg is not None:
+            members.setdefault(reg, set()).add(norm)
+    counts = {reg: len(hosts) for reg, hosts in members.items()}
+    queries: list[str] = []
+    query_types: list[tuple[str, str]] = []
+    index: dict[str, int] = {}
+    plan: list[tuple[int, str | None]] = []
+    for ioc, (t, norm), reg in zip(iocs, classified, regs, strict=True):
+        grouped = reg is not None and counts[reg] > 1
+        key = reg if grouped and reg is not None else norm
+        qi = index.get(key)
+        if qi is None:
+            qi = index[key] = len(queries)
+            queries.append(key if grouped else ioc)
+            query_types.append((t, key))
+        plan.append((qi, reg if grouped and reg != norm else None))
+    return queries, plan, query_types
 
 
 async def check_iocs(
-    iocs: List[str],
-    providers: List[BaseProvider],
+    iocs: list[str],
+    providers: list[BaseProvider],
     cache: Cache,
-    ttls: Dict[str, int],
+    ttls: dict[str, int],
     use_cache: bool,
     refresh: bool,
     timeout: float,
     concurrency: int,
-    cancel_cb: Optional[Callable[[], bool]] = None,
-) -> List[AggregatedResult]:
+    cancel_cb: Callable[[], bool] | None = None,
+    negatives: NegativeFilter | None = None,
+    prefilter: Prefilter | None = None,
+    ipasn: IpAsnDb | None = None,
+    group_by: PublicSuffixTrie | None = None,
+    store: SpillStore | None = None,
+    offload: Offloader | None = None,
+) -> Sequence[AggregatedResult]:
     """Batch-check IOCs with shared client/semaphore; optional cancel callback to stop early.
 
     cancel_cb: returns True to request cancellation between chunks.
+    negatives: optional NegativeFilter; it is saved when the run ends.
+    prefilter: optional Prefilter; matching IOCs get a local labelled result.
+    ipasn: optional offline IP-ASN table; IP results get asn/country in ``info``.
+    group_by: optional public-suffix trie; domains sharing a registrable domain
+    are looked up once (as that domain) and each input row reports the shared
+    verdict with ``info["registrable_domain"]``.
+    store: optional SpillStore; results are appended to it as each chunk
+    finishes and it is returned instead of a list, so the run need not fit in
+    memory.
+    offload: optional Offloader; the classification pre-pass over the input
+    (prefetch planning, grouping) runs on its process pool for large inputs.
+    Cache I/O goes through an AsyncCache so SQLite never blocks the event loop.
+    Before the per-IOC pass, providers may answer uncached IOCs in bulk
+    (BaseProvider.prefetch, e.g. AbuseIPDB check-block for IPs sharing a /24).
     """
-    results: List[AggregatedResult] = []
+    queries = iocs
+    plan: list[tuple[int, str | None]] | None = None
+    classified = (
+        await offload.amap(classify_lines, iocs) if offload is not None else classify_lines(iocs)
+    )
+    if group_by is not None:
+        queries, plan, classified = _group_registrable(iocs, group_by, classified)
+    results: list[AggregatedResult] | SpillStore
+    if store is None:
+        results = []
+    else:
+        # Grouped queries are fanned out to the input rows afterwards; spill them separately
+        results = (
+            store
+            if plan is None
+            else SpillStore(os.path.dirname(store.path), page_size=store.page_size)
+        )
     chunk_size = max(1, concurrency)
     sem = asyncio.Semaphore(max(1, concurrency))
-    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-        for start in range(0, len(iocs), chunk_size):
-            if cancel_cb and cancel_cb():
-                break
-            chunk = iocs[start:start + chunk_size]
-            tasks = [
-                enrich_one(ioc, providers, cache, ttls, use_cache, refresh, timeout, concurrency, client=client, sem=sem)
-                for ioc in chunk
-            ]
-            part = await asyncio.gather(*tasks)
-            results.extend(part)
-    return results 
\ No newline at end of file
+    acache = AsyncCache(cache)
+    try:
+        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+            prefetch = _prefetch_pending(
+                queries,
+                providers,
+                acache,
+                ttls,
+                use_cache,
+                refresh,
+                timeout,
+                client,
+                sem,
+                prefilter,
+                classified,
+            )
+            if cancel_cb is None:
+                prefetched = await prefetch
+            else:
+                got = await _unless_cancelled(prefetch, cancel_cb)
+                # Cancelled during the prefetch: the loop below stops before its first chunk
+                prefetched = got if got is not None else {}
+            for start in range(0, len(queries), chunk_size):
+                if cancel_cb and cancel_cb():
+                    break
+                chunk = queries[start:start + chunk_size]
+                tasks = [
+                    enrich_one(
+                        ioc,
+                        providers,
+                        acache,
+                        ttls,
+                        use_cache,
+                        refresh,
+                        timeout,
+                        concurrency,
+                        client=client,
+                        sem=sem,
+                        negatives=negatives,
+                        prefetched=prefetched,
+                        prefilter=prefilter,
+                        ipasn=ipasn,
+                    )
+                    for ioc in chunk
+                ]
+                part = await asyncio.gather(*tasks)
+                results.extend(part)
+    finally:
+        await acache.aclose()
+        if negatives is not None:
+            try:
+                negatives.save()
+            except OSError:
+                pass
+    if plan is None:
+        return results
+    # Fan grouped results back out in input order; on cancel only finished queries appear
+    out: list[AggregatedResult] | SpillStore = [] if store is None else store
+    try:
+        for ioc, (qi, reg) in zip(iocs, plan, strict=True):
+            if qi >= len(results):
+                continue
+            ar = results[qi]
+            if reg is None:
+                out.append(ar)
+                continue
+            _, t, norm, _ = classify_ioc(normalize_ioc(ioc))
+            out.append(
+                AggregatedResult(
+                    norm,
+                    t,
+                    ar.status,
+                    ar.score,
+                    list(ar.providers),
+                    {**ar.info, "registrable_domain": reg},
+                )
+            )
+    finally:
+        if isinstance(results, SpillStore) and results is not store:
+            results.close()
+    return out
+
+
+async def _aiter_iocs(iocs: Iterable[str] | AsyncIterable[str], batch: int) -> AsyncIterator[str]:
+    """Async view of ``iocs``; sync iterators advance in a worker thread, ``batch`` at a time."""
+    if isinstance(iocs, AsyncIterable):
+        async for ioc in iocs:
+            yield ioc
+        return
+    it: Iterator[str] = iter(iocs)
+    while True:
+        chunk = await asyncio.to_thread(lambda: list(islice(it, batch)))
+        if not chunk:
+            return
+        for ioc in chunk:
+            yield ioc
+
+
+async def enrich_stream(
+    iocs: Iterable[str] | AsyncIterable[str],
+    providers: list[BaseProvider],
+    cache: Cache,
+    ttls: dict[str, int],
+    use_cache: bool,
+    refresh: bool,
+    timeout: float,
+    concurrency: int,
+    negatives: NegativeFilter | None = None,
+    prefilter: Prefilter | None = None,
+    ipasn: IpAsnDb | None = None,
+    window: int = 0,
+    sem: asyncio.Semaphore | None = None,
+) -> AsyncGenerator[AggregatedResult, None]:
+    """Enrich a lazily produced IOC stream, yielding results as they complete.
+
+    Unlike check_iocs the input is never materialized: at most ``window``
+    (default 4 x concurrency) IOCs are read ahead or in flight, so memory stays
+    flat for inputs of any length. Input is consumed by a feeder task, so a
+    slow or endless source (a followed log) never delays finished results, and
+    a full window pushes back on the source. Sync iterables (e.g.
+    extract.extract_iocs over a multi-GB log) are pulled from a worker thread so
+    reading never blocks the event loop. Results arrive in completion order.
+    Closing the generator early cancels the in-flight lookups.
+    sem: optional semaphore shared by several concurrent streams, so they draw
+    from one lookup budget instead of ``concurrency`` each.
+    """
+    window = window or 4 * max(1, concurrency)
+    if sem is None:
+        sem = asyncio.Semaphore(max(1, concurrency))
+    slots = asyncio.Semaphore(window)
+    acache = AsyncCache(cache)
+    finished: asyncio.Queue[asyncio.Task[AggregatedResult] | None] = asyncio.Queue()
+    tasks: set[asyncio.Task[AggregatedResult]] = set()
+    feeder: asyncio.Task[None] | None = None
+    try:
+        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+
+            async def feed() -> None:
+                try:
+                    async for ioc in _aiter_iocs(iocs, window):
+                        await slots.acquire()
+                        task = asyncio.create_task(
+                            enrich_one(
+                                ioc,
+                                providers,
+                                acache,
+                                ttls,
+                                use_cache,
+                                refresh,
+                                timeout,
+                                concurrency,
+                                client=client,
+                                sem=sem,
+                                negatives=negatives,
+                                prefilter=prefilter,
+                                ipasn=ipasn,
+                            )
+                        )
+                        tasks.add(task)
+                        task.add_done_callback(finished.put_nowait)
+                finally:
+                    finished.put_nowait(None)
+
+            feeder = asyncio.create_task(feed())
+            input_done = False
+            while not (input_done and not tasks):
+                task = await finished.get()
+                if task is None:
+                    input_done = True
+                    continue
+                tasks.discard(task)
+                slots.release()
+                yield task.result()
+            await feeder  # re-raise a failed source (e.g. ExtractError)
+    finally:
+        if feeder is not None and not feeder.done():
+            feeder.cancel()
+        for task in tasks:
+            task.cancel()
+        leftovers = [t for t in (feeder, *tasks) if t is not None]
+        if leftovers:
+            await asyncio.gather(*leftovers, return_exceptions=True)
+        await acache.aclose()
+        if negatives is not None:
+            try:
+                negatives.save()
+            except OSError:
+                pass
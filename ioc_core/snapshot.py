@@ -0,0 +1,251 @@
+"""Portable cache snapshots for sharing lookups between analysts.
+
+A snapshot is a gzip stream::
+
+    MAGIC(8) VERSION(u8) CREATED_AT(i64) SINCE(i64)
+    { FETCHED_AT(i64) LEN_PROVIDER(u16) LEN_IOC(u16) LEN_TYPE(u16) LEN_PAYLOAD(u32) bytes... }*
+    END(i64 = -1) COUNT(u64)
+    { LEN_ALIAS(u8) LEN_SHA256(u8) bytes... }* ALIAS_END(u8 = 0) ALIAS_COUNT(u64)
+
+The alias section (version 2) carries the cache's MD5/SHA-1 -> SHA-256 hash
+aliases for the exported hashes; version 1 files end after COUNT and still import.
+
+Payloads use the compact encoding from ``ioc_core.codec``. Export and import stream
+row by row, so memory stays flat regardless of snapshot size. On import the newest
+``fetched_at`` wins per (provider, ioc). Rows are staged and applied in one
+transaction after the trailers check out, so a truncated file changes nothing.
+
+Usage::
+
+    python -m ioc_core.snapshot export team.snap --since 2025-01-31T00:00:00
+    python -m ioc_core.snapshot import team.snap other.snap
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import gzip
+import struct
+import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from .cache import Cache, RawCacheRow
+
+MAGIC = b"IOCSNAP\x00"
+VERSION = 2
+_VERSIONS = (1, 2)
+
+_HEADER = struct.Struct("<8sBqq")
+_RECORD = struct.Struct("<qHHHI")
+_TRAILER = struct.Struct("<qQ")
+_END = -1
+_ALIAS_END = 0
+
+
+class SnapshotError(ValueError):
+    """Raised for unreadable, truncated or foreign snapshot files."""
+
+
+@dataclass
+class SnapshotInfo:
+    version: int
+    created_at: int
+    since: int
+
+
+def export_snapshot(cache: Cache, path: str, since: int = 0) -> int:
+    """Write rows fetched at or after ``since`` (epoch seconds) to ``path``; returns the count."""
+    count = 0
+    with gzip.open(path, "wb", compresslevel=6) as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, int(time.time()), int(since)))
+        for provider, ioc, ioc_type, fetched_at, payload in cache.iter_rows(since=since):
+            p, i, t = provider.encode("utf-8"), ioc.encode("utf-8"), ioc_type.encode("utf-8")
+            if max(len(p), len(i), len(t)) > 0xFFFF:
+                continue
+            f.write(_RECORD.pack(fetched_at, len(p), len(i), len(t), len(payload)))
+            f.write(p + i + t + payload)
+            count += 1
+        f.write(_TRAILER.pack(_END, count))
+        aliases = 0
+        for alias, sha256 in cache.iter_hash_aliases(since=since):
+            a, h = alias.encode("ascii", "replace"), sha256.encode("ascii", "replace")
+            if not 0 < len(a) <= 0xFF or len(h) > 0xFF:
+                continue
+            f.write(bytes((len(a), len(h))) + a + h)
+            aliases += 1
+        f.write(struct.pack("<BQ", _ALIAS_END, aliases))
+    return count
+
+
+def _read_exact(f: gzip.GzipFile, n: int) -> bytes:
+    buf = f.read(n)
+    if len(buf) != n:
+        raise SnapshotError("truncated snapshot")
+    return buf
+
+
+def _read_header(f: gzip.GzipFile) -> SnapshotInfo:
+    magic, version, created_at, since = _HEADER.unpack(_read_exact(f, _HEADER.size))
+    if magic != MAGIC:
+        raise SnapshotError("not an IOC cache snapshot")
+    if version not in _VERSIONS:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    return SnapshotInfo(version, created_at, since)
+
+
+def read_snapshot_info(path: str) -> SnapshotInfo:
+    try:
+        with gzip.open(path, "rb") as f:
+            return _read_header(f)
+    except (OSError, EOFError) as e:
+        raise SnapshotError(str(e)) from e
+
+
+class _SnapshotReader:
+    """Reads one snapshot front to back: ``rows()``, then ``aliases()``."""
+
+    def __init__(self, path: str):
+        try:
+            self._f = gzip.open(path, "rb")
+        except OSError as e:
+            raise SnapshotError(str(e)) from e
+        try:
+            self.info = _read_header(self._f)
+        except (OSError, EOFError) as e:
+            self._f.close()
+            raise SnapshotError(str(e)) from e
+        except SnapshotError:
+            self._f.close()
+            raise
+
+    def __enter__(self) -> _SnapshotReader:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._f.close()
+
+    def rows(self) -> Iterator[RawCacheRow]:
+        f = self._f
+        try:
+            seen = 0
+            while True:
+                head = _read_exact(f, 8)
+                (fetched_at,) = struct.unpack("<q", head)
+                if fetched_at == _END:
+                    (expected,) = struct.unpack("<Q", _read_exact(f, 8))
+                    if expected != seen:
+                        raise SnapshotError(f"row count mismatch: {seen} != {expected}")
+                    return
+                lp, li, lt, lpay = struct.unpack("<HHHI", _read_exact(f, _RECORD.size - 8))
+                body = _read_exact(f, lp + li + lt + lpay)
+                provider = body[:lp].decode("utf-8")
+                ioc = body[lp:lp + li].decode("utf-8")
+                ioc_type = body[lp + li:lp + li + lt].decode("utf-8")
+                seen += 1
+                yield provider, ioc, ioc_type, fetched_at, body[lp + li + lt :]
+        except (OSError, EOFError, UnicodeDecodeError) as e:
+            raise SnapshotError(str(e)) from e
+
+    def aliases(self) -> Iterator[tuple[str, str]]:
+        """The alias section; call after ``rows()`` is exhausted (empty for version 1)."""
+        if self.info.version < 2:
+            return
+        f = self._f
+        try:
+            seen = 0
+            while True:
+                la = _read_exact(f, 1)[0]
+                if la == _ALIAS_END:
+                    (expected,) = struct.unpack("<Q", _read_exact(f, 8))
+                    if expected != seen:
+                        raise SnapshotError(f"alias count mismatch: {seen} != {expected}")
+                    return
+                lh = _read_exact(f, 1)[0]
+                body = _read_exact(f, la + lh)
+                seen += 1
+                yield body[:la].decode("ascii"), body[la:].decode("ascii")
+        except (OSError, EOFError, UnicodeDecodeError) as e:
+            raise SnapshotError(str(e)) from e
+
+
+def iter_snapshot(path: str) -> Iterator[RawCacheRow]:
+    """Stream rows from a snapshot file. Raises SnapshotError if it is truncated."""
+    with _SnapshotReader(path) as reader:
+        yield from reader.rows()
+        for _ in reader.aliases():
+            pass
+
+
+def import_snapshot(cache: Cache, path: str) -> tuple[int, int]:
+    """Merge a snapshot (rows and hash aliases) into ``cache``. Returns (rows read, rows applied).
+
+    Nothing is applied unless the whole file reads back intact.
+    """
+    read = 0
+
+    def counted(rows: Iterator[RawCacheRow]) -> Iterator[RawCacheRow]:
+        nonlocal read
+        for row in rows:
+            read += 1
+            yield row
+
+    with _SnapshotReader(path) as reader:
+        applied = cache.merge_rows(counted(reader.rows()), aliases=reader.aliases())
+    return read, applied
+
+
+def _parse_since(value: str) -> int:
+    v = (value or "").strip()
+    if not v:
+        return 0
+    if v.lstrip("-").isdigit():
+        return int(v)
+    try:
+        ts = dt.datetime.fromisoformat(v.replace("Z", "+00:00"))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid --since value: {value}") from e
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=dt.timezone.utc)
+    return int(ts.timestamp())
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.snapshot", description="Export or import cache snapshots."
+    )
+    ap.add_argument("--cache", default=".ioc_enricher_cache.sqlite", help="local SQLite cache path")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="write rows fetched since a timestamp to a snapshot file")
+    ex.add_argument("out")
+    ex.add_argument(
+        "--since", type=_parse_since, default=0, help="epoch seconds or ISO-8601 (UTC if no offset)"
+    )
+    im = sub.add_parser(
+        "import", help="merge snapshot files into the cache (newest fetched_at wins)"
+    )
+    im.add_argument("files", nargs="+")
+    args = ap.parse_args(argv)
+
+    cache = Cache(args.cache)
+    try:
+        if args.cmd == "export":
+            n = export_snapshot(cache, args.out, since=args.since)
+            print(f"Exported {n} rows to {args.out}")
+            return 0
+        for path in args.files:
+            try:
+                read, applied = import_snapshot(cache, path)
+            except SnapshotError as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                return 1
+            print(f"{path}: read {read} rows, applied {applied}")
+        return 0
+    finally:
+        cache.conn.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,270 @@
+"""Run-scoped result storage on disk, for runs larger than memory.
+
+``SpillStore`` appends results to a private SQLite file as the engine produces
+them (``check_iocs(..., store=store)``) and reads them back a page at a time:
+only the unwritten tail and a few recently used pages are held as objects, so a
+run of any size has a bounded footprint. Indexing, slicing and iteration return
+AggregatedResult objects like a list would; ``count_status`` and ``by_ioc``
+are answered by SQL without loading rows. The file is deleted on ``close()``.
+
+One writer (the engine) and readers on another thread (the GUI) may share a
+store; every access takes the store's lock.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
+from typing import overload
+
+from .models import AggregatedResult, ProviderResult
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_MAX_PAGES = 4
+
+_SCHEMA = """
+CREATE TABLE results (
+    seq INTEGER PRIMARY KEY,
+    ioc TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX results_ioc ON results(ioc);
+CREATE INDEX results_status ON results(status);
+"""
+
+
+def _encode(ar: AggregatedResult) -> str:
+    providers = [
+        [
+            pr.provider,
+            pr.status,
+            pr.score,
+            pr.evidence,
+            pr.raw_ref,
+            pr.latency_ms,
+            pr.cached,
+            pr.fields or None,
+        ]
+        for pr in ar.providers
+    ]
+    return json.dumps(
+        [ar.ioc_type, ar.score, providers, ar.info or None],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
+def _decode(ioc: str, status: str, payload: str) -> AggregatedResult:
+    ioc_type, score, providers, info = json.loads(payload)
+    prs = [
+        ProviderResult(p, st, sc, ev, ref, lat, cached, fields or {})
+        for p, st, sc, ev, ref, lat, cached, fields in providers
+    ]
+    return AggregatedResult(ioc, ioc_type, status, score, prs, info or {})
+
+
+def _discard(conn: sqlite3.Connection, path: str) -> None:
+    conn.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SpillStore(Sequence[AggregatedResult]):
+    """Append-only result sequence backed by a temporary SQLite file.
+
+    ``directory`` is where the file is created (default: the system temp dir).
+    Appends are written in batches of ``page_size``; reads keep up to
+    ``max_pages`` full pages cached.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        max_pages: int = DEFAULT_MAX_PAGES,
+    ):
+        if page_size < 1:
+            raise ValueError("page_size must be >= 1")
+        fd, self.path = tempfile.mkstemp(prefix="ioc-run-", suffix=".sqlite", dir=directory)
+        os.close(fd)
+        self.page_size = page_size
+        self.max_pages = max(1, max_pages)
+        self.closed = False
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # Scratch data for one run: no journal, no fsync
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(_SCHEMA)
+        # Also removes the file if the store is garbage-collected or the process exits unclosed
+        self._finalizer = weakref.finalize(self, _discard, self._conn, self.path)
+        self._written = 0
+        self._pending: list[AggregatedResult] = []
+        self._pages: OrderedDict[int, list[AggregatedResult]] = OrderedDict()
+        self._providers: dict[str, None] = {}
+
+    def __enter__(self) -> SpillStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # Writing
+
+    def append(self, ar: AggregatedResult) -> None:
+        with self._lock:
+            self._check_open()
+            self._pending.append(ar)
+            for pr in ar.providers:
+                self._providers.setdefault(pr.provider)
+            if len(self._pending) >= self.page_size:
+                self._flush()
+
+    def extend(self, results: Iterable[AggregatedResult]) -> None:
+        for ar in results:
+            self.append(ar)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._check_open()
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        start = self._written
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            "INSERT INTO results(seq, ioc, status, payload) VALUES (?, ?, ?, ?)",
+            ((start + k, ar.ioc, ar.status, _encode(ar)) for k, ar in enumerate(rows)),
+        )
+        self._conn.execute("COMMIT")
+        self._written += len(rows)
+
+    def close(self) -> None:
+        """Discard the run: close the database and delete its file."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._pending = []
+            self._pages.clear()
+            self._finalizer()
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise ValueError("SpillStore is closed")
+
+    # Reading
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._written + len(self._pending)
+
+    @overload
+    def __getitem__(self, index: int) -> AggregatedResult: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[AggregatedResult]: ...
+
+    def __getitem__(self, index: int | slice) -> AggregatedResult | list[AggregatedResult]:
+        with self._lock:
+            n = len(self)
+            if isinstance(index, slice):
+                return [self._get(i) for i in range(*index.indices(n))]
+            if index < 0:
+                index += n
+            if not 0 <= index < n:
+                raise IndexError("SpillStore index out of range")
+            return self._get(index)
+
+    def __iter__(self) -> Iterator[AggregatedResult]:
+        # Page by page, so a concurrent writer is picked up and memory stays bounded
+        page = 0
+        while True:
+            with self._lock:
+                rows = self._page(page)
+            if not rows:
+                return
+            yield from rows
+            if len(rows) < self.page_size:
+                return
+            page += 1
+
+    def _get(self, index: int) -> AggregatedResult:
+        if index >= self._written:
+            return self._pending[index - self._written]
+        page, offset = divmod(index, self.page_size)
+        return self._page(page)[offset]
+
+    def _page(self, page: int) -> list[AggregatedResult]:
+        self._check_open()
+        cached = self._pages.get(page)
+        if cached is not None:
+            self._pages.move_to_end(page)
+            return cached
+        start = page * self.page_size
+        end = start + self.page_size
+        if start >= self._written:
+            return list(self._pending[start - self._written:end - self._written])
+        rows = [
+            _decode(*row)
+            for row in self._conn.execute(
+                "SELECT ioc, status, payload FROM results WHERE seq >= ? AND seq < ? ORDER BY seq",
+                (start, end),
+            )
+        ]
+        if len(rows) == self.page_size:
+            self._pages[page] = rows
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        elif end > self._written:
+            rows.extend(self._pending[: end - self._written])
+        return rows
+
+    def ioc_at(self, index: int) -> str:
+        return self[index].ioc
+
+    def status_at(self, index: int) -> str:
+        return self[index].status
+
+    def count_status(self, *statuses: str) -> int:
+        """Number of results whose aggregate status is one of ``statuses``."""
+        with self._lock:
+            self._check_open()
+            if not statuses:
+                return 0
+            self._flush()
+            # Only "?" placeholders are formatted in; the statuses are bound
+            marks = ",".join("?" * len(statuses))
+            sql = f"SELECT COUNT(*) FROM results WHERE status IN ({marks})"  # noqa: S608
+            row = self._conn.execute(sql, statuses).fetchone()
+            return int(row[0])
+
+    def by_ioc(self, ioc: str) -> list[AggregatedResult]:
+        """Results for ``ioc``, in insertion order."""
+        with self._lock:
+            self._check_open()
+            self._flush()
+            return [
+                _decode(*row)
+                for row in self._conn.execute(
+                    "SELECT ioc, status, payload FROM results WHERE ioc = ? ORDER BY seq", (ioc,)
+                )
+            ]
+
+    def provider_names(self) -> list[str]:
+        """Providers that answered any result, in first-seen order."""
+        with self._lock:
+            return list(self._providers)
@@ -0,0 +1,473 @@
+"""Local, indexed mirror of the ThreatFox bulk exports.
+
+ThreatFox publishes its IOC database as bulk exports (CSV or JSON, optionally
+zipped). ``ThreatFoxMirror`` ingests them into SQLite keyed by (ioc, type) so
+``ThreatFoxProvider`` can answer from disk instead of one POST per IOC. Load a
+full export once, then apply the "recent" export periodically; each ingest
+records a sync time and the provider falls back to the API when the mirror is
+older than its freshness budget.
+
+Export IOC types are mapped onto ours: ``ip:port`` -> ip (port dropped),
+``md5_hash``/``sha1_hash``/``sha256_hash`` -> hash, ``domain`` and ``url`` as-is.
+Values are stored as ``normalize_ioc`` spells them, so they match the keys the
+engine looks up.
+
+Both CSV and JSON exports are parsed incrementally, so memory stays flat on the
+full export. A JSON export is read one top-level entry at a time (one IOC id's
+records, or one record of a list); a single entry larger than 64 MiB is
+rejected as malformed.
+
+Usage::
+
+    python -m ioc_core.threatfox_mirror ingest --full full.csv.zip
+    python -m ioc_core.threatfox_mirror ingest recent.csv
+    python -m ioc_core.threatfox_mirror sync            # download + ingest "recent"
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections.abc import Iterable, Iterator
+from typing import IO, Any
+
+import httpx
+
+from .models import normalize_ioc
+
+EXPORT_URLS = {
+    "full": "https://threatfox.abuse.ch/export/csv/full/",
+    "recent": "https://threatfox.abuse.ch/export/csv/recent/",
+}
+
+# Column order of the CSV exports (the header is a "#" comment line)
+CSV_COLUMNS = [
+    "first_seen_utc",
+    "ioc_id",
+    "ioc_value",
+    "ioc_type",
+    "threat_type",
+    "fk_malware",
+    "malware_alias",
+    "malware_printable",
+    "last_seen_utc",
+    "confidence_level",
+    "reference",
+    "tags",
+    "anonymous",
+    "reporter",
+]
+
+_TYPE_MAP = {
+    "ip:port": "ip",
+    "domain": "domain",
+    "url": "url",
+    "md5_hash": "hash",
+    "sha1_hash": "hash",
+    "sha256_hash": "hash",
+}
+
+_BATCH = 5000
+_JSON_READ_SIZE = 1 << 20
+_MAX_JSON_ENTRY = 64 << 20
+
+# (id, ioc, type, confidence, record json)
+MirrorRow = tuple[int | None, str, str, int, str]
+
+
+class ThreatFoxMirrorError(ValueError):
+    """Raised for export files that cannot be parsed."""
+
+
+def _clean(v: Any) -> str:
+    s = "" if v is None else str(v).strip()
+    return "" if s in ("None", "null") else s
+
+
+def normalize_export_record(rec: dict[str, Any]) -> MirrorRow | None:
+    """Map one export record (CSV row or JSON object) to a mirror row, or None to skip it."""
+    t = _TYPE_MAP.get(_clean(rec.get("ioc_type")).lower())
+    value = _clean(rec.get("ioc_value") or rec.get("ioc"))
+    if t is None or not value:
+        return None
+    if t == "ip":
+        value = value.rsplit(":", 1)[0] if value.count(":") == 1 else value
+    else:
+        value = normalize_ioc(value)
+    try:
+        conf = int(_clean(rec.get("confidence_level")) or 0)
+    except ValueError:
+        conf = 0
+    raw_tags = rec.get("tags")
+    if isinstance(raw_tags, list):
+        tags = [str(x) for x in raw_tags if _clean(x)]
+    else:
+        tags = [x.strip() for x in _clean(raw_tags).split(",") if x.strip()]
+    ioc_id_s = _clean(rec.get("ioc_id") or rec.get("id"))
+    ioc_id = int(ioc_id_s) if ioc_id_s.isdigit() else None
+    record = {
+        "malware": _clean(rec.get("fk_malware") or rec.get("malware")),
+        "malware_printable": _clean(rec.get("malware_printable")),
+        "tags": tags,
+        "confidence_level": conf,
+        "threat_type": _clean(rec.get("threat_type")),
+        "first_seen": _clean(rec.get("first_seen_utc") or rec.get("first_seen")),
+        "last_seen": _clean(rec.get("last_seen_utc") or rec.get("last_seen")),
+        "reference": _clean(rec.get("reference"))
+        or (f"https://threatfox.abuse.ch/ioc/{ioc_id}/" if ioc_id else ""),
+    }
+    if record["malware"] == "unknown":
+        record["malware"] = ""
+    return ioc_id, value, t, conf, json.dumps(record, separators=(",", ":"))
+
+
+def _iter_csv(text: IO[str]) -> Iterator[dict[str, Any]]:
+    columns = CSV_COLUMNS
+    rows = csv.reader(text, skipinitialspace=True)
+    for row in rows:
+        if not row:
+            continue
+        if row[0].startswith("#"):
+            # Header comment: '# "first_seen_utc","ioc_id",...'
+            head = [c.strip().lstrip("#").strip().strip('"') for c in row]
+            if "ioc_value" in head and "ioc_type" in head:
+                columns = head
+            continue
+        yield dict(zip(columns, row, strict=False))
+
+
+class _JsonStream:
+    """Pull-parser over JSON text: walks the outer containers by hand and decodes
+    each inner value with ``raw_decode`` from a sliding buffer."""
+
+    def __init__(self, text: IO[str]):
+        self.text = text
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.text.read(_JSON_READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos:
+            self.buf, self.pos = self.buf[self.pos :], 0
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at the end of input), not consumed."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ThreatFoxMirrorError(f"invalid JSON export: expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        while True:
+            self.peek()
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if len(self.buf) - self.pos > _MAX_JSON_ENTRY or not self._fill():
+                    raise ThreatFoxMirrorError(f"invalid JSON export: {e}") from e
+                continue
+            # A value ending exactly at the buffer edge (e.g. a number) may go on in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def items(self) -> Iterator[Any]:
+        """Values of the array starting at the cursor."""
+        self.take("[")
+        while True:
+            c = self.peek()
+            if c == "]":
+                self.pos += 1
+                return
+            if c == ",":
+                self.pos += 1
+                continue
+            if not c:
+                raise ThreatFoxMirrorError("invalid JSON export: unterminated array")
+            yield self.value()
+
+
+def _iter_json(text: IO[str]) -> Iterator[dict[str, Any]]:
+    stream = _JsonStream(text)
+    first = stream.peek()
+    if first == "[":
+        for rec in stream.items():
+            if isinstance(rec, dict):
+                yield rec
+        return
+    if first != "{":
+        raise ThreatFoxMirrorError("unexpected JSON export layout")
+    stream.take("{")
+    while True:
+        c = stream.peek()
+        if c == "}":
+            return
+        if c == ",":
+            stream.pos += 1
+            continue
+        if not c:
+            raise ThreatFoxMirrorError("invalid JSON export: unterminated object")
+        key = stream.value()
+        if not isinstance(key, str):
+            raise ThreatFoxMirrorError("invalid JSON export: object key is not a string")
+        stream.take(":")
+        if key == "data" and stream.peek() == "[":
+            # API style: {"query_status": ..., "data": [record, ...]}
+            for rec in stream.items():
+                if isinstance(rec, dict):
+                    yield rec
+            continue
+        # Export style: {"<ioc_id>": [record, ...], ...}
+        recs = stream.value()
+        for rec in recs if isinstance(recs, list) else [recs]:
+            if isinstance(rec, dict):
+                yield {"ioc_id": key, **rec}
+
+
+def _looks_like_json(raw: IO[bytes]) -> bool:
+    head = raw.read(64).lstrip(b"\xef\xbb\xbf \t\r\n")
+    return head[:1] in (b"{", b"[")
+
+
+def iter_export(path: str) -> Iterator[dict[str, Any]]:
+    """Stream raw records from a ThreatFox export (CSV/JSON, plain or zipped)."""
+    with open(path, "rb") as f:
+        is_zip = f.read(2) == b"PK"
+    if is_zip:
+        with zipfile.ZipFile(path) as zf:
+            members = [n for n in zf.namelist() if n.lower().endswith((".csv", ".json", ".txt"))]
+            if not members:
+                raise ThreatFoxMirrorError("zip export has no CSV/JSON member")
+            with zf.open(members[0]) as raw:
+                as_json = _looks_like_json(raw)
+            with zf.open(members[0]) as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+                yield from (_iter_json(text) if as_json else _iter_csv(text))
+        return
+    with open(path, "rb") as raw:
+        as_json = _looks_like_json(raw)
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as f_text:
+        yield from (_iter_json(f_text) if as_json else _iter_csv(f_text))
+
+
+class ThreatFoxMirror:
+    """SQLite store of ThreatFox export records.
+
+    Tables: iocs(id INTEGER PRIMARY KEY, ioc TEXT, type TEXT, confidence INTEGER, record TEXT)
+    indexed on (ioc, type); meta(key TEXT PRIMARY KEY, value TEXT) holding sync times.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS iocs (id INTEGER PRIMARY KEY, ioc TEXT NOT NULL, "
+            "type TEXT NOT NULL, confidence INTEGER, record TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_iocs_lookup ON iocs(ioc, type)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return int(self.conn.execute("SELECT COUNT(*) FROM iocs").fetchone()[0])
+
+    def _meta(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return None if row is None else str(row[0])
+
+    def synced_at(self) -> int | None:
+        """Epoch seconds of the last ingest, or None if no full export was loaded yet."""
+        with self.lock:
+            full, last = self._meta("full_synced_at"), self._meta("synced_at")
+        if full is None or last is None:
+            return None
+        return int(last)
+
+    def is_fresh(self, max_age: int) -> bool:
+        ts = self.synced_at()
+        return ts is not None and int(time.time()) - ts <= max_age
+
+    def ingest_records(self, records: Iterable[dict[str, Any]], full: bool = False) -> int:
+        """Upsert export records in one transaction; ``full`` replaces the whole table.
+
+        Returns the number of records stored.
+        """
+        count = 0
+        batch: list[MirrorRow] = []
+        sql = (
+            "INSERT OR REPLACE INTO iocs (id, ioc, type, confidence, record) VALUES (?, ?, ?, ?, ?)"
+        )
+        with self.lock:
+            try:
+                if full:
+                    self.conn.execute("DELETE FROM iocs")
+                for rec in records:
+                    row = normalize_export_record(rec)
+                    if row is None:
+                        continue
+                    batch.append(row)
+                    if len(batch) >= _BATCH:
+                        self.conn.executemany(sql, batch)
+                        count += len(batch)
+                        batch.clear()
+                if batch:
+                    self.conn.executemany(sql, batch)
+                    count += len(batch)
+                now = str(int(time.time()))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_at', ?)", (now,)
+                )
+                if full:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('full_synced_at', ?)",
+                        (now,),
+                    )
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return count
+
+    def ingest(self, path: str, full: bool = False) -> int:
+        """Ingest an export file (CSV/JSON, plain or zipped). See :meth:`ingest_records`."""
+        return self.ingest_records(iter_export(path), full=full)
+
+    def lookup(self, ioc: str, ioc_type: str) -> dict[str, Any] | None:
+        """Return the highest-confidence record for the IOC (API record shape), or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT record FROM iocs WHERE ioc=? AND type=? "
+                "ORDER BY confidence DESC, id DESC LIMIT 1",
+                (ioc, ioc_type),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            rec = json.loads(row[0])
+        except ValueError:
+            return None
+        return rec if isinstance(rec, dict) else None
+
+
+async def sync_export(
+    mirror: ThreatFoxMirror,
+    client: httpx.AsyncClient,
+    full: bool = False,
+    auth_key: str | None = None,
+    timeout: float = 120.0,
+) -> int:
+    """Download the full or recent export and ingest it; returns the record count."""
+    url = EXPORT_URLS["full" if full else "recent"]
+    headers = {"Auth-Key": auth_key} if auth_key else {}
+    fd, tmp = tempfile.mkstemp(
+        prefix=".threatfox-", suffix=".export", dir=os.path.dirname(os.path.abspath(mirror.path))
+    )
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async with client.stream("GET", url, headers=headers, timeout=timeout) as r:
+                r.raise_for_status()
+                async for chunk in r.aiter_bytes():
+                    out.write(chunk)
+        return mirror.ingest(tmp, full=full)
+    finally:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def main(argv: list[str] | None = None) -> int:
+    from . import config
+
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.threatfox_mirror", description="Maintain a local ThreatFox mirror."
+    )
+    ap.add_argument(
+        "--db",
+        default=config.threatfox_mirror_path(dict(os.environ)) or config.THREATFOX_MIRROR_PATH,
+        help="mirror SQLite path",
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="load export files (CSV/JSON, plain or zipped)")
+    ing.add_argument("files", nargs="+")
+    ing.add_argument(
+        "--full",
+        action="store_true",
+        help="first file is a full export: replace the mirror contents",
+    )
+    sy = sub.add_parser("sync", help="download and ingest an export from threatfox.abuse.ch")
+    sy.add_argument(
+        "--full", action="store_true", help="download the full export instead of the recent one"
+    )
+    sub.add_parser("info", help="show row count and last sync time")
+    args = ap.parse_args(argv)
+
+    mirror = ThreatFoxMirror(args.db)
+    try:
+        if args.cmd == "ingest":
+            for i, path in enumerate(args.files):
+                try:
+                    n = mirror.ingest(path, full=args.full and i == 0)
+                except (OSError, ThreatFoxMirrorError, zipfile.BadZipFile) as e:
+                    print(f"{path}: {e}", file=sys.stderr)
+                    return 1
+                print(f"{path}: ingested {n} records")
+            return 0
+        if args.cmd == "sync":
+            import asyncio
+
+            async def _run() -> int:
+                async with httpx.AsyncClient(follow_redirects=True) as client:
+                    return await sync_export(
+                        mirror, client, full=args.full, auth_key=os.getenv("THREATFOX_AUTH_KEY")
+                    )
+
+            try:
+                n = asyncio.run(_run())
+            except (httpx.HTTPError, ThreatFoxMirrorError, zipfile.BadZipFile) as e:
+                print(f"sync failed: {e}", file=sys.stderr)
+                return 1
+            print(f"synced {n} records")
+            return 0
+        ts = mirror.synced_at()
+        synced = ts if ts is not None else "never (no full export loaded)"
+        print(f"{len(mirror)} records; last sync: {synced}")
+        return 0
+    finally:
+        mirror.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,588 @@
+"""Watch-folder ingestion: enrich IOC files dropped into a directory.
+
+Sensors drop files (IOC lists, logs, compressed archives) into a shared directory.
+Each new file is claimed by renaming it into the watcher's own
+``.ioc_watch/claimed/<pid>@<host>/``; the rename is atomic, so several watchers
+on the same directory never process a file twice. IOCs are extracted with
+``ioc_core.extract`` and enriched through one shared semaphore and cache,
+several files at a time. Results stream into an export sink as they complete
+(so a file's results are never held in memory) and land next to the input as
+``<name>.ioc.csv`` (``.ioc.json``, ``.ioc.parquet``) via a temp file and an
+atomic replace. The input then moves to ``.ioc_watch/done/`` (as ``<name>.1``
+and so on if that name is taken) and its (name, size, mtime) key is appended to
+the ``.ioc_watch/done.log`` ledger.
+
+On start, files a crashed watcher left in ``claimed/`` are adopted (moved into
+this watcher's directory, again by rename) and then finished (already in the
+ledger) or processed again (not in it). Only claims whose owner is on this host
+and no longer running are adopted; a live watcher's files are never touched.
+
+New arrivals are noticed through inotify on Linux (loaded with ctypes, no
+extra dependency) or by polling elsewhere; a polled file is picked up once it
+has not changed for ``settle`` seconds::
+
+    python -m ioc_core.watch /srv/ioc-drop --max-files 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import socket
+import struct
+import sys
+import time
+from collections.abc import Iterator
+
+from . import config
+from .cache import AsyncCache, Cache
+from .columnar import ParquetSink, pyarrow_available
+from .compiled_cache import CompiledCache
+from .export import CsvSink, JsonArraySink, ResultSink, ordered_provider_names
+from .extract import extract_iocs
+from .follow import install_stop_signals
+from .ipasn import IpAsnDb
+from .logger import get_logger
+from .negatives import NegativeFilter
+from .offload import Offloader
+from .prefilter import Prefilter, build_prefilter
+from .services import BaseProvider, build_providers, enrich_stream
+
+STATE_DIR = ".ioc_watch"
+OUTPUT_SUFFIXES = {"csv": ".ioc.csv", "json": ".ioc.json", "parquet": ".ioc.parquet"}
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_SETTLE = 1.0
+DEFAULT_MAX_FILES = 4
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_EVENT = struct.Struct("iIII")
+
+
+def _owner_tag() -> str:
+    return f"{os.getpid()}@{socket.gethostname()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this id is running on this host."""
+    if pid == os.getpid():
+        return True
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return bool(ok) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _move_unique(src: str, dst_dir: str) -> str:
+    """Move ``src`` into ``dst_dir`` without replacing a file already there.
+
+    The target name is reserved with O_EXCL first (``name``, then ``name.1``, ...),
+    so concurrent movers from other processes never overwrite each other.
+    """
+    name = os.path.basename(src)
+    for n in range(10_000):
+        dst = os.path.join(dst_dir, name if n == 0 else f"{name}.{n}")
+        try:
+            os.close(os.open(dst, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            continue
+        try:
+            os.replace(src, dst)
+        except OSError:
+            os.remove(dst)
+            raise
+        return dst
+    raise FileExistsError(f"no free name for {name} in {dst_dir}")
+
+
+def _is_candidate(name: str) -> bool:
+    """Skip dotfiles, our own outputs and obvious in-progress uploads."""
+    if name.startswith(".") or name.endswith((".tmp", ".part", ".partial", ".crdownload")):
+        return False
+    return not any(name.endswith(sfx) for sfx in OUTPUT_SUFFIXES.values())
+
+
+class DirWatcher:
+    """Wake-ups for a directory: inotify where available, otherwise plain polling."""
+
+    def __init__(
+        self, path: str, poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True
+    ):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.ready: set[str] = set()
+        self._fd: int | None = _inotify_open(path) if use_inotify else None
+        self._event: asyncio.Event | None = None
+
+    @property
+    def inotify(self) -> bool:
+        return self._fd is not None
+
+    def _on_readable(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        off = 0
+        while off + _IN_EVENT.size <= len(buf):
+            _, _, _, length = _IN_EVENT.unpack_from(buf, off)
+            name = buf[off + _IN_EVENT.size:off + _IN_EVENT.size + length].rstrip(b"\0")
+            off += _IN_EVENT.size + length
+            if name:
+                self.ready.add(os.fsdecode(name))
+        if self._event is not None:
+            self._event.set()
+
+    async def wait(self) -> None:
+        """Return after an inotify event or ``poll_interval`` seconds, whichever is first."""
+        if self._event is None:
+            self._event = asyncio.Event()
+            if self._fd is not None:
+                asyncio.get_running_loop().add_reader(self._fd, self._on_readable)
+        try:
+            await asyncio.wait_for(self._event.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+    def close(self) -> None:
+        if self._fd is not None:
+            if self._event is not None:
+                try:
+                    asyncio.get_running_loop().remove_reader(self._fd)
+                except RuntimeError:
+                    pass
+            os.close(self._fd)
+            self._fd = None
+
+
+def _inotify_open(path: str) -> int | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(path), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            os.close(fd)
+            return None
+        return int(fd)
+    except (OSError, AttributeError):
+        return None
+
+
+class DoneLedger:
+    """Append-only record of completed inputs, keyed by name, size and mtime."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._keys: set[str] = set()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._keys.update(line.rstrip("\n") for line in f if line.strip())
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def key(path: str) -> str:
+        st = os.stat(path)
+        return f"{os.path.basename(path)}\t{st.st_size}\t{st.st_mtime_ns}"
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def add(self, key: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(key + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._keys.add(key)
+
+
+class WatchFolder:
+    """Claims, enriches and exports files dropped into ``directory``."""
+
+    def __init__(
+        self,
+        directory: str,
+        providers: list[BaseProvider],
+        cache: Cache,
+        ttls: dict[str, int],
+        use_cache: bool,
+        refresh: bool,
+        timeout: float,
+        concurrency: int,
+        fmt: str = "csv",
+        max_files: int = DEFAULT_MAX_FILES,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        settle: float = DEFAULT_SETTLE,
+        negatives: NegativeFilter | None = None,
+        prefilter: Prefilter | None = None,
+        ipasn: IpAsnDb | None = None,
+        use_inotify: bool = True,
+        offload: Offloader | None = None,
+    ):
+        if fmt not in OUTPUT_SUFFIXES:
+            raise ValueError(f"unsupported output format: {fmt}")
+        if fmt == "parquet" and not pyarrow_available():
+            raise ValueError("parquet output needs the optional 'pyarrow' package")
+        self.directory = directory
+        self.providers = providers
+        self.cache = cache
+        self.ttls = ttls
+        self.use_cache = use_cache
+        self.refresh = refresh
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.fmt = fmt
+        self.max_files = max(1, max_files)
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.negatives = negatives
+        self.prefilter = prefilter
+        self.ipasn = ipasn
+        self.use_inotify = use_inotify
+        self.offload = offload
+        state = os.path.join(directory, STATE_DIR)
+        self.claimed_root = os.path.join(state, "claimed")
+        self.claimed_dir = os.path.join(self.claimed_root, _owner_tag())
+        self.done_dir = os.path.join(state, "done")
+        os.makedirs(self.claimed_dir, exist_ok=True)
+        os.makedirs(self.done_dir, exist_ok=True)
+        self.ledger = DoneLedger(os.path.join(state, "done.log"))
+        # Age lookups for CSV and Parquet sinks go through this while ``run`` is active
+        self._acache: AsyncCache | None = None
+        self.completed = 0
+        self.failed = 0
+
+    def _claim(self, name: str) -> str | None:
+        """Atomically take ``name`` out of the drop directory; None if another watcher won.
+
+        A file of the same name that this watcher is still processing is not
+        replaced; the new one stays in the drop directory until that one is done.
+        """
+        dst = os.path.join(self.claimed_dir, name)
+        if os.path.lexists(dst):
+            return None
+        try:
+            os.rename(os.path.join(self.directory, name), dst)
+        except FileNotFoundError:
+            return None
+        return dst
+
+    def _orphaned(self) -> Iterator[str]:
+        """Claimed paths whose owner is gone: a dead process on this host, or the flat layout."""
+        host = socket.gethostname()
+        try:
+            entries = sorted(os.listdir(self.claimed_root))
+        except OSError:
+            return
+        for entry in entries:
+            path = os.path.join(self.claimed_root, entry)
+            if not os.path.isdir(path):
+                yield path  # claimed before claims were kept per owner
+                continue
+            pid, _, owner_host = entry.partition("@")
+            if path == self.claimed_dir or owner_host != host or not pid.isdigit():
+                continue
+            if _pid_alive(int(pid)):
+                continue
+            try:
+                names = sorted(os.listdir(path))
+            except OSError:
+                continue
+            for name in names:
+                yield os.path.join(path, name)
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+
+    def _adopt(self) -> list[str]:
+        """Move orphaned claims into this watcher's directory; returns their new paths."""
+        adopted: list[str] = []
+        for path in self._orphaned():
+            try:
+                adopted.append(_move_unique(path, self.claimed_dir))
+            except FileNotFoundError:  # another watcher adopted it first
+                continue
+            except OSError as e:
+                get_logger().warning("watch: cannot adopt %s: %s", path, e)
+        return adopted
+
+    def _scan(self, ready: set[str]) -> Iterator[str]:
+        """Names that look complete: reported by inotify, or untouched for ``settle`` seconds."""
+        now = time.time()
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return
+        for name in names:
+            if not _is_candidate(name):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path):
+                continue
+            if name in ready or now - st.st_mtime >= self.settle:
+                yield name
+
+    def _open_sink(self, path: str) -> ResultSink:
+        names = ordered_provider_names(p.name for p in self.providers)
+        if self.fmt == "json":
+            return JsonArraySink(path)
+        if self.fmt == "parquet":
+            return ParquetSink(path, names, cache=self._acache or self.cache)
+        return CsvSink(path, names, cache=self._acache or self.cache)
+
+    async def _enrich_file(self, path: str, sem: asyncio.Semaphore) -> tuple[str, int]:
+        """Stream results for ``path`` into ``<name>.ioc.<fmt>``; returns (output path, count)."""
+        name = os.path.basename(path)
+        out = os.path.join(self.directory, name + OUTPUT_SUFFIXES[self.fmt])
+        tmp = os.path.join(self.directory, f".{name}.{os.getpid()}.tmp")
+        sink = self._open_sink(tmp)
+        try:
+            source = (ioc for ioc, _ in extract_iocs(path, offload=self.offload))
+            async for ar in enrich_stream(
+                source,
+                self.providers,
+                self.cache,
+                self.ttls,
+                self.use_cache,
+                self.refresh,
+                self.timeout,
+                self.concurrency,
+                negatives=self.negatives,
+                prefilter=self.prefilter,
+                ipasn=self.ipasn,
+                sem=sem,
+            ):
+                await sink.awrite(ar)
+            await sink.aclose()
+            os.replace(tmp, out)
+        except BaseException:
+            sink.close()
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return out, sink.count
+
+    def _finish(self, claimed: str, key: str) -> None:
+        if key not in self.ledger:
+            self.ledger.add(key)
+        _move_unique(claimed, self.done_dir)
+
+    async def process(self, claimed: str, sem: asyncio.Semaphore) -> bool:
+        """Enrich one claimed file and export its results; False on failure (file stays claimed)."""
+        name = os.path.basename(claimed)
+        log = get_logger()
+        try:
+            key = DoneLedger.key(claimed)
+            if key not in self.ledger:
+                out, count = await self._enrich_file(claimed, sem)
+                log.info("watch: %s -> %s (%d results)", name, out, count)
+            self._finish(claimed, key)
+        except Exception as e:  # keep watching; the file stays claimed and is retried on restart
+            log.warning("watch: %s failed: %s", name, e)
+            self.failed += 1
+            return False
+        self.completed += 1
+        return True
+
+    async def run(self, stop: asyncio.Event | None = None, once: bool = False) -> int:
+        """Process files until ``stop`` is set (or, with ``once``, until the directory is drained).
+
+        Returns the number of files completed in this run.
+        """
+        sem = asyncio.Semaphore(self.concurrency)
+        slots = asyncio.Semaphore(self.max_files)
+        running: set[asyncio.Task[bool]] = set()
+        watcher = DirWatcher(self.directory, self.poll_interval, self.use_inotify)
+        self._acache = AsyncCache(self.cache)
+
+        async def guarded(path: str) -> bool:
+            try:
+                return await self.process(path, sem)
+            finally:
+                slots.release()
+
+        async def launch(path: str) -> None:
+            await slots.acquire()
+            task = asyncio.create_task(guarded(path))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        os.makedirs(self.claimed_dir, exist_ok=True)
+        try:
+            # Crash recovery: our own leftovers (same pid after a restart) and dead owners' claims
+            own = [os.path.join(self.claimed_dir, n) for n in sorted(os.listdir(self.claimed_dir))]
+            for orphan in own + self._adopt():
+                await launch(orphan)
+            while stop is None or not stop.is_set():
+                ready, watcher.ready = watcher.ready, set()
+                claimed_any = False
+                for name in self._scan(ready):
+                    path = self._claim(name)
+                    if path is not None:
+                        claimed_any = True
+                        await launch(path)
+                if once and not claimed_any:
+                    break
+                if not claimed_any:
+                    await watcher.wait()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        finally:
+            for task in running:
+                task.cancel()
+            watcher.close()
+            acache, self._acache = self._acache, None
+            await acache.aclose()
+            try:
+                os.rmdir(self.claimed_dir)  # only when empty: failed files stay claimed
+            except OSError:
+                pass
+            if self.negatives is not None:
+                try:
+                    self.negatives.save()
+                except OSError:
+                    pass
+        return self.completed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m ioc_core.watch", description="Enrich IOC files dropped into a directory."
+    )
+    ap.add_argument("directory")
+    ap.add_argument(
+        "--providers",
+        default=",".join(config.DEFAULT_PROVIDERS),
+        help="comma-separated provider names",
+    )
+    ap.add_argument("--mode", choices=sorted(config.DEFAULT_TIMEOUTS), default="normal")
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=config.DEFAULT_CONCURRENCY,
+        help="lookups in flight across all files",
+    )
+    ap.add_argument(
+        "--max-files", type=int, default=DEFAULT_MAX_FILES, help="files processed at the same time"
+    )
+    ap.add_argument("--format", choices=sorted(OUTPUT_SUFFIXES), default="csv")
+    ap.add_argument("--cache", default=config.CACHE_PATH, help="local SQLite cache path")
+    ap.add_argument(
+        "--poll", type=float, default=DEFAULT_POLL_INTERVAL, help="seconds between directory scans"
+    )
+    ap.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE,
+        help="seconds a polled file must be unchanged",
+    )
+    ap.add_argument("--no-inotify", action="store_true", help="always poll")
+    ap.add_argument("--once", action="store_true", help="process what is there, then exit")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=config.offload_workers(dict(os.environ)),
+        help="processes scanning dropped files in parallel (default: IOC_OFFLOAD_WORKERS, else 0)",
+    )
+    args = ap.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        print(f"not a directory: {args.directory}", file=sys.stderr)
+        return 2
+    if args.format == "parquet" and not pyarrow_available():
+        print("--format parquet needs the optional 'pyarrow' package", file=sys.stderr)
+        return 2
+    env = dict(os.environ)
+    try:
+        providers = build_providers(
+            [n.strip() for n in args.providers.split(",") if n.strip()], env
+        )
+        prefilter = build_prefilter(
+            config.allowlist_file(env), config.prefilter_cidrs(env), config.public_suffix_file(env)
+        )
+        ipasn_path = config.ipasn_db_path(env)
+        ipasn = IpAsnDb(ipasn_path) if ipasn_path else None
+        compiled_path = config.compiled_cache_path(env)
+        compiled = CompiledCache(compiled_path) if compiled_path else None
+    except (OSError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    trust_hours = config.negative_trust_hours(env)
+    negatives = NegativeFilter(config.NEGATIVE_FILTER_DIR, trust_hours) if trust_hours > 0 else None
+    use_cache, refresh, timeout = config.resolve_mode(args.mode)
+    cache = Cache(args.cache)
+    cache.attach_compiled(compiled)
+    offload = Offloader(max(0, args.workers))
+    wf = WatchFolder(
+        args.directory,
+        providers,
+        cache,
+        dict(config.DEFAULT_TTLS),
+        use_cache,
+        refresh,
+        timeout,
+        args.concurrency,
+        fmt=args.format,
+        max_files=args.max_files,
+        poll_interval=args.poll,
+        settle=args.settle,
+        negatives=negatives,
+        prefilter=prefilter,
+        ipasn=ipasn,
+        use_inotify=not args.no_inotify,
+        offload=offload,
+    )
+
+    async def run() -> int:
+        stop = asyncio.Event()
+        install_stop_signals(stop)
+        return await wf.run(stop, once=args.once)
+
+    try:
+        n = asyncio.run(run())
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        offload.close()
+        if ipasn is not None:
+            ipasn.close()
+        if compiled is not None:
+            compiled.close()
+        cache.conn.close()
+    print(f"processed {n} file(s), {wf.failed} failed", file=sys.stderr)
+    return 1 if wf.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,35 +7,119 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Callable, Awaitable
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any
 
-from PySide6.QtCore import Qt, QSettings, QPoint
-from PySide6.QtGui import QStandardItem, QStandardItemModel, QKeySequence, QAction
+from PySide6.QtCore import QModelIndex, QPersistentModelIndex, QPoint, QSettings, Qt
+from PySide6.QtGui import QAction, QKeySequence, QStandardItem, QStandardItemModel
 from PySide6.QtWidgets import (
-    QWidget,
-    QVBoxLayout,
-    QHBoxLayout,
-    QLabel,
-    QPlainTextEdit,
-    QPushButton,
-    QGroupBox,
     QCheckBox,
-    QTableView,
-    QFrame,
     QFileDialog,
-    QSplitter,
+    QGroupBox,
+    QHBoxLayout,
     QHeaderView,
+    QLabel,
     QMenu,
     QMessageBox,
+    QPlainTextEdit,
+    QPushButton,
+    QSplitter,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
 )
 
 from ioc_core import config as core_config
-from ioc_core.cache import Cache as CoreCache
 from ioc_core import services as core_services
+from ioc_core.cache import Cache as CoreCache
+from ioc_core.compiled_cache import CompiledCache, CompiledCacheError
 from ioc_core.export import export_results_csv
-from qt_app.workers import AsyncTaskWorker
-from qt_app.ui import BusyOverlay, ToastManager
+from ioc_core.extract import extract_iocs
+from ioc_core.ipasn import IpAsnDb, IpAsnError
 from ioc_core.logger import get_logger
+from ioc_core.models import (
+    IOC_INVALID,
+    IOC_TYPE_NAMES,
+    PublicSuffixTrie,
+    ResultStore,
+    classify_many,
+    default_public_suffixes,
+    normalize_ioc,
+)
+from ioc_core.negatives import NegativeFilter
+from ioc_core.offload import Offloader
+from ioc_core.prefilter import Prefilter, build_prefilter
+from ioc_core.spill import SpillStore
+from qt_app.ui import BusyOverlay, ToastManager
+from qt_app.workers import AsyncTaskWorker
+
+# Rows added to the table per page as it is scrolled; the full run stays on disk
+TABLE_PAGE_ROWS = 5_000
+
+# ProviderResult.fields shown in the summary pane: (field, summary key)
+_SUMMARY_FIELDS = (
+    ("country", "country"),
+    ("asn", "asn"),
+    ("isp", "isp"),
+    ("domain", "domain"),
+    ("usage_type", "usagetype"),
+    ("first_seen", "first_seen"),
+    ("last_seen", "last_seen"),
+    ("family", "family"),
+    ("tags", "tags"),
+    ("categories", "categories"),
+    ("reputation", "reputation"),
+)
+
+
+class _PagedResultModel(QStandardItemModel):
+    """Table rows for a run's results, loaded a page at a time as the view scrolls.
+
+    Rows are built from ``source`` (a list, ResultStore or SpillStore) by
+    ``row_fn`` when the view asks for them, so a run of any size can be browsed
+    without holding every row as items. A sort applies to the loaded rows and is
+    re-applied after each page.
+    """
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(0, 1, parent)
+        self._source: Sequence[Any] = ()
+        self._row_fn: Callable[[Any], list[str]] | None = None
+        self._loaded = 0
+        self._sort: tuple[int, Qt.SortOrder] | None = None
+
+    def set_source(self, source: Sequence[Any], row_fn: Callable[[Any], list[str]]) -> None:
+        self.removeRows(0, self.rowCount())
+        self._source, self._row_fn, self._loaded = source, row_fn, 0
+        self.fetchMore(QModelIndex())
+
+    def clear(self) -> None:
+        self._source, self._row_fn, self._loaded = (), None, 0
+        super().clear()
+
+    def canFetchMore(self, parent: QModelIndex | QPersistentModelIndex) -> bool:
+        return not parent.isValid() and self._loaded < len(self._source)
+
+    def fetchMore(self, parent: QModelIndex | QPersistentModelIndex) -> None:
+        if parent.isValid() or self._row_fn is None:
+            return
+        page = self._source[self._loaded:self._loaded + TABLE_PAGE_ROWS]
+        self._loaded += len(page)
+        for ar in page:
+            items = []
+            for c, val in enumerate(self._row_fn(ar)):
+                it = QStandardItem(str(val))
+                if c == 0:
+                    it.setEditable(False)
+                it.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+                items.append(it)
+            self.appendRow(items)
+        if page and self._sort is not None:
+            super().sort(*self._sort)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:
+        self._sort = (column, order)
+        super().sort(column, order)
 
 
 class IocCheckerPage(QWidget):
@@ -44,8 +128,18 @@ class IocCheckerPage(QWidget):
         self._status_cb: Callable[[str], None] = status_cb
         self._cache = CoreCache(".ioc_enricher_cache.sqlite")
         self._worker: AsyncTaskWorker | None = None
-        self._last_results: List[Any] = []
+        self._last_results: ResultStore | SpillStore = ResultStore()
+        self._run_store: SpillStore | None = None
         self._settings = QSettings("UpdatedIOCChecker", "QtApp")
+        self._prefilter: Prefilter | None = None
+        self._prefilter_key: tuple[Any, ...] = ()
+        self._ipasn: IpAsnDb | None = None
+        self._ipasn_path: str | None = None
+        self._compiled: CompiledCache | None = None
+        self._compiled_path: str | None = None
+        self._suffixes: PublicSuffixTrie | None = None
+        self._suffixes_path: str | None = None
+        self._offload: Offloader | None = None
 
         # Root layout with two-pane split (left controls, right results)
         root = QHBoxLayout(self)
@@ -123,7 +217,7 @@ class IocCheckerPage(QWidget):
         table_container.setSpacing(8)
 
         # Divider look implicitly via table frame
-        self.model = QStandardItemModel(0, 1, self)
+        self.model = _PagedResultModel(self)
         self.model.setHorizontalHeaderLabels(["IOC"]) 
         self.table = QTableView()
         self.table.setModel(self.model)
@@ -253,45 +347,24 @@ class IocCheckerPage(QWidget):
         self._empty_label.setVisible(not has_rows)
         self.table.setVisible(True)
 
-    def _info_map_from_providers(self, providers: List[Any]) -> Dict[str, str]:
-        info: Dict[str, str] = {}
-        def put(key: str, value: str) -> None:
-            if value and key not in info:
-                info[key] = value
+    def _info_map_from_providers(
+        self, providers: list[Any], local: dict[str, str] | None = None
+    ) -> dict[str, str]:
+        # Local context (offline IP-ASN table) wins over provider fields; then the first provider
+        info: dict[str, str] = dict(local or {})
         for pr in providers:
-            for ev in getattr(pr, "evidence", []) or []:
-                if not isinstance(ev, str) or "=" not in ev:
+            # Filled when the result is parsed or read from the cache
+            fields = getattr(pr, "fields", None) or {}
+            for field_name, key in _SUMMARY_FIELDS:
+                value = fields.get(field_name)
+                if value in (None, "", []) or key in info:
                     continue
-                k, v = ev.split("=", 1)
-                k = k.strip().lower()
-                v = v.strip()
-                if k in ("country", "countrycode", "country_code"):
-                    put("country", v)
-                elif k == "asn":
-                    put("asn", v)
-                elif k == "isp":
-                    put("isp", v)
-                elif k == "domain":
-                    put("domain", v)
-                elif k == "usagetype":
-                    put("usagetype", v)
-                elif k in ("first_seen", "first_seen_utc"):
-                    put("first_seen", v)
-                elif k in ("last_seen", "last_seen_utc", "lastreportedat"):
-                    put("last_seen", v)
-                elif k == "family":
-                    put("family", v)
-                elif k == "tags":
-                    put("tags", v)
-                elif k == "categories":
-                    put("categories", v)
-                elif k == "reputation":
-                    put("reputation", v)
+                info[key] = ",".join(map(str, value)) if isinstance(value, list) else str(value)
         return info
 
-    def _quick_info_from_providers(self, providers: List[Any]) -> str:
+    def _quick_info_from_providers(self, providers: list[Any]) -> str:
         info = self._info_map_from_providers(providers)
-        parts: List[str] = []
+        parts: list[str] = []
         if info.get("country"):
             parts.append(info["country"])
         if info.get("asn"):
@@ -304,48 +377,126 @@ class IocCheckerPage(QWidget):
             parts.append("tags=" + ",".join(info["tags"].split(",")[:3]))
         return " ".join(parts)
 
-    def _read_inputs(self, text: str) -> List[str]:
-        out: List[str] = []
+    def _read_inputs(self, text: str) -> list[str]:
+        out: list[str] = []
         for raw in (text or "").strip().splitlines():
             s = raw.strip()
             if not s:
                 continue
             if s.startswith("@") and os.path.isfile(s[1:]):
+                # Logs, mail dumps and gz/bz2/xz/zst archives: pull every IOC out of the text
                 try:
-                    with open(s[1:], "r", encoding="utf-8", errors="ignore") as f:
-                        for ln in f:
-                            t = ln.strip()
-                            if t:
-                                out.append(t)
+                    out.extend(ioc for ioc, _ in extract_iocs(s[1:], offload=self._get_offload()))
                 except Exception as e:
                     QMessageBox.critical(self, "File error", str(e))
                     return []
             else:
                 out.append(s)
+        # Dedup on the refanged/canonical form but keep the first spelling as typed
         seen = set()
-        dedup: List[str] = []
+        dedup: list[str] = []
         for x in out:
-            if x not in seen:
-                seen.add(x)
+            key = normalize_ioc(x)
+            if key not in seen:
+                seen.add(key)
                 dedup.append(x)
         return dedup
 
-    def _selected_providers(self) -> List[Any]:
-        provs: List[Any] = []
-        if self.chk_vt.isChecked():
-            provs.append(core_services.VirusTotalProvider(os.getenv("VIRUSTOTAL_API_KEY")))
-        if self.chk_ab.isChecked():
-            provs.append(core_services.AbuseIPDBProvider(os.getenv("ABUSEIPDB_API_KEY")))
-        if self.chk_otx.isChecked():
-            provs.append(core_services.OTXProvider(os.getenv("OTX_API_KEY") or os.getenv("ALIENVAULT_OTX_API_KEY")))
-        if self.chk_tf.isChecked():
-            provs.append(core_services.ThreatFoxProvider())
-        return provs
+    def _selected_providers(self) -> list[Any]:
+        names = [
+            name
+            for chk, name in (
+                (self.chk_vt, "virustotal"),
+                (self.chk_ab, "abuseipdb"),
+                (self.chk_otx, "otx"),
+                (self.chk_tf, "threatfox"),
+            )
+            if chk.isChecked()
+        ]
+        return list(core_services.build_providers(names, dict(os.environ)))
+
+    def _get_prefilter(self) -> Prefilter:
+        """Bogon ranges plus IOC_PREFILTER_CIDRS and the IOC_ALLOWLIST_FILE allowlist.
+
+        Rebuilt when either setting changes.
+        """
+        env = dict(os.environ)
+        allow_path = core_config.allowlist_file(env)
+        cidrs = core_config.prefilter_cidrs(env)
+        suffix_path = core_config.public_suffix_file(env)
+        key = (allow_path, tuple(cidrs), suffix_path)
+        if self._prefilter is None or key != self._prefilter_key:
+            try:
+                self._prefilter = build_prefilter(allow_path, cidrs, suffix_path)
+            except (OSError, ValueError) as e:
+                get_logger().warning("prefilter config ignored: %s", e)
+                self._prefilter = build_prefilter()
+            self._prefilter_key = key
+        return self._prefilter
+
+    def _get_ipasn(self) -> IpAsnDb | None:
+        """Offline IP-ASN table named by IOC_IPASN_DB, opened once per path."""
+        path = core_config.ipasn_db_path(dict(os.environ))
+        if path != self._ipasn_path:
+            if self._ipasn is not None:
+                self._ipasn.close()
+            self._ipasn, self._ipasn_path = None, path
+            if path:
+                try:
+                    self._ipasn = IpAsnDb(path)
+                except IpAsnError as e:
+                    get_logger().warning("IP-ASN table ignored: %s", e)
+        return self._ipasn
+
+    def _attach_compiled(self) -> None:
+        """Attach the compiled cache named by IOC_COMPILED_CACHE beneath the local cache."""
+        path = core_config.compiled_cache_path(dict(os.environ))
+        if path == self._compiled_path:
+            return
+        self._cache.attach_compiled(None)
+        if self._compiled is not None:
+            self._compiled.close()
+        self._compiled, self._compiled_path = None, path
+        if path:
+            try:
+                self._compiled = CompiledCache(path)
+            except CompiledCacheError as e:
+                get_logger().warning("compiled cache ignored: %s", e)
+        self._cache.attach_compiled(self._compiled)
+
+    def _get_suffixes(self) -> PublicSuffixTrie | None:
+        """Public-suffix trie for registrable-domain grouping (IOC_GROUP_REGISTRABLE), or None."""
+        env = dict(os.environ)
+        if not core_config.group_registrable(env):
+            return None
+        path = core_config.public_suffix_file(env)
+        if self._suffixes is None or path != self._suffixes_path:
+            self._suffixes = default_public_suffixes()
+            if path:
+                try:
+                    self._suffixes = PublicSuffixTrie.from_file(path)
+                except OSError as e:
+                    get_logger().warning("public suffix list ignored: %s", e)
+            self._suffixes_path = path
+        return self._suffixes
+
+    def _get_offload(self) -> Offloader | None:
+        """Process pool (IOC_OFFLOAD_WORKERS) for @file scanning and the classification pre-pass.
+
+        None when offload is off.
+        """
+        workers = core_config.offload_workers(dict(os.environ))
+        if self._offload is not None and self._offload.workers != workers:
+            self._offload.close()
+            self._offload = None
+        if self._offload is None and workers > 0:
+            self._offload = Offloader(workers)
+        return self._offload
 
     def _set_running(self, running: bool) -> None:
         self.btn_check.setEnabled(not running)
         self.btn_cancel.setEnabled(running)
-        self.btn_save.setEnabled((not running) and (self._last_results != []))
+        self.btn_save.setEnabled((not running) and bool(self._last_results))
         try:
             if running:
                 self.btn_check.setText("Checking…")
@@ -356,21 +507,34 @@ class IocCheckerPage(QWidget):
         except Exception:
             pass
 
-    def _populate_table_from_results(self, results: List[Any]) -> None:
-        self.model.removeRows(0, self.model.rowCount())
-        for ar in results:
+    def _discard_results(self) -> None:
+        """Close the previous run's on-disk results (and an unfinished run's store)."""
+        for store in (self._last_results, self._run_store):
+            if isinstance(store, SpillStore):
+                store.close()
+        self._last_results = ResultStore()
+        self._run_store = None
+
+    def _populate_table_from_results(self, results: Sequence[Any]) -> None:
+        provider_cols = []
+        for i in range(1, self.model.columnCount()):
+            txt = self.model.headerData(i, Qt.Orientation.Horizontal)
+            if txt is None:
+                continue
+            provider_cols.append(str(txt))
+
+        def row_vals(ar: Any) -> list[str]:
             per = {pr.provider: pr for pr in ar.providers}
-            row_vals: List[str] = [ar.ioc]
-            provider_cols = []
-            for i in range(1, self.model.columnCount()):
-                txt = self.model.headerData(i, Qt.Orientation.Horizontal)
-                if txt is None:
-                    continue
-                provider_cols.append(str(txt))
+            skipped = ""
+            pf = per.get("prefilter")
+            if pf is not None and pf.evidence:
+                # e.g. "prefilter=private (10.0.0.0/8)" -> "skipped: private"
+                skipped = "skipped: " + pf.evidence[0].partition("=")[2].split(" ", 1)[0]
+            vals: list[str] = [ar.ioc]
             for pname in provider_cols:
                 pr = per.get(pname)
                 if pr is None:
-                    row_vals.append("—")
+                    vals.append(skipped or "—")
                 else:
                     txt = pr.status
                     if pr.status in ("MALICIOUS", "SUSPICIOUS") and pr.score:
@@ -378,15 +542,10 @@ class IocCheckerPage(QWidget):
                             txt += f" ({int(pr.score)})"
                         except Exception:
                             pass
-                    row_vals.append(txt)
-            r = self.model.rowCount()
-            self.model.insertRow(r)
-            for c, val in enumerate(row_vals):
-                it = QStandardItem(str(val))
-                if c == 0:
-                    it.setEditable(False)
-                it.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                self.model.setItem(r, c, it)
+                    vals.append(txt)
+            return vals
+
+        self.model.set_source(results, row_vals)
         self._refresh_empty_state()
         # Restore sort if available
         try:
@@ -398,7 +557,7 @@ class IocCheckerPage(QWidget):
         except Exception:
             pass
 
-    def _update_summary(self, results: List[Any]) -> None:
+    def _update_summary(self, results: ResultStore | SpillStore) -> None:
         sel = self.table.selectionModel().selectedRows()
         if not sel:
             self.txt_summary.setPlainText("")
@@ -408,43 +567,49 @@ class IocCheckerPage(QWidget):
         idx = sel[0]
         ioc = self.model.item(idx.row(), 0).text()
         self.lbl_summary.setText(f"Summary: {ioc}")
-        lines: List[str] = []
-        for ar in results:
-            if ar.ioc == ioc:
-                lines.extend([
+        lines: list[str] = []
+        for ar in results.by_ioc(ioc)[:1]:
+            lines.extend(
+                [
                     f"IOC: {ar.ioc}",
                     f"Type: {ar.ioc_type}",
                     f"Verdict: {ar.status}",
                     f"Score: {int(ar.score)}",
-                ])
-                # Add detailed investigator info
-                info = self._info_map_from_providers(ar.providers)
-                def add_if(k: str, label: str) -> None:
-                    v = info.get(k)
-                    if v:
-                        lines.append(f"{label}: {v}")
-                add_if("country", "Country")
-                add_if("asn", "ASN")
-                add_if("isp", "ISP")
-                add_if("domain", "Domain")
-                add_if("usagetype", "Usage")
-                add_if("first_seen", "First seen")
-                add_if("last_seen", "Last seen")
-                add_if("family", "Malware family")
-                add_if("categories", "Categories")
-                add_if("tags", "Tags")
-                add_if("reputation", "Reputation")
-                parts: List[str] = []
-                for pr in ar.providers:
-                    ptxt = f"{pr.provider}={pr.status}"
-                    if pr.score:
-                        try:
-                            ptxt += f" ({int(pr.score)})"
-                        except Exception:
-                            pass
-                    parts.append(ptxt)
-                lines.append("Providers: " + ", ".join(parts))
-                break
+                ]
+            )
+            original = (getattr(ar, "info", None) or {}).get("input")
+            if original:
+                lines.append(f"Input: {original}")
+            # Add detailed investigator info
+            info = self._info_map_from_providers(ar.providers, getattr(ar, "info", None))
+
+            def add_if(k: str, label: str) -> None:
+                v = info.get(k)
+                if v:
+                    lines.append(f"{label}: {v}")
+
+            add_if("country", "Country")
+            add_if("asn", "ASN")
+            add_if("as_name", "AS owner")
+            add_if("isp", "ISP")
+            add_if("domain", "Domain")
+            add_if("usagetype", "Usage")
+            add_if("first_seen", "First seen")
+            add_if("last_seen", "Last seen")
+            add_if("family", "Malware family")
+            add_if("categories", "Categories")
+            add_if("tags", "Tags")
+            add_if("reputation", "Reputation")
+            parts: list[str] = []
+            for pr in ar.providers:
+                ptxt = f"{pr.provider}={pr.status}"
+                if pr.score:
+                    try:
+                        ptxt += f" ({int(pr.score)})"
+                    except Exception:
+                        pass
+                parts.append(ptxt)
+            lines.append("Providers: " + ", ".join(parts))
         self.txt_summary.setPlainText("\n".join(lines))
         self.btn_copy.setEnabled(True)
 
@@ -465,7 +630,7 @@ class IocCheckerPage(QWidget):
                 pass
             return
         # API key validation: if all selected need keys and none configured, block with error
-        missing: List[str] = []
+        missing: list[str] = []
         for p in providers:
             try:
                 # providers with available()==False imply missing key
@@ -476,38 +641,59 @@ class IocCheckerPage(QWidget):
                 pass
         if missing and (len(missing) == len(providers)):
             try:
-                ToastManager.instance(self).show("Missing API keys for selected providers.", "error")
+                ToastManager.instance(self).show(
+                    "Missing API keys for selected providers.", "error"
+                )
             except Exception:
                 pass
             return
         use_cache, refresh, timeout = core_config.resolve_mode("normal")
         # bypass cache removed
         ttls = dict(core_config.DEFAULT_TTLS)
+        trust_hours = core_config.negative_trust_hours(dict(os.environ))
+        negatives = (
+            NegativeFilter(core_config.NEGATIVE_FILTER_DIR, trust_hours)
+            if trust_hours > 0
+            else None
+        )
+        prefilter = self._get_prefilter()
+        ipasn = self._get_ipasn()
+        self._attach_compiled()
+        suffixes = self._get_suffixes()
+        offload = self._get_offload()
         # Table shows IOC + provider columns only (no Type/Age)
         headers = ["IOC"] + [p.name for p in providers]
         self.model.clear()
         self.model.setHorizontalHeaderLabels(headers)
         self.model.setRowCount(0)
-        self._last_results = []
+        self._discard_results()
+        # Results spill to a temporary file as they arrive, so large runs do not grow the GUI
+        store = self._run_store = SpillStore()
         self._set_running(True)
         self._update_status("Running…")
         try:
             log = get_logger()
-            types = {}
-            for s in iocs:
-                ok, t, _, _ = core_services.classify_ioc(s)  # type: ignore[attr-defined]
-                if ok:
+            types: dict[str, int] = {}
+            for code in classify_many(iocs)[0]:
+                if code != IOC_INVALID:
+                    t = IOC_TYPE_NAMES[code]
                     types[t] = types.get(t, 0) + 1
-            log.info("run start providers=%s iocs=%d types=%s", [p.name for p in providers], len(iocs), types)
+            log.info(
+                "run start providers=%s iocs=%d types=%s",
+                [p.name for p in providers],
+                len(iocs),
+                types,
+            )
         except Exception:
             pass
 
         cancel_flag = {"c": False}
+
         def cancel_cb() -> bool:
-            return bool(cancel_flag["c"]) 
+            return bool(cancel_flag["c"])
 
-        def make_coro() -> Awaitable[list[Any]]:
-            async def _inner() -> list[Any]:
+        def make_coro() -> Awaitable[Sequence[Any]]:
+            async def _inner() -> Sequence[Any]:
                 return await core_services.check_iocs(
                     iocs,
                     providers,
@@ -518,16 +704,27 @@ class IocCheckerPage(QWidget):
                     timeout,
                     concurrency=max(1, min(core_config.DEFAULT_CONCURRENCY, 4)),
                     cancel_cb=cancel_cb,
+                    negatives=negatives,
+                    prefilter=prefilter,
+                    ipasn=ipasn,
+                    group_by=suffixes,
+                    store=store,
+                    offload=offload,
                 )
+
             return _inner()
+
         # Fast path for test runner to avoid QThread timing issues
         import os as _os
+
         if _os.getenv("PYTEST_CURRENT_TEST"):
             try:
                 import asyncio as _aio
-                async def _typed_wrapper() -> list[Any]:
+
+                async def _typed_wrapper() -> Sequence[Any]:
                     coro = make_coro()
                     return await coro
+
                 results = _aio.run(_typed_wrapper())
                 self._on_results_ready(results)
             except Exception as e:
@@ -556,10 +753,14 @@ class IocCheckerPage(QWidget):
         except Exception:
             pass
 
-    def _on_results_ready(self, results: List[Any]) -> None:
-        self._last_results = results or []
+    def _on_results_ready(self, results: Sequence[Any]) -> None:
+        # Rows and summaries are read back from the run's store on demand
+        self._last_results = (
+            results if isinstance(results, SpillStore) else ResultStore(results or [])
+        )
+        self._run_store = None
         self._populate_table_from_results(self._last_results)
-        hits = sum(1 for ar in self._last_results if ar.status in ("MALICIOUS", "SUSPICIOUS"))
+        hits = self._last_results.count_status("MALICIOUS", "SUSPICIOUS")
         if self._last_results:
             self._update_status(f"Done: {hits} hit(s).")
             try:
@@ -579,7 +780,9 @@ class IocCheckerPage(QWidget):
             hv: QHeaderView = self.table.horizontalHeader()
             widths = [hv.sectionSize(i) for i in range(hv.count())]
             self._settings.setValue("ioc_checker/table_widths_v2", widths)
-            self._settings.setValue("ioc_checker/sort_col_v2", int(self.table.horizontalHeader().sortIndicatorSection()))
+            self._settings.setValue(
+                "ioc_checker/sort_col_v2", int(self.table.horizontalHeader().sortIndicatorSection())
+            )
             order_enum = self.table.horizontalHeader().sortIndicatorOrder()
             order_int = int(getattr(order_enum, "value", 0))
             self._settings.setValue("ioc_checker/sort_order_v2", order_int)
@@ -587,6 +790,9 @@ class IocCheckerPage(QWidget):
             pass
 
     def _on_error(self, msg: str) -> None:
+        if self._run_store is not None:
+            self._run_store.close()
+            self._run_store = None
         try:
             ToastManager.instance(self).show(msg or "Error", "error")
         except Exception:
@@ -603,7 +809,11 @@ class IocCheckerPage(QWidget):
             except Exception:
                 pass
             # If cancel flag was set and no results arrived
-            if hasattr(self, "_cancel_flag") and self._cancel_flag.get("c") and not self._last_results:
+            if (
+                hasattr(self, "_cancel_flag")
+                and self._cancel_flag.get("c")
+                and not self._last_results
+            ):
                 try:
                     ToastManager.instance(self).show("Cancelled.", "info")
                 except Exception:
@@ -615,7 +825,9 @@ class IocCheckerPage(QWidget):
         if not self._last_results:
             QMessageBox.warning(self, "Save CSV", "Nothing to save.")
             return
-        path, _ = QFileDialog.getSaveFileName(self, "Save CSV", "ioc_results.csv", "CSV Files (*.csv)")
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save CSV", "ioc_results.csv", "CSV Files (*.csv)"
+        )
         if not path:
             return
         try:
@@ -635,6 +847,7 @@ class IocCheckerPage(QWidget):
         self.txt_summary.selectAll()
         self.txt_summary.copy()
         from PySide6.QtGui import QTextCursor
+
         cur = self.txt_summary.textCursor()
         cur.movePosition(QTextCursor.MoveOperation.End)
         self.txt_summary.setTextCursor(cur)
@@ -654,28 +867,36 @@ class IocCheckerPage(QWidget):
         menu.addAction(act_copy_cell)
         menu.addSeparator()
         menu.addAction(act_export)
+
         def do_copy_row():
             if not idx.isValid():
                 return
             row = idx.row()
-            vals = [self.model.item(row, c).text() if self.model.item(row, c) else "" for c in range(self.model.columnCount())]
+            vals = [
+                self.model.item(row, c).text() if self.model.item(row, c) else ""
+                for c in range(self.model.columnCount())
+            ]
             self.txt_summary.setPlainText("\t".join(vals))
             self._on_copy_summary()
+
         def do_copy_cell():
             if not idx.isValid():
                 return
             it = self.model.item(idx.row(), idx.column())
             self.txt_summary.setPlainText(it.text() if it else "")
             self._on_copy_summary()
+
         def do_export():
             # reuse save csv but filter to selected row
             if not idx.isValid():
                 return
             ioc = self.model.item(idx.row(), 0).text()
-            subset = [ar for ar in self._last_results if ar.ioc == ioc]
+            subset = self._last_results.by_ioc(ioc)
             if not subset:
                 return
-            path, _ = QFileDialog.getSaveFileName(self, "Export Selected", f"{ioc}_results.csv", "CSV Files (*.csv)")
+            path, _ = QFileDialog.getSaveFileName(
+                self, "Export Selected", f"{ioc}_results.csv", "CSV Files (*.csv)"
+            )
             if not path:
                 return
             try:
@@ -683,6 +904,7 @@ class IocCheckerPage(QWidget):
                 QMessageBox.information(self, "Export", f"Saved to: {path}")
             except Exception as e:
                 QMessageBox.critical(self, "Export", str(e))
+
         act_copy_row.triggered.connect(do_copy_row)
         act_copy_cell.triggered.connect(do_copy_cell)
         act_export.triggered.connect(do_export)
@@ -701,4 +923,4 @@ class IocCheckerPage(QWidget):
                         pass
         except Exception:
             pass
-        return super().showEvent(e) 
\ No newline at end of file
+        return super().showEvent(e)
@@ -0,0 +1,74 @@
+import asyncio
+
+from ioc_core.cache import AsyncCache, Cache
+from ioc_core.models import ProviderResult
+
+
+def _payload(status="CLEAN"):
+    return ProviderResult("virustotal", status, 0.0, [], None, 5, False).to_dict()
+
+
+def test_get_many_and_set_many(tmp_path):
+    c = Cache(str(tmp_path / "c.sqlite"))
+    c.set_many([("virustotal", f"h{i}.com", "domain", _payload()) for i in range(1000)])
+    hits = c.get_many([("virustotal", f"h{i}.com") for i in range(0, 1200, 2)], 3600)
+    assert len(hits) == 500
+    assert hits[("virustotal", "h10.com")]["status"] == "CLEAN"
+    assert c.get_many([("virustotal", "h1.com")], -1) == {}
+
+
+def test_async_facade_roundtrip_and_coalescing(tmp_path):
+    c = Cache(str(tmp_path / "c.sqlite"))
+    calls = {"set_many": 0, "get_many": 0}
+    orig_set, orig_get = c.set_many, c.get_many
+
+    def counting_set(rows):
+        calls["set_many"] += 1
+        return orig_set(rows)
+
+    def counting_get(keys, max_age):
+        calls["get_many"] += 1
+        return orig_get(keys, max_age)
+
+    c.set_many, c.get_many = counting_set, counting_get
+
+    async def run():
+        ac = AsyncCache(c)
+        await asyncio.gather(
+            *[ac.set("virustotal", f"x{i}.com", "domain", _payload("MALICIOUS")) for i in range(50)]
+        )
+        got = await asyncio.gather(*[ac.get("virustotal", f"x{i}.com", 3600) for i in range(60)])
+        age = await ac.get_age("virustotal", "x1.com")
+        await ac.aclose()
+        return got, age
+
+    got, age = asyncio.run(run())
+    assert calls == {"set_many": 1, "get_many": 1}
+    assert [g["status"] for g in got[:50]] == ["MALICIOUS"] * 50
+    assert got[50:] == [None] * 10
+    assert age == 0
+    # Synchronous API still works after the facade is closed
+    assert c.get("virustotal", "x3.com", 3600)["status"] == "MALICIOUS"
+
+
+def test_async_facade_propagates_errors(tmp_path):
+    c = Cache(str(tmp_path / "c.sqlite"))
+
+    def boom(rows):
+        raise RuntimeError("disk full")
+
+    c.set_many = boom
+
+    async def run():
+        ac = AsyncCache(c)
+        try:
+            await ac.set("otx", "a.com", "domain", _payload())
+        finally:
+            await ac.aclose()
+
+    try:
+        asyncio.run(run())
+    except RuntimeError as e:
+        assert "disk full" in str(e)
+    else:
+        raise AssertionError("expected RuntimeError")
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from ioc_core.cache import Cache
+from ioc_core.codec import (
+    FLAG_ZLIB,
+    PayloadDecodeError,
+    decode_payload,
+    encode_payload,
+    is_binary_payload,
+)
+from ioc_core.models import ProviderResult, fields_from_evidence
+
+
+def _pr(**kw):
+    base = dict(
+        provider="virustotal",
+        status="MALICIOUS",
+        score=4.0,
+        evidence=["malicious=2", "categories=phishing,c2", "not found", "x=y=z", ""],
+        raw_ref="https://www.virustotal.com/gui/domain/evil.com",
+        latency_ms=321,
+        cached=False,
+    )
+    base.update(kw)
+    return ProviderResult(**base).to_dict()
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        _pr(),
+        _pr(
+            provider="custom",
+            status="WEIRD",
+            raw_ref=None,
+            latency_ms=None,
+            cached=True,
+            evidence=[],
+        ),
+        _pr(evidence=["pulse=" + "A" * 40 for _ in range(50)]),
+        _pr(evidence=["has\x1fseparator"]),
+        _pr(
+            fields={
+                "malicious": 2,
+                "categories": ["phishing", "c2"],
+                "is_public": True,
+                "country": "NL",
+            }
+        ),
+        {"status": "CLEAN", "score": 1, "extra": [1, 2]},
+    ],
+)
+def test_roundtrip(payload):
+    blob = encode_payload(payload)
+    assert is_binary_payload(blob)
+    assert decode_payload(blob) == payload
+
+
+def test_compact_is_smaller_and_compresses_large_evidence():
+    p = _pr()
+    assert len(encode_payload(p)) < len(json.dumps(p))
+    big = _pr(evidence=["pulse=" + "A" * 40 for _ in range(50)])
+    assert encode_payload(big)[3] & FLAG_ZLIB
+
+
+def test_decode_rejects_corrupt_blob():
+    blob = encode_payload(_pr())
+    with pytest.raises(ValueError):
+        decode_payload(blob[:5])
+    with pytest.raises(PayloadDecodeError):
+        decode_payload(blob[:2] + b"\x09" + blob[3:])
+
+
+def test_cache_reads_legacy_json_and_migrates(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    legacy = Cache(path, compact=False)
+    legacy.set("otx", "evil.com", "domain", _pr(provider="otx"))
+    legacy.set("otx", "good.com", "domain", _pr(provider="otx", status="CLEAN"))
+    c = Cache(path)
+    assert c.get("otx", "evil.com", 3600)["status"] == "MALICIOUS"
+    assert c.migrate_payloads(batch_size=1) == 2
+    types = {r[0] for r in c.conn.execute("SELECT typeof(payload) FROM cache")}
+    assert types == {"blob"}
+    assert c.get("otx", "good.com", 3600) == _pr(provider="otx", status="CLEAN")
+    assert c.migrate_payloads() == 0
+
+
+def test_cache_writes_blob_rows(tmp_path):
+    c = Cache(str(tmp_path / "c.sqlite"))
+    c.set("virustotal", "evil.com", "domain", _pr())
+    (payload,) = c.conn.execute("SELECT payload FROM cache").fetchone()
+    assert isinstance(payload, bytes)
+    assert c.get("virustotal", "evil.com", 3600) == _pr()
+
+
+def test_digest_keys_use_version_2():
+    blob = encode_payload(_pr(evidence=["malicious=2", "sha256=" + "a" * 64]))
+    assert blob[2] == 2 and decode_payload(blob)["evidence"][1] == "sha256=" + "a" * 64
+    assert encode_payload(_pr(evidence=["sha256"]))[2] == 1  # no "=", so not an interned key
+
+
+def test_fields_use_version_2_and_legacy_rows_recover_them():
+    assert encode_payload(_pr())[2] == 1
+    blob = encode_payload(_pr(fields={"malicious": 2}))
+    assert blob[2] == 2 and decode_payload(blob)["fields"] == {"malicious": 2}
+    legacy = [
+        "malicious=2",
+        "categories=phishing,c2",
+        "votes=mal:4/har:1",
+        "not found",
+        "bogus=1",
+        "reputation=x",
+    ]
+    assert fields_from_evidence("virustotal", legacy) == {
+        "malicious": 2,
+        "categories": ["phishing", "c2"],
+        "votes_malicious": 4,
+        "votes_harmless": 1,
+    }
+    assert fields_from_evidence("otx", ["pulses=2", "pulse=A", "pulse=B", "country=Germany"]) == {
+        "pulses": 2,
+        "pulse_names": ["A", "B"],
+        "country": "Germany",
+    }
+    assert fields_from_evidence("custom", ["k=v", "plain"]) == {"k": "v"}
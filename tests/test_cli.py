@@ -0,0 +1,158 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import time
+
+import pytest
+
+from ioc_core import cli as core_cli
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.compiled_cache import compile_cache
+from ioc_core.models import ProviderResult
+from ioc_core.services import RateLimiter
+
+INPUT = (
+    "# analyst list\n"
+    "8.8.8.8\n"
+    "hxxp://evil[.]com/a\n"
+    "\n"
+    "http://EVIL.com:80/a\n"
+    "8.8.8.8\n"
+    "not an ioc\n"
+    "44d88612fea8a8f36de82e1278abb02f\n"
+)
+
+
+class StubProvider(core_services.BaseProvider):
+    name = "stub"
+    supported = {"ip", "domain", "hash", "url"}
+
+    def __init__(self, delay=0.0):
+        super().__init__("k")
+        self.delay = delay
+        self.seen = []
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.seen.append(ioc)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status = "MALICIOUS" if ioc_type == "hash" else "CLEAN"
+        return ProviderResult(
+            self.name, status, 3.0 if status == "MALICIOUS" else 0.0, [], None, 1, False
+        )
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    prov = StubProvider()
+    monkeypatch.setattr(core_cli, "build_providers", lambda names, env: [prov])
+    monkeypatch.chdir(tmp_path)
+    return prov
+
+
+def _run(args, path):
+    out = io.StringIO()
+    code = core_cli.run_check(args + [str(path)], out=out)
+    return code, out.getvalue()
+
+
+def test_check_streams_every_format(stub, tmp_path):
+    path = tmp_path / "iocs.txt.gz"
+    with gzip.open(str(path), "wt") as f:
+        f.write(INPUT)
+
+    code, text = _run(["--format", "ndjson"], path)
+    assert code == 0
+    rows = [json.loads(line) for line in text.splitlines()]
+    assert sorted((r["type"], r["ioc"]) for r in rows) == [
+        ("hash", "44d88612fea8a8f36de82e1278abb02f"),
+        ("invalid", "not an ioc"),
+        ("ip", "8.8.8.8"),
+        ("url", "http://evil.com/a"),
+    ]
+    assert sorted(stub.seen) == ["44d88612fea8a8f36de82e1278abb02f", "8.8.8.8", "http://evil.com/a"]
+
+    code, text = _run(["--format", "csv", "--no-cache"], path)
+    table = list(csv.reader(io.StringIO(text)))
+    assert table[0] == ["type", "ioc", "status", "score", "stub"]
+    assert [
+        "hash",
+        "44d88612fea8a8f36de82e1278abb02f",
+        "MALICIOUS",
+        "3.0",
+        "MALICIOUS [3]",
+    ] in table
+    assert ["invalid", "not an ioc", "INCONCLUSIVE", "0.0", ""] in table
+
+    code, text = _run(["--format", "json", "--fail-on", "MALICIOUS"], path)
+    assert code == core_cli.EXIT_FLAGGED
+    assert len(json.loads(text)) == 4
+
+
+def test_extract_mode_and_exit_codes(stub, tmp_path, monkeypatch):
+    log = tmp_path / "proxy.log"
+    log.write_text(
+        "GET hxxp://bad[.]example/x from 10.0.0.1\nGET http://bad.example/x from 10.0.0.1\n"
+    )
+    code, text = _run(["--extract"], log)
+    assert code == 0
+    assert sorted(json.loads(line)["ioc"] for line in text.splitlines()) == [
+        "10.0.0.1",
+        "http://bad.example/x",
+    ]
+
+    assert _run([], tmp_path / "missing.txt")[0] == core_cli.EXIT_INPUT
+    monkeypatch.setattr(core_cli, "build_providers", core_services.build_providers)
+    assert _run(["--providers", "nope"], log)[0] == core_cli.EXIT_USAGE
+    assert core_cli.main(["frobnicate"]) == core_cli.EXIT_USAGE
+
+
+def test_check_reads_the_configured_compiled_cache(stub, tmp_path, monkeypatch):
+    shared = Cache(str(tmp_path / "shared.sqlite"))
+    shared.set(
+        "stub",
+        "8.8.8.8",
+        "ip",
+        ProviderResult("stub", "MALICIOUS", 3.0, [], None, 1, False).to_dict(),
+    )
+    compile_cache(shared, str(tmp_path / "shared.idx"))
+    path = tmp_path / "iocs.txt"
+    path.write_text("8.8.8.8\n")
+
+    monkeypatch.setenv("IOC_COMPILED_CACHE", str(tmp_path / "shared.idx"))
+    code, text = _run(["--format", "ndjson"], path)
+    assert code == 0 and stub.seen == []
+    assert json.loads(text)["status"] == "MALICIOUS"
+
+    monkeypatch.setenv("IOC_COMPILED_CACHE", str(tmp_path / "missing.idx"))
+    assert _run([], path)[0] == core_cli.EXIT_USAGE
+
+
+def test_deadline_stops_reading_and_keeps_finished_results(monkeypatch, tmp_path):
+    prov = StubProvider(delay=0.05)
+    monkeypatch.setattr(core_cli, "build_providers", lambda names, env: [prov])
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "many.txt"
+    path.write_text("".join(f"8.{i // 256}.{i % 256}.1\n" for i in range(2000)))
+
+    t0 = time.monotonic()
+    code, text = _run(["--deadline", "0.3", "--concurrency", "4"], path)
+    assert code == core_cli.EXIT_DEADLINE
+    assert time.monotonic() - t0 < 5
+    assert 0 < len(text.splitlines()) < 2000
+    assert all(json.loads(line)["status"] == "CLEAN" for line in text.splitlines())
+
+
+def test_rate_limiter_spaces_provider_queries():
+    async def run():
+        limiter = RateLimiter(50)
+        t0 = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+        return time.monotonic() - t0
+
+    assert asyncio.run(run()) >= 0.9 * 5 / 50  # first call is immediate, then 1/50 s apart
+    with pytest.raises(ValueError):
+        RateLimiter(0)
@@ -0,0 +1,99 @@
+import asyncio
+import importlib
+
+import pytest
+
+from ioc_core import columnar
+from ioc_core.cache import AsyncCache, Cache
+from ioc_core.export import ResultSink
+from ioc_core.models import AggregatedResult, ProviderResult
+
+RESULTS = [
+    AggregatedResult(
+        "evil.example",
+        "domain",
+        "MALICIOUS",
+        5.0,
+        [
+            ProviderResult(
+                "virustotal", "MALICIOUS", 5.0, ["malicious=5"], "ref", 120, False, {"malicious": 5}
+            )
+        ],
+        {"input": "evil[.]example"},
+    ),
+    AggregatedResult(
+        "8.8.8.8",
+        "ip",
+        "CLEAN",
+        0.0,
+        [
+            ProviderResult("virustotal", "CLEAN", 0.0, [], None, None, True),
+            ProviderResult("abuseipdb", "CLEAN", 0.0, [], None, 40, False),
+        ],
+    ),
+    AggregatedResult("1.2.3.4", "ip", "INCONCLUSIVE", 0.0, []),
+]
+
+
+def test_parquet_round_trip_in_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    cache.set("abuseipdb", "8.8.8.8", "ip", {"status": "CLEAN"})
+    path = str(tmp_path / "run.parquet")
+    with columnar.ParquetSink(
+        path, ["virustotal", "abuseipdb"], cache=cache, row_group_size=2
+    ) as sink:
+        sink.write_many(RESULTS)
+
+    assert pq.ParquetFile(path).metadata.num_row_groups == 2
+    assert list(columnar.iter_results(path, batch_size=2)) == RESULTS
+    table = columnar.read_table(
+        path, ["ioc", "virustotal_status", "abuseipdb_age_s", "abuseipdb_latency_ms"]
+    )
+    assert str(table.schema.field("virustotal_status").type).startswith("dictionary")
+    assert table.column("abuseipdb_age_s").to_pylist() == [None, 0, None]
+    assert table.column("abuseipdb_latency_ms").to_pylist() == [None, 40, None]
+
+
+def test_parquet_sink_async_writes(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    cache.set("abuseipdb", "8.8.8.8", "ip", {"status": "CLEAN"})
+    path = str(tmp_path / "run.parquet")
+
+    async def run():
+        acache = AsyncCache(cache)
+        providers = ["virustotal", "abuseipdb"]
+        sink = columnar.ParquetSink(path, providers, cache=acache, row_group_size=2)
+        assert isinstance(sink, ResultSink)
+        for r in RESULTS:
+            await sink.awrite(r)
+        await sink.aflush()
+        await sink.aclose()
+        await acache.aclose()
+
+    asyncio.run(run())
+    assert pq.ParquetFile(path).metadata.num_row_groups == 2
+    assert list(columnar.iter_results(path)) == RESULTS
+    assert columnar.read_table(path, ["abuseipdb_age_s"]).column(0).to_pylist() == [None, 0, None]
+
+
+def test_missing_pyarrow_and_foreign_files(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import pyarrow as pa
+
+    other = str(tmp_path / "other.parquet")
+    pq.write_table(pa.table({"x": [1]}), other)
+    with pytest.raises(columnar.ColumnarError):
+        list(columnar.iter_results(other))
+
+    real = importlib.import_module
+
+    def no_pyarrow(name, *a):
+        if name.startswith("pyarrow"):
+            raise ImportError(name)
+        return real(name, *a)
+
+    monkeypatch.setattr(columnar.importlib, "import_module", no_pyarrow)
+    with pytest.raises(columnar.ColumnarError, match="pyarrow"):
+        columnar.write_parquet(str(tmp_path / "x.parquet"), RESULTS, ["virustotal"])
@@ -0,0 +1,66 @@
+import pytest
+
+from ioc_core.cache import Cache
+from ioc_core.compiled_cache import CompiledCache, CompiledCacheError, compile_cache, main
+from ioc_core.models import ProviderResult
+
+
+def _payload(status, provider="virustotal"):
+    return ProviderResult(provider, status, 1.0, ["malicious=1"], None, 9, False).to_dict()
+
+
+def test_compile_and_lookup(tmp_path):
+    src = Cache(str(tmp_path / "shared.sqlite"))
+    src.set_many([("virustotal", f"h{i}.com", "domain", _payload("CLEAN")) for i in range(500)])
+    src.set("otx", "h1.com", "domain", _payload("SUSPICIOUS", "otx"))
+    out = str(tmp_path / "shared.idx")
+    assert compile_cache(src, out) == 501
+    cc = CompiledCache(out)
+    assert len(cc) == 501
+    assert cc.get("virustotal", "h42.com", 3600)["status"] == "CLEAN"
+    assert cc.get("otx", "h1.com", 3600)["status"] == "SUSPICIOUS"
+    assert cc.get("otx", "h2.com", 3600) is None
+    assert cc.lookup("virustotal", "h1.com")[0] == "domain"
+    assert cc.get_age("virustotal", "h1.com") == 0
+    cc.close()
+
+
+def test_read_tier_beneath_cache(tmp_path):
+    shared = Cache(str(tmp_path / "shared.sqlite"))
+    shared.set("virustotal", "team.com", "domain", _payload("MALICIOUS"))
+    shared.set("virustotal", "both.com", "domain", _payload("MALICIOUS"))
+    out = str(tmp_path / "shared.idx")
+    compile_cache(shared, out)
+    local = Cache(str(tmp_path / "local.sqlite"))
+    local.set("virustotal", "both.com", "domain", _payload("CLEAN"))
+    assert local.get("virustotal", "team.com", 3600) is None
+    local.attach_compiled(CompiledCache(out))
+    assert local.get("virustotal", "team.com", 3600)["status"] == "MALICIOUS"
+    assert local.get("virustotal", "both.com", 3600)["status"] == "CLEAN"  # local row wins
+    assert set(local.get_many([("virustotal", "team.com"), ("virustotal", "nope.com")], 3600)) == {
+        ("virustotal", "team.com")
+    }
+    assert local.get_age("virustotal", "team.com") == 0
+
+
+def test_empty_and_invalid_files(tmp_path):
+    out = str(tmp_path / "empty.idx")
+    assert compile_cache(Cache(":memory:"), out) == 0
+    assert CompiledCache(out).lookup("virustotal", "x") is None
+    bad = tmp_path / "bad.idx"
+    bad.write_bytes(b"garbage" * 20)
+    with pytest.raises(CompiledCacheError):
+        CompiledCache(str(bad))
+
+
+def test_build_and_lookup_commands(tmp_path, capsys):
+    src = Cache(str(tmp_path / "shared.sqlite"))
+    src.set("virustotal", "team.com", "domain", _payload("MALICIOUS"))
+    src.conn.close()
+    out = str(tmp_path / "shared.idx")
+    assert main(["build", "--cache", str(tmp_path / "shared.sqlite"), out]) == 0
+    assert "Wrote 1 entries" in capsys.readouterr().out
+    assert main(["lookup", out, "virustotal", "team.com", "nope.com"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("team.com type=domain age=0s") and lines[1] == "nope.com -"
+    assert main(["lookup", str(tmp_path / "missing.idx"), "virustotal", "x.com"]) == 1
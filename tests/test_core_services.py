@@ -1,11 +1,9 @@
 import asyncio
-import json
-
-import pytest
+import time
 
+from ioc_core import config as core_config
 from ioc_core import services as core_services
 from ioc_core.cache import Cache as CoreCache
-from ioc_core import config as core_config
 
 
 def test_check_iocs_basic(fake_httpx, tmp_path, monkeypatch):
@@ -67,8 +65,258 @@ def test_new_provider_threatfox_only(fake_httpx, tmp_path, monkeypatch):
     assert per["threatfox"].status in ("MALICIOUS", "SUSPICIOUS")
 
 
+def test_abuseipdb_groups_subnet_into_check_block(fake_httpx, tmp_path, monkeypatch):
+    cache = CoreCache(str(tmp_path / ".cache.sqlite"))
+    calls = {"block": 0, "check": 0}
+    max_ages = set()
+    real_get = core_services._http_get_with_retries
+
+    async def _get(client, url, headers=None, params=None, timeout=None):
+        max_ages.add((params or {}).get("maxAgeInDays"))
+        return await real_get(client, url, headers=headers, params=params, timeout=timeout)
+
+    monkeypatch.setattr(core_services, "_http_get_with_retries", _get)
+    block = {"data": {"networkAddress": "1.2.3.0", "reportedAddress": [
+        {"ipAddress": "1.2.3.4", "numReports": 12, "abuseConfidenceScore": 90, "countryCode": "NL"},
+    ]}}
+
+    def _block(method, url):
+        calls["block"] += 1
+        return fake_httpx_response(200, block)
+
+    def _check(method, url):
+        calls["check"] += 1
+        return fake_httpx_response(
+            200, {"data": {"abuseConfidenceScore": 0, "totalReports": 0, "isPublic": True}}
+        )
+
+    fake_httpx["set_routes"](
+        [
+            ("GET", "/api/v2/check-block", _block),
+            ("GET", "/api/v2/check", _check),
+        ]
+    )
+    iocs = [f"1.2.3.{i}" for i in range(4, 9)] + ["9.9.9.9"]
+    providers = [core_services.AbuseIPDBProvider("k", block_min_group=4)]
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    results = asyncio.run(
+        core_services.check_iocs(
+            iocs,
+            providers,
+            cache,
+            dict(core_config.DEFAULT_TTLS),
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=2,
+        )
+    )
+    assert calls == {"block": 1, "check": 1}
+    # /check-block and /check use the same report window, so batching cannot change a verdict
+    assert max_ages == {"90"}
+    per = {r.ioc: r.providers[0] for r in results}
+    assert per["1.2.3.4"].status == "MALICIOUS" and "country_code=NL" in per["1.2.3.4"].evidence
+    assert per["1.2.3.5"].status == "CLEAN" and "network=1.2.3.0/24" in per["1.2.3.5"].evidence
+    assert per["1.2.3.4"].fields == {
+        "confidence": 90,
+        "total_reports": 12,
+        "country": "NL",
+        "network": "1.2.3.0/24",
+    }
+    assert not any(e.startswith("is_public=") for e in per["1.2.3.4"].evidence)
+    assert cache.get("abuseipdb", "1.2.3.6", 3600)["status"] == "CLEAN"
+
+    # Second run is fully cached: no block or per-IP calls
+    asyncio.run(
+        core_services.check_iocs(
+            iocs,
+            providers,
+            cache,
+            dict(core_config.DEFAULT_TTLS),
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=2,
+        )
+    )
+    assert calls == {"block": 1, "check": 1}
+
+
+def test_cancel_stops_the_upfront_prefetch(tmp_path):
+    class SlowBlock(core_services.AbuseIPDBProvider):
+        started = 0
+
+        async def prefetch(self, client, iocs, timeout, sem=None):
+            SlowBlock.started += 1
+            await asyncio.sleep(30)
+            return {}
+
+        async def query(self, client, ioc, ioc_type, timeout):
+            raise AssertionError("cancelled run must not query")
+
+    cache = CoreCache(str(tmp_path / ".cache.sqlite"))
+    polls = []
+
+    def cancel():
+        polls.append(1)
+        return len(polls) > 2
+
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    started = time.monotonic()
+    results = asyncio.run(
+        core_services.check_iocs(
+            ["1.2.3.4", "1.2.3.5"],
+            [SlowBlock("k", block_min_group=2)],
+            cache,
+            {},
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=2,
+            cancel_cb=cancel,
+        )
+    )
+    assert list(results) == [] and SlowBlock.started == 1
+    assert time.monotonic() - started < 5
+
+
+def test_hash_forms_share_one_cached_lookup(fake_httpx, tmp_path):
+    cache = CoreCache(str(tmp_path / ".cache.sqlite"))
+    md5, sha1, sha256 = "a" * 32, "b" * 40, "c" * 64
+    calls = []
+    vt_file = {
+        "data": {
+            "attributes": {
+                "last_analysis_stats": {
+                    "malicious": 3,
+                    "suspicious": 0,
+                    "harmless": 0,
+                    "undetected": 10,
+                },
+                "md5": md5,
+                "sha1": sha1,
+                "sha256": sha256.upper(),
+            }
+        }
+    }
+
+    def _vt(method, url):
+        calls.append(url)
+        return fake_httpx_response(200, vt_file)
+
+    fake_httpx["set_routes"]([("GET", "/api/v3/files/", _vt)])
+    providers = [core_services.VirusTotalProvider("k")]
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+
+    def run(iocs):
+        return asyncio.run(
+            core_services.check_iocs(
+                iocs,
+                providers,
+                cache,
+                dict(core_config.DEFAULT_TTLS),
+                use_cache,
+                refresh,
+                timeout,
+                concurrency=1,
+            )
+        )
+
+    first = run([md5.upper()])
+    assert len(calls) == 1 and f"sha256={sha256}" in first[0].providers[0].evidence
+    assert cache.resolve_hash(sha1) == sha256 and cache.get("virustotal", sha256, 3600) is not None
+    later = run([sha256, sha1, md5])
+    assert len(calls) == 1
+    assert all(r.providers[0].cached and r.status == "MALICIOUS" for r in later)
+    # Structured fields are stored with the cached result
+    assert first[0].providers[0].fields["malicious"] == 3
+    assert all(r.providers[0].fields == first[0].providers[0].fields for r in later)
+
+
+def test_threatfox_hash_fields_feed_alias_table(fake_httpx, tmp_path):
+    cache = CoreCache(str(tmp_path / ".cache.sqlite"))
+    md5, sha256 = "d" * 32, "e" * 64
+    tf_body = {
+        "query_status": "ok",
+        "data": [
+            {
+                "confidence_level": 90,
+                "malware": "win.emotet",
+                "md5_hash": md5,
+                "sha256_hash": sha256,
+            }
+        ],
+    }
+    fake_httpx["set_routes"]([("POST", "/api/v1/", fake_httpx_response(200, tf_body))])
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    asyncio.run(
+        core_services.check_iocs(
+            [md5],
+            [core_services.ThreatFoxProvider()],
+            cache,
+            dict(core_config.DEFAULT_TTLS),
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=1,
+        )
+    )
+    assert cache.resolve_hash(md5) == sha256
+    assert cache.get("threatfox", sha256, 3600)["status"] == "MALICIOUS"
+
+
+def test_defanged_and_variant_urls_share_one_lookup(fake_httpx, tmp_path):
+    from ioc_core.models import vt_url_id
+
+    cache = CoreCache(str(tmp_path / ".cache.sqlite"))
+    calls = []
+    vt_url = {
+        "data": {
+            "attributes": {
+                "last_analysis_stats": {
+                    "malicious": 2,
+                    "suspicious": 0,
+                    "harmless": 0,
+                    "undetected": 5,
+                }
+            }
+        }
+    }
+
+    def _vt(method, url):
+        calls.append(url)
+        return fake_httpx_response(200, vt_url)
+
+    fake_httpx["set_routes"]([("GET", "/api/v3/urls/", _vt)])
+    providers = [core_services.VirusTotalProvider("k")]
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+
+    def run(iocs):
+        return asyncio.run(
+            core_services.check_iocs(
+                iocs,
+                providers,
+                cache,
+                dict(core_config.DEFAULT_TTLS),
+                use_cache,
+                refresh,
+                timeout,
+                concurrency=1,
+            )
+        )
+
+    first = run(["hxxp://Evil[.]com/a"])
+    assert first[0].ioc == "http://evil.com/a" and first[0].info == {"input": "hxxp://Evil[.]com/a"}
+    assert len(calls) == 1 and calls[0].endswith(vt_url_id("http://evil.com/a"))
+    later = run(["http://evil.com/a", "HTTP://EVIL.COM:80/a#top"])
+    assert len(calls) == 1 and all(r.providers[0].cached for r in later)
+    assert later[0].info == {}
+
+
 # helpers
 
+
 def fake_httpx_response(code, data):
     from tests.conftest import FakeResponse
-    return FakeResponse(code, json_data=data) 
\ No newline at end of file
+
+    return FakeResponse(code, json_data=data)
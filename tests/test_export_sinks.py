@@ -0,0 +1,123 @@
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+
+from ioc_core.cache import AsyncCache, Cache
+from ioc_core.export import CsvSink, JsonArraySink, JsonLinesSink, ResultSink, export_results_json
+from ioc_core.models import AggregatedResult, ProviderResult
+
+
+def _result(ioc, status="CLEAN"):
+    return AggregatedResult(
+        ioc,
+        "domain",
+        status,
+        1.0,
+        [ProviderResult("virustotal", status, 1.0, ["é"], None, 5, False)],
+    )
+
+
+class CountingCache(Cache):
+    def __init__(self, path):
+        super().__init__(path)
+        self.bulk_calls = 0
+
+    def get_age(self, provider, ioc):
+        raise AssertionError("sinks must resolve ages in bulk")
+
+    def get_ages_many(self, keys):
+        self.bulk_calls += 1
+        return super().get_ages_many(keys)
+
+
+def test_csv_sink_resolves_ages_in_bulk(tmp_path):
+    cache = CountingCache(str(tmp_path / "c.sqlite"))
+    for i in range(0, 10, 2):
+        cache.set("virustotal", f"d{i}.com", "domain", {"status": "CLEAN"})
+    assert cache.get_ages_many([("virustotal", "d0.com"), ("virustotal", "d1.com")]) == {
+        ("virustotal", "d0.com"): 0
+    }
+
+    out = io.StringIO()
+    with CsvSink(out, ["virustotal"], cache=cache, batch_size=4) as sink:
+        sink.write_many(_result(f"d{i}.com") for i in range(10))
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "type,ioc,age_bucket,virustotal"
+    assert lines[1:3] == ["domain,d0.com,<1h,CLEAN [1]", "domain,d1.com,unknown,CLEAN [1]"]
+    assert len(lines) == 11 and cache.bulk_calls == 1 + 3  # one query per batch of 4
+
+
+def test_csv_sink_awrite_looks_up_ages_off_the_loop(tmp_path):
+    threads = []
+
+    class ThreadRecordingCache(CountingCache):
+        def get_ages_many(self, keys):
+            threads.append(threading.current_thread())
+            return super().get_ages_many(keys)
+
+    cache = ThreadRecordingCache(str(tmp_path / "c.sqlite"))
+    cache.set("virustotal", "d0.com", "domain", {"status": "CLEAN"})
+    out = io.StringIO()
+
+    async def run():
+        acache = AsyncCache(cache)
+        sink = CsvSink(out, ["virustotal"], cache=acache, batch_size=4)
+        for i in range(10):
+            await sink.awrite(_result(f"d{i}.com"))
+        await sink.aclose()
+        await acache.aclose()
+
+    asyncio.run(run())
+    lines = out.getvalue().splitlines()
+    assert lines[1:3] == ["domain,d0.com,<1h,CLEAN [1]", "domain,d1.com,unknown,CLEAN [1]"]
+    assert len(lines) == 11 and cache.bulk_calls >= 3
+    assert threads and threading.main_thread() not in threads
+
+
+def test_result_sink_requires_write():
+    with pytest.raises(TypeError):
+        ResultSink(io.StringIO())
+
+
+def test_json_sinks_match_the_list_exporter(tmp_path):
+    results = [_result("a.com"), _result("b.com", "MALICIOUS")]
+    path = tmp_path / "r.json"
+    export_results_json(str(path), results)
+    assert path.read_text(encoding="utf-8") == json.dumps([r.to_dict() for r in results], indent=2)
+
+    out = io.StringIO()
+    with JsonLinesSink(out) as sink:
+        sink.write_many(results)
+    assert [json.loads(line)["ioc"] for line in out.getvalue().splitlines()] == ["a.com", "b.com"]
+
+
+def test_sink_flushes_while_running_and_finalizes_on_cancel(tmp_path):
+    path = tmp_path / "partial.json"
+    seen = []
+
+    async def run():
+        sink = JsonArraySink(str(path), flush_interval=0.05)
+        try:
+            sink.write(_result("a.com"))
+            await asyncio.sleep(0.2)
+            seen.append(path.read_text(encoding="utf-8"))
+            sink.write(_result("b.com"))
+            await asyncio.sleep(10)  # cancelled below
+        finally:
+            sink.close()
+
+    async def main():
+        task = asyncio.create_task(run())
+        await asyncio.sleep(0.3)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    assert '"a.com"' in seen[0]  # on disk before the run ended
+    assert [r["ioc"] for r in json.loads(path.read_text(encoding="utf-8"))] == ["a.com", "b.com"]
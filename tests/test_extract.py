@@ -0,0 +1,146 @@
+import asyncio
+import bz2
+import gzip
+import io
+import lzma
+import re
+
+import pytest
+
+from ioc_core import config as core_config
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.extract import (
+    _SCANNER,
+    BoundedSeen,
+    ExtractError,
+    extract_iocs,
+    iter_blocks,
+    main,
+    scan_block,
+)
+from ioc_core.models import ProviderResult
+
+LOG = (
+    b'2024-05-01 GET hxxp://Evil[.]com/a?b=1 from 10.0.0.5 ref="https://cdn.example.org/x.js",\n'
+    b"mail from bob@mail.corp.net: blocked 8.8.8.8 and 1[.]2[.]3[.]4; "
+    b"md5 D41D8CD98F00B204E9800998ECF8427E\n"
+    b"dropped setup.exe and report.pdf, version 1.2.3.4.5, seen evil(.)net. again 8.8.8.8\n"
+)
+EXPECTED = [
+    ("http://evil.com/a?b=1", "url"),
+    ("10.0.0.5", "ip"),
+    ("https://cdn.example.org/x.js", "url"),
+    ("mail.corp.net", "domain"),
+    ("8.8.8.8", "ip"),
+    ("1.2.3.4", "ip"),
+    ("d41d8cd98f00b204e9800998ecf8427e", "hash"),
+    ("evil.net", "domain"),
+]
+
+
+@pytest.mark.parametrize(
+    "opener,suffix", [(None, ".log"), (gzip.open, ".gz"), (bz2.open, ".bz2"), (lzma.open, ".xz")]
+)
+def test_extracts_from_plain_and_compressed(tmp_path, opener, suffix):
+    path = tmp_path / f"proxy{suffix}"
+    if opener is None:
+        path.write_bytes(LOG)
+    else:
+        with opener(str(path), "wb") as f:
+            f.write(LOG)
+    assert list(extract_iocs(str(path), chunk_size=16)) == EXPECTED
+
+
+def test_scanner_compiles_without_311_syntax():
+    # Possessive repeats and (?>...) need Python 3.11; the package supports 3.10
+    assert not re.search(rb"[+*?}]\+|\(\?>", _SCANNER.pattern)
+    assert re.compile(_SCANNER.pattern).groupindex == _SCANNER.groupindex
+    found = [
+        (kind, text) for kind, text in scan_block(b"x hxxp://a[.]b/c 1.2.3.4 foo-bar[.]example.com")
+    ]
+    assert found == [
+        ("url", "hxxp://a[.]b/c"),
+        ("ip", "1.2.3.4"),
+        ("domain", "foo-bar[.]example.com"),
+    ]
+
+
+def test_blocks_never_split_tokens_and_dedup_is_bounded():
+    blocks = list(iter_blocks([b"aaa 1.2.", b"3.4\nbb", b"b\n", b"tail"]))
+    assert blocks == [b"aaa 1.2.3.4\n", b"bbb\n", b"tail"]
+    seen = BoundedSeen(4)
+    assert [seen.add(x) for x in "abab"] == [True, True, False, False]
+    for x in "cdefgh":
+        seen.add(x)
+    assert len(seen) <= 4 and seen.add("a")
+
+
+def test_errors_and_cli(tmp_path, capsys):
+    bad = tmp_path / "bad.gz"
+    bad.write_bytes(b"\x1f\x8b" + b"\x00" * 20)
+    with pytest.raises(ExtractError):
+        list(extract_iocs(str(bad)))
+    src = tmp_path / "in.log"
+    src.write_bytes(LOG)
+    assert main([str(src), "--types", "ip", "--with-type"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["ip\t10.0.0.5", "ip\t8.8.8.8", "ip\t1.2.3.4"]
+    assert main([str(tmp_path / "missing.log")]) == 1
+
+
+class SlowProvider(core_services.BaseProvider):
+    name = "slow"
+    supported = {"ip", "domain", "hash", "url"}
+
+    def __init__(self):
+        super().__init__("k")
+        self.active = 0
+        self.peak = 0
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+        return ProviderResult(self.name, "CLEAN", 0.0, [], None, 1, False)
+
+
+def test_enrich_stream_is_lazy_and_bounded(tmp_path):
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    prov = SlowProvider()
+    pulled = []
+
+    def source():
+        for i in range(200):
+            pulled.append(i)
+            yield f"10.1.{i // 256}.{i % 256}"
+
+    async def run():
+        got = []
+        agen = core_services.enrich_stream(
+            source(), [prov], cache, {}, True, False, 5.0, concurrency=4, window=8
+        )
+        async for ar in agen:
+            got.append(ar)
+            if len(got) == 20:
+                break
+        await agen.aclose()
+        return got
+
+    got = asyncio.run(run())
+    assert len(got) == 20 and all(r.status == "CLEAN" for r in got)
+    assert prov.peak <= 4
+    assert len(pulled) < 200  # the generator was not drained up front
+
+    ips = [ioc for ioc, _ in extract_iocs(io.BytesIO(LOG)) if ioc[0].isdigit()]
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+
+    async def collect():
+        return [
+            ar
+            async for ar in core_services.enrich_stream(
+                iter(ips), [prov], cache, {}, use_cache, refresh, timeout, concurrency=2
+            )
+        ]
+
+    assert sorted(r.ioc for r in asyncio.run(collect())) == sorted(ips)
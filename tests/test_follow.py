@@ -0,0 +1,143 @@
+import asyncio
+import io
+import json
+import os
+import threading
+
+from ioc_core import follow as core_follow
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.follow import SeenWindow, TailFile
+from ioc_core.models import ProviderResult
+
+
+class CountingProvider(core_services.BaseProvider):
+    name = "counting"
+    supported = {"ip", "domain", "hash", "url"}
+
+    def __init__(self):
+        super().__init__("k")
+        self.seen = []
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.seen.append(ioc)
+        return ProviderResult(self.name, "SUSPICIOUS", 1.0, [], None, 1, False)
+
+
+def _append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def test_tail_handles_partial_lines_rotation_and_truncation(tmp_path):
+    path = str(tmp_path / "access.log")
+    _append(path, b"old 1.1.1.1\n")
+    tail = TailFile(path)
+    assert tail.read() == b""  # existing content is skipped by default
+    _append(path, b"a\nb")
+    assert tail.read() == b"a\n"
+    _append(path, b"\n")
+    assert tail.read() == b"b\n"
+    # logrotate "create": rename away, recreate
+    os.rename(path, path + ".1")
+    _append(path + ".1", b"late\n")
+    assert tail.read() == b"late\n"  # the old handle is drained first
+    _append(path, b"c\n")
+    assert tail.read() == b"c\n"
+    # copytruncate: same inode, shorter file
+    _append(path, b"dddddddd\n")
+    assert tail.read() == b"dddddddd\n"
+    with open(path, "wb") as f:
+        f.write(b"e\n")
+    assert tail.read() == b"e\n"
+    tail.close()
+
+    missing = TailFile(str(tmp_path / "later.log"))
+    assert missing.read() == b""
+    _append(str(tmp_path / "later.log"), b"first\n")
+    assert missing.read() == b"first\n"
+    missing.close()
+
+
+def test_seen_window_expires_and_is_capped():
+    now = [0.0]
+    seen = SeenWindow(10, max_items=3, clock=lambda: now[0])
+    assert seen.fresh("a") and not seen.fresh("a")
+    now[0] = 11
+    assert seen.fresh("a")
+    for k in "bcd":
+        assert seen.fresh(k)
+    assert len(seen) == 3 and seen.fresh("a")  # "a" was evicted to respect the cap
+
+
+def test_follow_streams_ndjson_for_new_lines(tmp_path):
+    path = str(tmp_path / "dns.log")
+    _append(path, b"query evil.example.com from 10.0.0.1\n")
+    prov = CountingProvider()
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    out = io.StringIO()
+
+    async def run():
+        stop = asyncio.Event()
+        task = asyncio.create_task(
+            core_follow.follow(
+                [path],
+                [prov],
+                cache,
+                {},
+                True,
+                False,
+                5.0,
+                2,
+                out,
+                poll_interval=0.01,
+                from_start=True,
+                stop=stop,
+            )
+        )
+        for _ in range(300):
+            if len(out.getvalue().splitlines()) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        _append(path, b"query evil.example.com again, then hxxp://bad[.]example/x\n")
+        for _ in range(300):
+            if len(out.getvalue().splitlines()) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        stop.set()
+        return await asyncio.wait_for(task, 5)
+
+    assert asyncio.run(run()) == 3
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(r["ioc"] for r in rows) == [
+        "10.0.0.1",
+        "evil.example.com",
+        "http://bad.example/x",
+    ]
+    assert prov.seen.count("evil.example.com") == 1  # repeated within the window
+
+
+def test_follow_scans_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "proxy.log")
+    _append(path, b"GET hxxp://bad[.]example/x\n")
+    scanned_on = []
+    real_scan = core_follow.iocs_in_block
+
+    def scan(block):
+        scanned_on.append(threading.current_thread())
+        return real_scan(block)
+
+    monkeypatch.setattr(core_follow, "iocs_in_block", scan)
+
+    async def run():
+        stop = asyncio.Event()
+        found = []
+        async for ioc in core_follow.follow_iocs(
+            [path], poll_interval=0.01, from_start=True, stop=stop
+        ):
+            found.append(ioc)
+            stop.set()
+        return found
+
+    assert asyncio.run(run()) == ["http://bad.example/x"]
+    assert scanned_on and threading.main_thread() not in scanned_on
@@ -94,4 +94,38 @@ def test_ioc_checker_cancel(qapp, fake_httpx, qt_flush):
         qt_flush(25)
         if page.btn_check.isEnabled():
             break
-    assert page.btn_check.isEnabled() 
\ No newline at end of file
+    assert page.btn_check.isEnabled() 
+
+def test_table_pages_through_spilled_results(qapp, tmp_path, monkeypatch):
+    from ioc_core.models import AggregatedResult, ProviderResult
+    from ioc_core.spill import SpillStore
+    from qt_app.views import ioc_checker_page
+
+    monkeypatch.setattr(ioc_checker_page, "TABLE_PAGE_ROWS", 10)
+    with SpillStore(str(tmp_path), page_size=8) as store:
+        for i in range(25):
+            pr = ProviderResult("virustotal", "CLEAN", 0.0, [], None, 1, False)
+            store.append(AggregatedResult(f"10.0.0.{i}", "ip", "CLEAN", 0.0, [pr]))
+        page = IocCheckerPage(lambda s: None)
+        page.model.setHorizontalHeaderLabels(["IOC", "virustotal"])
+        page._populate_table_from_results(store)
+        page.table.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        root = ioc_checker_page.QModelIndex()
+        assert page.model.rowCount() == 10 and page.model.canFetchMore(root)
+        while page.model.canFetchMore(root):
+            page.model.fetchMore(root)
+        assert page.model.rowCount() == 25
+        # Re-sorted with each page: "10.0.0.10" was in the second page
+        assert page.model.item(2, 0).text() == "10.0.0.10"
+        assert page.model.item(2, 1).text() == "CLEAN"
+        page.model.clear()
+        assert not page.model.canFetchMore(root)
+
+
+def test_summary_info_reads_fields_only(qapp):
+    from ioc_core.models import ProviderResult
+
+    page = IocCheckerPage(lambda s: None)
+    legacy = ProviderResult("abuseipdb", "CLEAN", 0.0, ["country_code=DE"], None, 1, True)
+    parsed = ProviderResult("otx", "CLEAN", 0.0, ["country=FR"], None, 1, False, {"country": "US"})
+    assert page._info_map_from_providers([legacy, parsed]) == {"country": "US"}
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from ioc_core import config as core_config
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.ipasn import IpAsnDb, IpAsnError, build_from_csv, main
+
+TSV = (
+    "1.0.0.0\t1.0.0.255\t13335\tUS\tCLOUDFLARENET\n"
+    "1.0.1.0\t1.0.3.255\t0\tNone\tNot routed\n"
+    "8.8.8.0\t8.8.8.255\t15169\tUS\tGOOGLE\n"
+    "8.8.9.0\t8.8.9.255\t15169\tUS\tGOOGLE\n"
+    "9.0.0.0\t9.0.0.255\t2119\tNO\tTelenor\n"
+    "2001:db8::\t2001:db8::ffff\t64500\tZZ\tv6\n"
+)
+
+
+@pytest.fixture()
+def db(tmp_path):
+    src = tmp_path / "ip2asn.tsv"
+    src.write_text(TSV, encoding="utf-8")
+    out = str(tmp_path / "ipasn.db")
+    assert build_from_csv(str(src), out) == 3  # unrouted/v6 dropped, adjacent GOOGLE rows merged
+    d = IpAsnDb(out)
+    yield d
+    d.close()
+
+
+def test_lookup_ranges(db):
+    hit = db.lookup("8.8.9.200")
+    assert (hit.asn, hit.country, hit.as_name) == (15169, "US", "GOOGLE")
+    assert db.lookup("1.0.0.1").to_info() == {
+        "asn": "AS13335",
+        "country": "US",
+        "as_name": "CLOUDFLARENET",
+    }
+    # "NO" is Norway, not a placeholder for unknown
+    assert db.lookup("9.0.0.1") == (2119, "NO", "Telenor")
+    assert db.lookup("1.0.2.1") is None
+    # Leading zeros are not read as octal (010.8.8.8 would be 8.8.8.8)
+    assert db.lookup("010.8.8.8") is None and db.lookup("008.008.008.008") is None
+    assert db.lookup("0.0.0.1") is None
+    assert db.lookup("255.255.255.255") is None
+    assert db.lookup("not-an-ip") is None
+
+
+def test_csv_cidr_rows_and_foreign_file(tmp_path):
+    src = tmp_path / "r.csv"
+    src.write_text("network,asn,country,name\n10.1.0.0/16,AS64512,de,Lab\n", encoding="utf-8")
+    out = str(tmp_path / "r.db")
+    assert build_from_csv(str(src), out) == 1
+    d = IpAsnDb(out)
+    assert d.lookup("10.1.200.3").to_info() == {"asn": "AS64512", "country": "DE", "as_name": "Lab"}
+    d.close()
+    (tmp_path / "junk.db").write_bytes(b"x" * 64)
+    with pytest.raises(IpAsnError):
+        IpAsnDb(str(tmp_path / "junk.db"))
+
+
+def test_check_iocs_adds_info_without_providers(db, tmp_path, capsys):
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    results = asyncio.run(
+        core_services.check_iocs(
+            ["8.8.8.8", "example.com"],
+            [],
+            cache,
+            {},
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=2,
+            ipasn=db,
+        )
+    )
+    assert results[0].info == {"asn": "AS15169", "country": "US", "as_name": "GOOGLE"}
+    assert results[0].to_dict()["info"]["asn"] == "AS15169"
+    assert results[1].info == {} and "info" not in results[1].to_dict()
+    assert main(["lookup", db.path, "8.8.8.8"]) == 0
+    assert "asn=AS15169" in capsys.readouterr().out
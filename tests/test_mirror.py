@@ -0,0 +1,93 @@
+import asyncio
+import csv
+import io
+
+import pytest
+
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.export import mirrored_cell
+from ioc_core.mirror import MirrorError, detect_ioc_column, mirror_csv
+from ioc_core.models import ProviderResult
+
+
+class SlowFirstProvider(core_services.BaseProvider):
+    """Answers the first IOC last, so later rows finish before earlier ones."""
+
+    name = "stub"
+    supported = {"ip", "domain", "hash", "url"}
+
+    def __init__(self):
+        super().__init__("k")
+        self.seen = []
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.seen.append(ioc)
+        await asyncio.sleep(0.2 if len(self.seen) == 1 else 0)
+        status = "MALICIOUS" if ioc.startswith("evil") else "CLEAN"
+        return ProviderResult(
+            self.name, status, 7.0 if status == "MALICIOUS" else 0.0, [], None, 1, False
+        )
+
+
+def _mirror(tmp_path, text, delimiter=",", **kw):
+    src = tmp_path / "in.csv"
+    src.write_text(text, encoding="utf-8")
+    prov = SlowFirstProvider()
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    out = io.StringIO()
+    stats = asyncio.run(mirror_csv(str(src), out, [prov], cache, {}, True, False, 5.0, 4, **kw))
+    return stats, list(csv.reader(io.StringIO(out.getvalue()), delimiter=delimiter)), prov
+
+
+def test_mirror_keeps_order_dedups_and_detects_column(tmp_path):
+    rows = [["time", "user", "dst"]]
+    for i in range(60):
+        rows.append(
+            [
+                f"t{i}",
+                f"user{i}",
+                ["8.8.8.8", "evil.example", "hxxp://x[.]example/a", "", "n/a"][i % 5],
+            ]
+        )
+    text = "".join(",".join(r) + "\n" for r in rows)
+
+    stats, out, prov = _mirror(tmp_path, text, max_buffer=8)
+    assert stats.column == 2 and stats.rows == 60
+    assert out[0] == ["time", "user", "dst", "stub"]
+    assert [r[:3] for r in out[1:]] == rows[1:]  # every row, in input order
+    by_ioc = {r[2]: r[3] for r in out[1:]}
+    assert by_ioc == {
+        "8.8.8.8": "CLEAN",
+        "evil.example": "MALICIOUS (7)",
+        "hxxp://x[.]example/a": "CLEAN",
+        "": "",
+        "n/a": "INVALID",
+    }
+    assert sorted(prov.seen) == ["8.8.8.8", "evil.example", "http://x.example/a"]
+    assert stats.lookups == 3 and stats.invalid == 12
+
+
+def test_mirror_column_option_and_headerless_input(tmp_path):
+    stats, out, _ = _mirror(
+        tmp_path, "1.1.1.1;evil.example\n2.2.2.2;evil.example\n", ";", column=2, has_header=False
+    )
+    assert out == [
+        ["Column 1", "Column 2", "stub"],
+        ["1.1.1.1", "evil.example", "MALICIOUS (7)"],
+        ["2.2.2.2", "evil.example", "MALICIOUS (7)"],
+    ]
+    with pytest.raises(MirrorError):
+        _mirror(tmp_path, "a,b\n1,2\n", column="ioc")
+
+
+def test_detect_column_and_cell_format():
+    assert (
+        detect_ioc_column(["id", "ioc"], [["1", ""], ["2", ""]]) == 1
+    )  # header hint breaks the tie
+    assert detect_ioc_column(None, [["x", "8.8.8.8"], ["y", "evil.example"]]) == 1
+    assert (
+        mirrored_cell(ProviderResult("p", "SUSPICIOUS", 2.6, [], None, None, False))
+        == "SUSPICIOUS (2)"
+    )
+    assert mirrored_cell(ProviderResult("p", "CLEAN", 0.0, [], None, None, False)) == "CLEAN"
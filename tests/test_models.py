@@ -3,7 +3,8 @@ from __future__ import annotations
 
 import unittest
 
-from ioc_checker.models import ProviderResult, AggregatedResult
+from ioc_checker.models import AggregatedResult, ProviderResult
+from ioc_core.models import IOC_TYPE_NAMES, ResultStore, classify_ioc, classify_many
 
 
 class TestModels(unittest.TestCase):
@@ -21,5 +22,82 @@ class TestModels(unittest.TestCase):
         row = ar.to_row()
         self.assertIn("vt_status", row)
 
+    def test_classify_many_matches_classify_ioc(self):
+        lines = [
+            "1.2.3.4",
+            " 256.1.1.1 ",
+            "1password.com",
+            "D41D8CD98F00B204E9800998ECF8427E",
+            "a" * 40,
+            "b" * 64,
+            "Evil.COM",
+            "HTTPS://x.example/a",
+            "hxxp://evil[.]com",
+            "",
+            "   ",
+            "-a.com",
+            "a..com",
+            "1.2.3",
+            "1.2.3.4.com",
+            "\u0661.\u0662.\u0663.\u0664",
+            "caf\u00e9.com",
+            "#comment",
+            None,
+        ]
+        codes, values = classify_many(lines)
+        self.assertEqual(len(codes), len(lines))
+        for raw, code, value in zip(lines, codes, values, strict=True):
+            _, t, norm, _ = classify_ioc(raw)
+            self.assertEqual((IOC_TYPE_NAMES[code], value), (t, norm), raw)
+
+    def test_result_store_views_match_inputs(self):
+        results = [
+            AggregatedResult(
+                "1.2.3.4",
+                "ip",
+                "MALICIOUS",
+                5.0,
+                [
+                    ProviderResult(
+                        "vt",
+                        "MALICIOUS",
+                        5.0,
+                        ["engines=5", "country=RU"],
+                        "ref",
+                        120,
+                        False,
+                        {"country": "RU", "tags": ["a", "b"]},
+                    ),
+                    ProviderResult("abuseipdb", "CLEAN", 0.0, [], None, None, True),
+                ],
+                {"asn": "64500", "country": "RU"},
+            ),
+            AggregatedResult(
+                "evil.example",
+                "domain",
+                "CLEAN",
+                0.0,
+                [ProviderResult("vt", "CLEAN", 0.0, ["engines=0"], None, 7, False)],
+            ),
+            AggregatedResult("nope", "invalid", "INCONCLUSIVE", 0.0, []),
+            AggregatedResult("1.2.3.4", "ip", "CLEAN", 0.0, []),
+        ]
+        store = ResultStore(results[:2])
+        self.assertFalse(ResultStore())
+        store.extend(results[2:])
+        self.assertEqual(len(store), 4)
+        self.assertEqual(list(store), results)
+        self.assertEqual(store[-1], results[-1])
+        self.assertEqual(store[1:3], results[1:3])
+        with self.assertRaises(IndexError):
+            store[4]
+        self.assertEqual((store.ioc_at(1), store.status_at(1)), ("evil.example", "CLEAN"))
+        self.assertEqual(store.count_status("MALICIOUS", "SUSPICIOUS"), 1)
+        self.assertEqual(store.by_ioc("1.2.3.4"), [results[0], results[3]])
+        # Views are copies
+        store[0].providers.clear()
+        self.assertEqual(len(store[0].providers), 2)
+
+
 if __name__ == "__main__":
     unittest.main()
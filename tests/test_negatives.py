@@ -0,0 +1,83 @@
+import asyncio
+
+from ioc_core import config as core_config
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.models import ProviderResult
+from ioc_core.negatives import BloomFilter, NegativeFilter, is_negative
+from tests.helpers import freeze_time
+
+
+def test_bloom_fp_rate_bounded():
+    bf = BloomFilter(5000, 0.01)
+    for i in range(5000):
+        bf.add(f"in-{i}")
+    assert all(f"in-{i}" in bf for i in range(5000))
+    fps = sum(1 for i in range(20000) if f"out-{i}" in bf)
+    assert fps / 20000 < 0.03
+    clone = BloomFilter.from_bytes(bf.to_bytes())
+    assert "in-7" in clone and clone.count == 5000
+
+
+def test_windows_rotate_and_persist(tmp_path):
+    d = str(tmp_path / "neg")
+    with freeze_time(10_000):
+        nf = NegativeFilter(d, trust_hours=4, windows=4, capacity=10)
+        for i in range(25):  # overflows into extra slices
+            nf.add("virustotal", f"h{i}")
+        nf.save()
+    with freeze_time(10_000 + 3600 * 2):
+        nf2 = NegativeFilter(d, trust_hours=4, windows=4)
+        assert nf2.contains("virustotal", "h24")
+        assert not nf2.contains("otx", "h24")
+    with freeze_time(10_000 + 3600 * 5):
+        nf3 = NegativeFilter(d, trust_hours=4, windows=4)
+        assert not nf3.contains("virustotal", "h24")
+        nf3.save()
+    assert not list((tmp_path / "neg").glob("*.bloom"))
+
+
+def test_is_negative():
+    assert is_negative(ProviderResult("otx", "CLEAN", 0.0, ["not found"], None, 1, False))
+    assert not is_negative(ProviderResult("otx", "CLEAN", 0.0, ["harmless=9"], None, 1, False))
+
+
+class CountingProvider(core_services.BaseProvider):
+    name = "counting"
+    supported = {"hash"}
+
+    def __init__(self):
+        super().__init__("k")
+        self.calls = 0
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.calls += 1
+        return ProviderResult(self.name, "CLEAN", 0.0, ["not found"], None, 3, False)
+
+
+def test_fetch_with_cache_skips_trusted_negatives(tmp_path):
+    prov = CountingProvider()
+    nf = NegativeFilter(str(tmp_path / "neg"), trust_hours=1)
+    cache = Cache(":memory:")
+
+    async def run():
+        first = await core_services.fetch_with_cache(
+            prov, cache, None, "a" * 32, "hash", 0, False, False, 1.0, nf
+        )
+        second = await core_services.fetch_with_cache(
+            prov, cache, None, "a" * 32, "hash", 0, False, False, 1.0, nf
+        )
+        forced = await core_services.fetch_with_cache(
+            prov, cache, None, "a" * 32, "hash", 0, False, True, 1.0, nf
+        )
+        return first, second, forced
+
+    first, second, forced = asyncio.run(run())
+    assert not first.cached and second.cached and second.status == "CLEAN"
+    assert prov.calls == 2 and not forced.cached
+
+
+def test_trust_hours_from_env():
+    assert core_config.negative_trust_hours({}) == 0.0
+    assert core_config.negative_trust_hours({"IOC_TRUST_NEGATIVES_HOURS": "12"}) == 12.0
+    assert core_config.negative_trust_hours({"IOC_TRUST_NEGATIVES_HOURS": "soon"}) == 0.0
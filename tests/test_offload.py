@@ -0,0 +1,113 @@
+import asyncio
+import os
+
+from ioc_core import config as core_config
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.extract import extract_iocs
+from ioc_core.models import classify_ioc, default_public_suffixes, normalize_ioc
+from ioc_core.offload import Offloader, classify_lines, parse_responses
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _body(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def _items(n):
+    bodies = [
+        ("virustotal", _body("vt_ok.json")),
+        ("abuseipdb", _body("abuse_ok.json")),
+        ("otx", _body("otx_ok.json")),
+    ]
+    return [
+        (bodies[i % 3][0], f"10.0.0.{i}", "ip", f"https://api.example/{i}", i, bodies[i % 3][1])
+        for i in range(n)
+    ]
+
+
+def test_pool_parse_matches_inline():
+    items = _items(12) + [
+        ("virustotal", "1.2.3.4", "ip", "u", None, b"{not json"),
+        ("nosuch", "1.2.3.4", "ip", "u", None, b"{}"),
+    ]
+    expected = parse_responses(items)
+    assert [r.provider for r in expected[:3]] == ["virustotal", "abuseipdb", "otx"]
+    assert expected[0].status == "MALICIOUS" and expected[0].fields["malicious"] == 2
+    assert expected[-2].status == "INCONCLUSIVE" and expected[-1].evidence == [
+        "no response parser for provider: nosuch"
+    ]
+    with Offloader(2, min_batch=4, chunk_size=3) as off:
+        assert off.map(parse_responses, items) == expected
+        assert asyncio.run(off.amap(parse_responses, items)) == expected
+        assert off._pool is not None
+
+
+def test_small_batches_run_inline():
+    items = _items(5)
+    with Offloader(2, min_batch=6) as off:
+        assert off.map(parse_responses, items) == parse_responses(items)
+        assert off._pool is None
+    off = Offloader(0, min_batch=1)
+    assert asyncio.run(off.amap(parse_responses, items)) == parse_responses(items)
+    assert off._pool is None
+
+
+def test_classify_lines_matches_classify_ioc():
+    lines = [
+        " 8.8.8.8 ",
+        "hxxp://evil[.]example/a",
+        "Example.COM.",
+        "d41d8cd98f00b204e9800998ecf8427e",
+        "not an ioc",
+        "",
+    ]
+    assert classify_lines(lines) == [classify_ioc(normalize_ioc(line))[1:3] for line in lines]
+
+
+def test_extract_and_check_iocs_on_the_pool_match_inline(tmp_path):
+    log = tmp_path / "proxy.log"
+    lines = [
+        f"GET hxxp://host{i % 40}[.]example/p 10.1.{i % 7}.{i % 50} md5 {i % 9:032x}\n"
+        for i in range(4000)
+    ]
+    log.write_text("".join(lines), encoding="utf-8")
+    inline = list(extract_iocs(str(log), chunk_size=4096))
+    with Offloader(2) as off:
+        assert list(extract_iocs(str(log), chunk_size=4096, offload=off)) == inline
+        assert off._pool is not None
+
+        cache = Cache(str(tmp_path / "c.sqlite"))
+        use_cache, refresh, timeout = core_config.resolve_mode("normal")
+        iocs = ["a.evil.com", "b.evil.com", "10.0.0.1", "not an ioc", "x.other.org"] * 60
+        runs = [
+            asyncio.run(
+                core_services.check_iocs(
+                    iocs,
+                    [],
+                    cache,
+                    {},
+                    use_cache,
+                    refresh,
+                    timeout,
+                    concurrency=8,
+                    group_by=default_public_suffixes(),
+                    offload=o,
+                )
+            )
+            for o in (None, off)
+        ]
+        assert list(runs[0]) == list(runs[1]) and runs[0][0].info == {
+            "registrable_domain": "evil.com"
+        }
+
+
+def test_offload_workers_setting(monkeypatch):
+    assert core_config.offload_workers({}) == 0
+    assert core_config.offload_workers({"IOC_OFFLOAD_WORKERS": "3"}) == 3
+    assert core_config.offload_workers({"IOC_OFFLOAD_WORKERS": "-2"}) == 0
+    assert core_config.offload_workers({"IOC_OFFLOAD_WORKERS": "many"}) == 0
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert core_config.offload_workers({"IOC_OFFLOAD_WORKERS": "auto"}) == 7
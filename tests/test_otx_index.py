@@ -0,0 +1,148 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from ioc_core import services as core_services
+from ioc_core.models import normalize_ioc
+from ioc_core.otx_index import OTXIndex, OTXIndexError, sync_subscribed
+from tests.helpers import FakeAsyncClient, freeze_time, make_response
+
+
+def _pulse(pid, name, modified, *indicators):
+    return {"id": pid, "name": name, "modified": modified,
+            "indicators": [{"indicator": v, "type": t} for v, t in indicators]}
+
+
+class _Recorder(FakeAsyncClient):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    async def get(self, url, *args, **kwargs):
+        self.calls.append((url, kwargs.get("params")))
+        return await super().get(url, *args, **kwargs)
+
+
+def test_sync_pages_and_resumes_from_cursor(tmp_path):
+    idx = OTXIndex(str(tmp_path / "otx.sqlite"))
+    client = _Recorder()
+    client.queue(
+        make_response(
+            200,
+            {
+                "results": [
+                    _pulse(
+                        "p1",
+                        "Emotet wave",
+                        "2024-05-01T00:00:00",
+                        ("1.2.3.4", "IPv4"),
+                        ("EVIL.example.com", "hostname"),
+                    )
+                ],
+                "next": "https://otx.alienvault.com/api/v1/pulses/subscribed?page=2",
+            },
+        )
+    )
+    client.queue(
+        make_response(
+            200,
+            {
+                "results": [
+                    _pulse(
+                        "p2",
+                        "Qakbot C2",
+                        "2024-05-02T00:00:00",
+                        ("1.2.3.4", "IPv4"),
+                        ("CVE-2024-1", "CVE"),
+                    )
+                ],
+                "next": None,
+            },
+        )
+    )
+    assert asyncio.run(sync_subscribed(idx, client, "k")) == 2
+    assert idx.modified_since() == "2024-05-02T00:00:00"
+    assert idx.lookup("1.2.3.4", "ip") == (2, ["Qakbot C2", "Emotet wave"])
+    assert idx.lookup("evil.example.com", "domain") == (1, ["Emotet wave"])
+    assert "modified_since" not in client.calls[0][1] and client.calls[1][1] is None
+
+    # A modified pulse replaces its indicator set; the cursor is sent on the next run
+    client.queue(
+        make_response(
+            200,
+            {
+                "results": [
+                    _pulse("p1", "Emotet wave", "2024-05-03T00:00:00", ("5.6.7.8", "IPv4"))
+                ],
+                "next": None,
+            },
+        )
+    )
+    asyncio.run(sync_subscribed(idx, client, "k"))
+    assert client.calls[2][1]["modified_since"] == "2024-05-02T00:00:00"
+    assert idx.lookup("1.2.3.4", "ip") == (1, ["Qakbot C2"])
+    assert idx.lookup("5.6.7.8", "ip")[0] == 1
+
+
+def test_failed_page_keeps_cursor(tmp_path):
+    idx = OTXIndex(str(tmp_path / "otx.sqlite"))
+    client = FakeAsyncClient()
+    client.queue(
+        make_response(
+            200,
+            {"results": [_pulse("p1", "A", "2024-05-01T00:00:00")], "next": "https://x/?page=2"},
+        )
+    )
+    client.queue(make_response(503, {}))
+    with pytest.raises(OTXIndexError):
+        asyncio.run(sync_subscribed(idx, client, "k"))
+    assert idx.modified_since() is None and idx.synced_at() is None
+
+
+def test_provider_uses_index_and_falls_back_for_unknown(tmp_path):
+    dump = tmp_path / "dump.json"
+    dump.write_text(
+        json.dumps([_pulse("p1", "Emotet wave", "2024-05-01", ("1.2.3.4", "IPv4"))]),
+        encoding="utf-8",
+    )
+    idx = OTXIndex(str(tmp_path / "otx.sqlite"))
+    with freeze_time(1_000_000):
+        assert idx.ingest_dump(str(dump)) == 1
+    prov = core_services.OTXProvider("k", index=idx, index_max_age=3600)
+    client = FakeAsyncClient()
+    client.queue(make_response(200, {"pulse_info": {"count": 0, "pulses": []}}))
+    with freeze_time(1_000_000 + 60):
+        hit = asyncio.run(prov.query(client, "1.2.3.4", "ip", 5.0))
+        assert len(client._queue) == 1  # answered locally
+        miss = asyncio.run(prov.query(client, "9.9.9.9", "ip", 5.0))
+    assert hit.status == "SUSPICIOUS" and hit.evidence == ["pulses=1", "pulse=Emotet wave"]
+    assert miss.status == "INCONCLUSIVE" and not client._queue
+
+
+def test_indicators_are_stored_normalized(tmp_path):
+    idx = OTXIndex(str(tmp_path / "otx.sqlite"))
+    pulse = _pulse("p1", "Phish", "2024-05-01", ("HTTP://Evil.COM/a", "URL"),
+                   ("Evil.COM.", "hostname"), ("44D88612FEA8A8F36DE82E1278ABB02F", "FileHash-MD5"))
+    assert idx.ingest_pulses([pulse]) == 1
+    assert idx.lookup(normalize_ioc("HTTP://Evil.COM/a"), "url") == (1, ["Phish"])
+    assert idx.lookup("evil.com", "domain") == (1, ["Phish"])
+    assert idx.lookup("44d88612fea8a8f36de82e1278abb02f", "hash") == (1, ["Phish"])
+    idx.close()
+
+
+def test_index_from_before_normalization_is_rewritten_on_open(tmp_path):
+    path = str(tmp_path / "otx.sqlite")
+    OTXIndex(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM meta WHERE key='schema'")
+    conn.execute("INSERT INTO pulses VALUES ('p1', 'Old', '2024-01-01')")
+    old = [("HTTP://Evil.COM:80/a", "url"), ("Evil.COM.", "domain"), ("evil.com", "domain")]
+    conn.executemany("INSERT INTO indicators VALUES (?, ?, 'p1')", old)
+    conn.commit()
+    conn.close()
+    idx = OTXIndex(path)
+    assert idx.lookup("http://evil.com/a", "url") == (1, ["Old"])
+    assert idx.lookup("evil.com", "domain") == (1, ["Old"]) and len(idx) == 2
+    idx.close()
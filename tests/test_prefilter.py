@@ -0,0 +1,101 @@
+import asyncio
+
+from ioc_core import config as core_config
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.models import ProviderResult
+from ioc_core.prefilter import Prefilter, RangeTable, build_prefilter, load_allowlist
+
+
+class CountingProvider(core_services.BaseProvider):
+    name = "counting"
+    supported = {"ip", "domain", "hash", "url"}
+
+    def __init__(self):
+        super().__init__("k")
+        self.seen = []
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.seen.append(ioc)
+        return ProviderResult(self.name, "SUSPICIOUS", 1.0, [], None, 1, False)
+
+
+def test_range_table_bogons_and_user_cidrs():
+    pf = Prefilter([("203.0.113.0/25", "lab"), ("8.8.4.0/24", "corp-dns")])
+    assert pf.match("10.0.0.5", "ip") == "private (10.0.0.0/8)"
+    assert pf.match("192.168.1.1", "ip") == "private (192.168.0.0/16)"
+    assert pf.match("127.0.0.1", "ip") == "loopback (127.0.0.0/8)"
+    assert pf.match("239.1.2.3", "ip").startswith("multicast")
+    assert pf.match("255.255.255.255", "ip").startswith("reserved")
+    assert pf.match("8.8.4.4", "ip") == "corp-dns (8.8.4.0/24)"
+    # nested inside the documentation range: the outer label wins
+    assert pf.match("203.0.113.7", "ip") == "documentation (203.0.113.0/24)"
+    assert pf.match("8.8.8.8", "ip") is None
+    assert pf.match("172.32.0.1", "ip") is None
+    # Leading zeros are not octal: never answer 012.0.0.1 as 10.0.0.0/8 or 0177.0.0.1 as loopback
+    assert pf.match("012.0.0.1", "ip") is None
+    assert pf.match("0177.0.0.1", "ip") is None
+    assert pf.match("10.1", "ip") is None
+    assert len(RangeTable([("10.0.0.0/8", "a"), ("10.1.0.0/16", "b")])) == 1
+
+
+def test_allowlist_matches_subdomains_only_for_domains(tmp_path):
+    top = tmp_path / "top.csv"
+    top.write_text("# rank,domain\n1,google.com\n2,Microsoft.com.\n", encoding="utf-8")
+    assert load_allowlist(str(top)) == ["google.com", "microsoft.com"]
+    pf = build_prefilter(str(top), ["45.33.0.0/16"])
+    assert pf.match("google.com", "domain") == "allowlisted (google.com)"
+    assert pf.match("mail.google.com", "domain") == "allowlisted (google.com)"
+    assert pf.match("notgoogle.com", "domain") is None
+    assert pf.match("https://google.com/x", "url") is None
+    assert pf.match("45.33.3.4", "ip") == "user-range (45.33.0.0/16)"
+
+
+def test_allowlist_never_walks_past_a_public_suffix(tmp_path):
+    # Top-sites lists rank shared-hosting suffixes; their tenants must still be looked up
+    pf = Prefilter(allowlist=["github.io", "duckdns.org", "bbc.co.uk", "co.uk", "mail.google.com"])
+    assert pf.match("github.io", "domain") == "allowlisted (github.io)"
+    assert pf.match("evil.github.io", "domain") is None
+    assert pf.match("a.c2.duckdns.org", "domain") is None
+    assert pf.match("news.bbc.co.uk", "domain") == "allowlisted (bbc.co.uk)"
+    assert pf.match("evil.co.uk", "domain") is None
+    assert pf.match("x.mail.google.com", "domain") == "allowlisted (mail.google.com)"
+    assert pf.match("google.com", "domain") is None
+    psl = tmp_path / "psl.dat"
+    psl.write_text("// private\nexample.net\n", encoding="utf-8")
+    top = tmp_path / "top.txt"
+    top.write_text("example.net\n", encoding="utf-8")
+    assert (
+        build_prefilter(str(top)).match("tenant.example.net", "domain")
+        == "allowlisted (example.net)"
+    )
+    assert (
+        build_prefilter(str(top), suffix_path=str(psl)).match("tenant.example.net", "domain")
+        is None
+    )
+
+
+def test_check_iocs_short_circuits_prefiltered(tmp_path):
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    prov = CountingProvider()
+    pf = Prefilter(allowlist=["google.com"])
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    results = asyncio.run(
+        core_services.check_iocs(
+            ["10.0.0.5", "www.google.com", "1.2.3.4"],
+            [prov],
+            cache,
+            {},
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=2,
+            prefilter=pf,
+        )
+    )
+    assert prov.seen == ["1.2.3.4"]
+    by_ioc = {r.ioc: r for r in results}
+    assert by_ioc["10.0.0.5"].status == "INCONCLUSIVE"
+    assert by_ioc["10.0.0.5"].providers[0].evidence == ["prefilter=private (10.0.0.0/8)"]
+    assert by_ioc["www.google.com"].status == "CLEAN"
+    assert cache.get("counting", "10.0.0.5", 3600) is None
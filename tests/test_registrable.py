@@ -0,0 +1,93 @@
+import asyncio
+
+from ioc_core import config as core_config
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.models import (
+    ProviderResult,
+    PublicSuffixTrie,
+    default_public_suffixes,
+    registrable_domain,
+)
+
+
+class CountingProvider(core_services.BaseProvider):
+    name = "counting"
+    supported = {"ip", "domain", "hash", "url"}
+
+    def __init__(self):
+        super().__init__("k")
+        self.seen = []
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.seen.append(ioc)
+        return ProviderResult(self.name, "SUSPICIOUS", 1.0, [f"q={ioc}"], None, 1, False)
+
+
+def test_registrable_domain_rules():
+    assert registrable_domain("a.b.evil.com") == "evil.com"
+    assert registrable_domain("com") is None
+    assert registrable_domain("x.y.example.co.uk") == "example.co.uk"
+    assert registrable_domain("co.uk") is None
+    # wildcard and exception rules
+    assert registrable_domain("foo.bar.ck") == "foo.bar.ck"
+    assert registrable_domain("a.www.ck") == "www.ck"
+    assert registrable_domain("me.github.io") == "me.github.io"
+    trie = PublicSuffixTrie.from_text("// comment\nexample\n*.kawasaki.jp\n!city.kawasaki.jp\n")
+    assert trie.registrable_domain("a.b.example") == "b.example"
+    assert trie.registrable_domain("x.foo.kawasaki.jp") == "x.foo.kawasaki.jp"
+    assert trie.registrable_domain("x.city.kawasaki.jp") == "city.kawasaki.jp"
+    assert default_public_suffixes() is default_public_suffixes()
+
+
+def test_check_iocs_groups_subdomains(tmp_path):
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    prov = CountingProvider()
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    iocs = ["a.evil.com", "1.2.3.4", "b.evil.com", "evil.com", "solo.other.org"]
+    results = asyncio.run(
+        core_services.check_iocs(
+            iocs,
+            [prov],
+            cache,
+            {},
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=2,
+            group_by=default_public_suffixes(),
+        )
+    )
+    assert sorted(prov.seen) == ["1.2.3.4", "evil.com", "solo.other.org"]
+    assert [r.ioc for r in results] == iocs
+    assert results[0].info == {"registrable_domain": "evil.com"}
+    assert results[0].providers[0].evidence == ["q=evil.com"]
+    assert (
+        results[2].status == "SUSPICIOUS"
+        and results[2].to_dict()["info"]["registrable_domain"] == "evil.com"
+    )
+    assert results[3].info == {} and results[4].info == {}
+
+
+def test_repeated_host_is_not_a_group(tmp_path):
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    prov = CountingProvider()
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    iocs = ["a.example.com", "A.Example.com.", "x.other.org", "y.other.org"]
+    results = asyncio.run(
+        core_services.check_iocs(
+            iocs,
+            [prov],
+            cache,
+            {},
+            use_cache,
+            refresh,
+            timeout,
+            concurrency=2,
+            group_by=default_public_suffixes(),
+        )
+    )
+    assert sorted(prov.seen) == ["a.example.com", "other.org"]
+    assert [r.info for r in results[:2]] == [{}, {}]
+    assert results[0].providers[0].evidence == ["q=a.example.com"]
+    assert results[3].info == {"registrable_domain": "other.org"}
@@ -0,0 +1,125 @@
+import gzip
+
+import pytest
+
+from ioc_core.cache import Cache
+from ioc_core.models import ProviderResult
+from ioc_core.snapshot import (
+    SnapshotError,
+    export_snapshot,
+    import_snapshot,
+    iter_snapshot,
+    main,
+    read_snapshot_info,
+)
+
+
+def _payload(status):
+    return ProviderResult("virustotal", status, 0.0, ["malicious=0"], None, 5, False).to_dict()
+
+
+def _set_at(cache, provider, ioc, status, fetched_at):
+    cache.set(provider, ioc, "domain", _payload(status))
+    with cache.lock:
+        cache.conn.execute(
+            "UPDATE cache SET fetched_at=? WHERE provider=? AND ioc=?", (fetched_at, provider, ioc)
+        )
+        cache.conn.commit()
+
+
+def test_export_since_and_roundtrip(tmp_path):
+    src = Cache(str(tmp_path / "a.sqlite"))
+    _set_at(src, "virustotal", "old.com", "CLEAN", 100)
+    _set_at(src, "virustotal", "new.com", "MALICIOUS", 200)
+    legacy = Cache(str(tmp_path / "a.sqlite"), compact=False)
+    legacy.set("otx", "legacy.com", "domain", _payload("SUSPICIOUS"))
+    snap = str(tmp_path / "delta.snap")
+    assert export_snapshot(src, snap, since=150) == 2
+    assert read_snapshot_info(snap).since == 150
+    rows = {(p, i) for p, i, *_ in iter_snapshot(snap)}
+    assert rows == {("virustotal", "new.com"), ("otx", "legacy.com")}
+
+
+def test_import_newest_wins_per_provider(tmp_path):
+    mine = Cache(str(tmp_path / "mine.sqlite"))
+    theirs = Cache(str(tmp_path / "theirs.sqlite"))
+    _set_at(mine, "virustotal", "a.com", "CLEAN", 500)
+    _set_at(theirs, "virustotal", "a.com", "MALICIOUS", 400)  # older: must lose
+    _set_at(mine, "otx", "a.com", "CLEAN", 100)
+    _set_at(theirs, "otx", "a.com", "SUSPICIOUS", 300)  # newer: must win
+    _set_at(theirs, "abuseipdb", "b.com", "CLEAN", 300)  # new row
+    snap = str(tmp_path / "theirs.snap")
+    export_snapshot(theirs, snap)
+    assert import_snapshot(mine, snap) == (3, 2)
+    assert mine.get("virustotal", "a.com", 10**10)["status"] == "CLEAN"
+    assert mine.get("otx", "a.com", 10**10)["status"] == "SUSPICIOUS"
+    assert mine.get("abuseipdb", "b.com", 10**10) is not None
+    # Re-import is idempotent
+    assert import_snapshot(mine, snap) == (3, 0)
+
+
+def test_truncated_and_foreign_files_rejected(tmp_path):
+    c = Cache(str(tmp_path / "c.sqlite"))
+    for i in range(20):
+        _set_at(c, "virustotal", f"h{i}.com", "CLEAN", 100)
+    snap = tmp_path / "s.snap"
+    export_snapshot(c, str(snap))
+    raw = gzip.decompress(snap.read_bytes())
+    cut = tmp_path / "cut.snap"
+    cut.write_bytes(gzip.compress(raw[: len(raw) // 2]))
+    with pytest.raises(SnapshotError):
+        list(iter_snapshot(str(cut)))
+    bogus = tmp_path / "bogus.snap"
+    bogus.write_bytes(gzip.compress(b"not a snapshot at all, sorry"))
+    with pytest.raises(SnapshotError):
+        read_snapshot_info(str(bogus))
+
+
+def test_hash_aliases_travel_with_the_snapshot(tmp_path):
+    sha256, md5 = "a" * 64, "b" * 32
+    theirs = Cache(str(tmp_path / "theirs.sqlite"))
+    theirs.set("virustotal", sha256, "hash", _payload("MALICIOUS"))
+    theirs.add_hash_aliases(sha256, [md5, "c" * 40])
+    theirs.add_hash_aliases("d" * 64, ["e" * 32])  # no exported row for this sample
+    snap = str(tmp_path / "theirs.snap")
+    export_snapshot(theirs, snap, since=1)
+    mine = Cache(str(tmp_path / "mine.sqlite"))
+    assert import_snapshot(mine, snap) == (1, 1)
+    assert mine.resolve_hash(md5) == sha256 and mine.resolve_hash("c" * 40) == sha256
+    assert mine.resolve_hash("e" * 32) == "e" * 32
+
+
+def test_truncated_import_changes_nothing(tmp_path):
+    theirs = Cache(str(tmp_path / "theirs.sqlite"))
+    for i in range(20):
+        _set_at(theirs, "virustotal", f"h{i}.com", "CLEAN", 100)
+    theirs.add_hash_aliases("a" * 64, ["b" * 32])
+    snap = tmp_path / "s.snap"
+    export_snapshot(theirs, str(snap))
+    cut = tmp_path / "cut.snap"
+    raw = gzip.decompress(snap.read_bytes())
+    cut.write_bytes(gzip.compress(raw[:-12]))  # inside the alias section
+    mine = Cache(str(tmp_path / "mine.sqlite"))
+    with pytest.raises(SnapshotError):
+        import_snapshot(mine, str(cut))
+    assert mine.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+
+    def failing():
+        yield from theirs.iter_rows()
+        raise OSError("source went away")
+
+    with pytest.raises(OSError):
+        mine.merge_rows(failing(), batch_size=3)
+    assert mine.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+    assert mine.merge_rows(theirs.iter_rows(), batch_size=3) == 20
+
+
+def test_cli_export_import(tmp_path, capsys):
+    a = str(tmp_path / "a.sqlite")
+    b = str(tmp_path / "b.sqlite")
+    Cache(a).set("virustotal", "x.com", "domain", _payload("CLEAN"))
+    snap = str(tmp_path / "x.snap")
+    assert main(["--cache", a, "export", snap, "--since", "1970-01-02T00:00:00Z"]) == 0
+    assert main(["--cache", b, "import", snap]) == 0
+    assert "applied 1" in capsys.readouterr().out
+    assert Cache(b).get("virustotal", "x.com", 3600) is not None
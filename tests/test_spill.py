@@ -0,0 +1,100 @@
+import asyncio
+import os
+
+import pytest
+
+from ioc_core import config as core_config
+from ioc_core import export
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.export import export_results_csv
+from ioc_core.models import AggregatedResult, ProviderResult, default_public_suffixes
+from ioc_core.spill import SpillStore
+
+
+def _result(i):
+    status = "MALICIOUS" if i % 5 == 0 else "CLEAN"
+    pr = ProviderResult(
+        "virustotal",
+        status,
+        float(i % 5 == 0),
+        [f"malicious={int(i % 5 == 0)}"],
+        None,
+        i,
+        bool(i & 1),
+        {"malicious": int(i % 5 == 0)},
+    )
+    return AggregatedResult(
+        f"10.0.{i // 256}.{i % 256}",
+        "ip",
+        status,
+        pr.score,
+        [pr],
+        {"asn": "64500"} if i % 2 else {},
+    )
+
+
+def test_pages_through_disk_with_bounded_cache(tmp_path, monkeypatch):
+    results = [_result(i) for i in range(23)]
+    store = SpillStore(str(tmp_path), page_size=4, max_pages=2)
+    store.extend(results[:10])
+    assert store[9] == results[9]  # still pending, not yet on disk
+    store.extend(results[10:])
+    assert len(store) == 23
+    assert list(store) == results
+    assert store[-1] == results[-1] and store[3:9] == results[3:9]
+    assert len(store._pages) <= 2 and len(store._pending) < 4
+    with pytest.raises(IndexError):
+        store[23]
+    assert store.count_status("MALICIOUS", "SUSPICIOUS") == 5
+    assert store.by_ioc("10.0.0.7") == [results[7]]
+    assert store.provider_names() == ["virustotal"]
+
+    assert store.count_status() == 0
+
+    # The provider columns come from the store, not from a second pass over the run
+    monkeypatch.setattr(export, "_ordered_provider_keys", None)
+    out = tmp_path / "out.csv"
+    export_results_csv(str(out), store, include_age=False)
+    assert len(out.read_text().splitlines()) == 24
+
+    path = store.path
+    assert os.path.exists(path)
+    store.close()
+    assert not os.path.exists(path)
+    with pytest.raises(ValueError):
+        store.append(results[0])
+
+
+class _Provider(core_services.BaseProvider):
+    name = "stub"
+    supported = {"ip", "domain", "hash", "url"}
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        return ProviderResult(self.name, "CLEAN", 0.0, [f"q={ioc}"], None, 1, False)
+
+
+def test_check_iocs_spills_results_into_store(tmp_path):
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    use_cache, refresh, timeout = core_config.resolve_mode("normal")
+    iocs = [f"h{i}.evil.com" for i in range(12)] + ["8.8.8.8"]
+    with SpillStore(str(tmp_path), page_size=5) as store:
+        out = asyncio.run(
+            core_services.check_iocs(
+                iocs,
+                [_Provider("k")],
+                cache,
+                {},
+                use_cache,
+                refresh,
+                timeout,
+                concurrency=3,
+                group_by=default_public_suffixes(),
+                store=store,
+            )
+        )
+        assert out is store
+        assert [r.ioc for r in store] == iocs
+        assert store[0].info == {"registrable_domain": "evil.com"}
+        # The scratch store for the grouped queries is gone
+        assert sorted(os.listdir(tmp_path)) == sorted(["c.sqlite", os.path.basename(store.path)])
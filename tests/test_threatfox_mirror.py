@@ -0,0 +1,159 @@
+import asyncio
+import json
+import zipfile
+
+import pytest
+
+from ioc_core import services as core_services
+from ioc_core import threatfox_mirror
+from ioc_core.threatfox_mirror import ThreatFoxMirror, ThreatFoxMirrorError, main
+from tests.helpers import FakeAsyncClient, freeze_time, make_response
+
+CSV_EXPORT = (
+    "################################################################\n"
+    "# ThreatFox IOCs: full data dump (CSV)                          #\n"
+    "################################################################\n"
+    "#\n"
+    '# "first_seen_utc","ioc_id","ioc_value","ioc_type","threat_type","fk_malware",'
+    '"malware_alias","malware_printable","last_seen_utc","confidence_level","reference",'
+    '"tags","anonymous","reporter"\n'
+    '"2024-05-01 10:00:00", "101", "1.2.3.4:443", "ip:port", "botnet_cc", "win.cobalt_strike", '
+    '"None", "Cobalt Strike", "", "100", "None", "c2,cs", "0", "abuse_ch"\n'
+    '"2024-05-01 11:00:00", "102", "EVIL.example.com", "domain", "payload_delivery", "unknown", '
+    '"None", "Unknown malware", "", "50", "https://ref.example/x", "None", "0", "abuse_ch"\n'
+    '"2024-05-01 12:00:00", "103", "44D88612FEA8A8F36DE82E1278ABB02F", "md5_hash", "payload", '
+    '"win.emotet", "None", "Emotet", "", "75", "None", "None", "0", "abuse_ch"\n'
+)
+
+
+class _NoNetwork(FakeAsyncClient):
+    async def post(self, url, *args, **kwargs):
+        raise AssertionError("mirror hit must not touch the network")
+
+
+def _ingest_full(tmp_path, now=1_000_000):
+    src = tmp_path / "full.csv"
+    src.write_text(CSV_EXPORT, encoding="utf-8")
+    mirror = ThreatFoxMirror(str(tmp_path / "tf.sqlite"))
+    with freeze_time(now):
+        assert mirror.ingest(str(src), full=True) == 3
+    return mirror
+
+
+def test_ingest_csv_and_lookup(tmp_path):
+    mirror = _ingest_full(tmp_path)
+    rec = mirror.lookup("1.2.3.4", "ip")
+    assert rec and rec["malware"] == "win.cobalt_strike" and rec["tags"] == ["c2", "cs"]
+    assert rec["reference"] == "https://threatfox.abuse.ch/ioc/101/"
+    assert mirror.lookup("evil.example.com", "domain")["malware_printable"] == "Unknown malware"
+    assert mirror.lookup("44d88612fea8a8f36de82e1278abb02f", "hash")["confidence_level"] == 75
+    assert mirror.lookup("5.6.7.8", "ip") is None
+
+
+def test_incremental_zip_json_updates_and_full_replaces(tmp_path):
+    mirror = _ingest_full(tmp_path)
+    recent = {
+        "104": [
+            {
+                "ioc_value": "bad.example.net",
+                "ioc_type": "domain",
+                "malware": "js.gootloader",
+                "confidence_level": 90,
+                "tags": ["loader"],
+            }
+        ],
+        "101": [
+            {
+                "ioc_value": "1.2.3.4:443",
+                "ioc_type": "ip:port",
+                "malware": "win.cobalt_strike",
+                "confidence_level": 10,
+            }
+        ],
+    }
+    zpath = tmp_path / "recent.json.zip"
+    with zipfile.ZipFile(zpath, "w") as zf:
+        zf.writestr("recent.json", json.dumps(recent))
+    assert mirror.ingest(str(zpath)) == 2
+    assert len(mirror) == 4
+    assert mirror.lookup("1.2.3.4", "ip")["confidence_level"] == 10
+    assert mirror.lookup("bad.example.net", "domain")["tags"] == ["loader"]
+    plain = tmp_path / "recent.json"
+    plain.write_text(json.dumps(recent), encoding="utf-8")
+    assert mirror.ingest(str(plain), full=True) == 2
+    assert mirror.lookup("evil.example.com", "domain") is None
+
+
+@pytest.mark.parametrize("layout", ["export", "list", "api"])
+def test_json_exports_stream_in_small_reads(tmp_path, monkeypatch, layout):
+    monkeypatch.setattr(threatfox_mirror, "_JSON_READ_SIZE", 7)
+    recs = [
+        {
+            "ioc_value": "hxxp://Bad[.]example:80/x#frag",
+            "ioc_type": "url",
+            "confidence_level": 12345,
+        },
+        {
+            "ioc_value": "Evil.Example.com.",
+            "ioc_type": "domain",
+            "tags": ["a", "b"],
+            "confidence_level": 1,
+        },
+    ]
+    data = {
+        "export": {"201": [recs[0]], "202": [recs[1]]},
+        "list": recs,
+        "api": {"query_status": "ok", "data": recs},
+    }[layout]
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+    mirror = ThreatFoxMirror(str(tmp_path / "tf.sqlite"))
+    assert mirror.ingest(str(path)) == 2
+    assert mirror.lookup("http://bad.example/x", "url")["confidence_level"] == 12345
+    assert mirror.lookup("evil.example.com", "domain")["tags"] == ["a", "b"]
+
+    path.write_text(json.dumps(data)[:-3], encoding="utf-8")
+    with pytest.raises(ThreatFoxMirrorError):
+        mirror.ingest(str(path))
+
+
+def test_provider_answers_from_fresh_mirror_offline(tmp_path):
+    mirror = _ingest_full(tmp_path, now=1_000_000)
+    prov = core_services.ThreatFoxProvider(mirror=mirror, mirror_max_age=3600)
+    with freeze_time(1_000_000 + 60):
+        hit = asyncio.run(prov.query(_NoNetwork(), "1.2.3.4", "ip", 5.0))
+        miss = asyncio.run(prov.query(_NoNetwork(), "9.9.9.9", "ip", 5.0))
+    assert hit.status == "MALICIOUS" and "family=win.cobalt_strike" in hit.evidence
+    assert miss.status == "CLEAN" and miss.evidence == ["not found"]
+
+
+def test_stale_or_incomplete_mirror_falls_back_to_api(tmp_path):
+    mirror = _ingest_full(tmp_path, now=1_000_000)
+    prov = core_services.ThreatFoxProvider(mirror=mirror, mirror_max_age=3600)
+    client = FakeAsyncClient()
+    client.queue(
+        make_response(
+            200, {"query_status": "ok", "data": [{"malware": "x", "confidence_level": 50}]}
+        )
+    )
+    with freeze_time(1_000_000 + 7200):
+        res = asyncio.run(prov.query(client, "1.2.3.4", "ip", 5.0))
+    assert res.status == "SUSPICIOUS" and res.raw_ref == "https://threatfox.abuse.ch/"
+
+    only_recent = ThreatFoxMirror(str(tmp_path / "recent-only.sqlite"))
+    only_recent.ingest_records(
+        [{"ioc_value": "1.2.3.4:80", "ioc_type": "ip:port", "confidence_level": 100}]
+    )
+    assert only_recent.synced_at() is None and not only_recent.is_fresh(10**9)
+
+
+def test_cli_ingest_and_info(tmp_path, capsys):
+    src = tmp_path / "full.csv"
+    src.write_text(CSV_EXPORT, encoding="utf-8")
+    db = str(tmp_path / "tf.sqlite")
+    assert main(["--db", db, "ingest", "--full", str(src)]) == 0
+    assert main(["--db", db, "info"]) == 0
+    assert "3 records" in capsys.readouterr().out
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json", encoding="utf-8")
+    assert main(["--db", db, "ingest", str(bad)]) == 1
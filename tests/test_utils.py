@@ -4,8 +4,9 @@ from __future__ import annotations
 import base64
 import unittest
 
-from ioc_checker.utils.helpers import classify_ioc, normalize_target_url, vt_url_id, now_utc
+from ioc_checker.utils.helpers import classify_ioc, normalize_target_url, now_utc, vt_url_id
 from ioc_core.cache import age_bucket
+from ioc_core.models import normalize_ioc
 
 
 class TestUtils(unittest.TestCase):
@@ -21,6 +22,22 @@ class TestUtils(unittest.TestCase):
         ok, t, norm, err = classify_ioc("bad input!!")
         self.assertFalse(ok); self.assertEqual(t, "invalid")
 
+    def test_normalize_ioc(self):
+        for raw in (
+            "hxxp://Evil[.]com/a",
+            "http://evil.com/a",
+            "HTTP://EVIL.COM:80/a",
+            "hXXp[:]//evil(.)com/a#frag",
+        ):
+            self.assertEqual(normalize_ioc(raw), "http://evil.com/a")
+        self.assertEqual(normalize_ioc("Evil[dot]com."), "evil.com")
+        self.assertEqual(
+            normalize_ioc("https://x.org:443/p%7e%2f?q=%aa"), "https://x.org/p~%2F?q=%AA"
+        )
+        self.assertEqual(normalize_ioc("https://x.org:8443"), "https://x.org:8443")
+        self.assertEqual(normalize_ioc("ABCDEF" + "0" * 26), "abcdef" + "0" * 26)
+        self.assertEqual(normalize_ioc("  "), "")
+
     def test_normalize_target_url(self):
         self.assertEqual(normalize_target_url("example.com"), "http://example.com")
         self.assertEqual(normalize_target_url("  https://x  "), "https://x")
@@ -44,5 +61,6 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(age_bucket(86000), "1–24h")
         self.assertEqual(age_bucket(90000), ">24h")
 
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import csv
+import gzip
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from ioc_core import services as core_services
+from ioc_core.cache import Cache
+from ioc_core.models import ProviderResult
+from ioc_core.watch import STATE_DIR, DirWatcher, DoneLedger, WatchFolder
+
+
+class CountingProvider(core_services.BaseProvider):
+    name = "counting"
+    supported = {"ip", "domain", "hash", "url"}
+
+    def __init__(self):
+        super().__init__("k")
+        self.seen = []
+
+    async def query(self, client, ioc, ioc_type, timeout):
+        self.seen.append(ioc)
+        return ProviderResult(self.name, "SUSPICIOUS", 1.0, [], None, 1, False)
+
+
+def _folder(drop, prov, cache):
+    return WatchFolder(
+        str(drop), [prov], cache, {}, True, False, 5.0, 4, settle=0, use_inotify=False
+    )
+
+
+def test_watch_folder_processes_each_file_once(tmp_path):
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    (drop / "a.txt").write_text("8.8.8.8\nevil[.]example\n8.8.8.8\n")
+    with gzip.open(str(drop / "b.log.gz"), "wb") as f:
+        f.write(b"GET hxxp://bad.example/x from 10.0.0.1\n")
+    (drop / ".hidden").write_text("1.1.1.1\n")
+    prov = CountingProvider()
+    cache = Cache(str(tmp_path / "c.sqlite"))
+
+    assert asyncio.run(_folder(drop, prov, cache).run(once=True)) == 2
+    with open(drop / "a.txt.ioc.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(r["ioc"] for r in rows) == ["8.8.8.8", "evil.example"]  # deduplicated
+    assert (drop / "b.log.gz.ioc.csv").exists()
+    assert sorted(os.listdir(drop / STATE_DIR / "done")) == ["a.txt", "b.log.gz"]
+    assert os.listdir(drop / STATE_DIR / "claimed") == []
+    assert (drop / ".hidden").exists()
+    ledger = (drop / STATE_DIR / "done.log").read_text().splitlines()
+    assert sorted(line.split("\t")[0] for line in ledger) == ["a.txt", "b.log.gz"]
+
+    # A restart finds nothing new: outputs are not inputs and done files are gone
+    assert asyncio.run(_folder(drop, prov, cache).run(once=True)) == 0
+    assert sorted(prov.seen) == ["10.0.0.1", "8.8.8.8", "evil.example", "http://bad.example/x"]
+
+
+def test_watch_folder_recovers_claimed_files(tmp_path):
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    prov = CountingProvider()
+    cache = Cache(str(tmp_path / "c.sqlite"))
+    wf = _folder(drop, prov, cache)
+    # Crashed mid-enrichment: still claimed, not in the ledger
+    (drop / STATE_DIR / "claimed" / "c.txt").write_text("9.9.9.9\n")
+    # Crashed after the ledger write but before the move: finished without a lookup
+    done = drop / STATE_DIR / "claimed" / "d.txt"
+    done.write_text("7.7.7.7\n")
+    wf.ledger.add(DoneLedger.key(str(done)))
+
+    assert asyncio.run(wf.run(once=True)) == 2
+    assert prov.seen == ["9.9.9.9"]
+    assert (drop / "c.txt.ioc.csv").exists() and not (drop / "d.txt.ioc.csv").exists()
+    assert sorted(os.listdir(drop / STATE_DIR / "done")) == ["c.txt", "d.txt"]
+
+
+def test_watch_folder_adopts_only_dead_owners_claims(tmp_path):
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    prov = CountingProvider()
+    wf = _folder(drop, prov, Cache(str(tmp_path / "c.sqlite")))
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    host = socket.gethostname()
+    dead = drop / STATE_DIR / "claimed" / f"{exited.pid}@{host}"
+    live = drop / STATE_DIR / "claimed" / f"{os.getppid()}@{host}"
+    elsewhere = drop / STATE_DIR / "claimed" / f"{exited.pid}@not-{host}"
+    for owner, ip in ((dead, "9.9.9.9"), (live, "8.8.8.8"), (elsewhere, "7.7.7.7")):
+        owner.mkdir()
+        (owner / "e.txt").write_text(ip + "\n")
+    (drop / STATE_DIR / "done" / "e.txt").write_text("archived earlier\n")
+
+    assert asyncio.run(wf.run(once=True)) == 1
+    assert prov.seen == ["9.9.9.9"]
+    assert not dead.exists()
+    assert (live / "e.txt").exists() and (elsewhere / "e.txt").exists()
+    assert sorted(os.listdir(drop / STATE_DIR / "done")) == ["e.txt", "e.txt.1"]
+    assert (drop / STATE_DIR / "done" / "e.txt").read_text() == "archived earlier\n"
+
+
+def test_claim_never_replaces_a_file_in_progress(tmp_path):
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    wf = _folder(drop, CountingProvider(), Cache(str(tmp_path / "c.sqlite")))
+    (drop / "f.txt").write_text("1.1.1.1\n")
+    first = wf._claim("f.txt")
+    (drop / "f.txt").write_text("2.2.2.2\n")
+    assert wf._claim("f.txt") is None
+    assert (drop / "f.txt").read_text() == "2.2.2.2\n"
+    assert open(first).read() == "1.1.1.1\n"
+
+
+def test_dir_watcher_wakes_on_inotify(tmp_path):
+    async def run():
+        watcher = DirWatcher(str(tmp_path), poll_interval=5.0)
+        if not watcher.inotify:
+            watcher.close()
+            pytest.skip("inotify not available")
+        try:
+            waiting = asyncio.create_task(watcher.wait())
+            await asyncio.sleep(0.05)
+            (tmp_path / "new.txt").write_text("1.1.1.1\n")
+            await asyncio.wait_for(waiting, 2)
+            return set(watcher.ready)
+        finally:
+            watcher.close()
+
+    assert asyncio.run(run()) == {"new.txt"}
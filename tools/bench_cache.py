@@ -0,0 +1,104 @@
+"""Compare legacy JSON vs compact cache payloads: DB size and get/set throughput.
+
+Usage: python tools/bench_cache.py [--rows 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.cache import Cache  # noqa: E402
+from ioc_core.config import DEFAULT_PROVIDERS  # noqa: E402
+from ioc_core.models import ProviderResult  # noqa: E402
+
+
+def _payload(i: int) -> dict:
+    prov = DEFAULT_PROVIDERS[i % len(DEFAULT_PROVIDERS)]
+    ev = [
+        f"malicious={i % 7}",
+        "suspicious=0",
+        "harmless=60",
+        "undetected=12",
+        f"reputation={-(i % 50)}",
+    ]
+    if i % 3 == 0:
+        ev.append("categories=" + ",".join(["phishing", "malware", "spam", "c2", "botnet"]))
+    return ProviderResult(
+        prov, "CLEAN", float(i % 11), ev, f"https://ref.example/{i}", 120 + i % 300, False
+    ).to_dict()
+
+
+def _fill(cache: Cache, rows: int, batch: int = 20000) -> float:
+    t0 = time.perf_counter()
+    now = int(time.time())
+    for start in range(0, rows, batch):
+        chunk = [
+            (
+                DEFAULT_PROVIDERS[i % len(DEFAULT_PROVIDERS)],
+                f"ioc-{i}.example.com",
+                "domain",
+                now,
+                cache._encode(_payload(i)),
+            )
+            for i in range(start, min(rows, start + batch))
+        ]
+        with cache.lock:
+            cache.conn.executemany(
+                "REPLACE INTO cache (provider, ioc, type, fetched_at, payload) VALUES (?,?,?,?,?)",
+                chunk,
+            )
+            cache.conn.commit()
+    return time.perf_counter() - t0
+
+
+def _bench(label: str, compact: bool, rows: int, samples: int, d: str) -> None:
+    path = os.path.join(d, f"{label}.sqlite")
+    cache = Cache(path, compact=compact)
+    cache.conn.execute("PRAGMA synchronous=OFF")
+    fill_s = _fill(cache, rows)
+    with cache.lock:
+        cache.conn.execute("VACUUM")
+    size = os.path.getsize(path)
+    rnd = random.Random(7)
+    keys = [
+        (DEFAULT_PROVIDERS[i % len(DEFAULT_PROVIDERS)], f"ioc-{i}.example.com")
+        for i in (rnd.randrange(rows) for _ in range(samples))
+    ]
+    t0 = time.perf_counter()
+    for p, ioc in keys:
+        cache.get(p, ioc, 86400)
+    get_rate = samples / (time.perf_counter() - t0)
+    set_n = min(samples, 20000)
+    t0 = time.perf_counter()
+    for i in range(set_n):
+        cache.set("virustotal", f"new-{i}.example.com", "domain", _payload(i))
+    set_rate = set_n / (time.perf_counter() - t0)
+    cache.conn.close()
+    print(
+        f"{label:8s} rows={rows} size={size / 1e6:8.1f} MB ({size / rows:6.1f} B/row) "
+        f"bulk_load={rows / fill_s:9.0f}/s get={get_rate:9.0f}/s set={set_rate:8.0f}/s"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--samples", type=int, default=100_000)
+    args = ap.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="ioc_bench_") as d:
+        _bench("json", False, args.rows, args.samples, d)
+        _bench("compact", True, args.rows, args.samples, d)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""Classify a synthetic mixed corpus with classify_ioc (per line) and classify_many (batch).
+
+Usage: python tools/bench_classify.py [--lines 5000000] [--verify]
+
+--verify checks that both paths agree on every line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.models import IOC_TYPE_NAMES, classify_ioc, classify_many  # noqa: E402
+
+
+def make_corpus(n: int, seed: int = 1) -> list[str]:
+    rnd = random.Random(seed)
+    out: list[str] = []
+    for i in range(n):
+        k = i % 10
+        if k < 3:
+            out.append(f"{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(256)}.{i & 255}")
+        elif k < 5:
+            out.append(f"host{i}.Example{i % 97}.com")
+        elif k < 7:
+            bits = (128, 160, 256)[i % 3]
+            out.append(f"{rnd.getrandbits(bits):0{bits // 4}x}")
+        elif k < 9:
+            out.append(f"https://site{i % 1000}.example.org/path/{i}?q=1")
+        else:
+            out.append(("not an ioc", "999.1.1.1", "  ", "#comment")[i % 4])
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, default=5_000_000)
+    ap.add_argument("--verify", action="store_true")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    corpus = make_corpus(args.lines)
+    print(f"corpus={len(corpus):,} lines generated in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    single = [classify_ioc(s) for s in corpus]
+    single_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    codes, values = classify_many(corpus)
+    many_s = time.perf_counter() - t0
+    print(f"classify_ioc  {single_s:.2f}s {len(corpus) / single_s:,.0f} lines/s")
+    print(
+        f"classify_many {many_s:.2f}s {len(corpus) / many_s:,.0f} lines/s "
+        f"speedup={single_s / many_s:.2f}x"
+    )
+    if args.verify:
+        bad = sum(
+            1
+            for (_, t, norm, _), c, v in zip(single, codes, values, strict=True)
+            if (t, norm) != (IOC_TYPE_NAMES[c], v)
+        )
+        print(f"mismatches={bad}")
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+"""Compare CSV and Parquet result files: size, write time and load time.
+
+Usage: python tools/bench_columnar.py [--rows 1000000]
+
+Needs the optional pyarrow package. CSV is loaded the way analysts did it:
+csv.reader plus re-parsing each "STATUS [score]" cell.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.columnar import read_table, write_parquet  # noqa: E402
+from ioc_core.export import export_results_csv  # noqa: E402
+from ioc_core.models import AggregatedResult, ProviderResult  # noqa: E402
+
+PROVIDERS = ["virustotal", "abuseipdb", "otx", "threatfox"]
+_CELL = re.compile(r"(\w+) \[(-?\d+)\]")
+
+
+def make_results(n: int, seed: int = 1) -> Iterator[AggregatedResult]:
+    rnd = random.Random(seed)
+    statuses = ["CLEAN"] * 6 + ["INCONCLUSIVE"] * 3 + ["SUSPICIOUS", "MALICIOUS"]
+    for i in range(n):
+        ip = f"{1 + (i >> 24) % 223}.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        prs = []
+        for p in PROVIDERS:
+            st = rnd.choice(statuses)
+            sc = float(rnd.randrange(10)) if st in ("SUSPICIOUS", "MALICIOUS") else 0.0
+            prs.append(
+                ProviderResult(p, st, sc, [], None, rnd.randrange(20, 900), rnd.random() < 0.5)
+            )
+        worst = max((pr.status for pr in prs), key=statuses.index)
+        yield AggregatedResult(ip, "ip", worst, sum(pr.score for pr in prs), prs)
+
+
+def load_csv(path: str) -> int:
+    n = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        r = csv.reader(f)
+        header = next(r)
+        for row in r:
+            for cell in row[len(header) - len(PROVIDERS) :]:
+                m = _CELL.match(cell)
+                if m:
+                    int(m.group(2))
+            n += 1
+    return n
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args(argv)
+    results = list(make_results(args.rows))
+    with tempfile.TemporaryDirectory(prefix="ioc_bench_") as d:
+        csv_path = os.path.join(d, "r.csv")
+        pq_path = os.path.join(d, "r.parquet")
+        t0 = time.perf_counter()
+        export_results_csv(csv_path, results, include_age=False)
+        csv_w = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        write_parquet(pq_path, results, PROVIDERS)
+        pq_w = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        load_csv(csv_path)
+        csv_r = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        read_table(pq_path)
+        pq_r = time.perf_counter() - t0
+        print(f"rows={args.rows:,}")
+        print(
+            f"csv     size={os.path.getsize(csv_path) / 1e6:8.1f} MB "
+            f"write={csv_w:6.2f}s load={csv_r:6.2f}s"
+        )
+        print(
+            f"parquet size={os.path.getsize(pq_path) / 1e6:8.1f} MB "
+            f"write={pq_w:6.2f}s load={pq_r:6.2f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+"""Build a compiled cache from N rows and measure compile time, open time and lookups/s.
+
+Usage: python tools/bench_compiled_cache.py [--rows 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.cache import Cache  # noqa: E402
+from ioc_core.compiled_cache import CompiledCache, compile_cache  # noqa: E402
+from ioc_core.models import ProviderResult  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--lookups", type=int, default=200_000)
+    args = ap.parse_args(argv)
+    payload = ProviderResult(
+        "virustotal", "CLEAN", 0.0, ["malicious=0", "harmless=70"], None, 100, False
+    ).to_dict()
+    with tempfile.TemporaryDirectory(prefix="ioc_bench_") as d:
+        cache = Cache(os.path.join(d, "src.sqlite"))
+        cache.conn.execute("PRAGMA synchronous=OFF")
+        for start in range(0, args.rows, 50_000):
+            cache.set_many(
+                ("virustotal", f"ioc-{i}.example.com", "domain", payload)
+                for i in range(start, min(args.rows, start + 50_000))
+            )
+        out = os.path.join(d, "cache.idx")
+        t0 = time.perf_counter()
+        n = compile_cache(cache, out)
+        compile_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cc = CompiledCache(out)
+        open_ms = (time.perf_counter() - t0) * 1000
+        rnd = random.Random(1)
+        keys = [f"ioc-{rnd.randrange(args.rows * 2)}.example.com" for _ in range(args.lookups)]
+        t0 = time.perf_counter()
+        hits = sum(1 for k in keys if cc.lookup("virustotal", k) is not None)
+        rate = args.lookups / (time.perf_counter() - t0)
+        print(
+            f"entries={n} file={os.path.getsize(out) / 1e6:.1f} MB compile={compile_s:.1f}s "
+            f"open={open_ms:.2f}ms lookups={rate:,.0f}/s hit_ratio={hits / args.lookups:.2f}"
+        )
+        cc.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""Measure IOC extraction throughput (MB/s) on a synthetic proxy log, plain and compressed.
+
+Usage: python tools/bench_extract.py [--mb 200] [--formats plain,gz,bz2,xz]
+"""
+
+from __future__ import annotations
+
+import argparse
+import bz2
+import gzip
+import lzma
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.extract import extract_iocs, iter_chunks  # noqa: E402
+
+
+def make_log(path: str, mb: int, seed: int = 1) -> int:
+    rnd = random.Random(seed)
+    target = mb * 1_000_000
+    written = 0
+    with open(path, "w", encoding="ascii") as f:
+        i = 0
+        while written < target:
+            lines = []
+            for _ in range(1000):
+                i += 1
+                ip = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+                host = f"host{rnd.randrange(50_000)}.example{rnd.randrange(300)}.com"
+                extra = f" sha256={rnd.getrandbits(256):064x}" if i % 20 == 0 else ""
+                lines.append(
+                    f"2024-05-01T12:00:{i % 60:02d}Z {ip} TCP_MISS/200 {rnd.randrange(99999)} GET "
+                    f"http://{host}/path/{i % 977}/index.html - DIRECT/{ip} text/html"
+                    f" ua=\"Mozilla/5.0 (Windows NT 10.0; Win64; x64)\"{extra}\n"
+                )
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--mb", type=int, default=200)
+    ap.add_argument("--formats", default="plain,gz,bz2,xz")
+    args = ap.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="ioc_bench_") as d:
+        plain = os.path.join(d, "proxy.log")
+        size = make_log(plain, args.mb)
+        for fmt in [x.strip() for x in args.formats.split(",") if x.strip()]:
+            path = plain
+            if fmt != "plain":
+                path = f"{plain}.{fmt}"
+                opener = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}[fmt]
+                with open(plain, "rb") as src, opener(path, "wb") as dst:
+                    while True:
+                        b = src.read(1 << 20)
+                        if not b:
+                            break
+                        dst.write(b)
+            t0 = time.perf_counter()
+            for _ in iter_chunks(path):
+                pass
+            read_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            n = sum(1 for _ in extract_iocs(path))
+            ext_s = time.perf_counter() - t0
+            print(
+                f"{fmt:5s} file={os.path.getsize(path) / 1e6:7.1f} MB "
+                f"read-only={size / 1e6 / read_s:7.1f} MB/s "
+                f"extract={size / 1e6 / ext_s:6.1f} MB/s unique_iocs={n:,}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+"""Build an IP-ASN table from N synthetic ranges and measure build time, open time and lookups/s.
+
+Usage: python tools/bench_ipasn.py [--ranges 500000] [--lookups 1000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.ipasn import IpAsnDb, build_table  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--ranges", type=int, default=500_000)
+    ap.add_argument("--lookups", type=int, default=1_000_000)
+    args = ap.parse_args(argv)
+    rnd = random.Random(1)
+    step = (1 << 32) // args.ranges
+    ranges = [
+        (
+            i * step,
+            i * step + step // 2,
+            1 + rnd.randrange(70_000),
+            "US" if i % 3 else "DE",
+            f"AS-NAME-{i % 5000}",
+        )
+        for i in range(args.ranges)
+    ]
+    with tempfile.TemporaryDirectory(prefix="ioc_bench_") as d:
+        out = os.path.join(d, "ipasn.db")
+        t0 = time.perf_counter()
+        n = build_table(ranges, out)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        db = IpAsnDb(out)
+        open_ms = (time.perf_counter() - t0) * 1000
+        ints = [rnd.randrange(1 << 32) for _ in range(args.lookups)]
+        ips = [f"{x >> 24}.{x >> 16 & 255}.{x >> 8 & 255}.{x & 255}" for x in ints[:200_000]]
+        t0 = time.perf_counter()
+        hits = sum(1 for x in ints if db.lookup_int(x) is not None)
+        int_rate = len(ints) / (time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        for ip in ips:
+            db.lookup(ip)
+        str_rate = len(ips) / (time.perf_counter() - t0)
+        print(
+            f"ranges={n} file={os.path.getsize(out) / 1e6:.1f} MB "
+            f"build={build_s:.2f}s open={open_ms:.2f}ms "
+            f"lookup_int={int_rate:,.0f}/s lookup(str)={str_rate:,.0f}/s "
+            f"hit_ratio={hits / len(ints):.2f}"
+        )
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
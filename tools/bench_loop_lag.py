@@ -0,0 +1,93 @@
+"""Measure event-loop lag while enrichment-style cache traffic runs.
+
+Compares the blocking Cache API (as fetch_with_cache used it) against AsyncCache.
+Usage: python tools/bench_loop_lag.py [--tasks 2000] [--rows 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.cache import AsyncCache, Cache  # noqa: E402
+from ioc_core.models import ProviderResult  # noqa: E402
+
+_PAYLOAD = ProviderResult(
+    "virustotal", "CLEAN", 0.0, ["malicious=0", "harmless=70"], None, 100, False
+).to_dict()
+
+
+async def _ticker(lags: list[float], stop: asyncio.Event, period: float = 0.001) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(period)
+        lags.append(time.perf_counter() - t0 - period)
+
+
+async def _worker(cache: Cache | AsyncCache, i: int) -> None:
+    ioc = f"host-{i}.example.com"
+    if isinstance(cache, AsyncCache):
+        await cache.get("virustotal", ioc, 3600)
+        await asyncio.sleep(0)  # stand-in for the network await
+        await cache.set("virustotal", ioc, "domain", _PAYLOAD)
+    else:
+        cache.get("virustotal", ioc, 3600)
+        await asyncio.sleep(0)
+        cache.set("virustotal", ioc, "domain", _PAYLOAD)
+
+
+async def _run(cache: Cache | AsyncCache, tasks: int) -> tuple[float, list[float]]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(_ticker(lags, stop))
+    t0 = time.perf_counter()
+    await asyncio.gather(*[_worker(cache, i) for i in range(tasks)])
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await tick
+    if isinstance(cache, AsyncCache):
+        await cache.aclose()
+    return elapsed, lags
+
+
+def _report(label: str, elapsed: float, tasks: int, lags: list[float]) -> None:
+    lags = sorted(lags) or [0.0]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(
+        f"{label:6s} {tasks / elapsed:8.0f} ops/s  lag p50={statistics.median(lags) * 1000:7.2f}ms "
+        f"p99={p99 * 1000:7.2f}ms max={lags[-1] * 1000:7.2f}ms ticks={len(lags)}"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--tasks", type=int, default=2000)
+    ap.add_argument(
+        "--rows", type=int, default=200_000, help="pre-filled rows to make lookups realistic"
+    )
+    args = ap.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="ioc_bench_") as d:
+        for label in ("sync", "async"):
+            cache = Cache(os.path.join(d, f"{label}.sqlite"))
+            cache.set_many(
+                ("virustotal", f"seed-{i}.example.com", "domain", _PAYLOAD)
+                for i in range(args.rows)
+            )
+            target: Cache | AsyncCache = cache if label == "sync" else AsyncCache(cache)
+            elapsed, lags = asyncio.run(_run(target, args.tasks))
+            _report(label, elapsed, args.tasks, lags)
+            cache.conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
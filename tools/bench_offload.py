@@ -0,0 +1,142 @@
+"""Offloaded stages inline vs on an Offloader process pool.
+
+Usage: python tools/bench_offload.py [--responses 50000] [--log-mb 64] [--workers 1,2,4]
+
+- parse: the recorded-response workload. Provider fixtures in tests/fixtures,
+  grown to production size (a VirusTotal report with ~90 engine verdicts, OTX
+  with a page of pulses), replayed round-robin with distinct IOCs.
+- scan: ``extract_iocs`` over a synthetic proxy log (tools/bench_extract.py).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from bench_extract import make_log  # noqa: E402
+
+from ioc_core.extract import extract_iocs  # noqa: E402
+from ioc_core.offload import Offloader, ResponseItem, parse_responses, scan_blocks  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+
+
+def _fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        data: dict = json.load(f)
+    return data
+
+
+def recorded_bodies() -> list[tuple[str, bytes]]:
+    vt = _fixture("vt_ok.json")
+    vt["data"]["attributes"]["last_analysis_results"] = {
+        f"engine{k}": {
+            "category": "harmless" if k % 9 else "malicious",
+            "engine_name": f"Engine {k}",
+            "method": "blacklist",
+            "result": "clean" if k % 9 else "malware",
+        }
+        for k in range(90)
+    }
+    otx = _fixture("otx_ok.json")
+    otx["pulse_info"]["pulses"] = [
+        {
+            "id": f"{k:024x}",
+            "name": f"Campaign {k}",
+            "tags": ["phishing", "c2"],
+            "created": "2024-01-01T00:00:00",
+        }
+        for k in range(20)
+    ]
+    otx["pulse_info"]["count"] = 20
+    abuse = _fixture("abuse_ok.json")
+    return [
+        (name, json.dumps(body).encode())
+        for name, body in (("virustotal", vt), ("otx", otx), ("abuseipdb", abuse))
+    ]
+
+
+def workload(n: int) -> list[ResponseItem]:
+    bodies = recorded_bodies()
+    items: list[ResponseItem] = []
+    for i in range(n):
+        provider, body = bodies[i % len(bodies)]
+        ioc = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        items.append(
+            (provider, ioc, "ip", f"https://ref.example/{provider}/{ioc}", 100 + i % 900, body)
+        )
+    return items
+
+
+def bench_parse(n: int, pools: list[int]) -> None:
+    items = workload(n)
+    mib = sum(len(it[5]) for it in items) / 2**20
+    print(f"parse: responses={len(items):,} ({mib:.0f} MiB of JSON)")
+    t0 = time.perf_counter()
+    expected = parse_responses(items)
+    base = time.perf_counter() - t0
+    print(f"  inline     {base:6.2f}s  {len(items) / base:9,.0f} responses/s")
+    for workers in pools:
+        with Offloader(workers) as off:
+            off.map(parse_responses, items[: off.min_batch])  # start the pool outside the timing
+            t0 = time.perf_counter()
+            got = off.map(parse_responses, items)
+            elapsed = time.perf_counter() - t0
+        assert got == expected
+        print(
+            f"  workers={workers}  {elapsed:6.2f}s  {len(items) / elapsed:9,.0f} responses/s"
+            f"  x{base / elapsed:.2f}"
+        )
+
+
+def bench_scan(mb: int, pools: list[int]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "proxy.log")
+        size = make_log(path, mb)
+        print(f"scan: log={size / 1e6:.0f} MB")
+        t0 = time.perf_counter()
+        expected = list(extract_iocs(path))
+        base = time.perf_counter() - t0
+        print(f"  inline     {base:6.2f}s  {size / 1e6 / base:6.1f} MB/s")
+        for workers in pools:
+            with Offloader(workers) as off:
+                off.map(
+                    scan_blocks, [b"", b""], chunk_size=1, min_batch=2
+                )  # start the pool outside the timing
+                t0 = time.perf_counter()
+                got = list(extract_iocs(path, offload=off))
+                elapsed = time.perf_counter() - t0
+            assert got == expected
+            print(
+                f"  workers={workers}  {elapsed:6.2f}s  {size / 1e6 / elapsed:6.1f} MB/s"
+                f"  x{base / elapsed:.2f}"
+            )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--responses", type=int, default=50_000)
+    ap.add_argument("--log-mb", type=int, default=64)
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated pool sizes")
+    ap.add_argument("--stages", default="parse,scan")
+    args = ap.parse_args(argv)
+    pools = [int(w) for w in args.workers.split(",") if w.strip()]
+    stages = {s.strip() for s in args.stages.split(",")}
+    print(f"cpus={os.cpu_count()}")
+    if "parse" in stages:
+        bench_parse(args.responses, pools)
+    if "scan" in stages:
+        bench_scan(args.log_mb, pools)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,93 @@
+"""Build an OTX pulse index from a recorded (or synthetic) pulse dump; report time and memory.
+
+Usage: python tools/bench_otx_index.py [--dump pulses.json] [--pulses 5000 --per-pulse 200]
+
+Reports build time, peak Python heap during ingestion (tracemalloc), on-disk index
+size and local lookups/s.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.otx_index import OTXIndex  # noqa: E402
+
+
+def _synthetic_dump(path: str, pulses: int, per_pulse: int) -> None:
+    rnd = random.Random(1)
+    kinds = ["IPv4", "domain", "hostname", "URL", "FileHash-SHA256", "FileHash-MD5"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for p in range(pulses):
+            inds = []
+            for _ in range(per_pulse):
+                # draw from a shared pool so indicators recur across pulses
+                n = rnd.randrange(pulses * per_pulse // 3)
+                kind = kinds[n % len(kinds)]
+                value = {
+                    "IPv4": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}",
+                    "URL": f"http://host{n}.example.com/x",
+                    "FileHash-SHA256": f"{n:064x}",
+                    "FileHash-MD5": f"{n:032x}",
+                }.get(kind, f"host{n}.example.com")
+                inds.append({"indicator": value, "type": kind})
+            pulse = {
+                "id": f"{p:024x}",
+                "name": f"pulse {p}",
+                "modified": f"2024-01-01T00:{p % 60:02d}:00",
+                "indicators": inds,
+            }
+            f.write(("," if p else "") + json.dumps(pulse))
+        f.write("]")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--dump", help="recorded pulse dump (JSON list or subscribed-API page)")
+    ap.add_argument("--pulses", type=int, default=5000)
+    ap.add_argument("--per-pulse", type=int, default=200)
+    ap.add_argument("--lookups", type=int, default=100_000)
+    args = ap.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="ioc_bench_") as d:
+        dump = args.dump
+        if not dump:
+            dump = os.path.join(d, "pulses.json")
+            _synthetic_dump(dump, args.pulses, args.per_pulse)
+        db = os.path.join(d, "otx.sqlite")
+        idx = OTXIndex(db)
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        n = idx.ingest_dump(dump)
+        build_s = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows = idx.conn.execute("SELECT ioc, type FROM indicators").fetchall()
+        rnd = random.Random(2)
+        probe = [rnd.choice(rows) for _ in range(args.lookups)] if rows else []
+        t0 = time.perf_counter()
+        for ioc, kind in probe:
+            idx.lookup(ioc, kind)
+        rate = len(probe) / max(1e-9, time.perf_counter() - t0)
+        print(
+            f"dump={os.path.getsize(dump) / 1e6:.1f} MB pulses={n} indicators={len(rows)} "
+            f"build={build_s:.1f}s peak_heap={peak / 1e6:.1f} MB "
+            f"index={os.path.getsize(db) / 1e6:.1f} MB "
+            f"lookups={rate:,.0f}/s"
+        )
+        idx.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
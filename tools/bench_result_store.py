@@ -0,0 +1,95 @@
+"""Memory per IOC for a run held as a list of AggregatedResult vs a ResultStore.
+
+Usage: python tools/bench_result_store.py [--iocs 200000] [--providers 3]
+
+Sizes are measured with tracemalloc, so only Python allocations are counted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.models import AggregatedResult, ProviderResult, ResultStore  # noqa: E402
+
+PROVIDERS = ("virustotal", "abuseipdb", "otx", "urlscan", "threatfox")
+STATUSES = ("CLEAN", "CLEAN", "CLEAN", "INCONCLUSIVE", "SUSPICIOUS", "MALICIOUS")
+
+
+def make_result(i: int, n_providers: int) -> AggregatedResult:
+    # Fresh strings per result, as parsed from provider responses
+    prs = []
+    for k in range(n_providers):
+        status = STATUSES[(i + k) % len(STATUSES)]
+        evidence = [f"engines={(i + k) % 7}", f"country={('US', 'DE', 'NL', 'RU')[i % 4]}"]
+        prs.append(
+            ProviderResult(
+                "".join(PROVIDERS[k]),
+                "".join(status),
+                float((i + k) % 7),
+                evidence,
+                f"https://ref.example/{k}/{i}",
+                100 + i % 900,
+                bool(i & 1),
+            )
+        )
+    info = {"asn": str(64500 + i % 50), "country": ("US", "DE", "NL", "RU")[i % 4]}
+    return AggregatedResult(
+        f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", "ip", prs[0].status, 3.0, prs, info
+    )
+
+
+def measure(build):  # type: ignore[no-untyped-def]
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--iocs", type=int, default=200_000)
+    ap.add_argument("--providers", type=int, default=3, choices=range(1, len(PROVIDERS) + 1))
+    args = ap.parse_args(argv)
+    n, p = args.iocs, args.providers
+
+    results, list_bytes, list_s = measure(lambda: [make_result(i, p) for i in range(n)])
+    del results
+    store, store_bytes, store_s = measure(lambda: ResultStore(make_result(i, p) for i in range(n)))
+    print(f"iocs={n:,} providers={p}")
+    print(
+        f"list[AggregatedResult] {list_bytes / n:8.0f} B/IOC  {list_bytes / 2**20:8.1f} MiB"
+        f"  built in {list_s:.1f}s"
+    )
+    print(
+        f"ResultStore            {store_bytes / n:8.0f} B/IOC  {store_bytes / 2**20:8.1f} MiB"
+        f"  built in {store_s:.1f}s"
+    )
+    print(f"ratio {list_bytes / store_bytes:.1f}x")
+
+    t0 = time.perf_counter()
+    hits = store.count_status("MALICIOUS", "SUSPICIOUS")
+    count_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in store:
+        pass
+    iter_s = time.perf_counter() - t0
+    print(f"count_status {count_s * 1000:.0f} ms ({hits:,} hits), iterate views {iter_s:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from ioc_core.cache import Cache  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        description="Convert legacy JSON cache rows to the compact payload format."
+    )
+    ap.add_argument(
+        "path", nargs="?", default=".ioc_enricher_cache.sqlite", help="SQLite cache file"
+    )
+    ap.add_argument("--batch-size", type=int, default=5000)
+    ap.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to reclaim space")
+    args = ap.parse_args(argv)
+    if not os.path.exists(args.path):
+        print(f"No such cache: {args.path}", file=sys.stderr)
+        return 1
+    before = os.path.getsize(args.path)
+    cache = Cache(args.path)
+    n = cache.migrate_payloads(batch_size=args.batch_size)
+    if args.vacuum:
+        with cache.lock:
+            cache.conn.execute("VACUUM")
+    cache.conn.close()
+    after = os.path.getsize(args.path)
+    print(f"Converted {n} rows; size {before} -> {after} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())